@@ -0,0 +1,429 @@
+"""Load generator for the chat and meal-logging edge functions.
+
+Drives concurrent simulated user sessions against ``functions/v1/openai-chat``
+(JSON and SSE), ``nutrition-resolver`` (batch) and ``nutrition-gemini``, and
+reports throughput, latency percentiles, error rates and SSE TTFB/TTFT per
+endpoint.
+
+Sessions are picked from the features in testsprite_tests/standard_prd.json,
+weighted by their priority (high 3, medium 2, low 1). Each feature maps to a
+scenario in workload.json, and features without an LLM endpoint are skipped:
+
+- chat: 1-3 turns with think time, history carried between turns, a share
+  of them streamed
+- tdee_chat: a single TDEE question
+- meal_log: resolver batch for the parsed items, plus a Gemini lookup for
+  branded foods
+
+Arrival models:
+
+- closed (default): ``--stages`` is a list of virtual-user counts. Each user
+  runs sessions back to back.
+- open: ``--stages`` is a list of session arrival rates per second, with
+  Poisson arrivals. ``--max-inflight`` caps concurrent sessions; arrivals
+  over the cap are counted as dropped.
+
+Each stage runs for ``--duration`` seconds after ``--warmup``. Stepping the
+stages (e.g. ``--stages 5,10,20,40``) shows where p95 and errors turn up.
+
+    pip install -r perf/requirements.txt
+    python perf/mock_llm/server.py --profile realistic &        # optional
+    SUPABASE_URL=http://127.0.0.1:54321 SUPABASE_ANON_KEY=... \\
+      python perf/loadgen.py --stages 5,10,20 --duration 60 --out perf/results/run.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Optional
+
+import aiohttp
+
+HERE = Path(__file__).resolve().parent
+PRD_PATH = HERE.parent / "testsprite_tests" / "standard_prd.json"
+WORKLOAD_PATH = HERE / "workload.json"
+
+PRIORITY_WEIGHTS = {"high": 3, "medium": 2, "low": 1}
+
+
+# ---------- Stats ----------
+
+def percentile(values: list[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no samples."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[max(1, math.ceil(p / 100 * len(ordered))) - 1], 1)
+
+
+def distribution(values: list[float]) -> dict[str, Any]:
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 1) if values else None,
+    }
+
+
+@dataclass
+class EndpointStats:
+    latencies: list[float] = field(default_factory=list)
+    ttfb: list[float] = field(default_factory=list)
+    ttft: list[float] = field(default_factory=list)
+    ok: int = 0
+    errors: dict[str, int] = field(default_factory=lambda: defaultdict(int))
+
+    def report(self, window_s: float) -> dict[str, Any]:
+        total = self.ok + sum(self.errors.values())
+        out: dict[str, Any] = {
+            "requests": total,
+            "ok": self.ok,
+            "error_rate": round(sum(self.errors.values()) / total, 4) if total else 0.0,
+            "errors": dict(self.errors),
+            "throughput_rps": round(self.ok / window_s, 2) if window_s > 0 else None,
+            "latency_ms": distribution(self.latencies),
+        }
+        if self.ttfb:
+            out["sse_ttfb_ms"] = distribution(self.ttfb)
+        if self.ttft:
+            out["sse_ttft_ms"] = distribution(self.ttft)
+        return out
+
+
+class Recorder:
+    """Collects results; only requests that start after warmup are counted."""
+
+    def __init__(self) -> None:
+        self.endpoints: dict[str, EndpointStats] = defaultdict(EndpointStats)
+        self.measuring = False
+        self.sessions = 0
+        self.dropped = 0
+        self.window_start = 0.0
+        self.window_end = 0.0
+
+    def record(self, endpoint: str, started: float, ms: float, error: Optional[str],
+               ttfb: Optional[float] = None, ttft: Optional[float] = None) -> None:
+        if not self.measuring or started < self.window_start:
+            return
+        stats = self.endpoints[endpoint]
+        if error:
+            stats.errors[error] += 1
+            return
+        stats.ok += 1
+        stats.latencies.append(ms)
+        if ttfb is not None:
+            stats.ttfb.append(ttfb)
+        if ttft is not None:
+            stats.ttft.append(ttft)
+
+    def report(self) -> dict[str, Any]:
+        window = max(0.001, self.window_end - self.window_start)
+        return {
+            "window_s": round(window, 1),
+            "sessions": self.sessions,
+            "dropped_sessions": self.dropped,
+            "endpoints": {name: s.report(window) for name, s in sorted(self.endpoints.items())},
+        }
+
+
+# ---------- Workload ----------
+
+@dataclass
+class Workload:
+    scenarios: list[str]
+    weights: list[int]
+    data: dict[str, Any]
+
+    @classmethod
+    def load(cls, prd_path: Path = PRD_PATH, workload_path: Path = WORKLOAD_PATH) -> "Workload":
+        data = json.loads(workload_path.read_text(encoding="utf-8"))
+        prd = json.loads(prd_path.read_text(encoding="utf-8"))
+        weights: dict[str, int] = defaultdict(int)
+        for feature in prd.get("key_features", []):
+            scenario = data["feature_scenarios"].get(feature.get("name"))
+            if scenario:
+                weights[scenario] += PRIORITY_WEIGHTS.get(str(feature.get("priority", "low")).lower(), 1)
+        if not weights:
+            raise SystemExit(f"No features in {prd_path} map to a scenario in {workload_path}")
+        return cls(scenarios=list(weights), weights=list(weights.values()), data=data)
+
+    def pick(self, rng: random.Random) -> str:
+        return rng.choices(self.scenarios, weights=self.weights)[0]
+
+
+# ---------- Client ----------
+
+class EdgeClient:
+    def __init__(self, session: aiohttp.ClientSession, base_url: str, token: str, anon_key: str,
+                 user_id: Optional[str], recorder: Recorder, timeout_s: float):
+        self.http = session
+        self.functions_url = f"{base_url.rstrip('/')}/functions/v1"
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "apikey": anon_key,
+            "Content-Type": "application/json",
+        }
+        self.user_id = user_id
+        self.recorder = recorder
+        self.timeout = aiohttp.ClientTimeout(total=timeout_s)
+
+    async def post_json(self, endpoint: str, body: dict[str, Any]) -> Optional[dict[str, Any]]:
+        started = time.perf_counter()
+        error: Optional[str] = None
+        data: Optional[dict[str, Any]] = None
+        try:
+            async with self.http.post(f"{self.functions_url}/{endpoint}", json=body,
+                                      headers=self.headers, timeout=self.timeout) as resp:
+                raw = await resp.read()
+                if resp.status >= 400:
+                    error = f"http_{resp.status}"
+                else:
+                    try:
+                        data = json.loads(raw)
+                    except json.JSONDecodeError:
+                        error = "bad_json"
+                    else:
+                        if isinstance(data, dict) and data.get("error"):
+                            error = "app_error"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as exc:
+            error = type(exc).__name__
+        ms = (time.perf_counter() - started) * 1000
+        self.recorder.record(endpoint, started, ms, error)
+        return data
+
+    async def stream_chat(self, messages: list[dict[str, str]]) -> str:
+        """POST openai-chat with stream=true and time the SSE relay."""
+        endpoint = "openai-chat[sse]"
+        body = {"messages": messages, "stream": True, **({"userId": self.user_id} if self.user_id else {})}
+        started = time.perf_counter()
+        ttfb = ttft = None
+        error: Optional[str] = None
+        text: list[str] = []
+        try:
+            async with self.http.post(f"{self.functions_url}/openai-chat", json=body,
+                                      headers=self.headers, timeout=self.timeout) as resp:
+                ttfb = (time.perf_counter() - started) * 1000
+                if resp.status >= 400:
+                    await resp.read()
+                    error = f"http_{resp.status}"
+                else:
+                    done = False
+                    async for raw_line in resp.content:
+                        line = raw_line.decode("utf-8", "replace").strip()
+                        if not line.startswith("data:"):
+                            continue
+                        payload = line[5:].strip()
+                        if payload == "[DONE]":
+                            done = True
+                            break
+                        try:
+                            event = json.loads(payload)
+                        except json.JSONDecodeError:
+                            continue
+                        token = event.get("token") or ((event.get("choices") or [{}])[0].get("delta") or {}).get("content")
+                        if token:
+                            if ttft is None:
+                                ttft = (time.perf_counter() - started) * 1000
+                            text.append(token)
+                    if not done:
+                        error = "stream_truncated"
+                    elif ttft is None:
+                        error = "no_tokens"
+        except asyncio.TimeoutError:
+            error = "timeout"
+        except aiohttp.ClientError as exc:
+            error = type(exc).__name__
+        ms = (time.perf_counter() - started) * 1000
+        self.recorder.record(endpoint, started, ms, error, ttfb=ttfb, ttft=ttft)
+        return "".join(text)
+
+    async def chat(self, messages: list[dict[str, str]], stream: bool) -> str:
+        if stream:
+            return await self.stream_chat(messages)
+        body = {"messages": messages, "stream": False, **({"userId": self.user_id} if self.user_id else {})}
+        data = await self.post_json("openai-chat", body)
+        return (data or {}).get("message") or ""
+
+
+# ---------- Sessions ----------
+
+async def think(rng: random.Random, args: argparse.Namespace) -> None:
+    if args.think_time > 0:
+        await asyncio.sleep(rng.expovariate(1 / args.think_time))
+
+
+async def run_session(client: EdgeClient, workload: Workload, rng: random.Random, args: argparse.Namespace) -> None:
+    data = workload.data
+    scenario = workload.pick(rng)
+
+    if scenario == "chat":
+        messages = [{"role": "user", "content": rng.choice(data["chat_prompts"])}]
+        for turn in range(rng.randint(1, 3)):
+            if turn:
+                await think(rng, args)
+                messages.append({"role": "user", "content": rng.choice(data["chat_followups"])})
+            reply = await client.chat(messages, stream=rng.random() < args.stream_ratio)
+            messages.append({"role": "assistant", "content": reply or "..."})
+
+    elif scenario == "tdee_chat":
+        await client.chat([{"role": "user", "content": rng.choice(data["tdee_prompts"])}],
+                          stream=rng.random() < args.stream_ratio)
+
+    elif scenario == "meal_log":
+        meal = rng.choice(data["meals"])
+        await client.post_json("nutrition-resolver", {"items": meal["items"]})
+        if rng.random() < args.branded_ratio:
+            await think(rng, args)
+            await client.post_json("nutrition-gemini", {"foodName": rng.choice(data["branded_foods"])})
+
+
+# ---------- Arrival models ----------
+
+async def closed_loop(client: EdgeClient, workload: Workload, users: int, deadline: float,
+                      args: argparse.Namespace, recorder: Recorder, seed: int) -> None:
+    async def user(i: int) -> None:
+        rng = random.Random(seed * 100_003 + i)
+        # Spread start-up so users don't fire in lockstep
+        await asyncio.sleep(rng.uniform(0, min(2.0, args.warmup or 2.0)))
+        while time.perf_counter() < deadline:
+            await run_session(client, workload, rng, args)
+            recorder.sessions += recorder.measuring
+            await think(rng, args)
+
+    await asyncio.gather(*(user(i) for i in range(users)))
+
+
+async def open_loop(client: EdgeClient, workload: Workload, rate: float, deadline: float,
+                    args: argparse.Namespace, recorder: Recorder, seed: int) -> None:
+    rng = random.Random(seed)
+    inflight: set[asyncio.Task] = set()
+
+    async def session(session_rng: random.Random) -> None:
+        await run_session(client, workload, session_rng, args)
+        recorder.sessions += recorder.measuring
+
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(rng.expovariate(rate))
+        if len(inflight) >= args.max_inflight:
+            recorder.dropped += recorder.measuring
+            continue
+        task = asyncio.create_task(session(random.Random(rng.getrandbits(64))))
+        inflight.add(task)
+        task.add_done_callback(inflight.discard)
+
+    if inflight:
+        await asyncio.wait(inflight, timeout=args.timeout)
+
+
+async def run_stage(load: float, args: argparse.Namespace, workload: Workload, seed: int) -> dict[str, Any]:
+    recorder = Recorder()
+    connector = aiohttp.TCPConnector(limit=args.connections, keepalive_timeout=30, ttl_dns_cache=300)
+    async with aiohttp.ClientSession(connector=connector) as http:
+        client = EdgeClient(http, args.supabase_url, args.token or args.anon_key, args.anon_key,
+                            args.user_id, recorder, args.timeout)
+        start = time.perf_counter()
+        deadline = start + args.warmup + args.duration
+
+        async def open_window() -> None:
+            await asyncio.sleep(args.warmup)
+            recorder.measuring = True
+            recorder.window_start = time.perf_counter()
+
+        window = asyncio.create_task(open_window())
+        if args.model == "closed":
+            await closed_loop(client, workload, int(load), deadline, args, recorder, seed)
+        else:
+            await open_loop(client, workload, load, deadline, args, recorder, seed)
+        await window
+        recorder.window_end = min(time.perf_counter(), deadline)
+
+    return {"model": args.model, ("users" if args.model == "closed" else "rate_per_s"): load, **recorder.report()}
+
+
+# ---------- Output ----------
+
+def print_stage(stage: dict[str, Any]) -> None:
+    key = "users" if "users" in stage else "rate_per_s"
+    print(f"\n== {key}={stage[key]}  window={stage['window_s']}s  sessions={stage['sessions']}  dropped={stage['dropped_sessions']}")
+    print(f"{'endpoint':<22}{'req':>6}{'rps':>8}{'err%':>7}{'p50':>8}{'p95':>8}{'p99':>8}{'ttft50':>8}{'ttft95':>8}")
+    for name, ep in stage["endpoints"].items():
+        lat = ep["latency_ms"]
+        ttft = ep.get("sse_ttft_ms", {})
+        cells = [lat["p50"], lat["p95"], lat["p99"], ttft.get("p50"), ttft.get("p95")]
+        print(f"{name:<22}{ep['requests']:>6}{(ep['throughput_rps'] or 0):>8.2f}{ep['error_rate'] * 100:>6.1f}%"
+              + "".join(f"{('-' if v is None else f'{v:.0f}'):>8}" for v in cells))
+        if ep["errors"]:
+            print(f"{'':<22}errors: {ep['errors']}")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--supabase-url", default=os.environ.get("SUPABASE_URL") or os.environ.get("VITE_SUPABASE_URL"))
+    parser.add_argument("--anon-key", default=os.environ.get("SUPABASE_ANON_KEY") or os.environ.get("VITE_SUPABASE_ANON_KEY"))
+    parser.add_argument("--token", default=os.environ.get("LOADGEN_ACCESS_TOKEN"),
+                        help="user JWT for Authorization (default: anon key)")
+    parser.add_argument("--user-id", default=os.environ.get("LOADGEN_USER_ID"), help="userId sent to openai-chat")
+    parser.add_argument("--model", choices=["closed", "open"], default="closed")
+    parser.add_argument("--stages", default="5", help="comma list: virtual users (closed) or sessions/s (open)")
+    parser.add_argument("--duration", type=float, default=60, help="measured seconds per stage")
+    parser.add_argument("--warmup", type=float, default=10, help="unmeasured seconds before each stage")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean think time between user actions (s)")
+    parser.add_argument("--stream-ratio", type=float, default=0.5, help="share of chat turns sent with stream=true")
+    parser.add_argument("--branded-ratio", type=float, default=0.3, help="share of meal logs that also hit nutrition-gemini")
+    parser.add_argument("--connections", type=int, default=100, help="HTTP connection pool size")
+    parser.add_argument("--max-inflight", type=int, default=500, help="open model: concurrent session cap")
+    parser.add_argument("--timeout", type=float, default=90, help="per-request timeout (s)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", type=Path, help="write the JSON report here")
+    args = parser.parse_args(argv)
+    if not args.supabase_url or not args.anon_key:
+        parser.error("SUPABASE_URL and SUPABASE_ANON_KEY (or --supabase-url/--anon-key) are required")
+    args.stages = [float(s) for s in str(args.stages).split(",") if s.strip()]
+    return args
+
+
+async def main_async(args: argparse.Namespace) -> dict[str, Any]:
+    workload = Workload.load()
+    print(f"Scenario mix: {dict(zip(workload.scenarios, workload.weights))}; "
+          f"{args.model} model, stages {args.stages}, {args.duration:.0f}s each", flush=True)
+    stages = []
+    for i, load in enumerate(args.stages):
+        stage = await run_stage(load, args, workload, seed=args.seed + i)
+        print_stage(stage)
+        stages.append(stage)
+    return {
+        "target": args.supabase_url,
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "config": {k: (str(v) if isinstance(v, Path) else v) for k, v in vars(args).items()
+                   if k not in ("anon_key", "token")},
+        "mix": dict(zip(workload.scenarios, workload.weights)),
+        "stages": stages,
+    }
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    report = asyncio.run(main_async(args))
+    if args.out:
+        args.out.parent.mkdir(parents=True, exist_ok=True)
+        args.out.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"\nReport written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
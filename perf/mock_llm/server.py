@@ -0,0 +1,552 @@
+"""Deterministic local stand-in for OpenAI, Gemini and Google Custom Search.
+
+Speaks the request/response shapes the edge functions use:
+
+- ``POST /v1/chat/completions``: JSON or SSE (``stream: true``), text replies,
+  ``tool_calls`` when ``tools`` are offered and the user message matches a
+  trigger, JSON bodies for ``response_format`` / "respond as JSON" prompts, and
+  ``usage`` (including ``stream_options.include_usage``)
+- ``POST /v1beta/models/<model>:generateContent`` and ``:streamGenerateContent``
+- ``GET /customsearch/v1``
+- ``GET /health`` and ``GET /stats``
+
+Replies come from fixtures.json: canned coaching text, nutrition values per
+food, tool triggers. The same request always gets the same reply, and the same
+seed gives the same latency sequence.
+
+Latency profiles shape time-to-first-byte and token rate. Choose one with
+``--profile``, or per request with the ``X-Mock-Profile`` header. Force an
+upstream error with ``X-Mock-Status: 429`` (or any status).
+
+Point the stack at it:
+
+    python perf/mock_llm/server.py --port 8787 --profile realistic
+
+    # supabase/functions/.env (edge runtime runs in Docker)
+    OPENAI_BASE_URL=http://host.docker.internal:8787/v1
+    GEMINI_BASE_URL=http://host.docker.internal:8787/v1beta
+    GOOGLE_CSE_URL=http://host.docker.internal:8787/customsearch/v1
+
+    # .env.local (Vite)
+    VITE_OPENAI_BASE_URL=http://localhost:8787/v1
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES_PATH = Path(__file__).resolve().parent / "fixtures.json"
+
+TOKEN_RE = re.compile(r"\S+\s*|\s+")
+
+
+@dataclass(frozen=True)
+class Profile:
+    ttfb_ms: float
+    tokens_per_s: float  # 0 = no pacing
+    jitter: float  # +/- fraction applied to every delay
+    error_rate: float = 0.0
+
+
+PROFILES: dict[str, Profile] = {
+    "instant": Profile(ttfb_ms=0, tokens_per_s=0, jitter=0),
+    "fast": Profile(ttfb_ms=80, tokens_per_s=200, jitter=0.1),
+    "realistic": Profile(ttfb_ms=450, tokens_per_s=45, jitter=0.25),
+    "slow": Profile(ttfb_ms=1500, tokens_per_s=12, jitter=0.4),
+    "flaky": Profile(ttfb_ms=450, tokens_per_s=45, jitter=0.25, error_rate=0.05),
+}
+
+
+# ---------- Reply generation ----------
+
+class Fixtures:
+    def __init__(self, path: Path = FIXTURES_PATH):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        # Longest names first so "brown rice" wins over "rice"
+        self.foods: list[tuple[str, dict[str, Any]]] = sorted(data["foods"].items(), key=lambda kv: -len(kv[0]))
+        self.tool_triggers = {
+            name: [re.compile(p, re.I) for p in patterns] for name, patterns in data["tool_triggers"].items()
+        }
+        self.replies = [(re.compile(r["match"], re.I), r["text"]) for r in data["replies"]]
+        self.default_replies: list[str] = data["default_replies"]
+        self.tool_followup: str = data["tool_followup"]
+
+    def find_food(self, text: str) -> Optional[tuple[str, dict[str, Any]]]:
+        lowered = text.lower()
+        for name, food in self.foods:
+            if name in lowered:
+                return name, food
+        return None
+
+    def macros_for(self, food_name: str) -> tuple[str, dict[str, Any]]:
+        """Fixture values, or stable pseudo-values for unknown foods."""
+        found = self.find_food(food_name)
+        if found:
+            return found
+        h = _digest(food_name.lower().strip())
+        kcal = 60 + h % 340
+        protein = round((h >> 8) % 300 / 10, 1)
+        fat = round((h >> 16) % 200 / 10, 1)
+        carbs = round(max(0.0, (kcal - protein * 4 - fat * 9) / 4), 1)
+        return food_name.strip(), {
+            "per": "100g", "kcal": kcal, "protein_g": protein, "carbs_g": carbs,
+            "fat_g": fat, "fiber_g": round((h >> 24) % 50 / 10, 1), "grams": 100,
+        }
+
+    def text_reply(self, user_text: str) -> str:
+        for pattern, text in self.replies:
+            if pattern.search(user_text):
+                return text
+        return self.default_replies[_digest(user_text) % len(self.default_replies)]
+
+    def tool_for(self, user_text: str, offered: list[str]) -> Optional[str]:
+        for name, patterns in self.tool_triggers.items():
+            if name in offered and any(p.search(user_text) for p in patterns):
+                return name
+        return None
+
+    def tool_arguments(self, tool: str, user_text: str) -> dict[str, Any]:
+        if tool != "log_meal":
+            return {}
+        items = []
+        lowered = user_text.lower()
+        for name, food in self.foods:
+            idx = lowered.find(name)
+            if idx < 0 or any(name in i["name"] for i in items):
+                continue
+            qty_match = re.search(r"(\d+(?:\.\d+)?)\s*(\w+)?\s*(?:of\s+)?$", lowered[:idx])
+            qty = float(qty_match.group(1)) if qty_match else 1.0
+            scale = food["grams"] / 100 if food["per"] == "100g" else 1.0
+            items.append({
+                "name": name,
+                "quantity": qty,
+                "unit": "serving",
+                "macros": {k: round(food[k] * scale * qty, 1) for k in ("kcal", "protein_g", "fat_g", "carbs_g", "fiber_g")},
+            })
+        if not items:
+            name, food = self.macros_for(user_text[:40])
+            items.append({
+                "name": name, "quantity": 1, "unit": "serving",
+                "macros": {k: food[k] for k in ("kcal", "protein_g", "fat_g", "carbs_g", "fiber_g")},
+            })
+        slot = re.search(r"\b(breakfast|lunch|dinner|snack)\b", lowered)
+        return {"items": items, **({"meal_slot": slot.group(1)} if slot else {})}
+
+
+_FOOD_PATTERNS = [
+    re.compile(r"per 100g for COOKED (.+?)\.\s", re.S),
+    re.compile(r"nutrition facts for (.+?) as served", re.S),
+    re.compile(r"^Food:\s*(.+)$", re.M),
+]
+
+
+def _digest(text: str) -> int:
+    return int.from_bytes(hashlib.sha256(text.encode("utf-8")).digest()[:8], "big")
+
+
+def _food_in_prompt(prompt: str) -> str:
+    for pattern in _FOOD_PATTERNS:
+        m = pattern.search(prompt)
+        if m:
+            return m.group(1).strip()
+    return prompt.strip().splitlines()[-1] if prompt.strip() else "food"
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def _message_text(message: dict[str, Any]) -> str:
+    content = message.get("content")
+    if isinstance(content, list):
+        return " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+    return content or ""
+
+
+# ---------- Server ----------
+
+class MockState:
+    def __init__(self, fixtures: Fixtures, profile: str, seed: int):
+        self.fixtures = fixtures
+        self.default_profile = profile
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = 0
+        self.stats: dict[str, int] = {}
+
+    def next_rng(self) -> random.Random:
+        """Per-request RNG drawn from the seeded sequence."""
+        with self.lock:
+            self.counter += 1
+            return random.Random(self.rng.getrandbits(64))
+
+    def count(self, route: str) -> None:
+        with self.lock:
+            self.stats[route] = self.stats.get(route, 0) + 1
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server_version = "mock-llm/1.0"
+    state: MockState  # set by serve()
+
+    # ---- plumbing ----
+
+    def log_message(self, fmt: str, *args: Any) -> None:
+        if self.server.verbose:  # type: ignore[attr-defined]
+            super().log_message(fmt, *args)
+
+    def _read_json(self) -> dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw or b"{}")
+        except json.JSONDecodeError:
+            return {}
+
+    def _send_json(self, status: int, body: Any) -> None:
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _start_sse(self) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _sse(self, data: str) -> None:
+        chunk = f"data: {data}\n\n".encode("utf-8")
+        self.wfile.write(f"{len(chunk):x}\r\n".encode("ascii") + chunk + b"\r\n")
+        self.wfile.flush()
+
+    def _end_sse(self) -> None:
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def _profile(self) -> Profile:
+        name = self.headers.get("X-Mock-Profile") or parse_qs(urlparse(self.path).query).get("profile", [None])[0]
+        return PROFILES.get(name or self.state.default_profile, PROFILES[self.state.default_profile])
+
+    def _sleep(self, ms: float, profile: Profile, rng: random.Random) -> None:
+        if ms <= 0:
+            return
+        factor = 1 + rng.uniform(-profile.jitter, profile.jitter) if profile.jitter else 1
+        time.sleep(ms * factor / 1000)
+
+    def _token_delay_ms(self, profile: Profile) -> float:
+        return 1000 / profile.tokens_per_s if profile.tokens_per_s > 0 else 0
+
+    def _forced_error(self, profile: Profile, rng: random.Random) -> Optional[int]:
+        forced = self.headers.get("X-Mock-Status")
+        if forced and forced.isdigit() and int(forced) >= 400:
+            return int(forced)
+        if profile.error_rate and rng.random() < profile.error_rate:
+            return rng.choice([429, 500, 503])
+        return None
+
+    # ---- routing ----
+
+    def do_GET(self) -> None:  # noqa: N802 - http.server naming
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"ok": True, "profile": self.state.default_profile})
+        elif path == "/stats":
+            self._send_json(200, {"requests": self.state.stats})
+        elif path.rstrip("/") == "/customsearch/v1":
+            self.state.count("customsearch")
+            self._custom_search()
+        else:
+            self._send_json(404, {"error": {"message": f"no mock for GET {path}"}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = urlparse(self.path).path
+        body = self._read_json()
+        if path.rstrip("/") == "/v1/chat/completions":
+            self.state.count("openai.chat")
+            self._chat_completions(body)
+            return
+        m = re.match(r"^/v1beta/models/([^/:]+):(generateContent|streamGenerateContent)$", path)
+        if m:
+            self.state.count(f"gemini.{m.group(2)}")
+            self._gemini(m.group(1), body, stream=m.group(2) == "streamGenerateContent")
+            return
+        self._send_json(404, {"error": {"message": f"no mock for POST {path}"}})
+
+    # ---- OpenAI ----
+
+    def _chat_completions(self, body: dict[str, Any]) -> None:
+        profile = self._profile()
+        rng = self.state.next_rng()
+        fixtures = self.state.fixtures
+        model = body.get("model", "gpt-4o-mini")
+        messages: list[dict[str, Any]] = body.get("messages") or []
+        stream = bool(body.get("stream"))
+
+        error = self._forced_error(profile, rng)
+        if error:
+            self._sleep(profile.ttfb_ms / 2, profile, rng)
+            self._send_json(error, {"error": {"message": f"mock upstream error {error}", "type": "mock_error", "code": error}})
+            return
+
+        system_text = " ".join(_message_text(m) for m in messages if m.get("role") == "system")
+        last = messages[-1] if messages else {"role": "user", "content": ""}
+        user_text = _message_text(last) if last.get("role") == "user" else ""
+        prompt_tokens = sum(_estimate_tokens(_message_text(m)) for m in messages)
+
+        tool_call: Optional[dict[str, Any]] = None
+        offered = [t.get("function", {}).get("name") for t in body.get("tools") or []]
+        if offered and last.get("role") == "user" and body.get("tool_choice") != "none":
+            tool = fixtures.tool_for(user_text, offered)
+            if tool:
+                tool_call = {
+                    "id": f"call_mock_{_digest(user_text + tool) % 10**10:010d}",
+                    "type": "function",
+                    "function": {"name": tool, "arguments": json.dumps(fixtures.tool_arguments(tool, user_text))},
+                }
+
+        content: Optional[str]
+        if tool_call:
+            content = None
+        elif last.get("role") == "tool":
+            content = fixtures.tool_followup
+        elif self._wants_json(body, system_text + " " + user_text):
+            content = json.dumps(self._json_reply(system_text, user_text))
+        else:
+            content = fixtures.text_reply(user_text or system_text)
+
+        completion_text = content if content is not None else tool_call["function"]["arguments"]
+        completion_tokens = len(TOKEN_RE.findall(completion_text))
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": 0},
+        }
+        completion_id = f"chatcmpl-mock-{self.state.counter}"
+        created = int(time.time())
+
+        if not stream:
+            self._sleep(profile.ttfb_ms + completion_tokens * self._token_delay_ms(profile), profile, rng)
+            message: dict[str, Any] = {"role": "assistant", "content": content}
+            if tool_call:
+                message["tool_calls"] = [tool_call]
+            self._send_json(200, {
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_call else "stop"}],
+                "usage": usage,
+            })
+            return
+
+        def chunk(delta: dict[str, Any], finish: Optional[str] = None) -> str:
+            return json.dumps({
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish}],
+            })
+
+        self._sleep(profile.ttfb_ms, profile, rng)
+        self._start_sse()
+        try:
+            delay = self._token_delay_ms(profile)
+            if tool_call:
+                fn = tool_call["function"]
+                self._sse(chunk({"role": "assistant", "content": None, "tool_calls": [{
+                    "index": 0, "id": tool_call["id"], "type": "function",
+                    "function": {"name": fn["name"], "arguments": ""},
+                }]}))
+                for piece in _split_fragments(fn["arguments"]):
+                    self._sleep(delay, profile, rng)
+                    self._sse(chunk({"tool_calls": [{"index": 0, "function": {"arguments": piece}}]}))
+                self._sse(chunk({}, "tool_calls"))
+            else:
+                self._sse(chunk({"role": "assistant", "content": ""}))
+                for token in TOKEN_RE.findall(content or ""):
+                    self._sleep(delay, profile, rng)
+                    self._sse(chunk({"content": token}))
+                self._sse(chunk({}, "stop"))
+            if (body.get("stream_options") or {}).get("include_usage"):
+                self._sse(json.dumps({
+                    "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                    "model": model, "choices": [], "usage": usage,
+                }))
+            self._sse("[DONE]")
+            self._end_sse()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away mid-stream
+
+    @staticmethod
+    def _wants_json(body: dict[str, Any], text: str) -> bool:
+        fmt = (body.get("response_format") or {}).get("type")
+        return fmt in ("json_object", "json_schema") or bool(re.search(r"respond (only )?(as|with) (valid )?json|valid json only", text, re.I))
+
+    def _json_reply(self, system_text: str, user_text: str) -> dict[str, Any]:
+        fixtures = self.state.fixtures
+        if "is_food_intake" in system_text:
+            is_food = fixtures.find_food(user_text) is not None or bool(re.search(r"\b(ate|had|eating)\b", user_text, re.I))
+            return {"is_food_intake": is_food, "should_log_now": is_food, "reason": "mock"}
+        if "kcal" in user_text or "nutrition" in system_text.lower():
+            _, food = fixtures.macros_for(_food_in_prompt(user_text))
+            return {k: food[k] for k in ("kcal", "protein_g", "carbs_g", "fat_g", "fiber_g")}
+        return {"ok": True, "reply": fixtures.text_reply(user_text)}
+
+    # ---- Gemini ----
+
+    def _gemini(self, model: str, body: dict[str, Any], stream: bool) -> None:
+        profile = self._profile()
+        rng = self.state.next_rng()
+        fixtures = self.state.fixtures
+
+        error = self._forced_error(profile, rng)
+        if error:
+            self._sleep(profile.ttfb_ms / 2, profile, rng)
+            self._send_json(error, {"error": {"code": error, "message": f"mock upstream error {error}", "status": "UNAVAILABLE"}})
+            return
+
+        instruction = "\n".join(part.get("text", "") for part in (body.get("systemInstruction") or {}).get("parts") or [])
+        prompt = "\n".join(
+            part.get("text", "")
+            for content in body.get("contents") or []
+            for part in content.get("parts") or []
+        )
+        wants_json = (body.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+
+        batch = re.search(r"^Foods \(JSON array\):\s*(\[.*\])$", prompt, re.M)
+        if batch:
+            # nutrition-gemini batch mode: one entry per food, in order
+            foods = json.loads(batch.group(1))
+            text = json.dumps({"items": [{"query": f, **self._gemini_nutrition(f)} for f in foods]})
+        elif wants_json or '"macros"' in instruction + prompt:
+            text = json.dumps(self._gemini_nutrition(_food_in_prompt(prompt)))
+        elif "Context:" in prompt and "[1]" in prompt:
+            query = re.search(r'answer: "(.+?)"', prompt)
+            text = (
+                f"{fixtures.text_reply(query.group(1) if query else prompt)} [1][2]\n\n"
+                "Sources:\n[1] https://example.com/mock/1\n[2] https://example.com/mock/2"
+            )
+        else:
+            text = fixtures.text_reply(prompt)
+
+        tokens = TOKEN_RE.findall(text)
+        usage = {
+            "promptTokenCount": _estimate_tokens(instruction) + _estimate_tokens(prompt),
+            "candidatesTokenCount": len(tokens),
+            "totalTokenCount": _estimate_tokens(instruction) + _estimate_tokens(prompt) + len(tokens),
+        }
+
+        def response(part_text: str, finish: Optional[str]) -> dict[str, Any]:
+            candidate: dict[str, Any] = {"content": {"role": "model", "parts": [{"text": part_text}]}, "index": 0}
+            if finish:
+                candidate["finishReason"] = finish
+            return {"candidates": [candidate], "usageMetadata": usage, "modelVersion": model}
+
+        delay = self._token_delay_ms(profile)
+        if not stream:
+            self._sleep(profile.ttfb_ms + len(tokens) * delay, profile, rng)
+            self._send_json(200, response(text, "STOP"))
+            return
+
+        self._sleep(profile.ttfb_ms, profile, rng)
+        self._start_sse()
+        try:
+            # Gemini streams in multi-token chunks
+            for i in range(0, len(tokens), 8):
+                piece = tokens[i:i + 8]
+                self._sleep(delay * len(piece), profile, rng)
+                last = i + 8 >= len(tokens)
+                self._sse(json.dumps(response("".join(piece), "STOP" if last else None)))
+            self._end_sse()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def _gemini_nutrition(self, food_name: str) -> dict[str, Any]:
+        name, food = self.state.fixtures.macros_for(food_name)
+        branded = food["per"] == "serving"
+        return {
+            "name": name,
+            "brand": food.get("brand"),
+            "serving_label": "1 serving" if branded else "100 g",
+            "grams_per_serving": food["grams"] if branded else 100,
+            "macros": {k: food[k] for k in ("kcal", "protein_g", "carbs_g", "fat_g", "fiber_g")},
+            "confidence": 0.9,
+            "source": "mock-fixtures",
+        }
+
+    # ---- Google Custom Search ----
+
+    def _custom_search(self) -> None:
+        profile = self._profile()
+        rng = self.state.next_rng()
+        params = parse_qs(urlparse(self.path).query)
+        query = params.get("q", [""])[0]
+        num = max(1, min(10, int(params.get("num", ["5"])[0] or 5)))
+        self._sleep(profile.ttfb_ms / 2, profile, rng)
+        slug = re.sub(r"[^a-z0-9]+", "-", query.lower()).strip("-") or "result"
+        self._send_json(200, {
+            "kind": "customsearch#search",
+            "items": [
+                {
+                    "title": f"{query.title()} - mock result {i}",
+                    "link": f"https://example.com/mock/{slug}/{i}",
+                    "snippet": self.state.fixtures.text_reply(query)[:160],
+                }
+                for i in range(1, num + 1)
+            ],
+        })
+
+
+def _split_fragments(text: str, size: int = 12) -> Iterator[str]:
+    for i in range(0, len(text), size):
+        yield text[i:i + size]
+
+
+def serve(host: str, port: int, profile: str, seed: int, verbose: bool = False) -> ThreadingHTTPServer:
+    Handler.state = MockState(Fixtures(), profile, seed)
+    ThreadingHTTPServer.request_queue_size = 1024
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.verbose = verbose  # type: ignore[attr-defined]
+    return server
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8787)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="realistic")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    server = serve(args.host, args.port, args.profile, args.seed, args.verbose)
+    print(f"mock-llm listening on http://{args.host}:{args.port} (profile={args.profile}, seed={args.seed})", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+/**
+ * Bundle Budget Plugin
+ * Prints a per-chunk size report after `vite build`, writes it to
+ * tmp/bundle-report.json and checks it against bundle-budgets.json.
+ *
+ * Budgets are gzip kB. BUNDLE_BUDGET=enforce fails the build on a breach
+ * (npm run build:budget); otherwise breaches are only reported.
+ */
+
+import type { Plugin } from 'vite';
+import type { OutputBundle } from 'rollup';
+import { gzipSync } from 'zlib';
+import { existsSync, mkdirSync, readFileSync, writeFileSync } from 'fs';
+import path from 'path';
+
+interface Budgets {
+  /** Entry chunk plus everything it imports statically (first paint of /login) */
+  initial?: number;
+  /** All emitted JS */
+  total?: number;
+  /** Fallback for chunks with no explicit entry */
+  defaultChunk?: number;
+  /** Chunk name (Rollup `name`, e.g. "ChatPage", "vendor-react") → limit */
+  chunks?: Record<string, number>;
+}
+
+interface ChunkReport {
+  file: string;
+  name: string;
+  kind: 'entry' | 'dynamic' | 'shared' | 'css';
+  bytes: number;
+  gzipBytes: number;
+  budgetKb?: number;
+  largestModules?: Array<{ id: string; bytes: number }>;
+}
+
+const kb = (bytes: number) => bytes / 1024;
+
+export function bundleBudget(options: { root: string; budgetsFile?: string; reportFile?: string }): Plugin {
+  const budgetsPath = path.resolve(options.root, options.budgetsFile ?? 'bundle-budgets.json');
+  const reportPath = path.resolve(options.root, options.reportFile ?? 'tmp/bundle-report.json');
+  const enforce = process.env.BUNDLE_BUDGET === 'enforce';
+
+  return {
+    name: 'bundle-budget',
+    apply: 'build',
+    generateBundle(_outputOptions, bundle: OutputBundle) {
+      const budgets: Budgets = existsSync(budgetsPath) ? JSON.parse(readFileSync(budgetsPath, 'utf8')) : {};
+      const chunks: ChunkReport[] = [];
+
+      for (const out of Object.values(bundle)) {
+        if (out.type === 'chunk') {
+          const code = Buffer.from(out.code);
+          const largestModules = Object.entries(out.modules)
+            .map(([id, m]) => ({ id: path.relative(options.root, id), bytes: m.renderedLength }))
+            .sort((a, b) => b.bytes - a.bytes)
+            .slice(0, 5);
+          chunks.push({
+            file: out.fileName,
+            name: out.name,
+            kind: out.isEntry ? 'entry' : out.isDynamicEntry ? 'dynamic' : 'shared',
+            bytes: code.length,
+            gzipBytes: gzipSync(code).length,
+            budgetKb: budgets.chunks?.[out.name] ?? budgets.defaultChunk,
+            largestModules
+          });
+        } else if (out.fileName.endsWith('.css')) {
+          const source = Buffer.from(out.source);
+          chunks.push({
+            file: out.fileName,
+            name: out.names?.[0] ?? out.fileName,
+            kind: 'css',
+            bytes: source.length,
+            gzipBytes: gzipSync(source).length
+          });
+        }
+      }
+
+      // Initial = entry chunks and their static import closure
+      const byFile = new Map(Object.values(bundle).map((o) => [o.fileName, o]));
+      const initial = new Set<string>();
+      const visit = (file: string) => {
+        const out = byFile.get(file);
+        if (!out || out.type !== 'chunk' || initial.has(file)) return;
+        initial.add(file);
+        out.imports.forEach(visit);
+      };
+      Object.values(bundle).forEach((o) => o.type === 'chunk' && o.isEntry && visit(o.fileName));
+
+      const js = chunks.filter((c) => c.kind !== 'css');
+      const initialGzip = js.filter((c) => initial.has(c.file)).reduce((n, c) => n + c.gzipBytes, 0);
+      const totalGzip = js.reduce((n, c) => n + c.gzipBytes, 0);
+
+      const violations: string[] = [];
+      for (const c of js) {
+        if (c.budgetKb !== undefined && kb(c.gzipBytes) > c.budgetKb) {
+          violations.push(`${c.name} (${c.file}) ${kb(c.gzipBytes).toFixed(1)} kB > ${c.budgetKb} kB`);
+        }
+      }
+      if (budgets.initial !== undefined && kb(initialGzip) > budgets.initial) {
+        violations.push(`initial load ${kb(initialGzip).toFixed(1)} kB > ${budgets.initial} kB`);
+      }
+      if (budgets.total !== undefined && kb(totalGzip) > budgets.total) {
+        violations.push(`total JS ${kb(totalGzip).toFixed(1)} kB > ${budgets.total} kB`);
+      }
+
+      chunks.sort((a, b) => b.gzipBytes - a.gzipBytes);
+      mkdirSync(path.dirname(reportPath), { recursive: true });
+      writeFileSync(reportPath, JSON.stringify({
+        generatedAt: new Date().toISOString(),
+        initialGzipBytes: initialGzip,
+        totalGzipBytes: totalGzip,
+        initialFiles: [...initial],
+        chunks,
+        violations
+      }, null, 2));
+
+      const lines = chunks
+        .filter((c) => c.kind !== 'css')
+        .map((c) => {
+          const over = c.budgetKb !== undefined && kb(c.gzipBytes) > c.budgetKb;
+          const budget = c.budgetKb !== undefined ? ` / ${c.budgetKb} kB` : '';
+          const mark = initial.has(c.file) ? '*' : ' ';
+          return `  ${over ? '✗' : ' '}${mark} ${c.name.padEnd(32)} ${kb(c.gzipBytes).toFixed(1).padStart(7)} kB gz${budget}`;
+        });
+      console.log(`\n[bundle-budget] JS chunks (* = initial load), report: ${path.relative(options.root, reportPath)}`);
+      console.log(lines.join('\n'));
+      console.log(`  initial ${kb(initialGzip).toFixed(1)} kB gz${budgets.initial ? ` / ${budgets.initial} kB` : ''}, total ${kb(totalGzip).toFixed(1)} kB gz${budgets.total ? ` / ${budgets.total} kB` : ''}\n`);
+
+      if (violations.length) {
+        const message = `Bundle budget exceeded:\n  ${violations.join('\n  ')}`;
+        if (enforce) this.error(message);
+        this.warn(message);
+      }
+    }
+  };
+}
@@ -1,97 +1,129 @@
 // src/App.tsx — normalized route tree (fixes unterminated JSX + ensures admin-only agents)
 
-import React from 'react';
+import React, { Suspense } from 'react';
 import { Routes, Route, Navigate } from 'react-router-dom';
 import { Toaster } from 'react-hot-toast';
 import { ErrorBoundary } from './components/ErrorBoundary';
 import ProtectedRoute from './components/auth/ProtectedRoute';
 import RootLayout from './layouts/RootLayout';
+import AdminGuard from './components/guards/AdminGuard';
+import { lazyWithPreload as lazy, registerRoute } from './lib/routePreload';
+import RouteFallback from './components/common/RouteFallback';
 
-// Auth/public pages
+// Login is the landing page for most sessions: keep it in the entry chunk
 import { LoginPage } from './pages/auth/LoginPage';
-import { RegisterPage } from './pages/auth/RegisterPage';
-import { ForgotPasswordPage } from './pages/auth/ForgotPasswordPage';
-import Health from './pages/Health';
-import BetaPendingPage from './pages/auth/BetaPendingPage';
+
+// Everything else is a route-level chunk; see lib/routePreload for prefetching
+const RegisterPage = lazy(() => import('./pages/auth/RegisterPage').then(m => ({ default: m.RegisterPage })));
+const ForgotPasswordPage = lazy(() => import('./pages/auth/ForgotPasswordPage').then(m => ({ default: m.ForgotPasswordPage })));
+const Health = lazy(() => import('./pages/Health'));
+const BetaPendingPage = lazy(() => import('./pages/auth/BetaPendingPage'));
+const WelcomeBetaPage = lazy(() => import('./pages/WelcomeBetaPage'));
 
 // App pages
-import DashboardPage from './pages/DashboardPage';
-import ProfilePage from './pages/ProfilePage';
-import UsagePage from './pages/profile/UsagePage';
-import VoicePage from './pages/VoicePage';
-import ChatPage from './pages/ChatPage';
-import CameraPage from './pages/CameraPage';
-import TDEEOnboardingWizard from './pages/TDEEOnboardingWizard';
-import TrainerDashboardPage from './pages/TrainerDashboardPage';
-import AdminPage from './pages/AdminPage';
+const DashboardPage = lazy(() => import('./pages/DashboardPage'));
+const ProfilePage = lazy(() => import('./pages/ProfilePage'));
+const UsagePage = lazy(() => import('./pages/profile/UsagePage'));
+const VoicePage = lazy(() => import('./pages/VoicePage'));
+const ChatPage = lazy(() => import('./pages/ChatPage'));
+const CameraPage = lazy(() => import('./pages/CameraPage'));
+const TDEEOnboardingWizard = lazy(() => import('./pages/TDEEOnboardingWizard'));
+const TrainerDashboardPage = lazy(() => import('./pages/TrainerDashboardPage'));
+const TMWYATestPage = lazy(() => import('./pages/TMWYATestPage').then(m => ({ default: m.TMWYATestPage })));
 
-// Admin/agents
-import AdminUsersPage from './pages/admin/AdminUsersPage';
-import SwarmsPage from './pages/admin/SwarmsPage';
-import AdminGuard from './components/guards/AdminGuard';
-import RoleAccessPage from './pages/admin/RoleAccessPage';
-import DiagnosticsPage from './pages/admin/DiagnosticsPage';
-import ShopLensPage from './pages/agents/ShopLensPage';
-import AgentConfigsPage from './pages/admin/AgentConfigsPage';
-import { PersonalityEditorPage } from './pages/admin/PersonalityEditorPage';
-import WelcomeBetaPage from './pages/WelcomeBetaPage';
-import { TMWYATestPage } from './pages/TMWYATestPage';
+// Admin/agents (never downloaded unless an admin route is visited or hovered)
+const AdminPage = lazy(() => import('./pages/AdminPage'));
+const AdminUsersPage = lazy(() => import('./pages/admin/AdminUsersPage'));
+const SwarmsPage = lazy(() => import('./pages/admin/SwarmsPage'));
+const RoleAccessPage = lazy(() => import('./pages/admin/RoleAccessPage'));
+const DiagnosticsPage = lazy(() => import('./pages/admin/DiagnosticsPage'));
+const ShopLensPage = lazy(() => import('./pages/agents/ShopLensPage'));
+const AgentConfigsPage = lazy(() => import('./pages/admin/AgentConfigsPage'));
+const PersonalityEditorPage = lazy(() => import('./pages/admin/PersonalityEditorPage'));
+
+// Dev tooling (dev server, or a build with VITE_ENABLE_PROFILER=true)
+const TranscriptProfiler = import.meta.env.DEV || import.meta.env.VITE_ENABLE_PROFILER === 'true'
+  ? lazy(() => import('./components/dev/TranscriptProfiler'))
+  : null;
 
+registerRoute('/register', RegisterPage);
+registerRoute('/forgot-password', ForgotPasswordPage);
+registerRoute('/', DashboardPage);
+registerRoute('/dashboard', DashboardPage);
+registerRoute('/profile', ProfilePage);
+registerRoute('/profile/usage', UsagePage);
+registerRoute('/chat', ChatPage);
+registerRoute('/camera', CameraPage);
+registerRoute('/voice', VoicePage);
+registerRoute('/tmwya', TMWYATestPage);
+registerRoute('/tdee', TDEEOnboardingWizard);
+registerRoute('/trainer-dashboard', TrainerDashboardPage);
+registerRoute('/admin', AdminPage);
+registerRoute('/admin/roles', RoleAccessPage);
+registerRoute('/admin/diagnostics', DiagnosticsPage);
+registerRoute('/admin/shoplens', ShopLensPage);
+registerRoute('/admin/users', AdminUsersPage);
+registerRoute('/admin/swarms', SwarmsPage);
+registerRoute('/admin/agent-configs', AgentConfigsPage);
+registerRoute('/admin/personality', PersonalityEditorPage);
 
 function App() {
 
   return (
     <ErrorBoundary>
       <Toaster position="top-right" />
-      <Routes>
-        {/* PUBLIC ROUTES */}
-        <Route path="/login" element={<LoginPage />} />
-        <Route path="/register" element={<RegisterPage onNavigate={() => {}} />} />
-        <Route path="/forgot-password" element={<ForgotPasswordPage onNavigate={() => {}} />} />
-        <Route path="/health" element={<Health />} />
-        <Route path="/welcome-beta" element={<WelcomeBetaPage />} />
-        <Route path="/beta-pending" element={<BetaPendingPage />} />
+      <Suspense fallback={<RouteFallback />}>
+        <Routes>
+          {/* PUBLIC ROUTES */}
+          <Route path="/login" element={<LoginPage />} />
+          <Route path="/register" element={<RegisterPage onNavigate={() => {}} />} />
+          <Route path="/forgot-password" element={<ForgotPasswordPage onNavigate={() => {}} />} />
+          <Route path="/health" element={<Health />} />
+          <Route path="/welcome-beta" element={<WelcomeBetaPage />} />
+          <Route path="/beta-pending" element={<BetaPendingPage />} />
+          {TranscriptProfiler && <Route path="/dev/transcript-profile" element={<TranscriptProfiler />} />}
 
-        {/* PROTECTED APP LAYOUT */}
-        <Route
-          path="/"
-          element={
-            <ProtectedRoute>
-              <RootLayout />
-            </ProtectedRoute>
-          }
-        >
-          <Route index element={<Navigate to="/dashboard" replace />} />
-          <Route path="dashboard" element={<DashboardPage />} />
-          <Route path="profile" element={<ProfilePage />} />
-          <Route path="profile/usage" element={<UsagePage />} />
-          <Route path="chat" element={<ChatPage />} />
-          <Route path="camera" element={<CameraPage />} />
-          <Route path="voice" element={<VoicePage />} />
-          <Route path="tmwya" element={<TMWYATestPage />} />
+          {/* PROTECTED APP LAYOUT */}
           <Route
-            path="tdee"
-            element={<TDEEOnboardingWizard onComplete={() => window.location.href = '/dashboard'} />}
-          />
-          <Route path="trainer-dashboard" element={<TrainerDashboardPage userProfile={null} />} />
+            path="/"
+            element={
+              <ProtectedRoute>
+                <RootLayout />
+              </ProtectedRoute>
+            }
+          >
+            <Route index element={<Navigate to="/dashboard" replace />} />
+            <Route path="dashboard" element={<DashboardPage />} />
+            <Route path="profile" element={<ProfilePage />} />
+            <Route path="profile/usage" element={<UsagePage />} />
+            <Route path="chat" element={<ChatPage />} />
+            <Route path="camera" element={<CameraPage />} />
+            <Route path="voice" element={<VoicePage />} />
+            <Route path="tmwya" element={<TMWYATestPage />} />
+            <Route
+              path="tdee"
+              element={<TDEEOnboardingWizard onComplete={() => window.location.href = '/dashboard'} />}
+            />
+            <Route path="trainer-dashboard" element={<TrainerDashboardPage userProfile={null} />} />
 
-          {/* ADMIN-ONLY NESTED ROUTES */}
-          <Route path="admin">
-            <Route index element={<AdminPage />} />
-            <Route path="roles" element={<AdminGuard><RoleAccessPage /></AdminGuard>} />
-            <Route path="diagnostics" element={<AdminGuard><DiagnosticsPage /></AdminGuard>} />
-            <Route path="shoplens" element={<AdminGuard><ShopLensPage /></AdminGuard>} />
-            <Route path="users" element={<AdminGuard><AdminUsersPage /></AdminGuard>} />
-            <Route path="swarms" element={<AdminGuard><SwarmsPage /></AdminGuard>} />
-            <Route path="agent-configs" element={<AdminGuard><AgentConfigsPage /></AdminGuard>} />
-            {/* RETIRED: PersonalityEditorPage now shows retirement notice, not removed from routes for bookmark compatibility */}
-            <Route path="personality" element={<AdminGuard><PersonalityEditorPage /></AdminGuard>} />
+            {/* ADMIN-ONLY NESTED ROUTES */}
+            <Route path="admin">
+              <Route index element={<AdminPage />} />
+              <Route path="roles" element={<AdminGuard><RoleAccessPage /></AdminGuard>} />
+              <Route path="diagnostics" element={<AdminGuard><DiagnosticsPage /></AdminGuard>} />
+              <Route path="shoplens" element={<AdminGuard><ShopLensPage /></AdminGuard>} />
+              <Route path="users" element={<AdminGuard><AdminUsersPage /></AdminGuard>} />
+              <Route path="swarms" element={<AdminGuard><SwarmsPage /></AdminGuard>} />
+              <Route path="agent-configs" element={<AdminGuard><AgentConfigsPage /></AdminGuard>} />
+              {/* RETIRED: PersonalityEditorPage now shows retirement notice, not removed from routes for bookmark compatibility */}
+              <Route path="personality" element={<AdminGuard><PersonalityEditorPage /></AdminGuard>} />
+            </Route>
           </Route>
-        </Route>
 
-        {/* FALLBACK */}
-        <Route path="*" element={<Navigate to="/login" replace />} />
-      </Routes>
+          {/* FALLBACK */}
+          <Route path="*" element={<Navigate to="/login" replace />} />
+        </Routes>
+      </Suspense>
     </ErrorBoundary>
   );
 }
@@ -2,23 +2,34 @@
  * Gemini Cache - Browser-safe, standalone
  * Calls nutrition-gemini Edge Function directly
  * Includes in-memory cache + DB persistence
+ *
+ * Lookups are batched: one food_cache query for every key, then one
+ * nutrition-gemini call (batch mode) for everything still missing.
  */
 
 import type { MacroResult } from './providers/types';
 import { getSupabase } from '../../../lib/supabase';
+import { reportGeminiFailure, reportGeminiSuccess } from './geminiHealth';
 
 const cache = new Map<string, { result: MacroResult; expires: number }>();
 
 /**
  * Build canonical key for DB lookup (normalized, deterministic)
  */
-function canonicalKeyFrom(q: {
+export interface GeminiQuery {
   name: string;
   brand?: string;
   serving_label?: string;
   size_label?: string;
   country?: string;
-}): string {
+}
+
+/** Foods per nutrition-gemini call (the Edge Function accepts up to 25) */
+const BATCH_SIZE = 20;
+
+const MEMORY_TTL_MS = 24 * 60 * 60 * 1000;
+
+function canonicalKeyFrom(q: GeminiQuery): string {
   const parts = [q.brand, q.name, q.serving_label, q.size_label]
     .filter(Boolean)
     .map(s => s!.toLowerCase().trim())
@@ -33,170 +44,212 @@ function canonicalKeyFrom(q: {
 /**
  * Get cached Gemini results via Edge Function
  */
-export async function getCachedGemini(q: {
-  name: string;
-  brand?: string;
-  serving_label?: string;
-  size_label?: string;
-  country?: string;
-}): Promise<MacroResult | null> {
+export async function getCachedGemini(q: GeminiQuery): Promise<MacroResult | null> {
+  const [result] = await getCachedGeminiBatch([q]);
+  return result;
+}
+
+/**
+ * Resolve many foods at once; results[i] belongs to qs[i] (null = not found,
+ * so the cascade moves on to its next provider for that item)
+ */
+export async function getCachedGeminiBatch(qs: GeminiQuery[]): Promise<(MacroResult | null)[]> {
   const supabase = getSupabase();
-  
-  // Guard against empty names
-  const foodName = q.name?.trim();
-  if (!foodName) {
-    console.warn('[geminiCache] Empty food name provided');
-    return null;
-  }
+  const results: (MacroResult | null)[] = qs.map(() => null);
 
   // ✅ Step 1: Check in-memory cache first
-  const key = JSON.stringify(q);
-  const hit = cache.get(key);
-  if (hit && hit.expires > Date.now()) {
-    console.log(`[macroLookup.trace] cache=hit key=${key}`);
-    return hit.result;
-  }
+  const pending: number[] = [];
+  qs.forEach((q, i) => {
+    // Guard against empty names
+    if (!q.name?.trim()) {
+      console.warn('[geminiCache] Empty food name provided');
+      return;
+    }
+    const key = JSON.stringify(q);
+    const hit = cache.get(key);
+    if (hit && hit.expires > Date.now()) {
+      console.log(`[macroLookup.trace] cache=hit key=${key}`);
+      results[i] = hit.result;
+    } else {
+      pending.push(i);
+    }
+  });
+  if (pending.length === 0) return results;
 
-  // ✅ Step 2: Check DB cache
-  const canonicalKey = canonicalKeyFrom(q);
+  // ✅ Step 2: Check DB cache (one query for every pending key)
+  let missing = pending;
   try {
-    const { data: dbHit, error: dbError } = await supabase
+    const keys = [...new Set(pending.map(i => canonicalKeyFrom(qs[i])))];
+    const { data: dbHits, error: dbError } = await supabase
       .from('food_cache')
       .select('*')
-      .eq('id', canonicalKey)  // food_cache uses 'id' as PK, not 'canonical_key'
-      .maybeSingle();
-
-    if (!dbError && dbHit) {
-      const result: MacroResult = {
-        name: dbHit.name,
-        serving_label: dbHit.serving_size || 'serving',
-        grams_per_serving: dbHit.grams_per_serving || 100,
-        macros: dbHit.macros as any,
-        confidence: dbHit.confidence || 0.7,
-        source: dbHit.source_db || 'gemini'
-      };
-
-      // Populate in-memory cache
-      cache.set(key, {
-        result,
-        expires: Date.now() + 24 * 60 * 60 * 1000
-      });
-
-      console.log(`[geminiCache] cache=db-hit id=${canonicalKey}`);
-      return result;
+      .in('id', keys);  // food_cache uses 'id' as PK, not 'canonical_key'
+
+    if (!dbError && dbHits?.length) {
+      const byId = new Map(dbHits.map((row: any) => [row.id, row]));
+      missing = [];
+      for (const i of pending) {
+        const canonicalKey = canonicalKeyFrom(qs[i]);
+        const dbHit = byId.get(canonicalKey);
+        if (!dbHit) {
+          missing.push(i);
+          continue;
+        }
+        const result: MacroResult = {
+          name: dbHit.name,
+          serving_label: dbHit.serving_size || 'serving',
+          grams_per_serving: dbHit.grams_per_serving || 100,
+          macros: dbHit.macros as any,
+          confidence: dbHit.confidence || 0.7,
+          source: dbHit.source_db || 'gemini'
+        };
+        // Populate in-memory cache
+        cache.set(JSON.stringify(qs[i]), { result, expires: Date.now() + MEMORY_TTL_MS });
+        console.log(`[geminiCache] cache=db-hit id=${canonicalKey}`);
+        results[i] = result;
+      }
     }
   } catch (dbErr) {
     console.warn('[geminiCache] DB cache lookup failed:', dbErr);
     // Continue to Edge Function call
   }
 
-  // ✅ Step 3: Call Edge Function
+  // ✅ Step 3: Call Edge Function, one batch call per BATCH_SIZE foods
+  const chunks: number[][] = [];
+  for (let i = 0; i < missing.length; i += BATCH_SIZE) {
+    chunks.push(missing.slice(i, i + BATCH_SIZE));
+  }
+  await Promise.all(chunks.map(async (chunk) => {
+    const fetched = await fetchBatch(chunk.map(i => qs[i]));
+    chunk.forEach((i, j) => { results[i] = fetched[j]; });
+  }));
+
+  // ✅ Step 4: Persist new results to DB in one upsert (only successful lookups)
+  const rows = missing
+    .filter(i => results[i] && results[i]!.macros.kcal > 0)
+    .map(i => {
+      const q = qs[i];
+      const result = results[i]!;
+      return {
+        id: canonicalKeyFrom(q),  // Use 'id' as PK (matches schema)
+        name: result.name,
+        brand: q.brand || null,
+        serving_size: result.serving_label,
+        grams_per_serving: result.grams_per_serving,
+        macros: result.macros,
+        micros: { fiber_g: result.macros.fiber_g || 0 },
+        country_code: q.country?.toUpperCase() || null,
+        source_db: 'gemini',
+        confidence: result.confidence,
+        last_accessed: new Date().toISOString(),
+        expires_at: new Date(Date.now() + 30 * 24 * 60 * 60 * 1000).toISOString() // 30 days
+      };
+    });
+  if (rows.length > 0) {
+    // Two queries can share a canonical key; upsert rejects duplicate rows
+    const unique = [...new Map(rows.map(r => [r.id, r])).values()];
+    const { error: upsertError } = await supabase.from('food_cache').upsert(unique, {
+      onConflict: 'id'
+    });
+
+    if (upsertError) {
+      console.warn('[geminiCache] DB cache write failed (non-blocking):', upsertError);
+    } else {
+      console.log(`[geminiCache] ✅ Cached ${unique.length} to database`);
+    }
+  }
+
+  return results;
+}
+
+/**
+ * One nutrition-gemini batch call; null entries for anything it could not resolve
+ */
+async function fetchBatch(qs: GeminiQuery[]): Promise<(MacroResult | null)[]> {
+  const supabase = getSupabase();
+
+  // Build correct payload format expected by Edge Function (batch mode)
+  const requestBody = {
+    foods: qs.map(q => ({
+      foodName: q.name.trim(),
+      // canonicalName for better Gemini results
+      canonicalName: [q.brand, q.name, q.serving_label, q.size_label].filter(Boolean).join(' ').trim() || undefined
+    }))
+  };
+
   try {
-    // Build canonicalName for better Gemini results
-    const canonicalName = [
-      q.brand,
-      q.name,
-      q.serving_label,
-      q.size_label
-    ].filter(Boolean).join(' ').trim() || undefined;
-
-    // Build correct payload format expected by Edge Function
-    const requestBody = {
-      foodName: foodName,
-      canonicalName: canonicalName
-    };
-
-    const { data, error } = await supabase.functions.invoke("nutrition-gemini", {
+    const { data, error } = await supabase.functions.invoke('nutrition-gemini', {
       body: requestBody
     });
 
     // Enhanced error logging
     if (error) {
+      const status = (error as any)?.context?.status ?? (error as any)?.status;
       console.error('[geminiCache] Edge Function error:', {
         error,
-        status: (error as any)?.status,
+        status,
         message: error.message,
-        request: requestBody,
+        count: qs.length,
         timestamp: new Date().toISOString()
       });
-      
-      if ((error as any)?.status === 400) {
+
+      if (status === 400) {
         console.error('[geminiCache] ⚠️ 400 Bad Request - check request format matches Edge Function expectations');
       }
-      
-      // Return null to let cascade continue (no stub masking)
-      return null;
+      if (status === 503 || status === 502) {
+        // Breaker open or upstream down: skip Gemini until it recovers
+        const retryAfter = Number((error as any)?.context?.headers?.get?.('Retry-After'));
+        reportGeminiFailure(Number.isFinite(retryAfter) && retryAfter > 0 ? retryAfter * 1000 : undefined);
+      }
+
+      // Return nulls to let cascade continue (no stub masking)
+      return qs.map(() => null);
     }
 
-    if (!data || typeof data !== 'object') {
+    if (!data || !Array.isArray(data.results)) {
       console.error('[geminiCache] Invalid response from Edge Function:', {
         data,
-        request: requestBody,
+        count: qs.length,
         timestamp: new Date().toISOString()
       });
-      return null;  // Let cascade continue
+      return qs.map(() => null);  // Let cascade continue
     }
+    reportGeminiSuccess();
 
-    // Convert Edge Function response to MacroResult format
-    const result: MacroResult = {
-      name: data.name || foodName,
-      serving_label: data.serving_label || 'serving',
-      grams_per_serving: data.grams_per_serving || 100,
-      macros: {
-        kcal: data.macros?.kcal || 0,
-        protein_g: data.macros?.protein_g || 0,
-        carbs_g: data.macros?.carbs_g || 0,
-        fat_g: data.macros?.fat_g || 0,
-        fiber_g: data.macros?.fiber_g || 0
-      },
-      confidence: data.confidence || 0.8,
-      source: 'gemini'
-    };
-
-    // ✅ Step 4: Persist to DB (fire and forget, don't block)
-    if (result.macros.kcal > 0) {  // Only cache successful lookups
-      const { error: upsertError } = await supabase.from('food_cache').upsert({
-        id: canonicalKey,  // Use 'id' as PK (matches schema)
-        name: result.name,
-        brand: q.brand || null,
-        serving_size: result.serving_label,
-        grams_per_serving: result.grams_per_serving,
-        macros: result.macros,
-        micros: { fiber_g: result.macros.fiber_g || 0 },
-        country_code: q.country?.toUpperCase() || null,
-        source_db: 'gemini',
-        confidence: result.confidence,
-        last_accessed: new Date().toISOString(),
-        expires_at: new Date(Date.now() + 30 * 24 * 60 * 60 * 1000).toISOString() // 30 days
-      }, {
-        onConflict: 'id'
-      });
+    return qs.map((q, i) => {
+      const entry = data.results[i];
+      if (!entry || entry.error) return null;
 
-      if (upsertError) {
-        console.warn('[geminiCache] DB cache write failed (non-blocking):', upsertError);
-      } else {
-        console.log(`[geminiCache] ✅ Cached to database: ${canonicalKey}`);
-      }
-    }
+      // Convert Edge Function response to MacroResult format
+      const result: MacroResult = {
+        name: entry.name || q.name,
+        serving_label: entry.serving_label || 'serving',
+        grams_per_serving: entry.grams_per_serving || 100,
+        macros: {
+          kcal: entry.macros?.kcal || 0,
+          protein_g: entry.macros?.protein_g || 0,
+          carbs_g: entry.macros?.carbs_g || 0,
+          fat_g: entry.macros?.fat_g || 0,
+          fiber_g: entry.macros?.fiber_g || 0
+        },
+        confidence: entry.confidence || 0.8,
+        source: 'gemini'
+      };
 
-    // ✅ Step 5: Populate in-memory cache
-    cache.set(key, {
-      result,
-      expires: Date.now() + 24 * 60 * 60 * 1000
+      // ✅ Populate in-memory cache
+      const key = JSON.stringify(q);
+      cache.set(key, { result, expires: Date.now() + MEMORY_TTL_MS });
+      console.log(`[macroLookup.trace] cache=miss key=${key} (will cache to DB)`);
+      return result;
     });
-
-    console.log(`[macroLookup.trace] cache=miss key=${key} (will cache to DB)`);
-    return result;
-
   } catch (err) {
     console.error('[geminiCache] Exception:', err);
     console.error('[geminiCache] Exception details:', {
       error: err,
-      query: q,
+      count: qs.length,
       stack: err instanceof Error ? err.stack : undefined,
       timestamp: new Date().toISOString()
     });
-    return null;
+    return qs.map(() => null);
   }
 }
-
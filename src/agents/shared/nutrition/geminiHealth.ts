@@ -0,0 +1,63 @@
+/**
+ * Gemini Health - whether the nutrition cascade should try Gemini right now
+ *
+ * Asks nutrition-gemini's ?health=1 endpoint (which reports its circuit
+ * breaker) at most once per HEALTH_TTL_MS, and learns from real calls in
+ * between: a 502/503 marks Gemini down until its Retry-After, a good
+ * batch marks it up. While down, the cascade uses its OpenAI fallback.
+ *
+ * The health endpoint reports the breaker of whichever isolate answers, and
+ * each isolate keeps its own, so it can say 'ok' while the isolates serving
+ * batches are open. Batch 502/503s (reportGeminiFailure) are the primary
+ * signal; the health check only decides the first attempt. Items a failed
+ * batch leaves unresolved fall through to OpenAI either way.
+ */
+
+import { getSupabase } from '../../../lib/supabase';
+
+const HEALTH_TTL_MS = 30_000;
+const DEFAULT_DOWN_MS = 30_000;
+
+let state: { available: boolean; until: number } | null = null;
+let inflight: Promise<boolean> | null = null;
+
+export async function isGeminiAvailable(): Promise<boolean> {
+  if (state && state.until > Date.now()) return state.available;
+  if (inflight) return inflight;
+
+  inflight = (async () => {
+    try {
+      const { data, error } = await getSupabase().functions.invoke('nutrition-gemini?health=1', {
+        method: 'GET'
+      });
+      if (error || !data) {
+        console.warn('[geminiHealth] health check failed:', error);
+        state = { available: false, until: Date.now() + DEFAULT_DOWN_MS };
+      } else {
+        // 'degraded' (half-open) still gets traffic: that is the probe
+        const available = data.status !== 'unavailable';
+        const retryAfterMs = Number(data.breaker?.retryAfterMs) || 0;
+        state = {
+          available,
+          until: Date.now() + (available ? HEALTH_TTL_MS : Math.max(retryAfterMs, 1000))
+        };
+      }
+    } catch (err) {
+      console.warn('[geminiHealth] health check exception:', err);
+      state = { available: false, until: Date.now() + DEFAULT_DOWN_MS };
+    } finally {
+      inflight = null;
+    }
+    return state!.available;
+  })();
+  return inflight;
+}
+
+/** A Gemini call failed with 502/503: skip it until retryAfterMs passes */
+export function reportGeminiFailure(retryAfterMs = DEFAULT_DOWN_MS): void {
+  state = { available: false, until: Date.now() + retryAfterMs };
+}
+
+export function reportGeminiSuccess(): void {
+  state = { available: true, until: Date.now() + HEALTH_TTL_MS };
+}
@@ -4,8 +4,8 @@
  */
 
 import type { MacroProvider, MacroResult, NormalizedItem } from './types';
+import { resolveUserContext, type UserContext } from '../../../../lib/userContext';
 import { buildBrandKey, BRAND_SERVINGS } from './brandServings';
-import { getSupabase } from '../../../../lib/supabase';
 
 export const brandMapProvider: MacroProvider = {
   id: 'brandMap',
@@ -15,22 +15,16 @@ export const brandMapProvider: MacroProvider = {
     return item.is_branded === true && !!item.brand;
   },
   
-  async fetch(item: NormalizedItem, userId?: string): Promise<MacroResult | null> {
+  async fetch(item: NormalizedItem, userId?: string, ctx?: UserContext): Promise<MacroResult | null> {
     if (!item.brand) return null;
 
-    // Get user's country preference
+    // Country comes from the request's UserContext (loaded once per user)
     let country = 'us';
     if (userId) {
       try {
-        const supabase = getSupabase();
-        const { data: prefs } = await supabase
-          .from('user_preferences')
-          .select('country_code')
-          .eq('user_id', userId)
-          .maybeSingle();
-        country = prefs?.country_code?.toLowerCase() || 'us';
+        country = (await resolveUserContext(userId, ctx)).countryCode;
       } catch (err) {
-        console.warn('[brandMap] Failed to fetch country preference, defaulting to US:', err);
+        console.warn('[brandMap] Failed to load user context, defaulting to US:', err);
       }
     }
 
@@ -79,7 +73,7 @@ export const brandMapProvider: MacroProvider = {
   }
 };
 
-export async function lookup(normalized: any, userId?: string) {
-  return await brandMapProvider.fetch?.(normalized, userId);
+export async function lookup(normalized: any, userId?: string, ctx?: UserContext) {
+  return await brandMapProvider.fetch?.(normalized, userId, ctx);
 }
 
@@ -3,8 +3,9 @@
  * Fallback for branded items not in brand map
  */
 
-import { getCachedGemini } from '../geminiCache';
+import { getCachedGemini, getCachedGeminiBatch } from '../geminiCache';
 import type { MacroProvider, MacroResult, NormalizedItem } from './types';
+import type { UserContext } from '../../../../lib/userContext';
 
 export const geminiProvider: MacroProvider = {
   id: 'gemini',
@@ -15,7 +16,7 @@ export const geminiProvider: MacroProvider = {
     return item.is_branded === true || !item.unit;
   },
 
-  async fetch(item: NormalizedItem, userId?: string): Promise<MacroResult | null> {
+  async fetch(item: NormalizedItem, userId?: string, ctx?: UserContext): Promise<MacroResult | null> {
     // Build canonical name for Gemini
     const canonicalName = [
       item.brand,
@@ -29,12 +30,23 @@ export const geminiProvider: MacroProvider = {
       brand: item.brand,
       serving_label: item.serving_label,
       size_label: item.size_label,
-      country: 'us' // Default to US, cache handles user prefs
+      country: ctx?.countryCode ?? 'us' // From the request's UserContext when threaded
     });
   }
 };
 
-export async function lookup(normalized: any, userId?: string) {
-  return await geminiProvider.fetch?.(normalized, userId);
+export async function lookup(normalized: any, userId?: string, ctx?: UserContext) {
+  return await geminiProvider.fetch?.(normalized, userId, ctx);
 }
 
+
+/** Many items in one nutrition-gemini call; results[i] belongs to items[i] */
+export async function lookupMany(items: NormalizedItem[], userId?: string, ctx?: UserContext) {
+  return await getCachedGeminiBatch(items.map(item => ({
+    name: item.name,
+    brand: item.brand ?? undefined,
+    serving_label: item.serving_label ?? undefined,
+    size_label: item.size_label ?? undefined,
+    country: ctx?.countryCode ?? 'us'
+  })));
+}
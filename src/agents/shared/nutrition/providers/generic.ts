@@ -4,12 +4,13 @@
  */
 
 import type { MacroProvider, MacroResult, NormalizedItem } from './types';
+import { resolveUserContext, type UserContext } from '../../../../lib/userContext';
 import { getSupabase } from '../../../../lib/supabase';
 
 /**
  * Convert quantity + unit to grams
  */
-function convertToGrams(qty: number, unit: string, foodName: string): number {
+export function convertToGrams(qty: number, unit: string, foodName: string): number {
   const unitLower = unit.toLowerCase();
   const foodNameLower = foodName.toLowerCase();
 
@@ -79,20 +80,14 @@ export const genericProvider: MacroProvider = {
     return true; // Always supports (fallback)
   },
   
-  async fetch(item: NormalizedItem, userId?: string): Promise<MacroResult | null> {
-    // Get user's country preference
+  async fetch(item: NormalizedItem, userId?: string, ctx?: UserContext): Promise<MacroResult | null> {
+    // Country comes from the request's UserContext (loaded once per user)
     let country = 'us';
     if (userId) {
       try {
-        const supabase = getSupabase();
-        const { data: prefs } = await supabase
-          .from('user_preferences')
-          .select('country_code')
-          .eq('user_id', userId)
-          .maybeSingle();
-        country = prefs?.country_code?.toLowerCase() || 'us';
+        country = (await resolveUserContext(userId, ctx)).countryCode;
       } catch (err) {
-        console.warn('[generic] Failed to fetch country preference:', err);
+        console.warn('[generic] Failed to load user context, defaulting to US:', err);
       }
     }
     
@@ -162,7 +157,7 @@ function convertToMacroResult(dbRow: any, item: NormalizedItem): MacroResult {
   };
 }
 
-export async function lookup(normalized: any, userId?: string) {
-  return await genericProvider.fetch?.(normalized, userId);
+export async function lookup(normalized: any, userId?: string, ctx?: UserContext) {
+  return await genericProvider.fetch?.(normalized, userId, ctx);
 }
 
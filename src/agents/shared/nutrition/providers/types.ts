@@ -3,6 +3,8 @@
  * Seam for future MCP integration
  */
 
+import type { UserContext } from '../../../../lib/userContext';
+
 export interface NormalizedItem {
   name: string;
   amount: number | null;
@@ -31,7 +33,8 @@ export interface MacroResult {
 export interface MacroProvider {
   id: 'gemini' | 'brandMap' | 'generic' | 'mcp-nutrition';
   supports(item: NormalizedItem, userId?: string): boolean;
-  fetch(item: NormalizedItem, userId?: string): Promise<MacroResult | null>;
+  /** ctx: the request's UserContext, so providers never re-read user rows */
+  fetch(item: NormalizedItem, userId?: string, ctx?: UserContext): Promise<MacroResult | null>;
   priority: number; // Lower = higher priority
 }
 
@@ -45,10 +48,10 @@ class ProviderRegistry {
     this.providers.sort((a, b) => a.priority - b.priority);
   }
   
-  async lookup(item: NormalizedItem, userId?: string): Promise<MacroResult | null> {
+  async lookup(item: NormalizedItem, userId?: string, ctx?: UserContext): Promise<MacroResult | null> {
     for (const provider of this.providers) {
       if (provider.supports(item, userId)) {
-        const result = await provider.fetch(item, userId);
+        const result = await provider.fetch(item, userId, ctx);
         if (result) {
           console.log(`[macroLookup.trace] item="${item.name}" path=${provider.id} serving="${result.serving_label}" qty=${item.amount ?? 1} kcal=${result.macros.kcal}`);
           return result;
@@ -1,15 +1,17 @@
 import type { MealTotals, TefBreakdown, TdeeResult } from "../shared/nutrition/types";
+import type { UserContext } from "../../lib/userContext";
 
 function round1(n: number) { return Math.max(0, Math.round(n * 10) / 10); }
 
-async function getTargetTDEE(supabase: any, userId: string): Promise<number> {
+async function getTargetTDEE(supabase: any, userId: string, ctx?: UserContext): Promise<number> {
   const { calculateTargetCalories } = await import('../../lib/macros');
 
-  const { data: metrics } = await supabase
+  // The request's UserContext already holds user_metrics / user_profiles
+  const metrics = ctx ? ctx.metrics : (await supabase
     .from('user_metrics')
     .select('tdee, protein_g, carbs_g, fat_g, manual_macro_override, caloric_goal, caloric_adjustment')
     .eq('user_id', userId)
-    .maybeSingle();
+    .maybeSingle()).data;
 
   if (metrics) {
     const protein = Number(metrics.protein_g ?? 0);
@@ -34,11 +36,11 @@ async function getTargetTDEE(supabase: any, userId: string): Promise<number> {
     }
   }
 
-  const { data: profile } = await supabase
+  const profile = ctx ? ctx.profile : (await supabase
     .from('user_profiles')
     .select('tdee_target')
     .eq('user_id', userId)
-    .maybeSingle();
+    .maybeSingle()).data;
 
   if (profile?.tdee_target) return Number(profile.tdee_target);
 
@@ -63,7 +65,8 @@ export async function computeTDEE(
   userId: string,
   mealTotals: MealTotals,
   tef: TefBreakdown,
-  _eatenAtIso: string // Unused, kept for API compatibility
+  _eatenAtIso: string, // Unused, kept for API compatibility
+  ctx?: UserContext
 ): Promise<TdeeResult> {
   try {
     // Use getSupabase() from lib to avoid process.env in browser
@@ -85,7 +88,7 @@ export async function computeTDEE(
       };
     }
 
-    const target = await getTargetTDEE(supabase, userId);
+    const target = await getTargetTDEE(supabase, userId, ctx && ctx.userId === userId ? ctx : undefined);
     const today = await getTodayUsage(supabase, userId, boundaries);
 
     const thisMealKcal = round1(mealTotals.calories + tef.kcal);
@@ -1,4 +1,4 @@
-import React, { useState, useRef, useEffect } from 'react';
+import React, { useState, useRef, useEffect, useCallback, useMemo } from 'react';
 import { useSearchParams } from 'react-router-dom';
 import { PatAvatar } from './PatAvatar';
 import { VoiceWaveform } from './VoiceWaveform';
@@ -21,7 +21,7 @@ import { useSpeechRecognition } from '../hooks/useSpeechRecognition';
 import { callChat } from '../lib/chat';
 import { callChatStreaming } from '../lib/streamingChat';
 import { classifyFoodMessage, type ClassificationResult } from '../lib/personality/foodClassifier';
-import { logMealViaRpc as saveMealAction } from '../lib/meals/saveMeal';
+import { enqueueMeal as saveMealAction } from '../lib/meals/outbox';
 import type { SaveMealInput, SaveMealResult } from '../lib/meals/saveMeal';
 import { inferMealSlot } from '../lib/meals/inferMealSlot';
 import { trackFirstChatMessage } from '../lib/analytics';
@@ -46,6 +46,9 @@ import { useNavigate } from 'react-router-dom';
 import { useRole } from '../hooks/useRole';
 import { isPrivileged } from '../utils/rbac';
 import { AnimatePresence } from 'framer-motion';
+import { ChatTranscript, withMessageText } from './chat/ChatTranscript';
+import { MessageBubble, toPendingMeal, type PendingMeal } from './chat/MessageBubble';
+import { createFrameCoalescer } from '../lib/frameCoalescer';
 
 export const ChatPat: React.FC = () => {
   const navigate = useNavigate();
@@ -134,6 +137,7 @@ export const ChatPat: React.FC = () => {
   const [statusText, setStatusText] = useState<string>('');
   const [showTDEEBubble, setShowTDEEBubble] = useState(false);
   const messagesEndRef = useRef<HTMLDivElement>(null);
+  const scrollContainerRef = useRef<HTMLDivElement>(null);
 
   // Swarm 2.1: Ephemeral cache for "log" follow-up with TTL
   const [lastQuestionItems, setLastQuestionItems] = useState<any[] | null>(null);
@@ -146,10 +150,11 @@ export const ChatPat: React.FC = () => {
       ? lastQuestionItems
       : null;
 
-  // Auto-scroll to bottom when messages change
+  // Auto-scroll to bottom on new messages / status changes. Streamed text
+  // growth is handled by ChatTranscript, which stays pinned to the bottom.
   useEffect(() => {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
-  }, [messages, isThinking, isSending, statusText]);
+  }, [messages.length, isThinking, isSending, statusText]);
 
   // Inline confirmation banner for food logging
   const [inlineConfirmation, setInlineConfirmation] = useState<{
@@ -420,28 +425,7 @@ export const ChatPat: React.FC = () => {
 
   // TMWYA Verification Page state
   const [showMealVerification, setShowMealVerification] = useState(false);
-  const [pendingMeal, setPendingMeal] = useState<{
-    items: Array<{
-      description: string;
-      brand?: string;
-      qty: number;
-      unit: string;
-      calories: number;
-      protein_g: number;
-      carbs_g: number;
-      fat_g: number;
-      fiber_g?: number;
-      source?: string;
-    }>;
-    inferredTimestamp?: Date;
-    totals: {
-      calories: number;
-      protein_g: number;
-      carbs_g: number;
-      fat_g: number;
-      fiber_g?: number;
-    };
-  } | null>(null);
+  const [pendingMeal, setPendingMeal] = useState<PendingMeal | null>(null);
 
   // TMWYA verification handlers
   const handleMealVerificationLog = async (editedMeal?: typeof pendingMeal) => {
@@ -530,6 +514,40 @@ export const ChatPat: React.FC = () => {
     setMessages(prev => [...prev, editMessage]);
   };
 
+  // TMWYA verify messages open the verification page once (not on every
+  // render; the transcript only renders the rows that are on screen)
+  const openedVerifyIdsRef = useRef(new Set<string>());
+  useEffect(() => {
+    const fresh = messages.filter(m => m.roleData?.type === 'tmwya.verify' && !openedVerifyIdsRef.current.has(m.id));
+    if (fresh.length === 0) return;
+    fresh.forEach(m => openedVerifyIdsRef.current.add(m.id));
+    const latest = fresh[fresh.length - 1];
+    console.log('[tmwya] resolved → pendingMeal set');
+    setPendingMeal(toPendingMeal(latest.roleData?.items || [], latest.roleData?.totals));
+    setShowMealVerification(true);
+    console.log('[tmwya] verify → opened');
+  }, [messages]);
+
+  // Stable handlers so memoized MessageBubbles don't re-render
+  const openAnalysis = useCallback((result: AnalysisResult) => {
+    setCurrentAnalysisResult(result);
+    setShowFoodVerificationScreen(true);
+  }, []);
+
+  const openMealVerification = useCallback((meal: PendingMeal) => {
+    setPendingMeal(meal);
+    setShowMealVerification(true);
+  }, []);
+
+  const transcriptMessages = useMemo(
+    () => messages.filter(m => m.roleData?.type !== 'tmwya.verify'),
+    [messages]
+  );
+
+  const renderMessage = useCallback((message: ChatMessage) => (
+    <MessageBubble message={message} onOpenAnalysis={openAnalysis} onVerifyMeal={openMealVerification} />
+  ), [openAnalysis, openMealVerification]);
+
   // Food verification screen handlers
   const handleConfirmVerification = async (normalizedMeal: any) => {
     try {
@@ -905,17 +923,22 @@ export const ChatPat: React.FC = () => {
               throw new Error('User not authenticated');
             }
 
+            // One user-context load per turn: feature flags, the persona and
+            // handleUserMessage all read from it
+            const { loadUserContext } = await import('../lib/userContext');
+            const requestContext = await loadUserContext(user.data.user.id);
+
             const { getFeatureFlags } = await import('../lib/featureFlags');
-            const flags = await getFeatureFlags(user.data.user.id);
+            const flags = await getFeatureFlags(user.data.user.id, requestContext);
 
             // Use new unified message handler
             console.log('[ChatPat] Using P3 unified handler');
 
             const { handleUserMessage } = await import('../core/chat/handleUserMessage');
-            const { loadUserContext } = await import('../core/personality/patSystem');
+            const { personaContextFrom } = await import('../core/personality/patSystem');
 
-            // Load full user context for personality injection
-            const userContext = await loadUserContext(user.data.user.id);
+            // Persona context for personality injection, from the rows already loaded
+            const userContext = personaContextFrom(requestContext);
             console.log('[ChatPat] User context loaded:', userContext);
 
             // Load personality prompts from DB if enabled
@@ -927,6 +950,7 @@ export const ChatPat: React.FC = () => {
             const result = await handleUserMessage(newMessage.text, {
               userId: user.data.user.id,
               userContext,
+              requestContext,
               mode: 'text',
             });
 
@@ -1073,33 +1097,40 @@ export const ChatPat: React.FC = () => {
             // Remove thinking message and add empty streaming message
             setMessages(prev => prev.filter(m => !m.id.startsWith('thinking-')).concat(patResponse));
 
+            // Tokens arrive faster than frames: render at most once per frame
+            const streamFrames = createFrameCoalescer<string>(text =>
+              setMessages(prev => withMessageText(prev, streamingMessageId, text))
+            );
+
             // Use streaming for real-time typing effect
             await callChatStreaming({
               messages: payload,
               onToken: (token: string) => {
                 streamingText += token;
-                setMessages(prev =>
-                  prev.map(msg =>
-                    msg.id === streamingMessageId
-                      ? { ...msg, text: streamingText }
-                      : msg
-                  )
-                );
+                streamFrames.push(streamingText);
+              },
+              onToolCall: ({ name }) => {
+                setStatusText(name === 'log_meal' ? 'Logging meal...' : 'Working...');
+              },
+              onToolResult: (tool) => {
+                setStatusText('');
+                if (!tool.success) {
+                  if (tool.name !== 'get_remaining_macros') toast.error(tool.error || 'That action failed');
+                } else if (tool.name === 'log_meal') {
+                  toast.success(`Logged ${tool.result?.items_logged ?? 0} item(s) · ${Math.round(tool.result?.totals?.kcal ?? 0)} kcal`);
+                } else if (tool.name === 'undo_last_meal') {
+                  toast.success('Removed your last meal');
+                }
               },
               onComplete: (fullText: string) => {
                 console.log("[chat:res] Streaming complete");
                 streamingText = fullText;
+                streamFrames.cancel();
 
                 // Pat's response already includes "Log" for macro responses
                 // Do NOT add extra instructions
 
-                setMessages(prev =>
-                  prev.map(msg =>
-                    msg.id === streamingMessageId
-                      ? { ...msg, text: fullText }
-                      : msg
-                  )
-                );
+                setMessages(prev => withMessageText(prev, streamingMessageId, fullText));
                 setIsSending(false);
                 setIsThinking(false);
                 setIsSpeaking(false);
@@ -1110,6 +1141,7 @@ export const ChatPat: React.FC = () => {
                 toast.error(error.includes('429') ? "Pat is busy right now. Please try again later." : error);
 
                 // Remove the empty message on error
+                streamFrames.cancel();
                 setMessages(prev => prev.filter(msg => msg.id !== streamingMessageId));
                 setIsSending(false);
                 setIsThinking(false);
@@ -1202,7 +1234,8 @@ export const ChatPat: React.FC = () => {
             
             // Handle specific error types with appropriate messaging
             const errorMessage = String(error?.message || error);
-            if (errorMessage.includes('openai-chat 429')) {
+            // 429: provider limit; 503: shed by the server's LLM scheduler
+            if (/openai-chat (429|503)/.test(errorMessage)) {
               toast.error("Pat is busy right now. Please try again later.");
             } else {
               toast.error('Chat failed');
@@ -1775,7 +1808,7 @@ export const ChatPat: React.FC = () => {
   return (
     <div className="h-screen bg-pat-gradient text-white flex flex-col pt-[44px]">
       <div className="flex-1 flex flex-col overflow-hidden">
-        <div className="flex-1 overflow-y-auto px-4 py-6 pb-32">
+        <div ref={scrollContainerRef} className="flex-1 overflow-y-auto px-4 py-6 pb-32">
           {/* TDEE Prompt Bubble - Always visible at top until completed */}
           <AnimatePresence>
             {showTDEEBubble && (
@@ -1806,211 +1839,20 @@ export const ChatPat: React.FC = () => {
             </div>
           )}
 
-          <div className={`space-y-6 transition-opacity duration-300 ${isTyping || messages.length > 1 ? 'opacity-100' : 'opacity-0'}`}>
-            {(() => {
-              function renderVerifyCtaIfNeeded(msg: any) {
-                if (msg?.meta?.ama_nutrition_estimate === true && (msg?.meta?.items?.length ?? 0) > 0) {
-                  // Convert AMA nutrition data to AnalysisResult format for FoodVerificationScreen
-                  const amaItems = msg.meta.items.map((item: any, index: number) => ({
-                    name: item.name || item.description || '',
-                    brand: item.brand,
-                    qty: item.quantity || item.qty || 1,
-                    unit: item.unit || 'serving',
-                    grams: 100, // Default assumption
-                    macros: {
-                      kcal: item.calories || 0,
-                      protein_g: item.protein_g || 0,
-                      carbs_g: item.carbs_g || 0,
-                      fat_g: item.fat_g || 0,
-                    },
-                    confidence: 0.9, // High confidence for AMA estimates
-                    candidates: [{
-                      name: item.name || item.description || '',
-                      brand: item.brand,
-                      macros: {
-                        kcal: item.calories || 0,
-                        protein_g: item.protein_g || 0,
-                        carbs_g: item.carbs_g || 0,
-                        fat_g: item.fat_g || 0,
-                      },
-                      confidence: 0.9,
-                      source: item.source || 'USDA'
-                    }],
-                    source_hints: { ama_estimate: true },
-                    originalText: item.name || item.description || ''
-                  }));
-
-                  const analysisResult = {
-                    items: amaItems,
-                    meal_slot: 'lunch', // Default assumption
-                    source: 'text',
-                    originalInput: 'AMA nutrition estimate'
-                  };
-
-                  return (
-                    <button
-                      className="mt-2 px-3 py-1 rounded-xl bg-white/20 hover:bg-white/30 transition"
-                      onClick={() => {
-                        setCurrentAnalysisResult(analysisResult);
-                        setShowFoodVerificationScreen(true);
-                        console.info('[ama] verify → opened from AMA CTA', { count: amaItems.length });
-                      }}
-                    >
-                      Verify &amp; Log
-                    </button>
-                  );
-                }
-                return null;
-              }
-
-              function renderAssistantBubble(msg: any) {
-                return (
-                  <div className="assistant-bubble">
-                    <div>{msg.text}</div>
-                    {renderVerifyCtaIfNeeded(msg)}
-                  </div>
-                );
-              }
-
-              return messages.map((message, index) => {
-              // Handle TMWYA verify card - set up pendingMeal instead of showing inline
-              if (message.roleData?.type === 'tmwya.verify') {
-                console.log('[tmwya] resolved → pendingMeal set');
-
-                // Set up pending meal from roleData
-                const mealItems = message.roleData.items || [];
-                const pendingMealData = {
-                  items: mealItems.map((item: any) => ({
-                    description: item.name || item.description || '',
-                    brand: item.brand || undefined,
-                    qty: item.quantity || item.qty || 1,
-                    unit: item.unit || 'serving',
-                    calories: item.calories || 0,
-                    protein_g: item.protein_g || 0,
-                    carbs_g: item.carbs_g || 0,
-                    fat_g: item.fat_g || 0,
-                    fiber_g: item.fiber_g || 0,
-                    source: item.source || undefined,
-                  })),
-                  inferredTimestamp: new Date(),
-                  totals: {
-                    calories: message.roleData.totals?.calories || 0,
-                    protein_g: message.roleData.totals?.protein_g || 0,
-                    carbs_g: message.roleData.totals?.carbs_g || 0,
-                    fat_g: message.roleData.totals?.fat_g || 0,
-                    fiber_g: message.roleData.totals?.fiber_g || 0,
-                  }
-                };
-
-                setPendingMeal(pendingMealData);
-                setShowMealVerification(true);
-                console.log('[tmwya] verify → opened');
-
-                // Don't render the message, show verification page instead
-                return null;
-              }
-              
-              // Regular message bubble
-              return (
-                <div key={message.id}>
-                  <div
-                    className={`flex ${message.isUser ? 'justify-end' : 'justify-start'}`}
-                  >
-                    <div
-                      className={`max-w-sm lg:max-w-2xl px-5 py-4 rounded-2xl ${
-                        message.isUser
-                          ? 'bg-blue-600 text-white'
-                          : 'bg-gray-800 text-gray-100'
-                      }`}
-                      style={{ maxWidth: message.isUser ? '480px' : '700px' }}
-                    >
-                      {message.isUser ? (
-                        <p className="message-bubble text-base leading-relaxed whitespace-pre-wrap break-words" style={{ lineHeight: '1.6', overflowWrap: 'anywhere', wordBreak: 'break-word' }}>{message.text}</p>
-                      ) : (
-                        renderAssistantBubble(message)
-                      )}
-
-                      {/* Source display for web-verified content */}
-                      {message.meta?.cite && (
-                        <div className="mt-3 pt-2 border-t border-gray-600">
-                          <div className="flex items-center gap-2 text-xs">
-                            {message.meta.webVerified && (
-                              <span className="inline-flex items-center px-2 py-1 rounded-full bg-green-600/20 text-green-400 text-xs font-medium">
-                                Web verified
-                              </span>
-                            )}
-                            <span className="text-gray-400">Source:</span>
-                            <a
-                              href={message.meta.cite}
-                              target="_blank"
-                              rel="noopener noreferrer"
-                              className="text-blue-400 hover:text-blue-300 underline"
-                            >
-                              {message.meta.citeTitle || message.meta.cite}
-                            </a>
-                          </div>
-                        </div>
-                      )}
-
-                      {/* Verify & Log button for AMA nutrition estimates */}
-                      {message.meta?.ama_nutrition_estimate && message.meta?.items && (
-                        <div className="mt-3 pt-2 border-t border-gray-600">
-                          <button
-                            onClick={() => {
-                              console.log('[chat] Verify & Log clicked for AMA nutrition');
-                              // Set up pending meal from message metadata
-                              const pendingMealData = {
-                                items: message.meta.items.map((item: any) => ({
-                                  description: item.name || item.description || '',
-                                  brand: item.brand || undefined,
-                                  qty: item.quantity || item.qty || 1,
-                                  unit: item.unit || 'serving',
-                                  calories: item.calories || 0,
-                                  protein_g: item.protein_g || 0,
-                                  carbs_g: item.carbs_g || 0,
-                                  fat_g: item.fat_g || 0,
-                                  fiber_g: item.fiber_g || 0,
-                                  source: item.source || undefined,
-                                })),
-                                inferredTimestamp: new Date(),
-                                totals: message.meta.totals || {
-                                  calories: 0,
-                                  protein_g: 0,
-                                  carbs_g: 0,
-                                  fat_g: 0,
-                                  fiber_g: 0,
-                                }
-                              };
-                              setPendingMeal(pendingMealData);
-                              setShowMealVerification(true);
-                              console.log('[tmwya] verify → opened from AMA CTA');
-                            }}
-                            className="inline-flex items-center px-3 py-2 text-sm font-medium text-blue-600 bg-blue-50 hover:bg-blue-100 rounded-lg transition-colors border border-blue-200"
-                          >
-                            Verify & Log
-                          </button>
-                        </div>
-                      )}
-                      <p className="text-xs opacity-70 mt-2">
-                        {message.timestamp.toLocaleTimeString([], {
-                          hour: '2-digit',
-                          minute: '2-digit'
-                        })}
-                      </p>
-                    </div>
-                  </div>
-              </div>
-              );
-              });
-            })()}
+          <div className={`transition-opacity duration-300 ${isTyping || messages.length > 1 ? 'opacity-100' : 'opacity-0'}`}>
+            <ChatTranscript
+              messages={transcriptMessages}
+              scrollRef={scrollContainerRef}
+              renderMessage={renderMessage}
+            />
             {/* Status Indicator */}
             {(isSending || isAnalyzingFood || statusText || isThinking) && (
-              <div className="flex justify-start">
+              <div className="flex justify-start mt-6" data-testid="chat-status">
                 <div className="max-w-sm lg:max-w-2xl px-5 py-4 rounded-2xl bg-gray-800 text-gray-100" style={{ maxWidth: '700px' }}>
                   <ThinkingAvatar className="" label={statusText || 'Pat is thinking...'} />
                 </div>
               </div>
-            )})
+            )}
             {/* Scroll anchor */}
             <div ref={messagesEndRef} />
           </div>
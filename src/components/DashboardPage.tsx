@@ -13,6 +13,8 @@ import { MealHistoryList } from './dashboard/MealHistoryList';
 import { MetricAlert, CrossMetricInsight } from '../types/metrics';
 import { PatMoodCalculator, UserMetrics } from '../utils/patMoodCalculator';
 import { getSupabase, getDashboardMetrics, updateDailyActivitySummary, getUserDayBoundaries } from '../lib/supabase';
+import { ensureDayTotalsSubscription } from '../lib/dayTotalsChannel';
+import { useDayTotalsStore } from '../store/dayTotals';
 import type { FoodEntry } from '../types/food';
 import { useNavigate, useLocation } from 'react-router-dom';
 import { motion, AnimatePresence } from 'framer-motion';
@@ -52,8 +54,8 @@ export const DashboardPage: React.FC = () => {
   const [dashboardData, setDashboardData] = useState<{
     userMetrics: UserMetricsData | null;
     todaysFoodLogs: FoodEntry[];
-    totalCalories: number;
-    totalMacros: { protein: number; carbs: number; fat: number; fiber: number };
+    // Today's kcal at load time; weekly total is shifted by later realtime deltas
+    dayKcalAtLoad: number;
     workoutLogs: WorkoutLogData[];
     sleepLogs: SleepLogData[];
     weeklyStats?: {
@@ -63,6 +65,16 @@ export const DashboardPage: React.FC = () => {
     };
   } | null>(null);
 
+  // Day totals are owned by the shared store and kept current by realtime deltas
+  const dayTotals = useDayTotalsStore(state => state.totals);
+  const totalCalories = Math.round(dayTotals.kcal);
+  const totalMacros = {
+    protein: Math.round(dayTotals.protein_g),
+    carbs: Math.round(dayTotals.carbs_g),
+    fat: Math.round(dayTotals.fat_g),
+    fiber: Math.round(dayTotals.fiber_g)
+  };
+
   useEffect(() => {
     setTimePeriod('daily');
   }, [location.key]);
@@ -117,8 +129,17 @@ export const DashboardPage: React.FC = () => {
       // Update daily activity summary first (idempotent)
       await updateDailyActivitySummary(user.data.user.id);
 
+      // Realtime deltas keep the seeded day totals current; skip the meal query
+      // (and the boundaries RPC) when the store is still live for today
+      const dayTotalsStore = useDayTotalsStore.getState();
+      const liveTotals = dayTotalsStore.isFresh(user.data.user.id);
+      console.log('[dashboard-load] Day totals source:', liveTotals ? 'realtime store' : 'database');
+
       // Get timezone-aware day boundaries (12:01 AM - 11:59:59 PM user local time)
       let dayBoundaries;
+      if (liveTotals) {
+        dayBoundaries = { day_start: dayTotalsStore.dayStart!, day_end: dayTotalsStore.dayEnd! };
+      } else {
       try {
         dayBoundaries = await getUserDayBoundaries(user.data.user.id);
         console.log('[dashboard-load] Day boundaries:', dayBoundaries);
@@ -178,6 +199,7 @@ export const DashboardPage: React.FC = () => {
           startLocal: startEST.toLocaleString(),
           endLocal: endEST.toLocaleString()
         });
+      }
       }
 
         // Prepare date ranges for other queries
@@ -207,7 +229,7 @@ export const DashboardPage: React.FC = () => {
 
           // Today's meals using timezone-aware boundaries + items for accurate macros
           // CRITICAL: Query meal_logs FIRST to ensure date filter works correctly
-          supabase
+          liveTotals ? Promise.resolve({ data: null }) : supabase
             .from('meal_logs')
             .select(`
               id,
@@ -255,7 +277,7 @@ export const DashboardPage: React.FC = () => {
         // Calculate totals from meal_items (accurate, canonical source)
         // IMPORTANT: Round all values to integers (no decimals)
         // NEW STRUCTURE: mealLogsResult.data contains meal_logs with nested meal_items
-        const mealLogs = mealLogsResult.data || [];
+        const mealLogs: any[] = mealLogsResult.data || [];
         
         // Flatten nested meal_items from all meal_logs
         const mealItems = mealLogs.flatMap(log => 
@@ -266,12 +288,28 @@ export const DashboardPage: React.FC = () => {
           }))
         );
         
-        const totalCalories = Math.round(mealItems.reduce((sum, item) => sum + (item.energy_kcal || 0), 0));
+        if (!liveTotals) {
+          // Seed the shared store; realtime deltas keep it current from here on
+          dayTotalsStore.seed(user.data.user.id, dayBoundaries.day_start, dayBoundaries.day_end, {
+            kcal: mealItems.reduce((sum, item) => sum + (item.energy_kcal || 0), 0),
+            protein_g: mealItems.reduce((sum, item) => sum + (item.protein_g || 0), 0),
+            carbs_g: mealItems.reduce((sum, item) => sum + (item.carbs_g || 0), 0),
+            fat_g: mealItems.reduce((sum, item) => sum + (item.fat_g || 0), 0),
+            fiber_g: mealItems.reduce((sum, item) => sum + (item.fiber_g || 0), 0),
+            items: mealItems.length
+          });
+        }
+        ensureDayTotalsSubscription(user.data.user.id).catch(err =>
+          console.warn('[dashboard-load] Day totals subscription failed:', err)
+        );
+
+        const seededTotals = useDayTotalsStore.getState().totals;
+        const totalCalories = Math.round(seededTotals.kcal);
         const totalMacros = {
-          protein: Math.round(mealItems.reduce((sum, item) => sum + (item.protein_g || 0), 0)),
-          carbs: Math.round(mealItems.reduce((sum, item) => sum + (item.carbs_g || 0), 0)),
-          fat: Math.round(mealItems.reduce((sum, item) => sum + (item.fat_g || 0), 0)),
-          fiber: Math.round(mealItems.reduce((sum, item) => sum + (item.fiber_g || 0), 0))
+          protein: Math.round(seededTotals.protein_g),
+          carbs: Math.round(seededTotals.carbs_g),
+          fat: Math.round(seededTotals.fat_g),
+          fiber: Math.round(seededTotals.fiber_g)
         };
 
         console.log('[dashboard-load] Meal items loaded:', {
@@ -331,8 +369,7 @@ export const DashboardPage: React.FC = () => {
         setDashboardData({
           userMetrics: metricsResult.data,
           todaysFoodLogs: groupedMeals,
-          totalCalories,
-          totalMacros,
+          dayKcalAtLoad: totalCalories,
           workoutLogs: workoutLogsResult.data || [],
           sleepLogs: sleepLogsResult.data || [],
           weeklyStats: {
@@ -470,7 +507,7 @@ export const DashboardPage: React.FC = () => {
           <div className="px-4 sm:px-6">
             {/* Daily Summary */}
             <DailySummary
-              totalCalories={dashboardData?.totalCalories || 0}
+              totalCalories={totalCalories}
               targetCalories={
                 // Use TARGET FROM MACROS (user's macro goal), NOT Net after TEF
                 (() => {
@@ -482,10 +519,14 @@ export const DashboardPage: React.FC = () => {
               }
               tdee={dashboardData?.userMetrics?.tdee || 0}
               proteinTarget={dashboardData?.userMetrics?.protein_g || 150}
-              currentProtein={dashboardData?.totalMacros?.protein || 0}
-              currentFiber={dashboardData?.totalMacros?.fiber || 0}
+              currentProtein={totalMacros.protein}
+              currentFiber={totalMacros.fiber}
               fiberTarget={20}
-              weeklyStats={dashboardData?.weeklyStats}
+              weeklyStats={dashboardData?.weeklyStats && {
+                ...dashboardData.weeklyStats,
+                totalCalories: dashboardData.weeklyStats.totalCalories + (totalCalories - dashboardData.dayKcalAtLoad),
+                totalDeficit: dashboardData.weeklyStats.totalDeficit - (totalCalories - dashboardData.dayKcalAtLoad)
+              }}
             />
           </div>
           
@@ -495,13 +536,13 @@ export const DashboardPage: React.FC = () => {
               <FrequencySection workouts={dashboardData?.workoutLogs || []} />
               <RestSection sleepLogs={dashboardData?.sleepLogs || []} />
               <EnergySection
-                energyData={dashboardData && dashboardData.totalMacros ? {
+                energyData={dashboardData ? {
                   date: new Date().toISOString().split('T')[0],
-                  calories: dashboardData.totalCalories || 0,
-                  protein_g: dashboardData.totalMacros?.protein || 0,
-                  carb_g: dashboardData.totalMacros?.carbs || 0,
-                  fat_g: dashboardData.totalMacros?.fat || 0,
-                  fiber_g: dashboardData.totalMacros?.fiber || 0,
+                  calories: totalCalories,
+                  protein_g: totalMacros.protein,
+                  carb_g: totalMacros.carbs,
+                  fat_g: totalMacros.fat,
+                  fiber_g: totalMacros.fiber,
                   salt_g: 2.3, // Mock for now
                   water_l: 3.2, // Mock for now
                   first_meal_time: '08:30', // Mock for now
@@ -528,10 +569,8 @@ export const DashboardPage: React.FC = () => {
             {/* Meal History */}
             {userId && (
               <div className="mt-6">
-                <MealHistoryList
-                  userId={userId}
-                  onMealDeleted={loadDashboardData}
-                />
+                {/* Deletes reach the day totals through the realtime channel; no reload needed */}
+                <MealHistoryList userId={userId} />
               </div>
             )}
 
@@ -4,6 +4,7 @@ import { NAV_ITEMS } from '../config/navItems';
 import { useRole } from '../hooks/useRole';
 import { supabase } from '../lib/supabase';
 import { getFeatureFlags, type FeatureFlags } from '../lib/featureFlags';
+import { prefetchRoute } from '../lib/routePreload';
 
 type ChatSummary = { id: string; title: string; preview: string; updated_at: string; };
 type UserProfile = { role?: 'admin' | 'trainer' | 'user' | string } | null;
@@ -134,6 +135,9 @@ export default function NavigationSidebar({ isOpen, onClose, onNavigate, recentC
     return (
       <button
         onClick={() => { onNavigate(to); onClose(); }}
+        onMouseEnter={() => prefetchRoute(to)}
+        onFocus={() => prefetchRoute(to)}
+        onTouchStart={() => prefetchRoute(to)}
         className="w-full text-left px-3 py-2 rounded-lg hover:bg-gray-100 text-sm flex items-center gap-3"
       >
         {Icon ? <Icon size={16} className="text-gray-600" /> : null}
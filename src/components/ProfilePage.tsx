@@ -11,6 +11,7 @@ import { PersonalInformationSection } from './profile/PersonalInformationSection
 import { CreditsWallet } from './profile/CreditsWallet';
 import { getSupabase, getUserProfile, upsertUserProfile } from '../lib/supabase';
 import { getDashboardMetrics } from '../lib/supabase';
+import { invalidateUserContext } from '../lib/userContext';
 import RequestRoleUpgrade from './settings/RequestRoleUpgrade';
 import { useNavigate } from 'react-router-dom';
 
@@ -277,6 +278,7 @@ export const ProfilePage: React.FC = () => {
           dob: editedProfile.dateOfBirth || null,
           bio: editedProfile.bio || null
         });
+        invalidateUserContext(user.data.user.id);
 
         setUserProfile(editedProfile);
         setIsEditing(false);
@@ -313,6 +315,7 @@ export const ProfilePage: React.FC = () => {
         voice_pitch: editedPreferences.voiceSettings.pitch,
         week_start_day: editedPreferences.weekStartDay
       });
+      invalidateUserContext(user.data.user.id);
 
       setPreferences(editedPreferences);
       toast.success('Preferences saved successfully!');
@@ -1,6 +1,7 @@
 import React, { useState } from 'react';
 import toast from 'react-hot-toast';
 import { getSupabase, type AppRole } from '../../lib/supabase';
+import { invalidateUserContext } from '../../lib/userContext';
 
 type Role = AppRole;
 
@@ -33,6 +34,7 @@ export default function ChangeRoleModal({ userId, currentRole, onClose, onChange
       toast.error(`Role change failed: ${error.message}`);
       return; 
     }
+    invalidateUserContext(userId);
     toast.success(`Role changed to "${role}"`);
     onChanged(role);
     onClose();
@@ -0,0 +1,210 @@
+import React, { useCallback, useEffect, useLayoutEffect, useMemo, useRef, useState } from 'react';
+import type { ChatMessage } from '../../types/chat';
+
+/**
+ * Virtualized Chat Transcript
+ * Renders only the rows inside the viewport (plus overscan) of the scroll
+ * container it lives in. Row content heights are measured with
+ * ResizeObserver and cached by message id (the gap below a row is added in
+ * the offset math, so a row becoming non-last never invalidates its cached
+ * height); unmeasured rows use an estimate. While the user is
+ * at the bottom, growth (new messages, streamed text) keeps them pinned.
+ */
+
+const DEFAULT_ESTIMATE_PX = 120;
+const DEFAULT_OVERSCAN_PX = 800;
+const STICK_THRESHOLD_PX = 80;
+
+interface ChatTranscriptProps {
+  messages: ChatMessage[];
+  /** The element that scrolls (the transcript may sit below other content in it) */
+  scrollRef: React.RefObject<HTMLElement>;
+  renderMessage: (message: ChatMessage) => React.ReactNode;
+  /** Vertical space between rows (px) */
+  gap?: number;
+  estimatedRowHeight?: number;
+  overscanPx?: number;
+}
+
+/**
+ * Index of the last row whose top is <= y (offsets is ascending)
+ */
+export function findRowAt(offsets: number[], y: number): number {
+  let lo = 0;
+  let hi = offsets.length - 1;
+  while (lo < hi) {
+    const mid = (lo + hi + 1) >> 1;
+    if (offsets[mid] <= y) lo = mid; else hi = mid - 1;
+  }
+  return Math.max(0, lo);
+}
+
+/**
+ * Visible slice for a viewport, given row tops and heights
+ */
+export function visibleRange(
+  offsets: number[],
+  heights: number[],
+  viewportTop: number,
+  viewportHeight: number,
+  overscanPx: number
+): { start: number; end: number } {
+  if (offsets.length === 0) return { start: 0, end: 0 };
+  const start = findRowAt(offsets, Math.max(0, viewportTop - overscanPx));
+  const bottom = viewportTop + viewportHeight + overscanPx;
+  let end = start;
+  while (end < offsets.length && offsets[end] < bottom) end++;
+  return { start, end: Math.max(end, Math.min(start + 1, offsets.length)) };
+}
+
+/**
+ * Replace one message's text, searching from the end (streaming rows are last)
+ * and leaving every other message object untouched for memoization
+ */
+export function withMessageText(messages: ChatMessage[], id: string, text: string): ChatMessage[] {
+  for (let i = messages.length - 1; i >= 0; i--) {
+    if (messages[i].id === id) {
+      if (messages[i].text === text) return messages;
+      const next = messages.slice();
+      next[i] = { ...messages[i], text };
+      return next;
+    }
+  }
+  return messages;
+}
+
+function MeasuredRow({
+  id,
+  onHeight,
+  paddingBottom,
+  children
+}: {
+  id: string;
+  onHeight: (id: string, height: number) => void;
+  paddingBottom: number;
+  children: React.ReactNode;
+}) {
+  const ref = useRef<HTMLDivElement>(null);
+
+  // Measure the content only; the gap is padding on the outer row
+  useLayoutEffect(() => {
+    const el = ref.current;
+    if (!el) return;
+    onHeight(id, el.offsetHeight);
+    if (typeof ResizeObserver === 'undefined') return;
+    const observer = new ResizeObserver(() => onHeight(id, el.offsetHeight));
+    observer.observe(el, { box: 'border-box' });
+    return () => observer.disconnect();
+  }, [id, onHeight]);
+
+  return (
+    <div data-message-id={id} style={{ paddingBottom }}>
+      <div ref={ref}>{children}</div>
+    </div>
+  );
+}
+
+export function ChatTranscript({
+  messages,
+  scrollRef,
+  renderMessage,
+  gap = 24,
+  estimatedRowHeight = DEFAULT_ESTIMATE_PX,
+  overscanPx = DEFAULT_OVERSCAN_PX
+}: ChatTranscriptProps) {
+  const listRef = useRef<HTMLDivElement>(null);
+  const heightsRef = useRef(new Map<string, number>());
+  const stickRef = useRef(true);
+  const frameRef = useRef<number | null>(null);
+  const [layoutVersion, setLayoutVersion] = useState(0);
+  const [viewport, setViewport] = useState({ top: 0, height: typeof window !== 'undefined' ? window.innerHeight : 800 });
+
+  // Batch measurement and scroll updates into one re-render per frame
+  const scheduleUpdate = useCallback(() => {
+    if (frameRef.current !== null) return;
+    frameRef.current = requestAnimationFrame(() => {
+      frameRef.current = null;
+      const container = scrollRef.current;
+      const list = listRef.current;
+      if (container && list) {
+        const listTop = list.getBoundingClientRect().top - container.getBoundingClientRect().top + container.scrollTop;
+        setViewport({ top: container.scrollTop - listTop, height: container.clientHeight });
+      }
+      setLayoutVersion(v => v + 1);
+    });
+  }, [scrollRef]);
+
+  const onHeight = useCallback((id: string, height: number) => {
+    if (heightsRef.current.get(id) === height) return;
+    heightsRef.current.set(id, height);
+    scheduleUpdate();
+  }, [scheduleUpdate]);
+
+  useEffect(() => {
+    const container = scrollRef.current;
+    if (!container) return;
+    const onScroll = () => {
+      stickRef.current = container.scrollHeight - container.scrollTop - container.clientHeight < STICK_THRESHOLD_PX;
+      scheduleUpdate();
+    };
+    container.addEventListener('scroll', onScroll, { passive: true });
+    window.addEventListener('resize', scheduleUpdate);
+    scheduleUpdate();
+    return () => {
+      container.removeEventListener('scroll', onScroll);
+      window.removeEventListener('resize', scheduleUpdate);
+      if (frameRef.current !== null) cancelAnimationFrame(frameRef.current);
+      frameRef.current = null;
+    };
+  }, [scrollRef, scheduleUpdate]);
+
+  // Forget heights of messages that are gone (chat switched / cleared)
+  useEffect(() => {
+    const ids = new Set(messages.map(m => m.id));
+    for (const id of heightsRef.current.keys()) {
+      if (!ids.has(id)) heightsRef.current.delete(id);
+    }
+  }, [messages]);
+
+  const { offsets, heights, total } = useMemo(() => {
+    const offsets: number[] = new Array(messages.length);
+    const heights: number[] = new Array(messages.length);
+    let y = 0;
+    for (let i = 0; i < messages.length; i++) {
+      offsets[i] = y;
+      heights[i] = (heightsRef.current.get(messages[i].id) ?? estimatedRowHeight) + (i < messages.length - 1 ? gap : 0);
+      y += heights[i];
+    }
+    return { offsets, heights, total: y };
+    // layoutVersion: heights live in a ref and change without new messages
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [messages, layoutVersion, estimatedRowHeight, gap]);
+
+  const { start, end } = visibleRange(offsets, heights, viewport.top, viewport.height, overscanPx);
+
+  // Keep pinned to the bottom while content grows under a user who is at the bottom
+  useLayoutEffect(() => {
+    const container = scrollRef.current;
+    if (container && stickRef.current) {
+      container.scrollTop = container.scrollHeight;
+    }
+  }, [scrollRef, total, messages.length]);
+
+  const topPad = offsets[start] ?? 0;
+  const bottomPad = Math.max(0, total - (end > 0 ? offsets[end - 1] + heights[end - 1] : 0));
+
+  return (
+    <div ref={listRef} style={{ paddingTop: topPad, paddingBottom: bottomPad }} data-testid="chat-transcript">
+      {messages.slice(start, end).map((message, i) => (
+        <MeasuredRow
+          key={message.id}
+          id={message.id}
+          onHeight={onHeight}
+          paddingBottom={start + i < messages.length - 1 ? gap : 0}
+        >
+          {renderMessage(message)}
+        </MeasuredRow>
+      ))}
+    </div>
+  );
+}
@@ -0,0 +1,188 @@
+import React from 'react';
+import type { ChatMessage } from '../../types/chat';
+import type { AnalysisResult } from '../../types/food';
+
+export interface PendingMeal {
+  items: Array<{
+    description: string;
+    brand?: string;
+    qty: number;
+    unit: string;
+    calories: number;
+    protein_g: number;
+    carbs_g: number;
+    fat_g: number;
+    fiber_g?: number;
+    source?: string;
+  }>;
+  inferredTimestamp?: Date;
+  totals: {
+    calories: number;
+    protein_g: number;
+    carbs_g: number;
+    fat_g: number;
+    fiber_g?: number;
+  };
+}
+
+/**
+ * Build the TMWYA verification payload from message items/totals
+ */
+export function toPendingMeal(items: any[], totals?: any): PendingMeal {
+  return {
+    items: items.map((item: any) => ({
+      description: item.name || item.description || '',
+      brand: item.brand || undefined,
+      qty: item.quantity || item.qty || 1,
+      unit: item.unit || 'serving',
+      calories: item.calories || 0,
+      protein_g: item.protein_g || 0,
+      carbs_g: item.carbs_g || 0,
+      fat_g: item.fat_g || 0,
+      fiber_g: item.fiber_g || 0,
+      source: item.source || undefined,
+    })),
+    inferredTimestamp: new Date(),
+    totals: {
+      calories: totals?.calories || 0,
+      protein_g: totals?.protein_g || 0,
+      carbs_g: totals?.carbs_g || 0,
+      fat_g: totals?.fat_g || 0,
+      fiber_g: totals?.fiber_g || 0,
+    }
+  };
+}
+
+/**
+ * Convert AMA nutrition data to AnalysisResult format for FoodVerificationScreen
+ */
+function toAnalysisResult(items: any[]): AnalysisResult {
+  const amaItems = items.map((item: any) => ({
+    name: item.name || item.description || '',
+    brand: item.brand,
+    qty: item.quantity || item.qty || 1,
+    unit: item.unit || 'serving',
+    grams: 100, // Default assumption
+    macros: {
+      kcal: item.calories || 0,
+      protein_g: item.protein_g || 0,
+      carbs_g: item.carbs_g || 0,
+      fat_g: item.fat_g || 0,
+    },
+    confidence: 0.9, // High confidence for AMA estimates
+    candidates: [{
+      name: item.name || item.description || '',
+      brand: item.brand,
+      macros: {
+        kcal: item.calories || 0,
+        protein_g: item.protein_g || 0,
+        carbs_g: item.carbs_g || 0,
+        fat_g: item.fat_g || 0,
+      },
+      confidence: 0.9,
+      source: item.source || 'USDA'
+    }],
+    source_hints: { ama_estimate: true },
+    originalText: item.name || item.description || ''
+  }));
+
+  return {
+    items: amaItems,
+    meal_slot: 'lunch', // Default assumption
+    source: 'text',
+    originalInput: 'AMA nutrition estimate'
+  } as AnalysisResult;
+}
+
+interface MessageBubbleProps {
+  message: ChatMessage;
+  /** Open FoodVerificationScreen for an AMA estimate */
+  onOpenAnalysis: (result: AnalysisResult) => void;
+  /** Open the TMWYA verification page */
+  onVerifyMeal: (meal: PendingMeal) => void;
+}
+
+/**
+ * One transcript row. Memoized on message identity: finished messages are
+ * never re-created, so they skip re-rendering while another one streams.
+ */
+export const MessageBubble = React.memo(function MessageBubble({ message, onOpenAnalysis, onVerifyMeal }: MessageBubbleProps) {
+  const meta = message.meta as any;
+
+  return (
+    <div className={`flex ${message.isUser ? 'justify-end' : 'justify-start'}`}>
+      <div
+        className={`max-w-sm lg:max-w-2xl px-5 py-4 rounded-2xl ${
+          message.isUser
+            ? 'bg-blue-600 text-white'
+            : 'bg-gray-800 text-gray-100'
+        }`}
+        style={{ maxWidth: message.isUser ? '480px' : '700px' }}
+      >
+        {message.isUser ? (
+          <p className="message-bubble text-base leading-relaxed whitespace-pre-wrap break-words" style={{ lineHeight: '1.6', overflowWrap: 'anywhere', wordBreak: 'break-word' }}>{message.text}</p>
+        ) : (
+          <div className="assistant-bubble">
+            <div>{message.text}</div>
+            {meta?.ama_nutrition_estimate === true && (meta?.items?.length ?? 0) > 0 && (
+              <button
+                className="mt-2 px-3 py-1 rounded-xl bg-white/20 hover:bg-white/30 transition"
+                onClick={() => {
+                  onOpenAnalysis(toAnalysisResult(meta.items));
+                  console.info('[ama] verify → opened from AMA CTA', { count: meta.items.length });
+                }}
+              >
+                Verify &amp; Log
+              </button>
+            )}
+          </div>
+        )}
+
+        {/* Source display for web-verified content */}
+        {meta?.cite && (
+          <div className="mt-3 pt-2 border-t border-gray-600">
+            <div className="flex items-center gap-2 text-xs">
+              {meta.webVerified && (
+                <span className="inline-flex items-center px-2 py-1 rounded-full bg-green-600/20 text-green-400 text-xs font-medium">
+                  Web verified
+                </span>
+              )}
+              <span className="text-gray-400">Source:</span>
+              <a
+                href={meta.cite}
+                target="_blank"
+                rel="noopener noreferrer"
+                className="text-blue-400 hover:text-blue-300 underline"
+              >
+                {meta.citeTitle || meta.cite}
+              </a>
+            </div>
+          </div>
+        )}
+
+        {/* Verify & Log button for AMA nutrition estimates */}
+        {meta?.ama_nutrition_estimate && meta?.items && (
+          <div className="mt-3 pt-2 border-t border-gray-600">
+            <button
+              onClick={() => {
+                console.log('[chat] Verify & Log clicked for AMA nutrition');
+                const pending = toPendingMeal(meta.items, meta.totals);
+                onVerifyMeal(meta.totals ? { ...pending, totals: meta.totals } : pending);
+                console.log('[tmwya] verify → opened from AMA CTA');
+              }}
+              className="inline-flex items-center px-3 py-2 text-sm font-medium text-blue-600 bg-blue-50 hover:bg-blue-100 rounded-lg transition-colors border border-blue-200"
+            >
+              Verify & Log
+            </button>
+          </div>
+        )}
+        <p className="text-xs opacity-70 mt-2">
+          {message.timestamp.toLocaleTimeString([], {
+            hour: '2-digit',
+            minute: '2-digit'
+          })}
+        </p>
+      </div>
+    </div>
+  );
+});
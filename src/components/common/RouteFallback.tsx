@@ -0,0 +1,12 @@
+import React from 'react';
+
+/**
+ * Suspense fallback while a route chunk downloads
+ */
+export default function RouteFallback() {
+  return (
+    <div className="flex items-center justify-center py-24" role="status" aria-label="Loading">
+      <div className="h-6 w-6 rounded-full border-2 border-gray-300 border-t-blue-600 animate-spin" />
+    </div>
+  );
+}
@@ -0,0 +1,199 @@
+import React, { Profiler, useCallback, useEffect, useRef, useState } from 'react';
+import { ChatTranscript, withMessageText } from '../chat/ChatTranscript';
+import { MessageBubble } from '../chat/MessageBubble';
+import { createFrameCoalescer } from '../../lib/frameCoalescer';
+import type { ChatMessage } from '../../types/chat';
+
+/**
+ * Transcript profiling harness (/dev/transcript-profile)
+ *
+ * Replays a 500-message session through the same ChatTranscript +
+ * MessageBubble + frame-coalesced streaming path ChatPat uses:
+ *   1. mount with the full history (as after chatSessions restore)
+ *   2. stream a long reply token by token in SSE-sized bursts
+ *   3. scroll from the bottom to the top and back
+ * Frame deltas (rAF) and React commits per phase land on
+ * window.__transcriptProfile; testsprite_tests/transcript_profile.py
+ * asserts budgets on them.
+ *
+ * Query params: ?messages=500&tokens=400&coalesce=0 (per-token setState,
+ * the pre-virtualization behaviour, for comparison)
+ */
+
+interface PhaseStats {
+  frames: number[];
+  commits: number;
+  commitMs: number[];
+  startedAt: number;
+  endedAt?: number;
+}
+
+const WORDS = 'protein carbs fat fiber calories breakfast lunch dinner chicken rice oats salmon eggs yogurt banana steps sleep water lift run recovery macros deficit surplus maintenance'.split(' ');
+
+function buildSession(count: number): ChatMessage[] {
+  let seed = 42;
+  const random = () => (seed = (seed * 16807) % 2147483647) / 2147483647;
+  const start = Date.now() - count * 60_000;
+  return Array.from({ length: count }, (_, i) => {
+    const isUser = i % 2 === 0;
+    const length = isUser ? 4 + Math.floor(random() * 16) : 20 + Math.floor(random() * 120);
+    const text = Array.from({ length }, () => WORDS[Math.floor(random() * WORDS.length)]).join(' ');
+    const withAma = !isUser && i % 25 === 1;
+    return {
+      id: `m${i}`,
+      text,
+      isUser,
+      timestamp: new Date(start + i * 60_000),
+      ...(withAma && {
+        meta: {
+          ama_nutrition_estimate: true,
+          items: [{ name: 'chicken breast', qty: 6, unit: 'oz', calories: 280, protein_g: 52, carbs_g: 0, fat_g: 6 }],
+          totals: { calories: 280, protein_g: 52, carbs_g: 0, fat_g: 6 }
+        } as ChatMessage['meta']
+      })
+    };
+  });
+}
+
+function percentile(values: number[], p: number): number {
+  if (!values.length) return 0;
+  const sorted = [...values].sort((a, b) => a - b);
+  return sorted[Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1)];
+}
+
+function summarize(phase: PhaseStats) {
+  return {
+    durationMs: Math.round((phase.endedAt ?? performance.now()) - phase.startedAt),
+    frames: phase.frames.length,
+    frameP50: +percentile(phase.frames, 50).toFixed(1),
+    frameP95: +percentile(phase.frames, 95).toFixed(1),
+    frameMax: +Math.max(0, ...phase.frames).toFixed(1),
+    longFrames: phase.frames.filter(f => f > 50).length,
+    commits: phase.commits,
+    commitP95: +percentile(phase.commitMs, 95).toFixed(2),
+    commitMax: +Math.max(0, ...phase.commitMs).toFixed(2)
+  };
+}
+
+const nextFrame = () => new Promise<number>(resolve => requestAnimationFrame(resolve));
+const sleep = (ms: number) => new Promise(resolve => setTimeout(resolve, ms));
+
+export default function TranscriptProfiler() {
+  const params = new URLSearchParams(window.location.search);
+  const messageCount = Number(params.get('messages') ?? 500);
+  const tokenCount = Number(params.get('tokens') ?? 400);
+  const coalesce = params.get('coalesce') !== '0';
+
+  const [messages, setMessages] = useState<ChatMessage[]>(() => buildSession(messageCount));
+  const scrollRef = useRef<HTMLDivElement>(null);
+  const phaseRef = useRef<PhaseStats>({ frames: [], commits: 0, commitMs: [], startedAt: performance.now() });
+  const [status, setStatus] = useState('mounting');
+
+  const onRender = useCallback((_id: string, _phase: string, actualDuration: number) => {
+    phaseRef.current.commits++;
+    phaseRef.current.commitMs.push(actualDuration);
+  }, []);
+
+  const noop = useCallback(() => {}, []);
+  const renderMessage = useCallback((message: ChatMessage) => (
+    <MessageBubble message={message} onOpenAnalysis={noop} onVerifyMeal={noop} />
+  ), [noop]);
+
+  useEffect(() => {
+    let cancelled = false;
+    let recording = true;
+    const results: Record<string, ReturnType<typeof summarize>> = {};
+
+    // Frame clock runs for the whole replay
+    (async () => {
+      let last = await nextFrame();
+      while (recording) {
+        const now = await nextFrame();
+        phaseRef.current.frames.push(now - last);
+        last = now;
+      }
+    })();
+
+    const begin = () => {
+      phaseRef.current = { frames: [], commits: 0, commitMs: [], startedAt: performance.now() };
+    };
+    const end = (name: string) => {
+      phaseRef.current.endedAt = performance.now();
+      results[name] = summarize(phaseRef.current);
+    };
+
+    (async () => {
+      // 1. Mount: the initial commit already happened; settle a few frames
+      for (let i = 0; i < 10; i++) await nextFrame();
+      end('mount');
+
+      // 2. Stream a reply in SSE-sized bursts (1-3 tokens every ~5 ms)
+      setStatus('streaming');
+      begin();
+      const streamId = 'streaming';
+      setMessages(prev => [...prev, { id: streamId, text: '', isUser: false, timestamp: new Date() }]);
+      const frames = createFrameCoalescer<string>(text => setMessages(prev => withMessageText(prev, streamId, text)));
+      let text = '';
+      let sent = 0;
+      while (sent < tokenCount && !cancelled) {
+        const burst = 1 + (sent % 3);
+        for (let i = 0; i < burst && sent < tokenCount; i++, sent++) {
+          text += `${WORDS[sent % WORDS.length]} `;
+          if (coalesce) frames.push(text);
+          else setMessages(prev => withMessageText(prev, streamId, text));
+        }
+        await sleep(5);
+      }
+      frames.flush();
+      for (let i = 0; i < 5; i++) await nextFrame();
+      end('stream');
+
+      // 3. Scroll to the top and back in viewport-sized steps
+      setStatus('scrolling');
+      begin();
+      const container = scrollRef.current!;
+      const step = container.clientHeight * 0.8;
+      while (container.scrollTop > 0 && !cancelled) {
+        container.scrollTop = Math.max(0, container.scrollTop - step);
+        await nextFrame();
+      }
+      while (container.scrollTop + container.clientHeight < container.scrollHeight - 1 && !cancelled) {
+        container.scrollTop = container.scrollTop + step;
+        await nextFrame();
+      }
+      for (let i = 0; i < 5; i++) await nextFrame();
+      end('scroll');
+
+      recording = false;
+      const renderedRows = container.querySelectorAll('[data-message-id]').length;
+      (window as any).__transcriptProfile = {
+        done: true,
+        messages: messageCount + 1,
+        tokens: tokenCount,
+        coalesce,
+        renderedRows,
+        phases: results
+      };
+      setStatus('done');
+    })();
+
+    return () => {
+      cancelled = true;
+      recording = false;
+    };
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, []);
+
+  return (
+    <div className="h-screen bg-pat-gradient text-white flex flex-col">
+      <div className="px-4 py-2 text-xs text-white/70" data-testid="profile-status">
+        transcript profile: {status} · {messages.length} messages · coalesce {coalesce ? 'on' : 'off'}
+      </div>
+      <div ref={scrollRef} className="flex-1 overflow-y-auto px-4 py-6">
+        <Profiler id="transcript" onRender={onRender}>
+          <ChatTranscript messages={messages} scrollRef={scrollRef} renderMessage={renderMessage} />
+        </Profiler>
+      </div>
+    </div>
+  );
+}
@@ -3,6 +3,7 @@ import { useNavigate } from 'react-router-dom';
 import { useOnboarding } from '../../../context/OnboardingContext';
 import { CheckCircle, Activity, TrendingUp, Target } from 'lucide-react';
 import { getSupabase } from '../../../lib/supabase';
+import { invalidateUserContext } from '../../../lib/userContext';
 import { trackTDEEWizardCompleted } from '../../../lib/analytics';
 import toast from 'react-hot-toast';
 
@@ -103,6 +104,7 @@ export const StepCompletion: React.FC = () => {
           } catch (baselineError) {
             console.error('Failed to save FREE baseline:', baselineError);
           }
+          invalidateUserContext(user.id);
 
           // Mark TDEE as completed in profiles table
           try {
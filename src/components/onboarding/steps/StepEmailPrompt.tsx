@@ -2,6 +2,7 @@ import React, { useState } from 'react';
 import { useOnboarding } from '../../../context/OnboardingContext';
 import { Mail, User, Save, Send } from 'lucide-react';
 import { getSupabase } from '../../../lib/supabase';
+import { invalidateUserContext } from '../../../lib/userContext';
 import { trackTDEEWizardCompleted } from '../../../lib/analytics';
 
 export const StepEmailPrompt: React.FC = () => {
@@ -73,6 +74,7 @@ export const StepEmailPrompt: React.FC = () => {
       if (error) {
         throw error;
       }
+      invalidateUserContext(user.data.user.id);
 
       // Track TDEE wizard completion
       trackTDEEWizardCompleted(
@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { X, Activity, Trash2, Calendar } from 'lucide-react';
 import { getSupabase } from '../../lib/supabase';
+import { invalidateUserContext } from '../../lib/userContext';
 import toast from 'react-hot-toast';
 
 interface BodyFatLog {
@@ -101,6 +102,7 @@ export const BodyFatLogModal: React.FC<BodyFatLogModalProps> = ({
         .from('user_metrics')
         .update({ body_fat_percent: bodyFatValue })
         .eq('user_id', user.id);
+      invalidateUserContext(user.id);
 
       toast.success('Body fat logged successfully!');
       setBodyFat('');
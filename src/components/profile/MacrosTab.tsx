@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Activity, Flame, Target, TrendingUp, Zap, Minus, Plus, CreditCard as Edit2, Scale, CheckCircle, X, AlertCircle } from 'lucide-react';
 import { getSupabase } from '../../lib/supabase';
+import { invalidateUserContext } from '../../lib/userContext';
 import toast from 'react-hot-toast';
 import { WeightLogModal } from './WeightLogModal';
 import { WeightTrendGraph } from './WeightTrendGraph';
@@ -154,6 +155,7 @@ export const MacrosTab: React.FC = () => {
         .eq('user_id', user.id);
 
       if (error) throw error;
+      invalidateUserContext(user.id);
 
       toast.success('Profile updated successfully!');
       setIsEditing(false);
@@ -200,6 +202,7 @@ export const MacrosTab: React.FC = () => {
         .eq('user_id', user.id);
 
       if (profilesError) console.warn('Profile sync warning:', profilesError);
+      invalidateUserContext(user.id);
 
       toast.success('Macros updated successfully! Calorie targets will now be calculated from your custom macros.');
       setIsEditingMacros(false);
@@ -228,6 +231,7 @@ export const MacrosTab: React.FC = () => {
         .eq('user_id', user.id);
 
       if (error) throw error;
+      invalidateUserContext(user.id);
 
       toast.success('Caloric goal saved! Macros will be automatically calculated.');
       loadData();  // Reload to recalculate macros
@@ -283,6 +287,7 @@ export const MacrosTab: React.FC = () => {
         });
 
       if (error) throw error;
+      invalidateUserContext(user.id);
 
       // Update local state
       setUnitPrefs({
@@ -625,6 +630,7 @@ export const MacrosTab: React.FC = () => {
                         .eq('user_id', user.id);
 
                       if (error) throw error;
+                      invalidateUserContext(user.id);
 
                       toast.success('Switched to automatic macro calculation');
                       loadData();
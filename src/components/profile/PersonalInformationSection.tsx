@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { User, Mail, Phone, MapPin, Calendar, Clock, CreditCard as Edit2, CheckCircle, AlertCircle } from 'lucide-react';
 import { getSupabase } from '../../lib/supabase';
+import { invalidateUserContext } from '../../lib/userContext';
 import toast from 'react-hot-toast';
 
 interface TDEEMetrics {
@@ -148,6 +149,7 @@ export const PersonalInformationSection: React.FC<PersonalInformationSectionProp
         });
 
       if (error) throw error;
+      invalidateUserContext(user.id);
 
       toast.success('Time zone updated successfully');
     } catch (error: any) {
@@ -175,6 +177,7 @@ export const PersonalInformationSection: React.FC<PersonalInformationSectionProp
         });
 
       if (error) throw error;
+      invalidateUserContext(user.id);
 
       toast.success(`Food database set to ${newCountry === 'US' ? 'United States' : 'Canada'}`);
     } catch (error: any) {
@@ -240,6 +243,7 @@ export const PersonalInformationSection: React.FC<PersonalInformationSectionProp
         .eq('user_id', user.id);
 
       if (metricsError) throw metricsError;
+      invalidateUserContext(user.id);
 
       // Update user profile basic info if edited
       if (editedProfile) {
@@ -252,6 +256,7 @@ export const PersonalInformationSection: React.FC<PersonalInformationSectionProp
           dob: editedProfile.dateOfBirth || null,
           bio: editedProfile.bio || null
         });
+        invalidateUserContext(user.id);
         onProfileUpdate(editedProfile);
       }
 
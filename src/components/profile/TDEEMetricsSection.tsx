@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { Activity, Flame, Target, TrendingUp, CreditCard as Edit3, Save, X, User, Calendar, Ruler, Weight, Droplet } from 'lucide-react';
 import { getSupabase } from '../../lib/supabase';
+import { invalidateUserContext } from '../../lib/userContext';
 import toast from 'react-hot-toast';
 
 interface TDEEMetrics {
@@ -126,6 +127,7 @@ export const TDEEMetricsSection: React.FC = () => {
         return;
       }
 
+      invalidateUserContext(user.id);
       setMetrics(editedMetrics);
       setIsEditing(false);
       toast.success('TDEE metrics updated successfully!');
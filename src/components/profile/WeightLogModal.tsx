@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from 'react';
 import { X, Scale, Trash2, Calendar } from 'lucide-react';
 import { getSupabase } from '../../lib/supabase';
+import { invalidateUserContext } from '../../lib/userContext';
 import toast from 'react-hot-toast';
 
 interface WeightLog {
@@ -115,6 +116,7 @@ export const WeightLogModal: React.FC<WeightLogModalProps> = ({
         .from('user_metrics')
         .update({ weight_kg: weightKg })
         .eq('user_id', user.id);
+      invalidateUserContext(user.id);
 
       toast.success('Weight logged successfully!');
       setWeight('');
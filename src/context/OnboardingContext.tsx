@@ -1,5 +1,6 @@
 import React, { createContext, useContext, useState, ReactNode, useCallback } from 'react';
 import { calculateTDEEAndMacros } from '../utils/tdeeCalculator';
+import { invalidateUserContext } from '../lib/userContext';
 
 // Define the shape of the user data
 interface UserData {
@@ -195,6 +196,7 @@ export const OnboardingProvider: React.FC<{ children: ReactNode }> = ({ children
           name: userData.firstName
         });
       }
+      invalidateUserContext(user.id);
 
       console.log('Successfully saved TDEE data to Supabase');
     } catch (error) {
@@ -5,11 +5,14 @@
 
 import { detectIntent, shouldTriggerRole } from '../router/intentRouter';
 import { selectModel, estimateCost, getModelDisplayName, type ModelSelection } from '../router/modelRouter';
-import { type UserContext } from '../personality/patSystem';
+import { type PersonaContext } from '../personality/patSystem';
 import { ensureChatSession } from './sessions';
 import { storeMessage, loadRecentMessages } from './store';
 import { buildHistoryContext } from '../../lib/chatHistoryContext';
 import { runTMWYAPipeline } from '../../lib/tmwya/pipeline';
+import { tracer } from '../../lib/telemetry/tracing';
+import { resolveUserContext, type UserContext } from '../../lib/userContext';
+import { assemblePrompt, extendPrompt, systemMessages, type AssembledPrompt } from '../../../supabase/functions/_shared/promptAssembly';
 
 /**
  * Strip leading style JSON from assistant responses
@@ -43,10 +46,11 @@ function stripLeadingStyleJSON(raw: string): string {
 
 export interface MessageContext {
   userId: string;
-  userContext?: UserContext;
+  userContext?: PersonaContext;
   messageHistory?: Array<{ role: 'user' | 'assistant'; content: string }>;
   mode?: 'text' | 'voice';
   sessionId?: string; // Optional: provide existing session ID
+  requestContext?: UserContext; // Optional: user rows already loaded for this request
 }
 
 export interface MessageResponse {
@@ -63,24 +67,58 @@ export interface MessageResponse {
 
 /**
  * Main entry point for handling user messages
+ * Each turn is one trace ("chat.turn"); DB queries and edge function invokes
+ * made inside it are recorded as child spans by the Supabase fetch wrapper.
  */
 export async function handleUserMessage(
   message: string,
   context: MessageContext
 ): Promise<MessageResponse> {
+  const root = tracer.startTrace('chat.turn', {
+    'chat.mode': context.mode ?? 'text',
+    'chat.message_length': message.length
+  });
+
+  try {
+    const result = await runTurn(message, context);
+    root.setAttributes({ 'chat.intent': result.intent, 'chat.model': result.modelUsed });
+    tracer.endTrace(root, 'ok');
+    return result;
+  } catch (err: any) {
+    tracer.endTrace(root, 'error', err?.message ?? String(err));
+    throw err;
+  }
+}
+
+async function runTurn(
+  message: string,
+  context: MessageContext
+): Promise<MessageResponse> {
+  // User rows (profile, preferences, metrics, roles) for every stage of this
+  // turn, loaded once in the background while the session is prepared
+  const requestContext = resolveUserContext(context.userId, context.requestContext);
+  requestContext.catch(() => undefined);
+
   // Step 0: Ensure chat session exists and load history
-  const sessionId = context.sessionId || await ensureChatSession(context.userId);
-  console.log('[handleUserMessage] Session ID:', sessionId);
+  const { sessionId, messageHistory } = await tracer.withSpan('chat.session', async () => {
+    const sessionId = context.sessionId || await ensureChatSession(context.userId);
+    console.log('[handleUserMessage] Session ID:', sessionId);
 
-  // Load recent message history if not provided (increased to 20 for better context)
-  const messageHistory = context.messageHistory || await loadRecentMessages(sessionId, 20);
-  console.log('[handleUserMessage] Message history loaded:', messageHistory.length, 'messages');
+    // Load recent message history if not provided (increased to 20 for better context)
+    const messageHistory = context.messageHistory || await loadRecentMessages(sessionId, 20);
+    console.log('[handleUserMessage] Message history loaded:', messageHistory.length, 'messages');
 
-  // Step 1: Store user message
-  await storeMessage(sessionId, 'user', message);
+    // Step 1: Store user message
+    await storeMessage(sessionId, 'user', message);
+    return { sessionId, messageHistory };
+  });
 
   // Step 1.5: Call Personality Router (LLM-aware intelligent routing)
-  const routerDecision = await detectIntent(message);
+  const routerDecision = await tracer.withSpan('chat.router', async (span) => {
+    const decision = await detectIntent(message);
+    span?.setAttributes({ 'router.intent': decision.intent, 'router.route_to': decision.route_to });
+    return decision;
+  });
   console.info('[handleUserMessage] Personality router decision:', routerDecision);
 
   // Early branch: Route to TMWYA pipeline for meal logging
@@ -89,10 +127,11 @@ export async function handleUserMessage(
       const tmwyaInput = {
         userMessage: message,
         source: 'text' as const,
-        userId: context.userId
+        userId: context.userId,
+        userContext: await requestContext
       };
 
-      const pipelineResult = await runTMWYAPipeline(tmwyaInput);
+      const pipelineResult = await tracer.withSpan('pipeline.tmwya', () => runTMWYAPipeline(tmwyaInput));
 
       if (pipelineResult.ok && pipelineResult.normalizedMeal) {
         const mealData = pipelineResult.normalizedMeal;
@@ -134,12 +173,14 @@ export async function handleUserMessage(
 
       console.log(`[nutrition] Intent: ${routerDecision.intent}, showLogButton: ${showLogButton}`);
       
-      const pipelineResult = await processNutrition({
+      const userContext = await requestContext;
+      const pipelineResult = await tracer.withSpan('pipeline.nutrition', () => processNutrition({
         message,
         userId: context.userId,
         sessionId,
-        showLogButton
-      });
+        showLogButton,
+        userContext
+      }));
       
       if (pipelineResult.success && pipelineResult.roleData) {
         // Create a summary text response with verification CTA
@@ -211,35 +252,41 @@ export async function handleUserMessage(
 
   // Step 5: Build system prompt with user context
   // All intents now route through swarm system (including general → personality swarm)
-  let systemPrompt: string;
+  // Stable persona/rules prefix first, then user and per-turn context (prompt caching)
+  let systemPrompt: AssembledPrompt = assemblePrompt([]);
   let swarm: any = null;
 
-  try {
-    const { getSwarmForIntent, buildSwarmPrompt } = await import('../swarm/loader');
+  await tracer.withSpan('chat.swarm_prompt', async (span) => {
+    try {
+      const { getSwarmForIntent, buildSwarmPromptParts } = await import('../swarm/loader');
 
-    swarm = await getSwarmForIntent(routerDecision.intent);
+      swarm = await getSwarmForIntent(routerDecision.intent);
 
-    if (!swarm) {
-      // No swarm matched; force-load personality swarm as fallback
-      console.warn('[routing] No swarm matched; falling back to personality swarm');
-      swarm = await getSwarmForIntent('general');
-    }
+      if (!swarm) {
+        // No swarm matched; force-load personality swarm as fallback
+        console.warn('[routing] No swarm matched; falling back to personality swarm');
+        swarm = await getSwarmForIntent('general');
+      }
 
-    if (swarm) {
-      console.log(`[handleUserMessage] Using swarm: ${swarm.swarm_name}`);
-      systemPrompt = await buildSwarmPrompt(swarm, context.userContext);
-    } else {
-      throw new Error('Personality swarm not configured');
+      if (swarm) {
+        console.log(`[handleUserMessage] Using swarm: ${swarm.swarm_name}`);
+        span?.setAttributes({ 'swarm.name': swarm.swarm_name });
+        systemPrompt = await buildSwarmPromptParts(swarm, context.userContext);
+        span?.setAttributes({ 'prompt.prefix_hash': systemPrompt.prefixHash });
+      } else {
+        throw new Error('Personality swarm not configured');
+      }
+    } catch (err) {
+      console.error('[handleUserMessage] Swarm load failed, using minimal emergency prompt:', err);
+      span?.setAttributes({ 'swarm.fallback': true });
+      systemPrompt = assemblePrompt([{ layer: 'persona', content: 'You are Pat. Speak clearly and concisely.' }]);
     }
-  } catch (err) {
-    console.error('[handleUserMessage] Swarm load failed, using minimal emergency prompt:', err);
-    systemPrompt = 'You are Pat. Speak clearly and concisely.';
-  }
+  });
 
   // Inject lightweight history context (recent conversation snippet)
-  const historyCtx = await buildHistoryContext(context.userId, sessionId);
+  const historyCtx = await tracer.withSpan('chat.history_context', () => buildHistoryContext(context.userId, sessionId));
   if (historyCtx) {
-    systemPrompt += `\n\n${historyCtx}`;
+    systemPrompt = extendPrompt(systemPrompt, [{ layer: 'turn', content: historyCtx }]);
     console.log('[handleUserMessage] Added history context, length:', historyCtx.length);
   }
 
@@ -258,15 +305,15 @@ export async function handleUserMessage(
       const portioned = portionResolver(naiveItems);
       const estimate = await macroLookup(portioned);
       const tef = computeTEF(estimate.totals);
-      const tdee = await computeTDEE(context.userId, estimate.totals, tef, new Date().toISOString());
+      const tdee = await computeTDEE(context.userId, estimate.totals, tef, new Date().toISOString(), await requestContext);
       
       // Add macro info to system prompt for Personality to use
-      systemPrompt += `\n\nUser just logged a meal. Here are the macros including fiber:
+      systemPrompt = extendPrompt(systemPrompt, [{ layer: 'turn', content: `User just logged a meal. Here are the macros including fiber:
 Total calories: ${estimate.totals.calories} kcal
 Protein: ${estimate.totals.protein_g}g, Carbs: ${estimate.totals.carbs_g}g, Fat: ${estimate.totals.fat_g}g, Fiber: ${estimate.totals.fiber_g}g
 TEF: ${tef.kcal} kcal
 Remaining for today: ${tdee.remaining_kcal} kcal (${tdee.remaining_percentage.toFixed(1)}%)
-Please acknowledge this meal logging and provide a brief summary.`;
+Please acknowledge this meal logging and provide a brief summary.` }]);
       
       console.log('[AMA Fallback] Added meal data to prompt:', estimate.totals);
     } catch (e) {
@@ -275,13 +322,18 @@ Please acknowledge this meal logging and provide a brief summary.`;
   }
 
   // Step 6: Call LLM (placeholder - will be implemented with actual API calls)
-  const llmResult = await callLLM({
+  const llmResult = await tracer.withSpan('llm.call', () => callLLM({
     system: systemPrompt,
     userMessage: message,
     messageHistory,
     roleData,
     modelSelection,
     userId: context.userId,
+  }), {
+    'llm.provider': modelSelection.provider,
+    'llm.model': modelSelection.model,
+    'llm.system_prompt_length': systemPrompt.text.length,
+    'llm.prompt_prefix_hash': systemPrompt.prefixHash
   });
 
   let llmResponse = typeof llmResult === 'string' ? llmResult : llmResult.message;
@@ -296,7 +348,11 @@ Please acknowledge this meal logging and provide a brief summary.`;
       const { executePostAgents } = await import('../swarm/executor');
       // Pass roleData.type to skip polishing structured nutrition data
       const roleDataType = roleData?.type;
-      const refined = await executePostAgents(llmResponse, swarm, context.userContext, postMode, roleDataType);
+      const refined = await tracer.withSpan(
+        'chat.post_agents',
+        () => executePostAgents(llmResponse, swarm, context.userContext, postMode, roleDataType),
+        { 'post.mode': postMode }
+      );
       console.log(`[personality-post] mode=${postMode}, roleDataType=${roleDataType ?? 'none'}, original=${llmResponse.length}, refined=${refined.length}`);
       llmResponse = refined;
     } catch (postError) {
@@ -315,7 +371,7 @@ Please acknowledge this meal logging and provide a brief summary.`;
   }
 
   // Step 7: Store assistant response
-  await storeMessage(sessionId, 'assistant', assistantText);
+  await tracer.withSpan('chat.store_reply', () => storeMessage(sessionId, 'assistant', assistantText));
 
   return {
     response: assistantText,
@@ -330,7 +386,7 @@ Please acknowledge this meal logging and provide a brief summary.`;
 }
 
 interface LLMCallParams {
-  system: string;
+  system: AssembledPrompt;
   userMessage: string;
   messageHistory: Array<{ role: 'user' | 'assistant'; content: string }>;
   roleData: any;
@@ -376,14 +432,14 @@ async function callLLM(params: LLMCallParams): Promise<{ message: string; tool_c
   const { system, userMessage, messageHistory, roleData, modelSelection, userId } = params;
 
   console.log('[callLLM] Calling', getModelDisplayName(modelSelection));
-  console.log('[callLLM] System prompt length:', system.length);
+  console.log('[callLLM] System prompt length:', system.text.length, 'prefix:', system.prefixHash);
   console.log('[callLLM] Message history:', messageHistory.length, 'messages');
   console.log('[callLLM] Last 3 messages:', messageHistory.slice(-3).map(m => `${m.role}: ${m.content.substring(0, 50)}...`));
   console.log('[callLLM] Role data:', roleData ? 'present' : 'none');
 
   // Build messages array for OpenAI
   const messages = [
-    { role: 'system' as const, content: system },
+    ...systemMessages(system),
     ...messageHistory.map(msg => ({
       role: msg.role,
       content: msg.content
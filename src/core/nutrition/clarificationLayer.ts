@@ -7,7 +7,7 @@
  */
 
 import { getSupabase } from '../../lib/supabase';
-import { loadUserContext } from '../personality/patSystem';
+import { loadPersonaContext } from '../personality/patSystem';
 import { buildHistoryContext } from '../../lib/chatHistoryContext';
 
 export interface ClarificationResult {
@@ -267,7 +267,7 @@ export async function checkNeedsClarification(
     }
 
     // Build Pat's personality prompt with user context
-    const userContext = await loadUserContext(userId);
+    const userContext = await loadPersonaContext(userId);
     const historyCtx = await buildHistoryContext(userId, sessionId);
     
     const supabase = getSupabase();
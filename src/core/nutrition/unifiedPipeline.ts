@@ -11,9 +11,14 @@ import { getSupabase } from '../../lib/supabase';
 import { getLatestPromptOrFallback } from '../../lib/admin/prompts';
 import { sanitizeNormalizedItems } from './sanitizeNormalizedItems';
 import { PROVIDERS, type ProviderKey } from '../../agents/shared/nutrition/providers';
+import { lookupMany as lookupGeminiMany } from '../../agents/shared/nutrition/providers/gemini';
+import { isGeminiAvailable } from '../../agents/shared/nutrition/geminiHealth';
+import { TelemetryCollector } from '../../lib/telemetry/events';
+import { resolveUserContext, type UserContext } from '../../lib/userContext';
 
-// Emergency Gemini kill-switch - temporarily disabled due to 502 errors
-const GEMINI_ENABLED = false; // import.meta.env.VITE_GEMINI_NUTRITION !== 'false';
+// Gemini kill-switch; when enabled, the cascade still skips Gemini while
+// nutrition-gemini reports its circuit breaker open (see geminiHealth)
+const GEMINI_ENABLED = import.meta.env.VITE_GEMINI_NUTRITION !== 'false';
 
 export interface NutritionPipelineOptions {
   message: string;
@@ -25,6 +30,8 @@ export interface NutritionPipelineOptions {
    * - false: Info-only, no log button (for "what are macros of..." queries)
    */
   showLogButton?: boolean;
+  /** Preloaded by the caller (handleUserMessage); loaded here otherwise */
+  userContext?: UserContext;
 }
 
 export interface NutritionPipelineResult {
@@ -129,24 +136,25 @@ function inferMealSlotFromTime(): 'breakfast' | 'lunch' | 'dinner' | 'snack' {
   return 'snack';
 }
 
+/** Static so every lookup shares the same system prefix; the food goes in the user message */
+const OPENAI_NUTRITION_PROMPT = `You are a nutrition expert. Given a food item, return exact nutritional data in this JSON format only:
+{"calories": number, "protein_g": number, "carbs_g": number, "fat_g": number, "fiber_g": number}
+
+Return only the JSON object, no other text.`;
+
 /**
  * OpenAI nutrition provider - fallback when Gemini is disabled
  */
-async function lookupOpenAI(normalized: any, userId?: string) {
+async function lookupOpenAI(normalized: any, userId?: string, _ctx?: UserContext) {
   try {
     const supabase = getSupabase();
-    const prompt = `You are a nutrition expert. Given this food item, return exact nutritional data in this JSON format only:
-{"calories": number, "protein_g": number, "carbs_g": number, "fat_g": number, "fiber_g": number}
-
-Food: ${normalized.name}${normalized.brand ? ` (${normalized.brand})` : ''}${normalized.serving_label ? ` - ${normalized.serving_label}` : ''}${normalized.size_label ? ` ${normalized.size_label}` : ''}
-
-Return only the JSON object, no other text.`;
+    const food = `Food: ${normalized.name}${normalized.brand ? ` (${normalized.brand})` : ''}${normalized.serving_label ? ` - ${normalized.serving_label}` : ''}${normalized.size_label ? ` ${normalized.size_label}` : ''}`;
 
     const { data, error } = await supabase.functions.invoke('openai-chat', {
       body: {
         messages: [
-          { role: 'system', content: prompt },
-          { role: 'user', content: normalized.name }
+          { role: 'system', content: OPENAI_NUTRITION_PROMPT },
+          { role: 'user', content: food }
         ],
         temperature: 0.1,
         model: 'gpt-4o-mini'
@@ -188,13 +196,17 @@ Return only the JSON object, no other text.`;
 }
 
 /**
- * Lookup macros in provider cascade: brand → gemini/openai → generic
+ * Lookup macros in provider cascade: brand → gemini → openai → generic
+ *
+ * Items advance through their provider order together, one stage at a
+ * time: every item currently at a given provider runs concurrently, and all
+ * items at the Gemini stage share one batched nutrition-gemini call.
  */
-async function lookupMacrosInCascade(items: any[], userId?: string): Promise<any> {
-  const results = [];
+async function lookupMacrosInCascade(items: any[], userId?: string, ctx?: UserContext): Promise<any> {
   const skillsFired: string[] = [];
+  const geminiOn = GEMINI_ENABLED && await isGeminiAvailable();
 
-  for (const item of items) {
+  const states = items.map(item => {
     // Convert to normalized item format
     const normalized = {
       name: item.name,
@@ -207,40 +219,57 @@ async function lookupMacrosInCascade(items: any[], userId?: string): Promise<any
     };
 
     // ✅ Choose provider order based on brand status and Gemini availability
-    // Branded: brand map → gemini/openai → generic
-    // Whole foods: generic (USDA) → gemini/openai → openai (fallback)
-    const ORDER: (ProviderKey | 'openai')[] = normalized.is_branded
-      ? GEMINI_ENABLED ? ["brand", "gemini", "generic"] : ["brand", "openai", "generic"]  // Branded: brand map first
-      : GEMINI_ENABLED ? ["generic", "gemini"] : ["generic", "openai"];                   // Whole foods: USDA first, then fallback
-
-    let macroResult = null;
-    let providerUsed = 'none';
-    
-    // ✅ Try each provider in order
-    for (const key of ORDER) {
-      let providerFn = null;
-
-      if (key === 'openai') {
-        providerFn = lookupOpenAI;
-      } else {
-        providerFn = PROVIDERS[key];
-      }
+    // Branded: brand map → gemini → openai → generic
+    // Whole foods: generic (USDA) → gemini → openai
+    // OpenAI stays behind Gemini: a failed batch (503, open breaker, parse
+    // error, "unconfident") returns null for every item it carried
+    const order: (ProviderKey | 'openai')[] = normalized.is_branded
+      ? geminiOn ? ["brand", "gemini", "openai", "generic"] : ["brand", "openai", "generic"]  // Branded: brand map first
+      : geminiOn ? ["generic", "gemini", "openai"] : ["generic", "openai"];                   // Whole foods: USDA first, then fallback
+
+    return { item, normalized, order, stage: 0, macroResult: null as any, providerUsed: 'none' };
+  });
+
+  const hasMacros = (r: any) => r && r.macros && r.macros.kcal > 0;
+  const settle = (state: typeof states[number], key: string, result: any) => {
+    state.macroResult = result;
+    if (hasMacros(result)) {
+      state.providerUsed = key;
+      skillsFired.push(`macro_lookup_${key}`); // Track skill usage
+      console.log(`[nutrition] Provider ${key} found macros for "${state.item.name}"`);
+    }
+  };
 
-      if (providerFn) {
+  // ✅ Try each provider in order, all items at once
+  let active = states;
+  while (active.length > 0) {
+    const geminiBatch = active.filter(s => s.order[s.stage] === 'gemini');
+    const single = active.filter(s => s.order[s.stage] !== 'gemini');
+
+    await Promise.all([
+      geminiBatch.length > 0 && lookupGeminiMany(geminiBatch.map(s => s.normalized), userId, ctx)
+        .then(results => geminiBatch.forEach((s, i) => settle(s, 'gemini', results[i])))
+        .catch(err => console.error(`[nutrition] Provider gemini batch error (${geminiBatch.length} items):`, err)),
+      ...single.map(async (s) => {
+        const key = s.order[s.stage];
+        const providerFn = key === 'openai' ? lookupOpenAI : PROVIDERS[key];
+        if (!providerFn) return;
         try {
-          macroResult = await providerFn(normalized, userId);
-          if (macroResult && macroResult.macros && macroResult.macros.kcal > 0) {
-            providerUsed = key;
-            skillsFired.push(`macro_lookup_${key}`); // Track skill usage
-            console.log(`[nutrition] Provider ${key} found macros for "${item.name}"`);
-            break;
-          }
+          settle(s, key, await providerFn(s.normalized, userId, ctx));
         } catch (err) {
-          console.error(`[nutrition] Provider ${key} error for "${item.name}":`, err);
-          continue;  // Try next provider
+          console.error(`[nutrition] Provider ${key} error for "${s.item.name}":`, err);
+          // Try next provider
         }
-      }
-    }
+      })
+    ]);
+
+    for (const s of active) s.stage++;
+    active = active.filter(s => !hasMacros(s.macroResult) && s.stage < s.order.length);
+  }
+
+  const results = states.map(({ item, macroResult: resolved, providerUsed: resolvedBy }) => {
+    let macroResult = resolved;
+    let providerUsed = resolvedBy;
 
     // ✅ Only use stub if ALL providers failed
     if (!macroResult || !macroResult.macros || macroResult.macros.kcal === 0) {
@@ -263,8 +292,7 @@ async function lookupMacrosInCascade(items: any[], userId?: string): Promise<any
       providerUsed = 'stub';
     }
 
-    // Add to results
-    results.push({
+    return {
       ...item,
       calories: macroResult.macros.kcal || 0,
       protein_g: macroResult.macros.protein_g || 0,
@@ -274,8 +302,8 @@ async function lookupMacrosInCascade(items: any[], userId?: string): Promise<any
       confidence: macroResult.confidence || 0.1,
       source: macroResult.source || 'unknown',
       provider: providerUsed
-    });
-  }
+    };
+  });
 
   // Calculate totals (ensure zeros are handled correctly)
   const totals = results.reduce((acc, item) => ({
@@ -298,8 +326,12 @@ async function lookupMacrosInCascade(items: any[], userId?: string): Promise<any
  * Used by both "food_question" (info) and "meal_logging" (log) intents
  */
 export async function processNutrition(options: NutritionPipelineOptions): Promise<NutritionPipelineResult> {
-  const { message, userId, showLogButton = true } = options;
+  const { message, userId, sessionId, showLogButton = true } = options;
   const skillsFired: string[] = [];
+  const telemetry = new TelemetryCollector(userId, sessionId);
+  // One read of the user's rows for the whole resolution, overlapping the normalizer call
+  const userContextPromise = resolveUserContext(userId, options.userContext);
+  userContextPromise.catch(() => undefined);
 
   try {
     console.log('[nutrition] Processing:', { message, userId, showLogButton });
@@ -319,6 +351,7 @@ Rules:
     const normalizerPrompt = await getLatestPromptOrFallback(NORMALIZER_AGENT_KEY, NORMALIZER_FALLBACK);
     console.info('[nutrition] normalizer prompt source:', normalizerPrompt.startsWith('Normalize messy') ? 'fallback' : 'db');
 
+    const nluStart = performance.now();
     const { data: normalizerResponse, error: normalizerError } = await supabase.functions.invoke('openai-chat', {
       body: {
         messages: [
@@ -333,6 +366,15 @@ Rules:
         response_format: { type: 'json_object' }  // ✅ FORCE JSON MODE
       }
     });
+    telemetry.log({
+      eventType: 'nlu_extracted',
+      stage: 'nlu',
+      durationMs: Math.round(performance.now() - nluStart),
+      llmProvider: 'openai',
+      llmModel: 'gpt-4o-mini',
+      success: !normalizerError,
+      ...(normalizerError && { error: String(normalizerError.message ?? normalizerError) })
+    });
 
     let parsedItems: Array<{ name: string; amount: number | null; unit: string | null }> = [];
 
@@ -382,15 +424,24 @@ Rules:
 
     // Step 3: Resolve portions and lookup macros
     const portioned = portionResolver(portionedItems);
-    const macroResults = await lookupMacrosInCascade(portioned, userId);
+    const userContext = await userContextPromise;
+    const macroResults = await telemetry.time(
+      'resolve',
+      'nutrition_resolved',
+      () => lookupMacrosInCascade(portioned, userId, userContext),
+      { itemCount: portioned.length }
+    );
 
     // Extract skills_fired from macro lookup
     const macroSkills = macroResults.skills_fired || [];
     skillsFired.push(...macroSkills);
 
     // Step 3: Compute TEF and TDEE
-    const tef = computeTEF(macroResults.totals);
-    const tdee = await computeTDEE(userId, macroResults.totals, tef, new Date().toISOString());
+    const { tef, tdee } = await telemetry.time('aggregate', 'macros_aggregated', async () => {
+      const tef = computeTEF(macroResults.totals);
+      const tdee = await computeTDEE(userId, macroResults.totals, tef, new Date().toISOString(), userContext);
+      return { tef, tdee };
+    });
 
     console.log('[nutrition] Pipeline complete:', {
       items: macroResults.items.length,
@@ -466,10 +517,19 @@ Rules:
 
   } catch (error: any) {
     console.error('[nutrition] Pipeline failed:', error);
+    telemetry.log({
+      eventType: 'error',
+      stage: 'general',
+      durationMs: 0,
+      success: false,
+      error: error?.message ?? 'Nutrition pipeline failed'
+    });
     return {
       success: false,
       error: error?.message ?? 'Nutrition pipeline failed'
     };
+  } finally {
+    telemetry.finish();
   }
 }
 
@@ -15,6 +15,8 @@
  * - Pat's personality overlays ANY role, making the system truly modular
  */
 
+import type { UserContext } from '../../lib/userContext';
+
 export const PAT_SYSTEM_PROMPT = `
 <<<PAT.SYSTEM.V3>>>
 
@@ -135,7 +137,7 @@ export const PAT_TALK_RULES = {
   bargeInEnabled: true,
 } as const;
 
-export interface UserContext {
+export interface PersonaContext {
   firstName?: string;
   isFirstTimeChat?: boolean;
   hasTDEE?: boolean;
@@ -150,32 +152,13 @@ export interface UserContext {
 }
 
 /**
- * Load full user context from database for personality injection
+ * Build the persona context from the request's user context
+ * (profiles account fields, user_metrics, user_preferences), with no I/O
  */
-export async function loadUserContext(userId: string): Promise<UserContext> {
-  const { getSupabase } = await import('../../lib/supabase');
-  const supabase = getSupabase();
-
-  // Load user profile (CORRECT COLUMNS)
-  const { data: profile } = await supabase
-    .from('profiles')
-    .select('name, has_completed_tdee, chat_count')
-    .eq('user_id', userId)
-    .maybeSingle();
-
-  // Load user metrics (CORRECT COLUMNS)
-  const { data: metrics } = await supabase
-    .from('user_metrics')
-    .select('caloric_goal, tdee, height_cm, weight_kg, age, gender, dietary_preference, tdee_completed')
-    .eq('user_id', userId)
-    .maybeSingle();
-
-  // Load user preferences (CORRECT COLUMNS)
-  const { data: prefs } = await supabase
-    .from('user_preferences')
-    .select('learning_style, diet_type')
-    .eq('user_id', userId)
-    .maybeSingle();
+export function personaContextFrom(ctx: UserContext): PersonaContext {
+  const profile = ctx.account;
+  const metrics = ctx.metrics;
+  const prefs = ctx.preferences;
 
   const firstName = profile?.name?.split(' ')[0];
   const chatCount = profile?.chat_count || 0;
@@ -213,7 +196,16 @@ export async function loadUserContext(userId: string): Promise<UserContext> {
   };
 }
 
-export function buildSystemPrompt(context: UserContext = {}): string {
+/**
+ * Load the persona context for personality injection (shares the cached
+ * get_user_context load with the rest of the request)
+ */
+export async function loadPersonaContext(userId: string): Promise<PersonaContext> {
+  const { loadUserContext } = await import('../../lib/userContext');
+  return personaContextFrom(await loadUserContext(userId));
+}
+
+export function buildSystemPrompt(context: PersonaContext = {}): string {
   let prompt = PAT_SYSTEM_PROMPT;
 
   // Inject user context dynamically
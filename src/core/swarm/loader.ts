@@ -3,6 +3,8 @@
  * Loads agent configs from database and builds dynamic system prompts
  */
 
+import { assemblePrompt, formatContextBlock, type AssembledPrompt, type PromptSection } from '../../../supabase/functions/_shared/promptAssembly';
+
 /**
  * Load master personality from database (single source of truth)
  * Returns the DB-driven Pat personality that all swarms inherit
@@ -120,55 +122,52 @@ export async function loadSwarm(swarmName: string): Promise<SwarmConfig | null>
 }
 
 /**
- * Build system prompt from swarm agents
- * Combines all enabled pre-phase and main agents' prompts
+ * Swarm prompt as cache-friendly layers: pre-phase agents are the persona,
+ * main-phase agents the rules, then user context and any per-turn sections.
+ * Post agents are not included (they run after the LLM response).
  */
-export async function buildSwarmPrompt(swarm: SwarmConfig, userContext?: Record<string, any>): Promise<string> {
-  const sections: string[] = [];
+export async function buildSwarmPromptParts(
+  swarm: SwarmConfig,
+  userContext?: Record<string, any>,
+  turnSections: PromptSection[] = []
+): Promise<AssembledPrompt> {
+  const sections: PromptSection[] = [];
 
   // Import prompt library
   const { resolvePromptRef } = await import('./prompts');
 
   // Get all enabled agents sorted by phase and order
-  const enabledAgents = swarm.agents
-    .filter(a => a.enabled)
+  const promptAgents = swarm.agents
+    .filter(a => a.enabled && (a.phase === 'pre' || a.phase === 'main'))
     .sort((a, b) => {
       const phaseOrder = { 'pre': 0, 'main': 1, 'post': 2 };
       const phaseDiff = phaseOrder[a.phase] - phaseOrder[b.phase];
       return phaseDiff !== 0 ? phaseDiff : a.order - b.order;
     });
 
-  // Only include pre and main phases in system prompt
-  // (post agents run after LLM response)
-  const promptAgents = enabledAgents.filter(a => a.phase === 'pre' || a.phase === 'main');
-
   for (const agent of promptAgents) {
-    if (agent.prompt) {
-      // Direct prompt
-      sections.push(`[${agent.name}]`);
-      sections.push(agent.prompt);
-    } else if (agent.promptRef) {
-      // Reference to prompt library (database-first, then fallback)
-      const prompt = await resolvePromptRef(agent.promptRef);
-      if (prompt) {
-        sections.push(`[${agent.name}]`);
-        sections.push(prompt);
-      }
+    // Direct prompt, or a reference to the prompt library (database-first, then fallback)
+    const prompt = agent.prompt ?? (agent.promptRef ? await resolvePromptRef(agent.promptRef) : null);
+    if (prompt) {
+      sections.push({ layer: agent.phase === 'pre' ? 'persona' : 'rules', label: agent.name, content: prompt });
     }
   }
 
-  // Inject user context at the end
-  if (userContext && Object.keys(userContext).length > 0) {
-    sections.push('');
-    sections.push('=== USER CONTEXT (USE THIS TO PERSONALIZE YOUR RESPONSES) ===');
-    for (const [key, value] of Object.entries(userContext)) {
-      if (value !== undefined && value !== null) {
-        sections.push(`${key}: ${JSON.stringify(value)}`);
-      }
-    }
+  if (userContext) {
+    sections.push({
+      layer: 'user',
+      content: formatContextBlock('=== USER CONTEXT (USE THIS TO PERSONALIZE YOUR RESPONSES) ===', userContext)
+    });
   }
 
-  return sections.join('\n\n');
+  return assemblePrompt([...sections, ...turnSections]);
+}
+
+/**
+ * Build system prompt from swarm agents as a single string
+ */
+export async function buildSwarmPrompt(swarm: SwarmConfig, userContext?: Record<string, any>): Promise<string> {
+  return (await buildSwarmPromptParts(swarm, userContext)).text;
 }
 
 /**
@@ -3,6 +3,9 @@ import { spendCredits, calculateCost } from '@/lib/credits/spendHook';
 import { TMWYA_INTENT_SYSTEM } from '@/agents/tmwya/intent.system';
 import { TMWYA_NORMALIZE_SYSTEM } from '@/agents/tmwya/normalize.system';
 
+// VITE_OPENAI_BASE_URL points perf/offline runs at perf/mock_llm
+const OPENAI_CHAT_URL = `${(import.meta.env.VITE_OPENAI_BASE_URL || 'https://api.openai.com/v1').replace(/\/+$/, '')}/chat/completions`;
+
 /**
  * STEP 1: Intent Detection
  * Uses TMWYA_INTENT_SYSTEM prompt to determine if message is food intake
@@ -17,7 +20,7 @@ async function detectIntent(userMessage: string): Promise<{
 
   console.log('[SWARM] intent detection → calling OpenAI');
 
-  const response = await fetch('https://api.openai.com/v1/chat/completions', {
+  const response = await fetch(OPENAI_CHAT_URL, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
@@ -56,7 +59,7 @@ async function normalizeStructure(userMessage: string): Promise<any> {
 
   console.log('[SWARM] normalize → calling OpenAI');
 
-  const response = await fetch('https://api.openai.com/v1/chat/completions', {
+  const response = await fetch(OPENAI_CHAT_URL, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
@@ -137,7 +140,7 @@ async function resolveMacros(normalized: any): Promise<FoodResult> {
 
   console.log('[SWARM] resolver → calling OpenAI');
 
-  const response = await fetch('https://api.openai.com/v1/chat/completions', {
+  const response = await fetch(OPENAI_CHAT_URL, {
     method: 'POST',
     headers: {
       'Content-Type': 'application/json',
@@ -12,7 +12,7 @@ export async function edgeHealth() {
   const chatRes = await fetch(`${base}/functions/v1/openai-chat`, {
     method: 'POST',
     headers,
-    body: JSON.stringify({ messages: [{ role: 'user', content: 'ping' }] }),
+    body: JSON.stringify({ messages: [{ role: 'user', content: 'ping' }], priority: 'background' }),
   }).catch(() => null);
 
   // FOOD check — IMPORTANT: send a valid body
@@ -1,4 +1,4 @@
-import React, { useEffect, useState } from 'react';
+import React, { Suspense, useEffect, useState } from 'react';
 import { Outlet, useLocation, useNavigate } from 'react-router-dom';
 import MainHeader from '../components/layout/MainHeader';
 import NavigationSidebar from '../components/NavigationSidebar';
@@ -7,6 +7,11 @@ import { ChatManager } from '../utils/chatManager';
 import { getSupabase, getUserProfile } from '../lib/supabase';
 import { getChatHistory, deleteChatSession, restoreChatSession, type ChatHistoryItem } from '../lib/chatHistory';
 import toast from 'react-hot-toast';
+import RouteFallback from '../components/common/RouteFallback';
+import { prefetchOnIdle } from '../lib/routePreload';
+import { getMealOutbox } from '../lib/meals/outbox';
+import { startAccessRulesSync } from '../lib/accessRules';
+import { getCreditMeter } from '../lib/credits/meter';
 
 type ChatSummary = {
   id: string;
@@ -123,6 +128,32 @@ export default function RootLayout() {
     })();
     return () => { active = false; };
   }, []);
+
+  // Drain meals queued offline (or before a reload); surface server rejections
+  useEffect(() => {
+    const outbox = getMealOutbox();
+    const unsubscribe = outbox.subscribe(event => {
+      if (event.type === 'rejected') {
+        toast.error(`A meal could not be saved: ${event.error}`);
+      }
+    });
+    getSupabase().auth.getSession().then(({ data }) => {
+      const userId = data.session?.user.id;
+      if (userId) {
+        outbox.start(userId).catch(err => console.error('[outbox] start failed:', err));
+        // Settle credit usage left over from the last session
+        getCreditMeter().start(userId).catch(err => console.error('[credits] start failed:', err));
+      }
+    });
+    return unsubscribe;
+  }, []);
+
+  // Role / flag checks evaluate against this in-memory table; it follows the rules version
+  useEffect(() => startAccessRulesSync(), []);
+
+  // Dashboard ↔ chat is the common flow: warm the other chunk once idle
+  useEffect(() => prefetchOnIdle(['/dashboard', '/chat']), []);
+
   const pageTitle = getPageTitle(location.pathname);
 
   return (
@@ -141,7 +172,9 @@ export default function RootLayout() {
       {/* Padding to clear fixed header: 56px (14 * 4) on mobile, 64px (16 * 4) on sm+ */}
       <main className="flex-1 overflow-y-auto pt-14 sm:pt-16">
         <TDEEGuard>
-          <Outlet />
+          <Suspense fallback={<RouteFallback />}>
+            <Outlet />
+          </Suspense>
         </TDEEGuard>
       </main>
     </div>
@@ -0,0 +1,117 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+
+vi.mock('../supabase', () => {
+  const rpc = vi.fn();
+  return {
+    getSupabase: () => ({ rpc }),
+    __rpc: rpc
+  };
+});
+
+import { __rpc as rpcMock } from '../supabase';
+import {
+  compileAccessRules,
+  compileFlag,
+  evaluateFlag,
+  flagBucket,
+  allowedRolesFor,
+  isRoleAllowed,
+  refreshAccessRules,
+  getAccessRules,
+  setAccessRules
+} from '../accessRules';
+
+const rpc = rpcMock as unknown as ReturnType<typeof vi.fn>;
+
+const doc = {
+  version: 7,
+  roles: [
+    { role_name: 'AMA', stage: 'public' as const, enabled: true },
+    { role_name: 'TMWYA', stage: 'beta' as const, enabled: true },
+    { role_name: 'SwarmAdmin', stage: 'admin' as const, enabled: true },
+    { role_name: 'Retired', stage: 'public' as const, enabled: false }
+  ],
+  flags: [
+    { flag: 'MEMORY_UI_ENABLED', enabled: true, rollout_percentage: null, allowed_roles: ['admin'], allowed_users: null }
+  ]
+};
+
+/** The per-check hash featureFlags.v2 used before compilation */
+function naiveBucket(userId: string, flag: string): number {
+  const str = `${userId}-${flag}`;
+  let hash = 0;
+  for (let i = 0; i < str.length; i++) {
+    hash = (hash << 5) - hash + str.charCodeAt(i);
+    hash = hash & hash;
+  }
+  return Math.abs(hash % 100);
+}
+
+describe('compiled access rules', () => {
+  it('matches the allowed_roles() stage rules', () => {
+    const rules = compileAccessRules(doc);
+
+    expect(allowedRolesFor({ isAdmin: false, isBeta: false }, rules)).toEqual(['AMA']);
+    expect(allowedRolesFor({ isAdmin: false, isBeta: true }, rules)).toEqual(['AMA', 'TMWYA']);
+    expect(allowedRolesFor({ isAdmin: true, isBeta: false }, rules)).toEqual(['AMA', 'SwarmAdmin']);
+    expect(isRoleAllowed('TMWYA', { isAdmin: true, isBeta: false }, rules)).toBe(false);
+    expect(isRoleAllowed('Retired', { isAdmin: true, isBeta: true }, rules)).toBe(false);
+    expect(rules.flags.get('MEMORY_UI_ENABLED')).toEqual({
+      enabled: true,
+      rolloutPercentage: undefined,
+      allowedRoles: ['admin'],
+      allowedUsers: undefined
+    });
+  });
+
+  it('buckets users exactly like hashing `${userId}-${flag}` each time', () => {
+    const compiled = compileFlag('SWARM_V2_ENABLED', { enabled: true, rolloutPercentage: 50 });
+    for (const userId of ['11111111-1111-4111-8111-111111111111', 'a', '', 'ffffffff-ffff-4fff-bfff-ffffffffffff']) {
+      expect(flagBucket(compiled, userId)).toBe(naiveBucket(userId, 'SWARM_V2_ENABLED'));
+    }
+  });
+
+  it('evaluates role, user and rollout gates', () => {
+    const flag = compileFlag('F', { enabled: true, rolloutPercentage: 0, allowedRoles: ['admin'] });
+    expect(evaluateFlag(flag, { userId: 'u', userRole: 'user' })).toBe(false);
+    expect(evaluateFlag(flag, { userId: 'u', userRole: 'admin' })).toBe(false); // 0% rollout
+    expect(evaluateFlag(compileFlag('F', { enabled: true, rolloutPercentage: 100 }), { userId: 'u' })).toBe(true);
+    expect(evaluateFlag(compileFlag('F', { enabled: true, allowedUsers: ['x'] }), { userId: 'u' })).toBe(false);
+    expect(evaluateFlag(compileFlag('F', { enabled: false }), { userId: 'u' })).toBe(false);
+  });
+});
+
+describe('refreshAccessRules', () => {
+  beforeEach(() => {
+    setAccessRules(compileAccessRules(null));
+    rpc.mockReset();
+  });
+
+  it('fetches the rules only when the version moves', async () => {
+    rpc.mockImplementation(async (name: string) =>
+      name === 'access_rules_version' ? { data: 7, error: null } : { data: doc, error: null }
+    );
+
+    await refreshAccessRules({ force: true });
+    await refreshAccessRules();
+    expect(rpc.mock.calls.map(([name]: [string]) => name)).toEqual(['access_rules', 'access_rules_version']);
+    expect(getAccessRules().version).toBe(7);
+
+    rpc.mockImplementation(async (name: string) =>
+      name === 'access_rules_version' ? { data: 8, error: null } : { data: { ...doc, version: 8, roles: [] }, error: null }
+    );
+    await refreshAccessRules();
+    expect(getAccessRules().version).toBe(8);
+    expect(allowedRolesFor({ isAdmin: true, isBeta: true })).toEqual([]);
+  });
+
+  it('keeps the current rules when the fetch fails', async () => {
+    rpc.mockResolvedValueOnce({ data: doc, error: null });
+    await refreshAccessRules({ force: true });
+
+    rpc.mockResolvedValueOnce({ data: null, error: { message: 'offline' } });
+    await refreshAccessRules({ force: true });
+
+    expect(getAccessRules().version).toBe(7);
+  });
+});
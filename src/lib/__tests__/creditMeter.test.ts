@@ -0,0 +1,224 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+
+vi.mock('../supabase', () => ({
+  getSupabase: () => ({ rpc: vi.fn() })
+}));
+
+import { createCreditMeter, createLocalLedgerStorage } from '../credits/meter';
+
+const USER = '11111111-1111-4111-8111-111111111111';
+const OTHER = '22222222-2222-4222-8222-222222222222';
+
+const hold = (id: string, userId: string) =>
+  ({ id, userId, sessionId: 'gone', grantedUsd: 0.1, usedUsd: 0, unlimited: false, expiresAt: 0 });
+
+/** In-memory stand-in for reserve_credits / settle_credit_usage / reconcile_credit_usage */
+function fakeServer(balance: number) {
+  const state = {
+    balance,
+    holds: new Map<string, { reserved: number; spent: number; open: boolean }>(),
+    transactions: new Map<string, number>(),
+    failSettles: 0
+  };
+
+  const rpc = vi.fn(async (name: string, params: Record<string, any>) => {
+    if (name === 'reserve_credits') {
+      const held = [...state.holds.values()].filter(h => h.open).reduce((s, h) => s + Math.max(h.reserved - h.spent, 0), 0);
+      const granted = Math.min(params.p_amount_usd, state.balance - held);
+      if (granted <= 0) return { data: null, error: { message: 'Insufficient credits' } };
+      state.holds.set(params.p_reservation_id, { reserved: granted, spent: 0, open: true });
+      return { data: { granted_usd: granted, balance_usd: state.balance, unlimited: false }, error: null };
+    }
+    if (name === 'settle_credit_usage') {
+      if (state.failSettles > 0) {
+        state.failSettles--;
+        return { data: null, error: { message: 'network' } };
+      }
+      const hold = state.holds.get(params.p_reservation_id);
+      if (!hold) return { data: null, error: { message: 'Unknown reservation' } };
+      const applied: string[] = [];
+      const duplicates: string[] = [];
+      for (const entry of params.p_entries) {
+        if (state.transactions.has(entry.key)) {
+          duplicates.push(entry.key);
+          continue;
+        }
+        state.transactions.set(entry.key, entry.amount_usd);
+        state.balance -= entry.amount_usd;
+        hold.spent += entry.amount_usd;
+        applied.push(entry.key);
+      }
+      if (params.p_close) hold.open = false;
+      return { data: { applied, duplicates, balance_usd: state.balance }, error: null };
+    }
+    if (name === 'reconcile_credit_usage') {
+      return { data: params.p_keys.filter((k: string) => state.transactions.has(k)), error: null };
+    }
+    throw new Error(`unexpected rpc ${name}`);
+  });
+
+  return { state, rpc };
+}
+
+function setup(balance: number, budgetUsd = 0.1) {
+  let ids = 0;
+  const server = fakeServer(balance);
+  const storage = createLocalLedgerStorage(null);
+  const meter = createCreditMeter({
+    storage,
+    rpc: server.rpc as any,
+    budgetUsd,
+    flushDelayMs: 60_000,
+    newId: () => `id-${++ids}`
+  });
+  return { meter, storage, server };
+}
+
+/** Two tabs: separate meters and storage objects over one localStorage */
+function setupTabs(balance: number) {
+  let ids = 0;
+  const server = fakeServer(balance);
+  const data = new Map<string, string>();
+  const local = { getItem: (k: string) => data.get(k) ?? null, setItem: (k: string, v: string) => { data.set(k, v); } };
+  const tab = (sessionId: string) => {
+    const storage = createLocalLedgerStorage(local);
+    const meter = createCreditMeter({
+      storage,
+      rpc: server.rpc as any,
+      sessionId,
+      budgetUsd: 0.1,
+      flushDelayMs: 60_000,
+      newId: () => `id-${++ids}`
+    });
+    return { meter, storage };
+  };
+  return { server, a: tab('tab-a'), b: tab('tab-b') };
+}
+
+const calls = (rpc: ReturnType<typeof vi.fn>) => rpc.mock.calls.map(([name]: [string]) => name);
+
+describe('credit meter', () => {
+  beforeEach(() => {
+    vi.useFakeTimers();
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it('reserves once and records later charges without I/O', async () => {
+    const { meter, storage, server } = setup(1);
+
+    await meter.charge(USER, 0.02, 'turn');
+    await meter.charge(USER, 0.02, 'turn');
+    await meter.charge(USER, 0.02, 'turn');
+
+    expect(calls(server.rpc)).toEqual(['reserve_credits']);
+    expect(storage.entries()).toHaveLength(3);
+    expect(meter.estimatedBalance(USER)).toBeCloseTo(0.94);
+  });
+
+  it('settles the ledger in one batch per reservation', async () => {
+    const { meter, storage, server } = setup(1);
+    await meter.charge(USER, 0.02, 'turn');
+    await meter.charge(USER, 0.01, 'resolver');
+
+    await meter.flush();
+
+    expect(calls(server.rpc)).toEqual(['reserve_credits', 'settle_credit_usage']);
+    expect(storage.entries()).toHaveLength(0);
+    expect(server.state.balance).toBeCloseTo(0.97);
+  });
+
+  it('never lets charges exceed what the server granted', async () => {
+    const { meter, server } = setup(0.05, 0.1);
+
+    await meter.charge(USER, 0.03, 'turn');
+    await expect(meter.charge(USER, 0.03, 'turn')).rejects.toThrow('INSUFFICIENT_CREDITS');
+
+    await meter.flush();
+    expect(server.state.balance).toBeCloseTo(0.02);
+  });
+
+  it('keeps entries after a failed settle and does not double-charge on retry', async () => {
+    const { meter, storage, server } = setup(1);
+    await meter.charge(USER, 0.02, 'turn');
+
+    server.state.failSettles = 1;
+    await meter.flush();
+    expect(storage.entries()).toHaveLength(1);
+
+    await meter.flush();
+    await meter.flush();
+    expect(storage.entries()).toHaveLength(0);
+    expect(server.state.balance).toBeCloseTo(0.98);
+  });
+
+  it('keeps both tabs\' entries and never closes a live tab\'s reservation', async () => {
+    const { server, a, b } = setupTabs(1);
+    await a.meter.start(USER);
+    await a.meter.charge(USER, 0.02, 'turn');
+
+    await b.meter.start(USER);
+    await b.meter.charge(USER, 0.03, 'turn');
+    await a.meter.charge(USER, 0.01, 'turn');
+
+    // b's start settled a's first charge; the later ones are both pending
+    expect(server.state.balance).toBeCloseTo(0.98);
+    expect(a.storage.entries().map(e => e.amountUsd)).toEqual([0.03, 0.01]);
+    expect(a.storage.reservation('tab-a')?.usedUsd).toBeCloseTo(0.03);
+    expect(a.storage.closing()).toEqual([]);
+    expect([...server.state.holds.values()].every(h => h.open)).toBe(true);
+
+    await b.meter.flush();
+    expect(a.storage.entries()).toHaveLength(0);
+    expect(server.state.balance).toBeCloseTo(0.94);
+  });
+
+  it('releases the reservation of a session that is gone', async () => {
+    const { server, a, b } = setupTabs(1);
+    await a.meter.start(USER);
+    await a.meter.charge(USER, 0.02, 'turn');
+    const held = a.storage.reservation('tab-a')!.id;
+    a.meter.end();
+
+    await b.meter.start(USER);
+
+    expect(b.storage.reservation('tab-a')).toBeNull();
+    expect(server.state.holds.get(held)).toMatchObject({ open: false, spent: 0.02 });
+    expect(b.storage.entries()).toHaveLength(0);
+  });
+
+  it('settles only the signed-in user\'s usage, past a reservation that fails', async () => {
+    const { meter, storage, server } = setup(1);
+    // Another account used this browser earlier
+    storage.append({ key: 'other-1', userId: OTHER, reservationId: 'other-r', amountUsd: 0.05, reason: 'turn', at: 0 });
+    storage.addClosing([hold('other-old', OTHER)]);
+    // A hold of this user's the server no longer knows; it settles first and fails
+    storage.addClosing([hold('expired', USER)]);
+    await meter.charge(USER, 0.02, 'turn');
+    const [live] = storage.reservations();
+
+    await meter.flush();
+
+    const settled = server.rpc.mock.calls
+      .filter(([name]: [string]) => name === 'settle_credit_usage')
+      .map(([, params]: [string, Record<string, any>]) => params.p_reservation_id);
+    expect(settled).toEqual(['expired', live.id]);
+    expect(storage.entries().map(e => e.key)).toEqual(['other-1']);
+    expect(storage.closing().map(r => r.id)).toEqual(['other-old', 'expired']);
+    expect(server.state.balance).toBeCloseTo(0.98);
+  });
+
+  it('reconciles entries the server already applied', async () => {
+    const { meter, storage, server } = setup(1);
+    await meter.charge(USER, 0.02, 'turn');
+    const [entry] = storage.entries();
+    server.state.transactions.set(entry.key, 0.02); // settle landed, response was lost
+
+    await meter.start(USER);
+
+    expect(storage.entries()).toHaveLength(0);
+    expect(calls(server.rpc)).toContain('reconcile_credit_usage');
+  });
+});
@@ -0,0 +1,67 @@
+import { describe, it, expect } from 'vitest';
+import { createFrameCoalescer } from '../frameCoalescer';
+import { visibleRange, withMessageText } from '../../components/chat/ChatTranscript';
+import type { ChatMessage } from '../../types/chat';
+
+function manualFrames() {
+  const queue: Array<() => void> = [];
+  return {
+    schedule: (cb: () => void) => queue.push(cb),
+    unschedule: () => { queue.length = 0; },
+    tick: () => queue.splice(0).forEach(cb => cb()),
+    pending: () => queue.length
+  };
+}
+
+describe('createFrameCoalescer', () => {
+  it('applies only the latest value once per frame', () => {
+    const frames = manualFrames();
+    const applied: string[] = [];
+    const c = createFrameCoalescer<string>(v => applied.push(v), frames.schedule, frames.unschedule);
+
+    ['H', 'He', 'Hel', 'Hell'].forEach(v => c.push(v));
+    expect(frames.pending()).toBe(1);
+    frames.tick();
+    expect(applied).toEqual(['Hell']);
+
+    c.push('Hello');
+    c.flush();
+    expect(applied).toEqual(['Hell', 'Hello']);
+    frames.tick();
+    expect(applied).toHaveLength(2);
+  });
+
+  it('drops the pending value on cancel', () => {
+    const frames = manualFrames();
+    const applied: number[] = [];
+    const c = createFrameCoalescer<number>(v => applied.push(v), frames.schedule, frames.unschedule);
+    c.push(1);
+    c.cancel();
+    frames.tick();
+    c.flush();
+    expect(applied).toEqual([]);
+  });
+});
+
+describe('ChatTranscript helpers', () => {
+  const msgs: ChatMessage[] = Array.from({ length: 5 }, (_, i) => ({
+    id: `m${i}`, text: `t${i}`, isUser: i % 2 === 0, timestamp: new Date(0)
+  }));
+
+  it('withMessageText replaces one message and keeps the others by identity', () => {
+    const next = withMessageText(msgs, 'm4', 'streamed');
+    expect(next[4].text).toBe('streamed');
+    expect(next.slice(0, 4).every((m, i) => m === msgs[i])).toBe(true);
+    expect(withMessageText(msgs, 'm4', 't4')).toBe(msgs);
+    expect(withMessageText(msgs, 'missing', 'x')).toBe(msgs);
+  });
+
+  it('visibleRange returns the rows overlapping the viewport plus overscan', () => {
+    const heights = Array(1000).fill(100);
+    const offsets = heights.map((_, i) => i * 100);
+    expect(visibleRange(offsets, heights, 50_000, 800, 0)).toEqual({ start: 500, end: 508 });
+    expect(visibleRange(offsets, heights, 50_000, 800, 200)).toEqual({ start: 498, end: 510 });
+    expect(visibleRange(offsets, heights, 0, 800, 200)).toEqual({ start: 0, end: 10 });
+    expect(visibleRange([], [], 0, 800, 200)).toEqual({ start: 0, end: 0 });
+  });
+});
@@ -0,0 +1,178 @@
+import { describe, it, expect, vi, beforeEach, afterEach } from 'vitest';
+
+vi.mock('../supabase', () => ({
+  getSupabase: () => ({ rpc: vi.fn(), auth: { getSession: vi.fn() } })
+}));
+
+import { createMealOutbox, createMemoryStorage, backoffDelay, type BatchResult, type OutboxMeal } from '../meals/outbox';
+import { useDayTotalsStore } from '../../store/dayTotals';
+import type { SaveMealInput } from '../meals/saveMeal';
+
+const USER = '11111111-1111-4111-8111-111111111111';
+
+function meal(kcal: number): SaveMealInput {
+  return {
+    userId: USER,
+    items: [{ name: 'oats', quantity: 1, unit: 'cup', energy_kcal: kcal, protein_g: 10, fat_g: 5, carbs_g: 50, fiber_g: 8 }],
+    mealSlot: 'breakfast',
+    timestamp: '2025-11-07T14:00:00.000Z'
+  };
+}
+
+function setup(send: (meals: OutboxMeal[]) => Promise<BatchResult[]>, deleteSent = vi.fn(async () => {})) {
+  let ids = 0;
+  const storage = createMemoryStorage();
+  const outbox = createMealOutbox({
+    storage,
+    send: vi.fn(send),
+    currentUserId: async () => USER,
+    deleteSent,
+    newId: () => `00000000-0000-4000-8000-00000000000${++ids}`,
+    random: () => 0.5,
+    isOnline: () => true
+  });
+  return { outbox, storage };
+}
+
+const created = (meals: OutboxMeal[]): BatchResult[] =>
+  meals.map((m, i) => ({ client_id: m.client_id, status: 'created', meal_log_id: `log-${i}` }));
+
+describe('meal outbox', () => {
+  beforeEach(() => {
+    vi.useFakeTimers();
+    useDayTotalsStore.getState().reset();
+    useDayTotalsStore.getState().seed(USER, '2025-11-07T05:00:00.000Z', '2025-11-08T04:59:59.999Z', {
+      kcal: 1000, protein_g: 80, carbs_g: 100, fat_g: 30, fiber_g: 10, items: 4
+    });
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it('acknowledges locally and applies totals before anything is sent', async () => {
+    const send = vi.fn(async (meals: OutboxMeal[]) => created(meals));
+    const { outbox, storage } = setup(send);
+
+    const result = await outbox.enqueue(meal(400));
+
+    expect(result).toMatchObject({ ok: true, queued: true, itemsCount: 1 });
+    expect(send).not.toHaveBeenCalled();
+    expect(await storage.all()).toHaveLength(1);
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1400);
+  });
+
+  it('sends queued meals as one batch and clears them on created or duplicate', async () => {
+    const { outbox, storage } = setup(async (meals) => [
+      { client_id: meals[0].client_id, status: 'created', meal_log_id: 'log-1' },
+      { client_id: meals[1].client_id, status: 'duplicate', meal_log_id: 'log-2' }
+    ]);
+    await outbox.enqueue(meal(400));
+    await outbox.enqueue(meal(200));
+
+    const report = await outbox.flush();
+
+    expect(report).toEqual({ sent: 2, synced: 2, rejected: 0, failed: 0 });
+    expect(await storage.all()).toEqual([]);
+    // Not live: no delta is coming, so the optimistic amounts stay counted
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1600);
+  });
+
+  it('keeps entries and backs off on transport failure, then retries with the same key', async () => {
+    let fail = true;
+    const sent: string[][] = [];
+    const { outbox, storage } = setup(async (meals) => {
+      sent.push(meals.map(m => m.client_id));
+      if (fail) throw new Error('Failed to fetch');
+      return created(meals);
+    });
+    await outbox.enqueue(meal(400));
+
+    expect(await outbox.flush()).toMatchObject({ sent: 1, failed: 1 });
+    const [entry] = await storage.all();
+    expect(entry.attempts).toBe(1);
+    expect(entry.nextAttemptAt).toBeGreaterThan(Date.now());
+
+    // Not due yet
+    expect((await outbox.flush()).sent).toBe(0);
+
+    fail = false;
+    vi.setSystemTime(entry.nextAttemptAt);
+    expect(await outbox.flush()).toMatchObject({ sent: 1, synced: 1 });
+    expect(sent[0]).toEqual(sent[1]);
+    expect(await storage.all()).toEqual([]);
+  });
+
+  it('backs off entries the batch response left out instead of retrying at once', async () => {
+    const { outbox, storage } = setup(async (meals) => created(meals.slice(0, 1)));
+    await outbox.enqueue(meal(400));
+    await outbox.enqueue(meal(200));
+
+    expect(await outbox.flush()).toMatchObject({ sent: 2, synced: 1, failed: 1 });
+    const [entry] = await storage.all();
+    expect(entry.attempts).toBe(1);
+    expect(entry.nextAttemptAt).toBeGreaterThan(Date.now());
+  });
+
+  it('drops rejected meals and reverts their optimistic totals', async () => {
+    const { outbox, storage } = setup(async (meals) => [
+      { client_id: meals[0].client_id, status: 'rejected', error: 'invalid input value for enum meal_slot_enum' }
+    ]);
+    const events: string[] = [];
+    outbox.subscribe(e => events.push(e.type));
+    await outbox.enqueue(meal(400));
+
+    expect(await outbox.flush()).toMatchObject({ rejected: 1 });
+    expect(await storage.all()).toEqual([]);
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1000);
+    expect(events).toEqual(['queued', 'rejected']);
+  });
+
+  it('undoes a meal that has not synced without touching the server', async () => {
+    const send = vi.fn(async (meals: OutboxMeal[]) => created(meals));
+    const { outbox, storage } = setup(send);
+    await outbox.enqueue(meal(400));
+
+    const dropped = await outbox.discardLatest(USER);
+
+    expect(dropped?.totals.kcal).toBe(400);
+    expect(await storage.all()).toEqual([]);
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1000);
+    expect(send).not.toHaveBeenCalled();
+  });
+
+  it('deletes a meal server-side on undo once it may have been written', async () => {
+    const deleteSent = vi.fn(async () => {});
+    // The batch response leaves the meal out: it may or may not be committed
+    const { outbox, storage } = setup(async () => [], deleteSent);
+    await outbox.enqueue(meal(400));
+    await outbox.flush();
+    const [entry] = await storage.all();
+
+    await outbox.discardLatest(USER);
+
+    expect(deleteSent.mock.calls).toEqual([[USER, entry.clientId]]);
+    expect(await storage.all()).toEqual([]);
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1000);
+  });
+
+  it('keeps a sent meal queued when the server-side delete fails', async () => {
+    const deleteSent = vi.fn(async () => { throw new Error('offline'); });
+    const { outbox, storage } = setup(async () => [], deleteSent);
+    await outbox.enqueue(meal(400));
+    await outbox.flush();
+
+    await expect(outbox.discardLatest(USER)).rejects.toThrow('offline');
+    expect(await storage.all()).toHaveLength(1);
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1400);
+  });
+});
+
+describe('backoffDelay', () => {
+  it('doubles per attempt up to the cap', () => {
+    const mid = () => 0.5;
+    expect(backoffDelay(1, 1000, 60_000, mid)).toBe(1000);
+    expect(backoffDelay(3, 1000, 60_000, mid)).toBe(4000);
+    expect(backoffDelay(20, 1000, 60_000, mid)).toBe(60_000);
+  });
+});
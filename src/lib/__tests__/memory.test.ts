@@ -0,0 +1,74 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+import type { MemoryRow } from '../../types/swarm';
+
+vi.mock('../supabase', () => {
+  const rpc = vi.fn();
+  return {
+    getSupabase: () => ({ rpc }),
+    __rpc: rpc
+  };
+});
+
+import { __rpc as rpcMock } from '../supabase';
+import { MemoryService, scoreMemory, isExpired } from '../memory';
+
+function memory(overrides: Partial<MemoryRow> = {}): MemoryRow {
+  const now = new Date().toISOString();
+  return {
+    id: 'm1',
+    user_id: 'u1',
+    tier: 'short_term',
+    key: 'k',
+    value: {},
+    source: 'inferred',
+    confidence: 0.5,
+    ttl: null,
+    topics: [],
+    is_pii: false,
+    conflict_priority: 1,
+    created_at: now,
+    updated_at: now,
+    ...overrides
+  };
+}
+
+describe('scoreMemory', () => {
+  it('ranks topic overlap, then recency and confidence', () => {
+    const now = Date.now();
+    const onTopic = memory({ topics: ['protein', 'dinner'] });
+    const offTopic = memory({ topics: ['sleep'] });
+    const stale = memory({ topics: ['protein', 'dinner'], created_at: new Date(now - 60 * 86400000).toISOString() });
+
+    const topics = ['protein', 'dinner'];
+    expect(scoreMemory(onTopic, topics, now)).toBeGreaterThan(scoreMemory(stale, topics, now));
+    expect(scoreMemory(stale, topics, now)).toBeGreaterThan(scoreMemory(offTopic, topics, now));
+  });
+
+  it('treats rows past their ttl as expired', () => {
+    expect(isExpired(memory({ ttl: new Date(Date.now() - 1000).toISOString() }))).toBe(true);
+    expect(isExpired(memory({ ttl: null }))).toBe(false);
+  });
+});
+
+describe('MemoryService.query cache', () => {
+  beforeEach(() => {
+    rpcMock.mockReset();
+    MemoryService.invalidateCache();
+  });
+
+  it('serves repeat queries from cache until a write invalidates it', async () => {
+    rpcMock.mockResolvedValue({ data: [{ ...memory({ topics: ['protein'] }), score: 0.9 }], error: null });
+
+    const first = await MemoryService.query({ userId: 'u1', topics: ['protein'] });
+    const second = await MemoryService.query({ userId: 'u1', topics: ['protein'] });
+    expect(first).toEqual(second);
+    expect(first[0]).not.toHaveProperty('score');
+    expect(rpcMock).toHaveBeenCalledTimes(1);
+
+    rpcMock.mockResolvedValueOnce({ data: 'new-id', error: null });
+    await MemoryService.upsertWithConflictResolution('u1', 'goal', 'cut', 'explicit');
+
+    await MemoryService.query({ userId: 'u1', topics: ['protein'] });
+    expect(rpcMock).toHaveBeenCalledTimes(3);
+  });
+});
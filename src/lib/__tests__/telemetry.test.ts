@@ -0,0 +1,103 @@
+import { describe, it, expect } from 'vitest';
+import { RingBuffer } from '../telemetry/ringBuffer';
+import { TelemetryCollector } from '../telemetry/events';
+import type { TelemetryWireEvent } from '../telemetry/sink';
+import { Tracer, formatTrace, type TraceRecord } from '../telemetry/tracing';
+
+function captureSink() {
+  const shipped: TelemetryWireEvent[] = [];
+  return { shipped, sink: { enqueue: (events: TelemetryWireEvent[]) => shipped.push(...events) } };
+}
+
+describe('RingBuffer', () => {
+  it('keeps only the newest `capacity` items and counts drops', () => {
+    const buf = new RingBuffer<number>(3);
+    [1, 2, 3, 4, 5].forEach(n => buf.push(n));
+    expect(buf.toArray()).toEqual([3, 4, 5]);
+    expect(buf.dropped).toBe(2);
+    expect(buf.drain(2)).toEqual([3, 4]);
+    expect(buf.size).toBe(1);
+    buf.push(6);
+    expect(buf.toArray()).toEqual([5, 6]);
+  });
+
+  it('rejects non-positive capacity', () => {
+    expect(() => new RingBuffer(0)).toThrow();
+  });
+});
+
+describe('TelemetryCollector', () => {
+  it('bounds memory while keeping exact aggregates', () => {
+    const { sink } = captureSink();
+    const t = new TelemetryCollector('u1', 's1', { capacity: 4, sampleRate: 0, sink });
+    for (let i = 0; i < 10; i++) {
+      t.log({ eventType: 'nutrition_resolved', stage: 'resolve', durationMs: 10, success: true });
+    }
+    const summary = t.getSummary();
+    expect(summary.events).toHaveLength(4);
+    expect(summary.stageCount.resolve).toBe(10);
+    expect(t.getStageDuration('resolve')).toBe(100);
+    expect(t.getDroppedCount()).toBe(6);
+  });
+
+  it('head-samples healthy runs', () => {
+    const { shipped, sink } = captureSink();
+    const t = new TelemetryCollector('u1', 's1', { sampleRate: 1, sink });
+    t.log({ eventType: 'intent_classified', stage: 'intent', durationMs: 5, success: true });
+    t.finish();
+    expect(shipped.length).toBeGreaterThan(0);
+    expect(shipped.every(e => e.sample_reason === 'head')).toBe(true);
+  });
+
+  it('drops unsampled healthy runs but always ships errored runs', () => {
+    const healthy = captureSink();
+    const ok = new TelemetryCollector('u1', 's1', { sampleRate: 0, slowThresholdMs: 60_000, sink: healthy.sink });
+    ok.log({ eventType: 'intent_classified', stage: 'intent', durationMs: 5, success: true });
+    ok.finish();
+    expect(healthy.shipped).toHaveLength(0);
+
+    const failing = captureSink();
+    const bad = new TelemetryCollector('u1', 's1', { sampleRate: 0, sink: failing.sink });
+    bad.log({ eventType: 'error', stage: 'nlu', durationMs: 5, success: false, error: 'boom' });
+    bad.finish();
+    expect(failing.shipped.length).toBeGreaterThan(0);
+    expect(failing.shipped[0].sample_reason).toBe('tail_error');
+  });
+
+  it('time() records failures and rethrows', async () => {
+    const { sink } = captureSink();
+    const t = new TelemetryCollector('u1', 's1', { sampleRate: 0, sink });
+    await expect(t.time('resolve', 'nutrition_resolved', async () => { throw new Error('nope'); })).rejects.toThrow('nope');
+    expect(t.hasErrors()).toBe(true);
+    expect(t.getFirstError()?.error).toBe('nope');
+  });
+});
+
+describe('Tracer', () => {
+  it('nests spans under the root and emits a W3C traceparent', async () => {
+    const exported: TraceRecord[] = [];
+    const tracer = new Tracer(t => exported.push(t));
+    const root = tracer.startTrace('chat.turn');
+
+    await tracer.withSpan('llm.call', async (span) => {
+      expect(span?.traceparent()).toMatch(/^00-[0-9a-f]{32}-[0-9a-f]{16}-01$/);
+      expect(tracer.getActiveSpan()).toBe(span);
+    });
+    await expect(tracer.withSpan('chat.post_agents', async () => { throw new Error('boom'); })).rejects.toThrow('boom');
+    tracer.endTrace(root);
+
+    expect(tracer.getActiveSpan()).toBeNull();
+    expect(exported).toHaveLength(1);
+    const [trace] = exported;
+    expect(trace.spans.map(s => s.name).sort()).toEqual(['chat.post_agents', 'chat.turn', 'llm.call']);
+    expect(trace.spans.every(s => s.traceId === root.traceId)).toBe(true);
+    expect(trace.spans.find(s => s.name === 'llm.call')?.parentSpanId).toBe(root.spanId);
+    expect(trace.spans.find(s => s.name === 'chat.post_agents')?.status).toBe('error');
+    expect(formatTrace(trace)).toContain('llm.call');
+  });
+
+  it('runs work untraced when no trace is open', async () => {
+    const tracer = new Tracer();
+    await expect(tracer.withSpan('orphan', async (span) => span)).resolves.toBeNull();
+  });
+});
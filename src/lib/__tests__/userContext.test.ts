@@ -0,0 +1,130 @@
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+
+vi.mock('../supabase', () => {
+  const rpc = vi.fn();
+  const from = vi.fn();
+  const authListeners: Array<(event: string) => void> = [];
+  const auth = { onAuthStateChange: (fn: (event: string) => void) => authListeners.push(fn) };
+  return {
+    getSupabase: () => ({ rpc, from, auth }),
+    __rpc: rpc,
+    __from: from,
+    __authListeners: authListeners
+  };
+});
+
+vi.mock('../auth/isAdmin', () => ({ isAdmin: async () => false }));
+
+import { __rpc as rpcMock, __from as fromMock, __authListeners as authListeners } from '../supabase';
+import { loadUserContext, invalidateUserContext, hasRole, resolveUserContext } from '../userContext';
+import { resolveFeatureFlags, getFeatureFlags } from '../featureFlags';
+import { personaContextFrom } from '../../core/personality/patSystem';
+
+const rpc = rpcMock as unknown as ReturnType<typeof vi.fn>;
+const from = fromMock as unknown as ReturnType<typeof vi.fn>;
+const USER = '11111111-1111-4111-8111-111111111111';
+
+const row = {
+  user_id: USER,
+  profile: { tdee_target: 2200 },
+  preferences: { country_code: 'CA', feature_flags: { swarm_v2_enabled: true } },
+  metrics: { tdee: 2400, protein_g: 160, caloric_goal: 'cut' },
+  account: { name: 'Sam Lee', has_completed_tdee: true, chat_count: 3 },
+  allowed_roles: ['AMA', 'TMWYA'],
+  is_admin: false,
+  is_beta: true
+};
+
+describe('loadUserContext', () => {
+  beforeEach(() => {
+    invalidateUserContext();
+    rpc.mockReset();
+    from.mockReset();
+  });
+
+  it('loads every user row in one RPC and shares it across concurrent callers', async () => {
+    rpc.mockResolvedValue({ data: row, error: null });
+
+    const [a, b, c] = await Promise.all([
+      loadUserContext(USER),
+      loadUserContext(USER),
+      resolveUserContext(USER)
+    ]);
+
+    expect(rpc).toHaveBeenCalledTimes(1);
+    expect(rpc).toHaveBeenCalledWith('get_user_context');
+    expect(a).toBe(b);
+    expect(a).toBe(c);
+    expect(a.countryCode).toBe('ca');
+    expect(hasRole(a, 'TMWYA')).toBe(true);
+    expect(from).not.toHaveBeenCalled();
+  });
+
+  it('reuses the cached context until invalidated', async () => {
+    rpc.mockResolvedValue({ data: row, error: null });
+    await loadUserContext(USER);
+    await loadUserContext(USER);
+    expect(rpc).toHaveBeenCalledTimes(1);
+
+    invalidateUserContext(USER);
+    await loadUserContext(USER);
+    expect(rpc).toHaveBeenCalledTimes(2);
+  });
+
+  it('drops the cache on sign-out', async () => {
+    rpc.mockResolvedValue({ data: row, error: null });
+    await loadUserContext(USER);
+
+    (authListeners as unknown as Array<(event: string) => void>).forEach(fn => fn('SIGNED_OUT'));
+    await loadUserContext(USER);
+    expect(rpc).toHaveBeenCalledTimes(2);
+  });
+
+  it('reads the beta flag from profiles.beta_user when falling back to tables', async () => {
+    rpc.mockImplementation(async (name: string) =>
+      name === 'get_user_context' ? { data: null, error: { message: 'not deployed' } } : { data: [], error: null });
+    const tables: Record<string, unknown> = { profiles: { beta_user: true }, user_profiles: { is_beta: false } };
+    from.mockImplementation((table: string) => ({
+      select: () => ({ eq: () => ({ maybeSingle: async () => ({ data: tables[table] ?? null, error: null }) }) })
+    }));
+
+    const ctx = await loadUserContext(USER);
+
+    expect(ctx.isBeta).toBe(true);
+    expect(from).toHaveBeenCalledWith('profiles');
+  });
+
+  it('prefers a context the caller already holds', async () => {
+    rpc.mockResolvedValue({ data: row, error: null });
+    const ctx = await loadUserContext(USER);
+    rpc.mockClear();
+
+    expect(await resolveUserContext(USER, ctx)).toBe(ctx);
+    expect(rpc).not.toHaveBeenCalled();
+  });
+
+  it('derives feature flags from the context without reading user_preferences', async () => {
+    rpc.mockResolvedValue({ data: row, error: null });
+    const ctx = await loadUserContext(USER);
+
+    const flags = await getFeatureFlags(USER, ctx);
+
+    expect(flags).toEqual(resolveFeatureFlags(USER, row.preferences.feature_flags, false));
+    expect(flags.source).toBe('user_override');
+    expect(from).not.toHaveBeenCalled();
+  });
+
+  it('builds the persona context from the same load', async () => {
+    rpc.mockResolvedValue({ data: row, error: null });
+    const ctx = await loadUserContext(USER);
+
+    expect(personaContextFrom(ctx)).toMatchObject({
+      firstName: 'Sam',
+      isFirstTimeChat: false,
+      hasTDEE: true,
+      fitnessGoal: 'losing weight',
+      chatCount: 3
+    });
+    expect(from).not.toHaveBeenCalled();
+  });
+});
@@ -0,0 +1,269 @@
+/**
+ * Access Rules - compiled role_access + feature flag table
+ *
+ * The rules (which roles are public / beta / admin, flag rollout configs)
+ * are loaded once via the access_rules RPC and compiled into lookup tables,
+ * so role and flag checks are Map lookups with no I/O. A version stamp keeps
+ * the table current: the access_rules realtime topic pushes every bump and
+ * a slow access_rules_version poll covers missed broadcasts. Only a changed
+ * version re-fetches the rules.
+ *
+ * Who the user is (admin / beta) comes from the request's UserContext.
+ */
+
+import type { RealtimeChannel } from '@supabase/supabase-js';
+import { getSupabase } from './supabase';
+import type { RolloutStage } from './roleAccess';
+
+export interface AccessSubject {
+  isAdmin: boolean;
+  isBeta: boolean;
+}
+
+export interface FlagConfig {
+  enabled: boolean;
+  rolloutPercentage?: number;
+  allowedRoles?: string[];
+  allowedUsers?: string[];
+}
+
+export interface CompiledFlag {
+  enabled: boolean;
+  /** null when everyone passes the rollout check */
+  rollout: number | null;
+  roles: Set<string> | null;
+  users: Set<string> | null;
+  /** 31^len and hash of `-<flag>`, to extend a cached user hash */
+  suffixPow: number;
+  suffixHash: number;
+}
+
+export interface CompiledAccessRules {
+  version: number;
+  roleStages: Map<string, RolloutStage>;
+  /** Allowed role names per subject kind, precomputed */
+  allowed: { user: string[]; beta: string[]; admin: string[]; adminBeta: string[] };
+  /** Remote flag configs; flags without a row keep their code defaults */
+  flags: Map<string, FlagConfig>;
+}
+
+interface RawAccessRules {
+  version?: number;
+  roles?: Array<{ role_name: string; stage: RolloutStage; enabled: boolean }>;
+  flags?: Array<{
+    flag: string;
+    enabled: boolean;
+    rollout_percentage: number | null;
+    allowed_roles: string[] | null;
+    allowed_users: string[] | null;
+  }>;
+}
+
+export function compileAccessRules(raw: RawAccessRules | null | undefined): CompiledAccessRules {
+  const roleStages = new Map<string, RolloutStage>();
+  for (const role of raw?.roles ?? []) {
+    if (role.enabled) roleStages.set(role.role_name, role.stage);
+  }
+
+  const names = [...roleStages.keys()].sort();
+  const pick = (subject: AccessSubject) => names.filter(name => stageAllows(roleStages.get(name)!, subject));
+
+  const flags = new Map<string, FlagConfig>();
+  for (const row of raw?.flags ?? []) {
+    flags.set(row.flag, {
+      enabled: row.enabled,
+      rolloutPercentage: row.rollout_percentage ?? undefined,
+      allowedRoles: row.allowed_roles ?? undefined,
+      allowedUsers: row.allowed_users ?? undefined
+    });
+  }
+
+  return {
+    version: Number(raw?.version) || 0,
+    roleStages,
+    allowed: {
+      user: pick({ isAdmin: false, isBeta: false }),
+      beta: pick({ isAdmin: false, isBeta: true }),
+      admin: pick({ isAdmin: true, isBeta: false }),
+      adminBeta: pick({ isAdmin: true, isBeta: true })
+    },
+    flags
+  };
+}
+
+function stageAllows(stage: RolloutStage, subject: AccessSubject): boolean {
+  return stage === 'public' || (stage === 'beta' && subject.isBeta) || (stage === 'admin' && subject.isAdmin);
+}
+
+/** Same rules as the allowed_roles() RPC */
+export function isRoleAllowed(roleName: string, subject: AccessSubject, rules = current): boolean {
+  const stage = rules.roleStages.get(roleName);
+  return stage !== undefined && stageAllows(stage, subject);
+}
+
+export function allowedRolesFor(subject: AccessSubject, rules = current): string[] {
+  const { allowed } = rules;
+  if (subject.isAdmin) return subject.isBeta ? allowed.adminBeta : allowed.admin;
+  return subject.isBeta ? allowed.beta : allowed.user;
+}
+
+// ---- Feature flags ----
+
+export function compileFlag(flag: string, config: FlagConfig): CompiledFlag {
+  const suffix = `-${flag}`;
+  let suffixPow = 1;
+  let suffixHash = 0;
+  for (let i = 0; i < suffix.length; i++) {
+    suffixPow = Math.imul(suffixPow, 31);
+    suffixHash = (Math.imul(suffixHash, 31) + suffix.charCodeAt(i)) | 0;
+  }
+  return {
+    enabled: config.enabled,
+    rollout: config.rolloutPercentage !== undefined && config.rolloutPercentage < 100 ? config.rolloutPercentage : null,
+    roles: config.allowedRoles ? new Set(config.allowedRoles) : null,
+    users: config.allowedUsers ? new Set(config.allowedUsers) : null,
+    suffixPow,
+    suffixHash
+  };
+}
+
+const USER_HASH_MAX = 1000;
+const userHashes = new Map<string, number>();
+
+/**
+ * 32-bit rolling hash of the user id (h = h * 31 + c), memoized so each
+ * user is hashed once rather than on every rollout check
+ */
+export function userHash(userId: string): number {
+  let hash = userHashes.get(userId);
+  if (hash !== undefined) return hash;
+  hash = 0;
+  for (let i = 0; i < userId.length; i++) {
+    hash = (Math.imul(hash, 31) + userId.charCodeAt(i)) | 0;
+  }
+  if (userHashes.size >= USER_HASH_MAX) userHashes.clear();
+  userHashes.set(userId, hash);
+  return hash;
+}
+
+/**
+ * Rollout bucket 0-99 for `${userId}-${flag}`, identical to hashing the
+ * whole string, from the cached user hash and the flag's precomputed suffix
+ */
+export function flagBucket(compiled: CompiledFlag, userId: string): number {
+  const hash = (Math.imul(userHash(userId), compiled.suffixPow) + compiled.suffixHash) | 0;
+  return Math.abs(hash % 100);
+}
+
+export function evaluateFlag(
+  compiled: CompiledFlag | undefined,
+  context?: { userId?: string; userRole?: string }
+): boolean {
+  if (!compiled || !compiled.enabled) return false;
+  if (context?.userRole && compiled.roles && !compiled.roles.has(context.userRole)) return false;
+  if (context?.userId && compiled.users && !compiled.users.has(context.userId)) return false;
+  if (compiled.rollout !== null) {
+    const bucket = context?.userId ? flagBucket(compiled, context.userId) : Math.random() * 100;
+    return bucket < compiled.rollout;
+  }
+  return true;
+}
+
+// ---- Live table ----
+
+let current: CompiledAccessRules = compileAccessRules(null);
+let refreshing: Promise<CompiledAccessRules> | null = null;
+const listeners = new Set<(rules: CompiledAccessRules) => void>();
+
+export function getAccessRules(): CompiledAccessRules {
+  return current;
+}
+
+/** False until the first access_rules load (callers fall back to their own data) */
+export function accessRulesLoaded(): boolean {
+  return current.version > 0;
+}
+
+export function onAccessRulesChange(listener: (rules: CompiledAccessRules) => void): () => void {
+  listeners.add(listener);
+  return () => listeners.delete(listener);
+}
+
+export function setAccessRules(rules: CompiledAccessRules): void {
+  current = rules;
+  listeners.forEach(listener => listener(rules));
+}
+
+/**
+ * Re-fetch the rules if their version moved (or when forced). Concurrent
+ * calls share one refresh; failures keep the current table.
+ */
+export function refreshAccessRules(options: { force?: boolean; knownVersion?: number } = {}): Promise<CompiledAccessRules> {
+  if (refreshing) return refreshing;
+  refreshing = (async () => {
+    const supabase = getSupabase();
+    try {
+      if (!options.force && current.version > 0) {
+        const version = options.knownVersion ?? (await supabase.rpc('access_rules_version')).data;
+        if (version == null || Number(version) === current.version) return current;
+      }
+      const { data, error } = await supabase.rpc('access_rules');
+      if (error || !data) {
+        console.warn('[accessRules] access_rules failed, keeping current rules:', error?.message);
+        return current;
+      }
+      const rules = compileAccessRules(data);
+      if (rules.version !== current.version) {
+        setAccessRules(rules);
+        console.log(`[accessRules] Loaded rules v${rules.version}`);
+      }
+      return current;
+    } catch (err) {
+      console.warn('[accessRules] refresh failed, keeping current rules:', err);
+      return current;
+    } finally {
+      refreshing = null;
+    }
+  })();
+  return refreshing;
+}
+
+const POLL_MS = 5 * 60_000;
+
+let channel: RealtimeChannel | null = null;
+let pollTimer: ReturnType<typeof setInterval> | null = null;
+
+/**
+ * Load the rules and keep them current for the app session. Idempotent.
+ */
+export function startAccessRulesSync(options: { pollMs?: number } = {}): void {
+  if (channel || pollTimer) return;
+  const supabase = getSupabase();
+
+  refreshAccessRules({ force: true });
+  pollTimer = setInterval(() => refreshAccessRules(), options.pollMs ?? POLL_MS);
+
+  channel = supabase
+    .channel('access_rules')
+    .on('broadcast', { event: 'version' }, ({ payload }) => {
+      const version = Number(payload?.version);
+      if (Number.isFinite(version) && version !== current.version) {
+        refreshAccessRules({ knownVersion: version });
+      }
+    })
+    .subscribe((status) => {
+      if (status === 'SUBSCRIBED') {
+        // Catch anything broadcast before we joined
+        refreshAccessRules();
+      }
+    });
+}
+
+export async function stopAccessRulesSync(): Promise<void> {
+  if (pollTimer) clearInterval(pollTimer);
+  pollTimer = null;
+  if (!channel) return;
+  const active = channel;
+  channel = null;
+  await getSupabase().removeChannel(active);
+}
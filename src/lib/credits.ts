@@ -1,4 +1,5 @@
 import { supabase } from './supabase';
+import { getCreditMeter } from './credits/meter';
 
 export interface TokenWallet {
   user_id: string;
@@ -33,8 +34,13 @@ export async function getUserCredits(userId: string): Promise<UserCredits | null
     console.error('[credits] Error fetching user credits:', error);
     return null;
   }
+  if (!data) return data;
 
-  return data;
+  // Usage recorded by the meter but not settled yet
+  const pending = getCreditMeter().pendingUsd(userId);
+  return pending > 0 && !data.is_unlimited
+    ? { ...data, balance_usd: data.balance_usd - pending, month_delta_usd: data.month_delta_usd - pending }
+    : data;
 }
 
 export async function addCredits(amountUsd: number, reason: string): Promise<number> {
@@ -50,20 +56,20 @@ export async function addCredits(amountUsd: number, reason: string): Promise<num
   return data as number;
 }
 
+/**
+ * Charge the signed-in user through the credit meter: recorded against the
+ * session's reservation and settled in the background. Resolves to the
+ * estimated balance; throws INSUFFICIENT_CREDITS when nothing can be reserved.
+ */
 export async function spendCredits(amountUsd: number, reason: string): Promise<number> {
-  const { data, error } = await supabase.rpc('spend_credits', {
-    p_amount_usd: amountUsd,
-    p_reason: reason
-  });
-
-  if (error) {
-    if (error.message?.includes('Insufficient credits')) {
-      throw new Error('INSUFFICIENT_CREDITS');
-    }
-    throw new Error(`Failed to spend credits: ${error.message}`);
+  const { data: { session } } = await supabase.auth.getSession(); // local, no round trip
+  const user = session?.user;
+  if (!user) {
+    throw new Error('Failed to spend credits: Not authenticated');
   }
 
-  return data as number;
+  const result = await getCreditMeter().charge(user.id, amountUsd, reason);
+  return result.balanceUsd ?? 0;
 }
 
 export async function getTransactionHistory(userId: string, limit = 50): Promise<TokenTransaction[]> {
@@ -0,0 +1,508 @@
+/**
+ * Credit Meter
+ * Keeps billing off the request path. Per session the meter reserves a
+ * credit budget (reserve_credits RPC), records each charge against it in an
+ * append-only local ledger with no I/O, and settles the ledger in batches
+ * (settle_credit_usage RPC). See
+ * supabase/migrations/20251108050000_credit_reservations.sql.
+ *
+ * - No overspend: a charge the reservation cannot cover reserves more
+ *   first (one round trip per budget, usually prefetched in the
+ *   background). If the server grants nothing, the charge fails with
+ *   INSUFFICIENT_CREDITS.
+ * - Each ledger entry carries a client-generated idempotency key, so a
+ *   settle retried after a lost response never charges twice. On start,
+ *   reconcile() drops entries token_transactions already has.
+ * - Failed settles keep the entries and back off; settling resumes on
+ *   `online`, when the tab is hidden, and on the next charge.
+ * - Tabs share the ledger. Each meter is a session that owns only its own
+ *   reservation and heartbeats while it lives; start() releases the
+ *   reservations of sessions that are gone, never a live tab's. Storage
+ *   re-reads the shared state before every change, so tabs never overwrite
+ *   each other's entries.
+ * - A settle only covers the signed-in user's entries and reservations;
+ *   another account's usage in the same browser waits for that account.
+ *   A reservation that fails to settle does not hold up the others.
+ */
+
+import { getSupabase } from '../supabase';
+
+export interface LedgerEntry {
+  key: string;
+  userId: string;
+  reservationId: string;
+  amountUsd: number;
+  reason: string;
+  at: number;
+}
+
+export interface Reservation {
+  id: string;
+  userId: string;
+  sessionId: string;
+  grantedUsd: number;
+  usedUsd: number;
+  unlimited: boolean;
+  expiresAt: number;
+}
+
+export interface LedgerStorage {
+  entries: () => LedgerEntry[];
+  append: (entry: LedgerEntry) => void;
+  remove: (keys: string[]) => void;
+  /** Active reservation per session (one per tab) */
+  reservations: () => Reservation[];
+  reservation: (sessionId: string) => Reservation | null;
+  saveReservation: (sessionId: string, reservation: Reservation | null) => void;
+  /** Replaced reservations whose unused hold still has to be released */
+  closing: () => Reservation[];
+  /** Add to the closing list (re-read first, so concurrent adds survive) */
+  addClosing: (reservations: Reservation[]) => void;
+  removeClosing: (ids: string[]) => void;
+  /** Last heartbeat per live session */
+  sessions: () => Record<string, number>;
+  touchSession: (sessionId: string, at: number) => void;
+  endSession: (sessionId: string) => void;
+}
+
+export interface ChargeResult {
+  ok: true;
+  /** Server balance minus unsettled local usage */
+  balanceUsd: number | null;
+  unlimited: boolean;
+}
+
+type Rpc = (name: string, params: Record<string, unknown>) => Promise<{ data: any; error: { message: string } | null }>;
+
+interface MeterOptions {
+  storage: LedgerStorage;
+  rpc: Rpc;
+  /** This tab's session; it only ever spends and replaces its own reservation */
+  sessionId?: string;
+  /** Credit held per reservation */
+  budgetUsd?: number;
+  /** Debounce before settling, so a turn's charges share one batch */
+  flushDelayMs?: number;
+  /** Settle at once when this many entries are pending */
+  maxPendingEntries?: number;
+  baseBackoffMs?: number;
+  maxBackoffMs?: number;
+  now?: () => number;
+  newId?: () => string;
+}
+
+const DEFAULT_BUDGET_USD = 0.25;
+const DEFAULT_FLUSH_DELAY_MS = 5_000;
+const DEFAULT_MAX_PENDING = 20;
+const DEFAULT_BASE_BACKOFF_MS = 2_000;
+const DEFAULT_MAX_BACKOFF_MS = 5 * 60_000;
+/** Treat a reservation as gone this long before it expires server-side */
+const EXPIRY_MARGIN_MS = 60_000;
+/** Heartbeat interval; background tabs may be throttled to once a minute */
+const SESSION_HEARTBEAT_MS = 30_000;
+/** A session with no heartbeat for this long is gone and its reservation is released */
+const SESSION_STALE_MS = 5 * 60_000;
+/** Float slack when comparing dollar sums */
+const EPSILON = 1e-9;
+
+export function createCreditMeter(options: MeterOptions) {
+  const {
+    storage,
+    rpc,
+    budgetUsd = DEFAULT_BUDGET_USD,
+    flushDelayMs = DEFAULT_FLUSH_DELAY_MS,
+    maxPendingEntries = DEFAULT_MAX_PENDING,
+    baseBackoffMs = DEFAULT_BASE_BACKOFF_MS,
+    maxBackoffMs = DEFAULT_MAX_BACKOFF_MS,
+    now = Date.now,
+    newId = () => crypto.randomUUID()
+  } = options;
+  const sessionId = options.sessionId ?? newId();
+
+  let serverBalance: number | null = null;
+  /** Last user this session charged or started for; scheduled settles are for them */
+  let activeUserId: string | null = null;
+  let failures = 0;
+  const flushing = new Map<string, Promise<void>>();
+  let timer: ReturnType<typeof setTimeout> | null = null;
+  let heartbeat: ReturnType<typeof setInterval> | null = null;
+  const reserving = new Map<string, Promise<Reservation>>();
+  const prefetched = new Map<string, Promise<Reservation | null>>();
+
+  const schedule = (delayMs: number) => {
+    if (timer !== null) return;
+    timer = setTimeout(() => {
+      timer = null;
+      flush().catch(err => console.error('[credits] settle failed:', err));
+    }, Math.max(0, delayMs));
+  };
+
+  const pendingFor = (userId: string) => storage.entries().filter(e => e.userId === userId);
+
+  function pendingUsd(userId: string): number {
+    return pendingFor(userId).reduce((sum, e) => sum + e.amountUsd, 0);
+  }
+
+  function estimatedBalance(userId: string): number | null {
+    return serverBalance === null ? null : serverBalance - pendingUsd(userId);
+  }
+
+  const usable = (r: Reservation | null, amountUsd: number): r is Reservation =>
+    !!r && r.expiresAt - EXPIRY_MARGIN_MS > now() && (r.unlimited || r.usedUsd + amountUsd <= r.grantedUsd + EPSILON);
+
+  async function requestReservation(userId: string, amountUsd: number): Promise<Reservation> {
+    const id = newId();
+    const { data, error } = await rpc('reserve_credits', {
+      p_reservation_id: id,
+      p_session_id: sessionId,
+      p_amount_usd: Math.max(budgetUsd, amountUsd)
+    });
+    if (error) {
+      throw new Error(error.message?.includes('Insufficient credits') ? 'INSUFFICIENT_CREDITS' : `Failed to reserve credits: ${error.message}`);
+    }
+    serverBalance = Number(data?.balance_usd ?? 0);
+    return {
+      id,
+      userId,
+      sessionId,
+      grantedUsd: Number(data?.granted_usd ?? 0),
+      usedUsd: 0,
+      unlimited: data?.unlimited === true,
+      expiresAt: data?.expires_at ? Date.parse(data.expires_at) : now() + 2 * 3_600_000
+    };
+  }
+
+  /** This session's reservation for the user, if it still holds one */
+  const current = (userId: string): Reservation | null => {
+    const r = storage.reservation(sessionId);
+    return r && r.userId === userId ? r : null;
+  };
+
+  /** Make `next` this session's reservation; the old one is released on the next settle */
+  function activate(next: Reservation) {
+    const previous = storage.reservation(sessionId);
+    if (previous && previous.id !== next.id) {
+      storage.addClosing([previous]);
+      schedule(0);
+    }
+    storage.saveReservation(sessionId, next);
+  }
+
+  /** A reservation that covers amountUsd, reserving (once per user at a time) if needed */
+  async function reservationFor(userId: string, amountUsd: number): Promise<Reservation> {
+    const existing = current(userId);
+    if (usable(existing, amountUsd)) return existing;
+
+    const early = prefetched.get(userId);
+    if (early) {
+      prefetched.delete(userId);
+      const next = await early;
+      if (next) activate(next);
+      if (usable(next, amountUsd)) return next;
+    }
+
+    let pending = reserving.get(userId);
+    if (!pending) {
+      pending = requestReservation(userId, amountUsd)
+        .then(next => {
+          activate(next);
+          return next;
+        })
+        .finally(() => reserving.delete(userId));
+      reserving.set(userId, pending);
+    }
+    const next = await pending;
+    if (!usable(next, amountUsd)) throw new Error('INSUFFICIENT_CREDITS');
+    return next;
+  }
+
+  /** Reserve the next budget in the background once a quarter of the current one is left */
+  function prefetchIfLow(r: Reservation) {
+    if (r.unlimited || prefetched.has(r.userId)) return;
+    if (r.grantedUsd - r.usedUsd > r.grantedUsd * 0.25) return;
+    const next = requestReservation(r.userId, budgetUsd).catch(err => {
+      console.warn('[credits] background reservation failed:', err?.message || err);
+      return null;
+    });
+    prefetched.set(r.userId, next);
+  }
+
+  /**
+   * Record a charge. Resolves without I/O while the session's reservation
+   * covers it; throws INSUFFICIENT_CREDITS when the server will not.
+   */
+  async function charge(userId: string, amountUsd: number, reason: string): Promise<ChargeResult> {
+    activeUserId = userId;
+    if (!(amountUsd > 0)) {
+      return { ok: true, balanceUsd: estimatedBalance(userId), unlimited: current(userId)?.unlimited ?? false };
+    }
+
+    // Re-read after the await: a concurrent charge may have used the headroom
+    let reservation = await reservationFor(userId, amountUsd);
+    while (current(userId)?.id !== reservation.id || !usable(current(userId), amountUsd)) {
+      reservation = await reservationFor(userId, amountUsd);
+    }
+    reservation = current(userId)!;
+
+    storage.append({ key: newId(), userId, reservationId: reservation.id, amountUsd, reason, at: now() });
+    const updated = { ...reservation, usedUsd: reservation.usedUsd + amountUsd };
+    storage.saveReservation(sessionId, updated);
+    storage.touchSession(sessionId, now());
+
+    prefetchIfLow(updated);
+    schedule(pendingFor(userId).length >= maxPendingEntries ? 0 : flushDelayMs);
+
+    return { ok: true, balanceUsd: updated.unlimited ? serverBalance : estimatedBalance(userId), unlimited: updated.unlimited };
+  }
+
+  async function runFlush(userId: string): Promise<void> {
+    // settle_credit_usage only accepts the caller's own reservations, so
+    // another account's usage in the shared ledger is left for that account
+    const closing = new Set(storage.closing().filter(r => r.userId === userId).map(r => r.id));
+    const groups = new Map<string, LedgerEntry[]>();
+    for (const id of closing) groups.set(id, []);
+    for (const entry of pendingFor(userId)) {
+      const group = groups.get(entry.reservationId) ?? [];
+      group.push(entry);
+      groups.set(entry.reservationId, group);
+    }
+
+    let failed = 0;
+    for (const [reservationId, group] of groups) {
+      const close = closing.has(reservationId);
+      const { data, error } = await rpc('settle_credit_usage', {
+        p_reservation_id: reservationId,
+        p_entries: group.map(e => ({
+          key: e.key,
+          amount_usd: e.amountUsd,
+          reason: e.reason,
+          at: new Date(e.at).toISOString()
+        })),
+        p_close: close
+      });
+
+      if (error) {
+        // Keep going: one bad reservation must not hold up the others
+        failed++;
+        console.warn(`[credits] settle of ${group.length} entries for ${reservationId} failed:`, error.message);
+        continue;
+      }
+
+      serverBalance = Number(data?.balance_usd ?? serverBalance ?? 0);
+      const done = new Set<string>([...(data?.applied ?? []), ...(data?.duplicates ?? [])]);
+      storage.remove(group.filter(e => done.has(e.key)).map(e => e.key));
+      if (close) storage.removeClosing([reservationId]);
+    }
+
+    if (failed > 0) {
+      failures++;
+      const delayMs = Math.min(maxBackoffMs, baseBackoffMs * 2 ** (failures - 1));
+      console.warn(`[credits] ${failed} of ${groups.size} settles failed, retrying in ${delayMs}ms`);
+      schedule(delayMs);
+    } else {
+      failures = 0;
+    }
+  }
+
+  /**
+   * Settle everything recorded so far for a user (the active one by
+   * default). Concurrent calls for the same user share one run.
+   */
+  function flush(userId: string | null = activeUserId): Promise<void> {
+    if (timer !== null) {
+      clearTimeout(timer);
+      timer = null;
+    }
+    if (!userId) return Promise.resolve();
+    let run = flushing.get(userId);
+    if (!run) {
+      run = runFlush(userId).finally(() => {
+        flushing.delete(userId);
+      });
+      flushing.set(userId, run);
+    }
+    return run;
+  }
+
+  /**
+   * Drop ledger entries token_transactions already holds (a settle whose
+   * response was lost), then settle the rest
+   */
+  async function reconcile(userId: string): Promise<void> {
+    const keys = pendingFor(userId).map(e => e.key);
+    if (keys.length > 0) {
+      const { data, error } = await rpc('reconcile_credit_usage', { p_keys: keys });
+      if (error) {
+        console.warn('[credits] reconcile failed:', error.message);
+      } else if (Array.isArray(data) && data.length > 0) {
+        storage.remove(data);
+        console.log(`[credits] reconciled ${data.length} already-settled entries`);
+      }
+    }
+    await flush(userId);
+  }
+
+  /**
+   * Begin this session: heartbeat while it lives, release the holds of the
+   * user's sessions that are gone (closed tabs, reloads), settle their usage
+   */
+  async function start(userId: string): Promise<void> {
+    activeUserId = userId;
+    resume();
+
+    const sessions = storage.sessions();
+    const isGone = (id: string) => id !== sessionId && !(now() - (sessions[id] ?? 0) < SESSION_STALE_MS);
+    const gone = storage.reservations().filter(r => r.userId === userId && isGone(r.sessionId));
+    for (const r of gone) storage.saveReservation(r.sessionId, null);
+    storage.addClosing(gone);
+    for (const id of Object.keys(sessions)) {
+      if (isGone(id)) storage.endSession(id);
+    }
+    await reconcile(userId);
+  }
+
+  /** The tab is going away: let the next start() release this session's hold */
+  function end(): void {
+    if (heartbeat !== null) {
+      clearInterval(heartbeat);
+      heartbeat = null;
+    }
+    storage.endSession(sessionId);
+  }
+
+  /** Heartbeat this session (also after a bfcache restore) */
+  function resume(): void {
+    storage.touchSession(sessionId, now());
+    if (heartbeat === null && typeof setInterval !== 'undefined') {
+      heartbeat = setInterval(() => storage.touchSession(sessionId, now()), SESSION_HEARTBEAT_MS);
+    }
+  }
+
+  return { charge, flush, reconcile, start, end, resume, pendingUsd, estimatedBalance };
+}
+
+export type CreditMeter = ReturnType<typeof createCreditMeter>;
+
+// ---------------------------------------------------------------------------
+// Storage
+// ---------------------------------------------------------------------------
+
+const LEDGER_KEY = 'hipat-credit-ledger';
+
+interface LedgerState {
+  entries: LedgerEntry[];
+  /** Keyed by session id */
+  reservations: Record<string, Reservation>;
+  closing: Reservation[];
+  sessions: Record<string, number>;
+}
+
+const emptyState = (): LedgerState => ({ entries: [], reservations: {}, closing: [], sessions: {} });
+
+/**
+ * Synchronous so charge() never awaits storage. Every read and change goes
+ * to the store, so other tabs' entries and reservations are never lost to a
+ * stale in-memory copy. Falls back to memory when localStorage is
+ * unavailable (private mode, tests).
+ */
+export function createLocalLedgerStorage(store: Pick<Storage, 'getItem' | 'setItem'> | null = typeof localStorage === 'undefined' ? null : localStorage): LedgerStorage {
+  let memory = emptyState();
+
+  const read = (): LedgerState => {
+    if (!store) return memory;
+    try {
+      const raw = store.getItem(LEDGER_KEY);
+      if (!raw) return emptyState();
+      const parsed = JSON.parse(raw);
+      // Ledgers written before reservations were per session are keyed by user
+      const reservations = Object.fromEntries(
+        Object.values<Reservation>(parsed.reservations ?? {})
+          .map(r => [r.sessionId ?? `legacy:${r.userId}`, { ...r, sessionId: r.sessionId ?? `legacy:${r.userId}` }])
+      );
+      // Older ledgers kept closing ids only; with no owner to settle them
+      // under, those holds are left to expire server-side
+      const closing = (parsed.closing ?? []).filter((r: unknown) => typeof r === 'object' && r !== null);
+      return { ...emptyState(), ...parsed, reservations, closing };
+    } catch (err) {
+      console.warn('[credits] could not read the ledger, starting empty:', err);
+      return emptyState();
+    }
+  };
+
+  /** Read-modify-write against the stored state, never a cached copy */
+  const update = (change: (state: LedgerState) => LedgerState) => {
+    const next = change(read());
+    if (!store) {
+      memory = next;
+      return;
+    }
+    try {
+      store.setItem(LEDGER_KEY, JSON.stringify(next));
+    } catch (err) {
+      console.warn('[credits] could not persist the ledger:', err);
+    }
+  };
+
+  return {
+    entries: () => read().entries,
+    append: (entry) => update(state => ({ ...state, entries: [...state.entries, entry] })),
+    remove: (keys) => {
+      if (keys.length === 0) return;
+      const drop = new Set(keys);
+      update(state => ({ ...state, entries: state.entries.filter(e => !drop.has(e.key)) }));
+    },
+    reservations: () => Object.values(read().reservations),
+    reservation: (sessionId) => read().reservations[sessionId] ?? null,
+    saveReservation: (sessionId, reservation) => update(state => {
+      const { [sessionId]: _, ...rest } = state.reservations;
+      return { ...state, reservations: reservation ? { ...rest, [sessionId]: reservation } : rest };
+    }),
+    closing: () => read().closing,
+    addClosing: (reservations) => {
+      if (reservations.length === 0) return;
+      update(state => {
+        const known = new Set(state.closing.map(r => r.id));
+        return { ...state, closing: [...state.closing, ...reservations.filter(r => !known.has(r.id))] };
+      });
+    },
+    removeClosing: (ids) => {
+      const drop = new Set(ids);
+      update(state => ({ ...state, closing: state.closing.filter(r => !drop.has(r.id)) }));
+    },
+    sessions: () => read().sessions,
+    touchSession: (sessionId, at) => update(state => ({ ...state, sessions: { ...state.sessions, [sessionId]: at } })),
+    endSession: (sessionId) => update(state => {
+      const { [sessionId]: _, ...rest } = state.sessions;
+      return { ...state, sessions: rest };
+    })
+  };
+}
+
+let meter: CreditMeter | null = null;
+let listenersAttached = false;
+
+export function getCreditMeter(): CreditMeter {
+  if (!meter) {
+    meter = createCreditMeter({
+      storage: createLocalLedgerStorage(),
+      rpc: (name, params) => getSupabase().rpc(name, params) as any,
+      sessionId: crypto.randomUUID()
+    });
+  }
+  if (!listenersAttached && typeof window !== 'undefined') {
+    listenersAttached = true;
+    const settle = () => meter!.flush().catch(err => console.error('[credits] settle failed:', err));
+    window.addEventListener('online', settle);
+    window.addEventListener('pagehide', () => {
+      meter!.end();
+      settle();
+    });
+    window.addEventListener('pageshow', (event) => {
+      if (event.persisted) meter!.resume();
+    });
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') settle();
+    });
+  }
+  return meter;
+}
@@ -1,35 +1,22 @@
 import { supabase } from '@/lib/supabase';
+import { getCreditMeter } from './meter';
+
+let lowCreditAnnounced = false;
 
 export async function spendCredits(amount: number, reason: string): Promise<void> {
   try {
-    // Check if user has unlimited plan first
-    const { data: credits } = await supabase
-      .from('v_user_credits')
-      .select('is_unlimited, balance_usd, plan')
-      .maybeSingle();
-
-    // Short-circuit: unlimited users don't spend or get warnings
-    if (credits?.is_unlimited) {
-      console.log('[spendCredits] User has unlimited plan, skipping deduction');
-      return;
-    }
+    const { data: { session } } = await supabase.auth.getSession(); // local, no round trip
+    const user = session?.user;
+    if (!user) return;
 
-    const { error } = await supabase.rpc('spend_credits', {
-      amount,
-      reason
-    });
-
-    if (error) {
-      console.error('Failed to spend credits:', error);
-      return;
-    }
+    // Recorded against the session's reservation; settled in the background
+    const { balanceUsd, unlimited } = await getCreditMeter().charge(user.id, amount, reason);
 
-    const { data: balance } = await supabase
-      .from('v_user_credits')
-      .select('balance_usd')
-      .maybeSingle();
+    // Short-circuit: unlimited users don't get warnings
+    if (unlimited) return;
 
-    if (balance && balance.balance_usd < 0.20) {
+    if (!lowCreditAnnounced && balanceUsd !== null && balanceUsd < 0.20) {
+      lowCreditAnnounced = true;
       await createLowCreditAnnouncement();
     }
   } catch (err) {
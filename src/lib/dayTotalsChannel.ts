@@ -0,0 +1,126 @@
+/**
+ * Day Totals Realtime Channel
+ *
+ * Subscribes to the private `day_totals:<userId>` broadcast topic fed by the
+ * meal_items / meal_logs triggers and applies each delta to the shared
+ * useDayTotalsStore. One subscription per signed-in user lives for the whole
+ * app session so the dashboard never has to refetch meals on remount.
+ */
+
+import type { RealtimeChannel } from '@supabase/supabase-js';
+import { getSupabase } from './supabase';
+import { useDayTotalsStore, type DayTotalsDelta } from '../store/dayTotals';
+
+let activeChannel: RealtimeChannel | null = null;
+let activeUserId: string | null = null;
+let authListenerAttached = false;
+let retryTimer: ReturnType<typeof setTimeout> | null = null;
+let retryAttempt = 0;
+
+const RETRY_BASE_MS = 1_000;
+const RETRY_MAX_MS = 30_000;
+
+/**
+ * Ensure the current user is subscribed. Idempotent: repeated calls for the
+ * same user reuse the open (or opening) channel.
+ */
+export async function ensureDayTotalsSubscription(userId: string): Promise<void> {
+  if (!userId) return;
+  if (activeUserId === userId) return;
+
+  // Claim the slot before the first await so concurrent callers don't double-subscribe
+  activeUserId = userId;
+  retryAttempt = 0;
+  await closeChannel();
+
+  const supabase = getSupabase();
+
+  if (!authListenerAttached) {
+    authListenerAttached = true;
+    supabase.auth.onAuthStateChange((event) => {
+      if (event === 'SIGNED_OUT') {
+        stopDayTotalsSubscription().finally(() => useDayTotalsStore.getState().reset());
+      }
+    });
+  }
+
+  const store = useDayTotalsStore.getState();
+  if (store.userId && store.userId !== userId) {
+    store.reset();
+  }
+
+  try {
+    await openChannel(userId);
+  } catch (err) {
+    // Keep the slot claimed and retry rather than leaving the user unsubscribed
+    console.warn('[day-totals] Subscribe failed', err);
+    scheduleResubscribe(userId);
+  }
+}
+
+async function openChannel(userId: string): Promise<void> {
+  const supabase = getSupabase();
+
+  // Private channels authorize with the user's JWT (RLS on realtime.messages)
+  await supabase.realtime.setAuth();
+  // Superseded by a sign-out or another user while awaiting
+  if (activeUserId !== userId || activeChannel) return;
+
+  const channel = supabase
+    .channel(`day_totals:${userId}`, { config: { private: true } })
+    .on('broadcast', { event: 'delta' }, ({ payload }) => {
+      useDayTotalsStore.getState().applyDelta(payload as DayTotalsDelta);
+    });
+  activeChannel = channel;
+
+  channel.subscribe((status) => {
+    // Ignore status from a channel we already replaced or removed
+    if (activeChannel !== channel) return;
+    const state = useDayTotalsStore.getState();
+    if (status === 'SUBSCRIBED') {
+      retryAttempt = 0;
+      state.setLive(true);
+      console.log(`[day-totals] Subscribed to day_totals:${userId}`);
+    } else if (status === 'CHANNEL_ERROR' || status === 'TIMED_OUT' || status === 'CLOSED') {
+      // Deltas may have been missed; next dashboard mount re-seeds from the DB
+      state.invalidate();
+      console.warn(`[day-totals] Channel ${status}, totals marked stale; resubscribing`);
+      scheduleResubscribe(userId);
+    }
+  });
+}
+
+/** Replace a dead channel with exponential backoff (1s, 2s, 4s ... 30s) */
+function scheduleResubscribe(userId: string): void {
+  if (retryTimer) return;
+  const delay = Math.min(RETRY_MAX_MS, RETRY_BASE_MS * 2 ** retryAttempt);
+  retryAttempt++;
+  retryTimer = setTimeout(() => {
+    retryTimer = null;
+    if (activeUserId !== userId) return;
+    closeChannel()
+      .then(() => openChannel(userId))
+      .catch((err) => {
+        console.warn('[day-totals] Resubscribe failed', err);
+        scheduleResubscribe(userId);
+      });
+  }, delay);
+}
+
+async function closeChannel(): Promise<void> {
+  if (retryTimer) {
+    clearTimeout(retryTimer);
+    retryTimer = null;
+  }
+  if (!activeChannel) return;
+  const channel = activeChannel;
+  activeChannel = null;
+  useDayTotalsStore.getState().setLive(false);
+  await getSupabase().removeChannel(channel);
+}
+
+export async function stopDayTotalsSubscription(): Promise<void> {
+  activeUserId = null;
+  retryAttempt = 0;
+  await closeChannel();
+}
@@ -6,7 +6,8 @@
  */
 
 import { getSupabase } from './supabase';
-import { isAdmin } from './auth/isAdmin';
+import { userHash } from './accessRules';
+import { invalidateUserContext, loadUserContext, type UserContext } from './userContext';
 
 export interface FeatureFlags {
   swarm_v2_enabled: boolean;
@@ -19,30 +20,35 @@ export interface FeatureFlags {
 }
 
 /**
- * Get feature flags for a user
+ * Get feature flags for a user. Pass the request's UserContext to reuse the
+ * rows it already loaded; otherwise the cached context is used, so repeat
+ * calls within its TTL do no I/O.
  */
-export async function getFeatureFlags(userId: string): Promise<FeatureFlags> {
-  const supabase = getSupabase();
+export async function getFeatureFlags(userId: string, ctx?: UserContext): Promise<FeatureFlags> {
+  // Layer 0 (admin status) and layer 1 (user_preferences.feature_flags override)
+  const userContext = ctx && ctx.userId === userId ? ctx : await loadUserContext(userId);
+  return resolveFeatureFlags(userId, userContext.preferences?.feature_flags, userContext.isAdmin);
+}
 
-  // Layer 0: Check admin status first
-  const userIsAdmin = await isAdmin();
+// Build-time settings, read once
+const isDev = import.meta.env.MODE !== 'production';
+const devOverride = isDev && import.meta.env.VITE_SWARMS_V2_ADMIN === 'true';
+const rolloutPct = parseInt(import.meta.env.VITE_SWARM_V2_ROLLOUT_PCT || '0', 10);
 
+/**
+ * Flags from already-loaded inputs (no I/O)
+ */
+export function resolveFeatureFlags(
+  userId: string,
+  overrides: Record<string, any> | null | undefined,
+  userIsAdmin: boolean
+): FeatureFlags {
   // In dev mode, also check for VITE_SWARMS_V2_ADMIN override
-  const isDev = import.meta.env.MODE !== 'production';
-  const devOverride = isDev && import.meta.env.VITE_SWARMS_V2_ADMIN === 'true';
-
   const swarmsV2AdminEnabled = userIsAdmin || devOverride;
 
-  // Layer 1: Check user_preferences.feature_flags for per-user override
-  const { data: userPrefs } = await supabase
-    .from('user_preferences')
-    .select('feature_flags')
-    .eq('user_id', userId)
-    .maybeSingle();
-
-  if (userPrefs?.feature_flags?.swarm_v2_enabled !== undefined) {
+  if (overrides?.swarm_v2_enabled !== undefined) {
     return {
-      swarm_v2_enabled: userPrefs.feature_flags.swarm_v2_enabled,
+      swarm_v2_enabled: overrides.swarm_v2_enabled,
       swarm_v2_rollout_pct: 100,
       swarmsV2Admin: swarmsV2AdminEnabled,
       personaDefaultRouter: true, // Always enabled - core AMA functionality
@@ -53,11 +59,8 @@ export async function getFeatureFlags(userId: string): Promise<FeatureFlags> {
   }
 
   // Layer 2: Global rollout percentage (from environment variable)
-  const rolloutPct = parseInt(import.meta.env.VITE_SWARM_V2_ROLLOUT_PCT || '0', 10);
-
   // Deterministic assignment based on userId hash
-  const userHash = hashUserId(userId);
-  const isInRollout = (userHash % 100) < rolloutPct;
+  const isInRollout = (hashUserId(userId) % 100) < rolloutPct;
 
   return {
     swarm_v2_enabled: isInRollout,
@@ -75,12 +78,7 @@ export async function getFeatureFlags(userId: string): Promise<FeatureFlags> {
  * Same user always gets same bucket assignment
  */
 function hashUserId(userId: string): number {
-  let hash = 0;
-  for (let i = 0; i < userId.length; i++) {
-    hash = ((hash << 5) - hash) + userId.charCodeAt(i);
-    hash = hash & hash; // Convert to 32-bit integer
-  }
-  return Math.abs(hash);
+  return Math.abs(userHash(userId)); // memoized per user
 }
 
 /**
@@ -111,6 +109,7 @@ export async function enableSwarmV2ForUser(userId: string): Promise<{ success: b
     return { success: false, error: error.message };
   }
 
+  invalidateUserContext(userId);
   return { success: true };
 }
 
@@ -142,6 +141,7 @@ export async function disableSwarmV2ForUser(userId: string): Promise<{ success:
     return { success: false, error: error.message };
   }
 
+  invalidateUserContext(userId);
   return { success: true };
 }
 
@@ -173,5 +173,6 @@ export async function clearSwarmV2Override(userId: string): Promise<{ success: b
     return { success: false, error: error.message };
   }
 
+  invalidateUserContext(userId);
   return { success: true };
 }
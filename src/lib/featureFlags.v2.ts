@@ -1,3 +1,12 @@
+import {
+  compileFlag,
+  evaluateFlag,
+  getAccessRules,
+  onAccessRulesChange,
+  type CompiledFlag,
+  type FlagConfig
+} from './accessRules';
+
 export type FeatureFlag =
   | 'SWARM_V2_ENABLED'
   | 'RESPONSE_RENDERER_ENABLED'
@@ -12,12 +21,7 @@ export type FeatureFlag =
   | 'FILTER_ALLERGEN'
   | 'FILTER_RELIGIOUS';
 
-interface FeatureFlagConfig {
-  enabled: boolean;
-  rolloutPercentage?: number;
-  allowedRoles?: string[];
-  allowedUsers?: string[];
-}
+type FeatureFlagConfig = FlagConfig;
 
 const DEFAULT_FLAGS: Record<FeatureFlag, FeatureFlagConfig> = {
   SWARM_V2_ENABLED: {
@@ -82,13 +86,19 @@ const DEFAULT_FLAGS: Record<FeatureFlag, FeatureFlagConfig> = {
   }
 };
 
+/**
+ * Flag configs are code defaults, overlaid by feature_flag_configs rows from
+ * the access rules, overlaid by setFlag calls. Each is compiled once, so
+ * isEnabled is a Map lookup plus a cached-hash bucket check.
+ */
 class FeatureFlagManager {
   private flags: Map<FeatureFlag, FeatureFlagConfig> = new Map();
+  private local: Map<FeatureFlag, Partial<FeatureFlagConfig>> = new Map();
+  private compiled: Map<FeatureFlag, CompiledFlag> = new Map();
 
   constructor() {
-    Object.entries(DEFAULT_FLAGS).forEach(([key, config]) => {
-      this.flags.set(key as FeatureFlag, config);
-    });
+    this.applyRemote(getAccessRules().flags);
+    onAccessRulesChange(rules => this.applyRemote(rules.flags));
   }
 
   isEnabled(
@@ -98,36 +108,13 @@ class FeatureFlagManager {
       userRole?: string;
     }
   ): boolean {
-    const config = this.flags.get(flag);
-    if (!config) return false;
-
-    if (!config.enabled) return false;
-
-    if (context?.userRole && config.allowedRoles) {
-      if (!config.allowedRoles.includes(context.userRole)) {
-        return false;
-      }
-    }
-
-    if (context?.userId && config.allowedUsers) {
-      if (!config.allowedUsers.includes(context.userId)) {
-        return false;
-      }
-    }
-
-    if (config.rolloutPercentage !== undefined && config.rolloutPercentage < 100) {
-      const hash = context?.userId
-        ? this.hashUserId(context.userId, flag)
-        : Math.random() * 100;
-      return hash < config.rolloutPercentage;
-    }
-
-    return true;
+    return evaluateFlag(this.compiled.get(flag), context);
   }
 
   setFlag(flag: FeatureFlag, config: Partial<FeatureFlagConfig>): void {
     const existing = this.flags.get(flag) || { enabled: false };
-    this.flags.set(flag, { ...existing, ...config });
+    this.local.set(flag, { ...this.local.get(flag), ...config });
+    this.store(flag, { ...existing, ...config });
   }
 
   getConfig(flag: FeatureFlag): FeatureFlagConfig | undefined {
@@ -138,15 +125,18 @@ class FeatureFlagManager {
     return new Map(this.flags);
   }
 
-  private hashUserId(userId: string, flag: FeatureFlag): number {
-    const str = `${userId}-${flag}`;
-    let hash = 0;
-    for (let i = 0; i < str.length; i++) {
-      const char = str.charCodeAt(i);
-      hash = (hash << 5) - hash + char;
-      hash = hash & hash;
+  private applyRemote(remote: Map<string, FeatureFlagConfig>): void {
+    const names = new Set<string>([...Object.keys(DEFAULT_FLAGS), ...remote.keys(), ...this.local.keys()]);
+    for (const name of names) {
+      const flag = name as FeatureFlag;
+      const base = remote.get(flag) ?? DEFAULT_FLAGS[flag] ?? { enabled: false };
+      this.store(flag, { ...base, ...this.local.get(flag) });
     }
-    return Math.abs(hash % 100);
+  }
+
+  private store(flag: FeatureFlag, config: FeatureFlagConfig): void {
+    this.flags.set(flag, config);
+    this.compiled.set(flag, compileFlag(flag, config));
   }
 }
 
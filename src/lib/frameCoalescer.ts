@@ -0,0 +1,58 @@
+/**
+ * Frame Coalescer
+ * Collapses bursts of updates (e.g. streamed tokens) into at most one apply
+ * per animation frame. Only the latest value is applied.
+ */
+
+export interface FrameCoalescer<T> {
+  /** Queue a value; applied on the next frame */
+  push: (value: T) => void;
+  /** Apply the pending value now (e.g. on stream completion) */
+  flush: () => void;
+  /** Drop the pending value */
+  cancel: () => void;
+}
+
+type Schedule = (cb: () => void) => unknown;
+type Unschedule = (handle: unknown) => void;
+
+const raf: Schedule = (cb) =>
+  typeof requestAnimationFrame === 'function' ? requestAnimationFrame(cb) : setTimeout(cb, 16);
+const cancelRaf: Unschedule = (handle) =>
+  typeof cancelAnimationFrame === 'function' ? cancelAnimationFrame(handle as number) : clearTimeout(handle as ReturnType<typeof setTimeout>);
+
+export function createFrameCoalescer<T>(
+  apply: (value: T) => void,
+  schedule: Schedule = raf,
+  unschedule: Unschedule = cancelRaf
+): FrameCoalescer<T> {
+  let pending: { value: T } | null = null;
+  let handle: unknown = null;
+
+  const run = () => {
+    handle = null;
+    if (!pending) return;
+    const { value } = pending;
+    pending = null;
+    apply(value);
+  };
+
+  return {
+    push(value) {
+      pending = { value };
+      if (handle === null) handle = schedule(run);
+    },
+    flush() {
+      if (handle !== null) {
+        unschedule(handle);
+        handle = null;
+      }
+      run();
+    },
+    cancel() {
+      if (handle !== null) unschedule(handle);
+      handle = null;
+      pending = null;
+    }
+  };
+}
@@ -5,7 +5,8 @@
  */
 
 import { getSupabase } from '../supabase';
-import { saveMeal, type SaveMealInput } from '../meals/saveMeal';
+import type { SaveMealInput } from '../meals/saveMeal';
+import { enqueueMeal, getMealOutbox } from '../meals/outbox';
 import type { FoodItem } from '../personality/intentClassifier';
 import { inferMealSlot } from '../meals/inferMealSlot';
 
@@ -60,8 +61,8 @@ export async function handleFoodMention(
   // Infer meal slot if not provided
   const mealSlot = ctx.mealSlot || inferMealSlot(ctx.timestamp ? new Date(ctx.timestamp) : new Date());
 
-  // Call existing saveMeal function
-  const result = await saveMeal({
+  // Queue through the outbox: acknowledged locally, synced in the background
+  const result = await enqueueMeal({
     userId: ctx.userId,
     messageId: ctx.messageId,
     items: items.map(item => ({
@@ -145,6 +146,16 @@ export async function handleUndoLast(userId: string): Promise<UndoResult> {
   const supabase = getSupabase();
 
   try {
+    // A meal still in the outbox is dropped there (and deleted server-side if
+    // an earlier send may have written it)
+    const queued = await getMealOutbox().discardLatest(userId);
+    if (queued) {
+      return {
+        ok: true,
+        removed: true
+      };
+    }
+
     // Step 1: Get latest meal_log for user
     const { data: logs, error: logError } = await supabase
       .from('meal_logs')
@@ -0,0 +1,522 @@
+/**
+ * Meal Outbox
+ * Offline-first meal logging. enqueue() persists the meal to IndexedDB,
+ * applies it optimistically to the day totals and returns at once; a
+ * background flush sends queued meals in batches to the log_meals_batch RPC
+ * (supabase/migrations/20251108000000_meal_log_outbox_batch.sql).
+ *
+ * - Each meal carries a client-generated idempotency key (client_id), so a
+ *   retry after a lost response, or a second tab flushing the same entry,
+ *   resolves to the row written the first time ('duplicate' = success)
+ * - Transport / server failures keep the entry and back off exponentially;
+ *   flushing resumes on `online`, on tab focus and on the next enqueue
+ * - Entries the server rejects are dropped, their optimistic totals are
+ *   reverted and subscribers are told, so the UI can surface the failure
+ */
+
+import { getSupabase } from '../supabase';
+import { useDayTotalsStore } from '../../store/dayTotals';
+import { buildLogMealParams, type SaveMealInput, type SaveMealResult } from './saveMeal';
+import type { MealTotals } from './schemaMap';
+
+/** Payload of one meal in a log_meals_batch call */
+export interface OutboxMeal {
+  client_id: string;
+  ts: string;
+  meal_slot: string;
+  note: string | null;
+  items: Array<Record<string, string | number>>;
+}
+
+export interface OutboxEntry {
+  clientId: string;
+  userId: string;
+  meal: OutboxMeal;
+  totals: MealTotals;
+  itemsCount: number;
+  createdAt: number;
+  attempts: number;
+  nextAttemptAt: number;
+  lastError?: string;
+}
+
+export interface BatchResult {
+  client_id: string;
+  status: 'created' | 'duplicate' | 'rejected';
+  meal_log_id?: string | null;
+  error?: string | null;
+}
+
+export interface OutboxStorage {
+  all: () => Promise<OutboxEntry[]>;
+  put: (entry: OutboxEntry) => Promise<void>;
+  remove: (clientIds: string[]) => Promise<void>;
+}
+
+export type OutboxEvent =
+  | { type: 'queued'; entry: OutboxEntry }
+  | { type: 'synced'; entry: OutboxEntry; mealLogId: string; duplicate: boolean }
+  | { type: 'rejected'; entry: OutboxEntry; error: string }
+  | { type: 'retry'; entries: OutboxEntry[]; error: string; delayMs: number };
+
+export interface EnqueueResult extends SaveMealResult {
+  clientId?: string;
+  queued?: boolean;
+}
+
+export interface FlushReport {
+  sent: number;
+  synced: number;
+  rejected: number;
+  failed: number;
+}
+
+interface OutboxOptions {
+  storage: OutboxStorage;
+  /** Send one batch; throw on transport or whole-call failure */
+  send: (meals: OutboxMeal[]) => Promise<BatchResult[]>;
+  /** auth.uid() of the session the RPC will run as */
+  currentUserId: () => Promise<string | null>;
+  /**
+   * Delete a meal that may already be on the server, by (user_id, client_id).
+   * A no-op when the row does not exist; throw on failure.
+   */
+  deleteSent: (userId: string, clientId: string) => Promise<void>;
+  batchSize?: number;
+  /** Debounce before flushing after an enqueue, so quick logs share a batch */
+  flushDelayMs?: number;
+  baseBackoffMs?: number;
+  maxBackoffMs?: number;
+  now?: () => number;
+  random?: () => number;
+  newId?: () => string;
+  isOnline?: () => boolean;
+}
+
+const DEFAULT_BATCH_SIZE = 20;
+const DEFAULT_FLUSH_DELAY_MS = 250;
+const DEFAULT_BASE_BACKOFF_MS = 2_000;
+const DEFAULT_MAX_BACKOFF_MS = 5 * 60_000;
+
+/**
+ * Retry delay after `attempts` failures: exponential, capped, +/-20% jitter
+ */
+export function backoffDelay(attempts: number, base: number, max: number, random: () => number = Math.random): number {
+  const exp = Math.min(max, base * 2 ** Math.max(0, attempts - 1));
+  return Math.round(exp * (0.8 + random() * 0.4));
+}
+
+function toDelta(entry: OutboxEntry) {
+  return {
+    ts: entry.meal.ts,
+    totals: {
+      kcal: entry.totals.kcal,
+      protein_g: entry.totals.protein_g,
+      carbs_g: entry.totals.carbs_g,
+      fat_g: entry.totals.fat_g,
+      fiber_g: entry.totals.fiber_g,
+      items: entry.itemsCount
+    }
+  };
+}
+
+export function createMealOutbox(options: OutboxOptions) {
+  const {
+    storage,
+    send,
+    currentUserId,
+    deleteSent,
+    batchSize = DEFAULT_BATCH_SIZE,
+    flushDelayMs = DEFAULT_FLUSH_DELAY_MS,
+    baseBackoffMs = DEFAULT_BASE_BACKOFF_MS,
+    maxBackoffMs = DEFAULT_MAX_BACKOFF_MS,
+    now = Date.now,
+    random = Math.random,
+    newId = () => crypto.randomUUID(),
+    isOnline = () => typeof navigator === 'undefined' || navigator.onLine !== false
+  } = options;
+
+  const listeners = new Set<(event: OutboxEvent) => void>();
+  let flushing: Promise<FlushReport> | null = null;
+  let timer: ReturnType<typeof setTimeout> | null = null;
+  let timerAt = Infinity;
+
+  const emit = (event: OutboxEvent) => {
+    for (const listener of listeners) {
+      try {
+        listener(event);
+      } catch (err) {
+        console.error('[outbox] listener failed:', err);
+      }
+    }
+  };
+
+  /** Run a flush in `delayMs` unless one is already due sooner */
+  const schedule = (delayMs: number) => {
+    const at = now() + Math.max(0, delayMs);
+    if (timer !== null && timerAt <= at) return;
+    if (timer !== null) clearTimeout(timer);
+    timerAt = at;
+    timer = setTimeout(() => {
+      timer = null;
+      timerAt = Infinity;
+      flush().catch(err => console.error('[outbox] flush failed:', err));
+    }, Math.max(0, delayMs));
+  };
+
+  const scheduleNextDue = (entries: OutboxEntry[]) => {
+    if (entries.length === 0) return;
+    const next = Math.min(...entries.map(e => e.nextAttemptAt));
+    schedule(next - now());
+  };
+
+  /** Push entries back with a backoff so the next flush doesn't spin on them */
+  async function retryLater(entries: OutboxEntry[], error: string, report: FlushReport): Promise<void> {
+    const retried: OutboxEntry[] = [];
+    for (const entry of entries) {
+      const attempts = entry.attempts + 1;
+      const updated = {
+        ...entry,
+        attempts,
+        lastError: error,
+        nextAttemptAt: now() + backoffDelay(attempts, baseBackoffMs, maxBackoffMs, random)
+      };
+      await storage.put(updated);
+      retried.push(updated);
+    }
+    report.failed += entries.length;
+    const delayMs = Math.min(...retried.map(e => e.nextAttemptAt)) - now();
+    console.warn(`[outbox] ${entries.length} meal(s) not written, retrying in ${delayMs}ms:`, error);
+    emit({ type: 'retry', entries: retried, error, delayMs });
+  }
+
+  async function sendBatch(batch: OutboxEntry[], report: FlushReport): Promise<void> {
+    let results: BatchResult[];
+    try {
+      results = await send(batch.map(e => e.meal));
+    } catch (err: any) {
+      await retryLater(batch, err?.message || String(err), report);
+      return;
+    }
+
+    const byId = new Map(results.map(r => [r.client_id, r]));
+    const done: string[] = [];
+    const unanswered: OutboxEntry[] = [];
+    for (const entry of batch) {
+      const result = byId.get(entry.clientId);
+      if (!result) {
+        // Not answered (truncated response); it stays queued with its key
+        unanswered.push(entry);
+        continue;
+      }
+      done.push(entry.clientId);
+      if ((result.status === 'created' || result.status === 'duplicate') && result.meal_log_id) {
+        report.synced++;
+        useDayTotalsStore.getState().confirmOptimistic(entry.clientId, result.meal_log_id);
+        emit({ type: 'synced', entry, mealLogId: result.meal_log_id, duplicate: result.status === 'duplicate' });
+      } else {
+        report.rejected++;
+        const error = result.error || 'Meal was rejected by the server';
+        console.error('[outbox] meal rejected:', { clientId: entry.clientId, error });
+        useDayTotalsStore.getState().rejectOptimistic(entry.clientId);
+        emit({ type: 'rejected', entry, error });
+      }
+    }
+    await storage.remove(done);
+    if (unanswered.length > 0) {
+      await retryLater(unanswered, 'No result for this meal in the batch response', report);
+    }
+  }
+
+  async function runFlush(): Promise<FlushReport> {
+    const report: FlushReport = { sent: 0, synced: 0, rejected: 0, failed: 0 };
+    const userId = await currentUserId();
+    if (!userId) return report;
+
+    // Drain due entries batch by batch; stop on the first failed batch
+    for (;;) {
+      const queued = (await storage.all()).filter(e => e.userId === userId);
+      const due = queued
+        .filter(e => e.nextAttemptAt <= now())
+        .sort((a, b) => a.createdAt - b.createdAt);
+
+      if (due.length === 0 || !isOnline()) {
+        // Offline: the `online` listener resumes the flush
+        if (isOnline()) scheduleNextDue(queued);
+        return report;
+      }
+
+      const batch = due.slice(0, batchSize);
+      report.sent += batch.length;
+      const failedBefore = report.failed;
+      await sendBatch(batch, report);
+      if (report.failed > failedBefore) {
+        scheduleNextDue((await storage.all()).filter(e => e.userId === userId));
+        return report;
+      }
+    }
+  }
+
+  /** Send everything that is due. Concurrent calls share one run. */
+  function flush(): Promise<FlushReport> {
+    if (!flushing) {
+      flushing = runFlush().finally(() => {
+        flushing = null;
+      });
+    }
+    return flushing;
+  }
+
+  /**
+   * Queue a meal. Resolves once it is persisted locally (not on the server).
+   */
+  async function enqueue(input: SaveMealInput): Promise<EnqueueResult> {
+    if (!input.items || input.items.length === 0) {
+      return { ok: false, error: 'No items provided' };
+    }
+
+    const { p_ts, p_meal_slot_text, p_note, p_items, totals } = buildLogMealParams(input);
+    const clientId = newId();
+    const entry: OutboxEntry = {
+      clientId,
+      userId: input.userId,
+      meal: { client_id: clientId, ts: p_ts, meal_slot: p_meal_slot_text, note: p_note, items: p_items },
+      totals,
+      itemsCount: input.items.length,
+      createdAt: now(),
+      attempts: 0,
+      nextAttemptAt: now()
+    };
+
+    try {
+      await storage.put(entry);
+    } catch (err: any) {
+      return { ok: false, error: `Failed to queue meal: ${err?.message || err}` };
+    }
+
+    useDayTotalsStore.getState().addOptimistic(clientId, toDelta(entry));
+    emit({ type: 'queued', entry });
+    schedule(flushDelayMs);
+
+    return { ok: true, clientId, queued: true, itemsCount: entry.itemsCount, totals };
+  }
+
+  /**
+   * Re-apply persisted entries after a reload and start draining them
+   */
+  async function start(userId: string): Promise<void> {
+    const queued = (await storage.all()).filter(e => e.userId === userId);
+    const store = useDayTotalsStore.getState();
+    for (const entry of queued) store.addOptimistic(entry.clientId, toDelta(entry));
+    if (queued.length > 0) schedule(0);
+  }
+
+  /**
+   * Drop the newest unsynced meal for a user (undo before it reached the
+   * server). Waits for an in-flight flush so the entry is not mid-send.
+   * An entry that was sent before (attempts > 0) may have been written even
+   * though no result came back, so it is also deleted server-side by its
+   * client_id; if that fails the entry is put back and the error thrown.
+   */
+  async function discardLatest(userId: string): Promise<OutboxEntry | null> {
+    if (flushing) await flushing.catch(() => undefined);
+    const queued = (await storage.all())
+      .filter(e => e.userId === userId)
+      .sort((a, b) => b.createdAt - a.createdAt);
+    const latest = queued[0];
+    if (!latest) return null;
+    // Remove locally first so a flush cannot resend it during the delete
+    await storage.remove([latest.clientId]);
+    if (latest.attempts > 0) {
+      try {
+        await deleteSent(userId, latest.clientId);
+      } catch (err) {
+        await storage.put(latest);
+        throw err;
+      }
+    }
+    useDayTotalsStore.getState().rejectOptimistic(latest.clientId);
+    return latest;
+  }
+
+  async function pending(userId?: string): Promise<OutboxEntry[]> {
+    const all = await storage.all();
+    return userId ? all.filter(e => e.userId === userId) : all;
+  }
+
+  function subscribe(listener: (event: OutboxEvent) => void): () => void {
+    listeners.add(listener);
+    return () => listeners.delete(listener);
+  }
+
+  return { enqueue, flush, start, discardLatest, pending, subscribe, schedule };
+}
+
+export type MealOutbox = ReturnType<typeof createMealOutbox>;
+
+// ---------------------------------------------------------------------------
+// Storage
+// ---------------------------------------------------------------------------
+
+const DB_NAME = 'hipat-meal-outbox';
+const DB_VERSION = 1;
+const STORE_NAME = 'meals';
+
+function request<T>(req: IDBRequest<T>): Promise<T> {
+  return new Promise((resolve, reject) => {
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => reject(req.error);
+  });
+}
+
+export function createIndexedDbStorage(): OutboxStorage {
+  let dbPromise: Promise<IDBDatabase> | null = null;
+
+  const open = () => {
+    if (!dbPromise) {
+      dbPromise = new Promise((resolve, reject) => {
+        const req = indexedDB.open(DB_NAME, DB_VERSION);
+        req.onupgradeneeded = () => {
+          if (!req.result.objectStoreNames.contains(STORE_NAME)) {
+            req.result.createObjectStore(STORE_NAME, { keyPath: 'clientId' });
+          }
+        };
+        req.onsuccess = () => resolve(req.result);
+        req.onerror = () => reject(req.error);
+        req.onblocked = () => reject(new Error('IndexedDB open blocked'));
+      });
+      dbPromise.catch(() => {
+        dbPromise = null;
+      });
+    }
+    return dbPromise;
+  };
+
+  const withStore = async <T>(mode: IDBTransactionMode, fn: (store: IDBObjectStore) => Promise<T>): Promise<T> => {
+    const db = await open();
+    const tx = db.transaction(STORE_NAME, mode);
+    const done = new Promise<void>((resolve, reject) => {
+      tx.oncomplete = () => resolve();
+      tx.onerror = () => reject(tx.error);
+      tx.onabort = () => reject(tx.error ?? new Error('IndexedDB transaction aborted'));
+    });
+    const result = await fn(tx.objectStore(STORE_NAME));
+    await done;
+    return result;
+  };
+
+  return {
+    all: () => withStore('readonly', store => request(store.getAll() as IDBRequest<OutboxEntry[]>)),
+    put: (entry) => withStore('readwrite', async store => {
+      await request(store.put(entry));
+    }),
+    remove: (clientIds) => clientIds.length === 0
+      ? Promise.resolve()
+      : withStore('readwrite', async store => {
+          await Promise.all(clientIds.map(id => request(store.delete(id))));
+        })
+  };
+}
+
+export function createMemoryStorage(): OutboxStorage {
+  const entries = new Map<string, OutboxEntry>();
+  return {
+    all: async () => [...entries.values()],
+    put: async (entry) => {
+      entries.set(entry.clientId, entry);
+    },
+    remove: async (clientIds) => {
+      for (const id of clientIds) entries.delete(id);
+    }
+  };
+}
+
+/**
+ * IndexedDB when available; memory otherwise (private mode, SSR), where
+ * queued meals still sync but do not survive a reload
+ */
+function defaultStorage(): OutboxStorage {
+  if (typeof indexedDB === 'undefined') return createMemoryStorage();
+  const idb = createIndexedDbStorage();
+  const memory = createMemoryStorage();
+  let useMemory = false;
+  const guard = <A extends unknown[], T>(fn: (s: OutboxStorage) => (...args: A) => Promise<T>) =>
+    async (...args: A): Promise<T> => {
+      if (!useMemory) {
+        try {
+          return await fn(idb)(...args);
+        } catch (err) {
+          console.warn('[outbox] IndexedDB unavailable, queue is in-memory only:', err);
+          useMemory = true;
+        }
+      }
+      return fn(memory)(...args);
+    };
+  return {
+    all: guard(s => s.all),
+    put: guard(s => s.put),
+    remove: guard(s => s.remove)
+  };
+}
+
+// ---------------------------------------------------------------------------
+// App instance
+// ---------------------------------------------------------------------------
+
+async function sendToSupabase(meals: OutboxMeal[]): Promise<BatchResult[]> {
+  const { data, error } = await getSupabase().rpc('log_meals_batch', { p_meals: meals });
+  if (error) throw new Error(error.message);
+  return (data ?? []) as BatchResult[];
+}
+
+/** Same two-step delete as handleUndoLast, located by the outbox key */
+async function deleteSentMeal(userId: string, clientId: string): Promise<void> {
+  const supabase = getSupabase();
+  const { data: log, error } = await supabase
+    .from('meal_logs')
+    .select('id')
+    .eq('user_id', userId)
+    .eq('client_id', clientId)
+    .maybeSingle();
+  if (error) throw new Error(error.message);
+  if (!log) return;
+
+  const { error: itemsError } = await supabase.from('meal_items').delete().eq('meal_log_id', log.id);
+  if (itemsError) throw new Error(itemsError.message);
+  const { error: logError } = await supabase.from('meal_logs').delete().eq('id', log.id);
+  if (logError) throw new Error(logError.message);
+}
+
+async function sessionUserId(): Promise<string | null> {
+  const { data } = await getSupabase().auth.getSession();
+  return data.session?.user.id ?? null;
+}
+
+let appOutbox: MealOutbox | null = null;
+
+export function getMealOutbox(): MealOutbox {
+  if (!appOutbox) {
+    const outbox = createMealOutbox({
+      storage: defaultStorage(),
+      send: sendToSupabase,
+      currentUserId: sessionUserId,
+      deleteSent: deleteSentMeal
+    });
+    if (typeof window !== 'undefined') {
+      window.addEventListener('online', () => outbox.schedule(0));
+      document.addEventListener('visibilitychange', () => {
+        if (document.visibilityState === 'visible') outbox.schedule(0);
+      });
+    }
+    appOutbox = outbox;
+  }
+  return appOutbox;
+}
+
+/**
+ * Log a meal through the outbox (drop-in for logMealViaRpc). `ok` means the
+ * meal is stored on the device; mealLogId is not known yet.
+ */
+export function enqueueMeal(input: SaveMealInput): Promise<EnqueueResult> {
+  return getMealOutbox().enqueue(input);
+}
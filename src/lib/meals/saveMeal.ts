@@ -66,7 +66,7 @@ export interface SaveMealResult {
  * Compute dual-key totals JSONB (required for meal_logs NOT NULL constraint)
  * Includes both kcal and calories for future-proofing
  */
-function computeTotals(items: SaveMealInput['items']): MealTotals {
+export function computeTotals(items: SaveMealInput['items']): MealTotals {
   const totals: MealTotals = {
     kcal: 0,
     calories: 0,
@@ -236,6 +236,47 @@ export async function saveMeal(input: SaveMealInput): Promise<SaveMealResult> {
   }
 }
 
+export interface LogMealParams {
+  p_ts: string;
+  p_meal_slot_text: string;
+  p_note: string | null;
+  p_items: Array<Record<string, string | number>>;
+  totals: MealTotals;
+}
+
+/**
+ * Build log_meal RPC parameters (also the outbox's queued payload)
+ */
+export function buildLogMealParams(input: SaveMealInput): LogMealParams {
+  // Validate and sanitize meal_slot (must match enum values)
+  // CRITICAL: Use time-based fallback to avoid NULL constraint violations
+  const allowedSlots = new Set(['breakfast', 'lunch', 'dinner', 'snack']);
+  const p_meal_slot_text = input.mealSlot && allowedSlots.has(input.mealSlot.toLowerCase())
+    ? input.mealSlot.toLowerCase()
+    : inferMealSlotFromTime(); // Fallback to time-based inference
+
+  // Prepare items JSONB (matching new signature)
+  const p_items = input.items.map((item, index) => ({
+    position: index + 1,
+    name: item.name,
+    quantity: String(item.quantity || 1),
+    unit: item.unit || 'serving',
+    energy_kcal: String(item.energy_kcal || 0),
+    protein_g: String(item.protein_g || 0),
+    fat_g: String(item.fat_g || 0),
+    carbs_g: String(item.carbs_g || 0),
+    fiber_g: String(item.fiber_g || 0)
+  }));
+
+  return {
+    p_ts: (input.timestamp ? new Date(input.timestamp) : new Date()).toISOString(),
+    p_meal_slot_text,
+    p_note: input.note || null,
+    p_items,
+    totals: computeTotals(input.items)
+  };
+}
+
 /**
  * Log meal via RPC (bypasses RLS issues)
  * This is the preferred method for saving meals
@@ -249,51 +290,7 @@ export async function logMealViaRpc(input: SaveMealInput): Promise<SaveMealResul
       return { ok: false, error: 'No items provided' };
     }
 
-    // Validate and sanitize meal_slot (must match enum values)
-    // CRITICAL: Use time-based fallback to avoid NULL constraint violations
-    const allowedSlots = new Set(['breakfast', 'lunch', 'dinner', 'snack']);
-    const safeMealSlot = input.mealSlot && allowedSlots.has(input.mealSlot.toLowerCase())
-      ? input.mealSlot.toLowerCase()
-      : inferMealSlotFromTime(); // Fallback to time-based inference
-
-    // Prepare RPC parameters (matching new signature)
-    const p_ts = input.timestamp ? new Date(input.timestamp) : new Date();
-    const p_meal_slot_text = safeMealSlot;
-    const p_note = input.note || null;
-
-    // Compute totals
-    const totals: MealTotals = {
-      kcal: 0,
-      calories: 0,
-      protein_g: 0,
-      fat_g: 0,
-      carbs_g: 0,
-      fiber_g: 0
-    };
-
-    for (const item of input.items) {
-      totals.kcal += item.energy_kcal || 0;
-      totals.protein_g += item.protein_g || 0;
-      totals.fat_g += item.fat_g || 0;
-      totals.carbs_g += item.carbs_g || 0;
-      totals.fiber_g += item.fiber_g || 0;
-    }
-    
-    // Dual-key compatibility
-    totals.calories = totals.kcal;
-
-    // Prepare items JSONB (matching new signature)
-    const p_items = input.items.map((item, index) => ({
-      position: index + 1,
-      name: item.name,
-      quantity: String(item.quantity || 1),
-      unit: item.unit || 'serving',
-      energy_kcal: String(item.energy_kcal || 0),
-      protein_g: String(item.protein_g || 0),
-      fat_g: String(item.fat_g || 0),
-      carbs_g: String(item.carbs_g || 0),
-      fiber_g: String(item.fiber_g || 0)
-    }));
+    const { p_ts, p_meal_slot_text, p_note, p_items, totals } = buildLogMealParams(input);
 
     // Call RPC with correct parameter order matching DB function signature:
     // log_meal(p_ts timestamptz, p_meal_slot_text text, p_note text, p_items jsonb)
@@ -304,7 +301,7 @@ export async function logMealViaRpc(input: SaveMealInput): Promise<SaveMealResul
     });
 
     const { data: mealLogId, error } = await supabase.rpc('log_meal', {
-      p_ts: p_ts.toISOString(),
+      p_ts,
       p_meal_slot_text,
       p_note,
       p_items
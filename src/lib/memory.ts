@@ -9,6 +9,79 @@ export interface MemoryQuery {
   limit?: number;
 }
 
+const MEMORY_COLUMNS =
+  'id, user_id, tier, key, value, source, confidence, ttl, topics, is_pii, conflict_priority, created_at, updated_at';
+
+const RECENCY_WINDOW_MS = 30 * 24 * 60 * 60 * 1000;
+const TIER_WEIGHT: Record<MemoryRow['tier'], number> = { long_term: 1.0, short_term: 0.7, ephemeral: 0.4 };
+
+/**
+ * Relevance score in [0, 1]. Weights match rank_user_memories() in SQL:
+ * 40% topic overlap, 30% recency (linear over 30 days), 20% confidence, 10% tier.
+ */
+export function scoreMemory(memory: MemoryRow, topics: string[], now: number = Date.now()): number {
+  const wanted = new Set(topics);
+  const overlap = wanted.size > 0 ? memory.topics.filter(t => wanted.has(t)).length : 0;
+  const topicScore = overlap / Math.max(wanted.size, 1);
+
+  const age = now - new Date(memory.created_at).getTime();
+  const recencyScore = Math.max(0, 1 - age / RECENCY_WINDOW_MS);
+
+  return (
+    topicScore * 0.4 +
+    recencyScore * 0.3 +
+    Number(memory.confidence) * 0.2 +
+    TIER_WEIGHT[memory.tier] * 0.1
+  );
+}
+
+export function isExpired(memory: Pick<MemoryRow, 'ttl'>, now: number = Date.now()): boolean {
+  return memory.ttl !== null && new Date(memory.ttl).getTime() <= now;
+}
+
+// ---------- Per-session read-through cache ----------
+
+const CACHE_TTL_MS = 5 * 60 * 1000;
+const MAX_CACHED_QUERIES_PER_USER = 50;
+
+interface CacheEntry {
+  rows: MemoryRow[];
+  expiresAt: number;
+}
+
+// userId -> query signature -> ranked rows
+const queryCache = new Map<string, Map<string, CacheEntry>>();
+
+function cacheKey(query: MemoryQuery): string {
+  const topics = query.topics ? [...new Set(query.topics)].sort().join(',') : '';
+  return `${query.tier ?? '*'}|${query.minConfidence ?? ''}|${query.limit ?? 20}|${topics}`;
+}
+
+function readCache(query: MemoryQuery): MemoryRow[] | null {
+  const entry = queryCache.get(query.userId)?.get(cacheKey(query));
+  if (!entry) return null;
+  const now = Date.now();
+  if (entry.expiresAt <= now) {
+    queryCache.get(query.userId)?.delete(cacheKey(query));
+    return null;
+  }
+  // Rows can reach their ttl while cached
+  return entry.rows.filter(r => !isExpired(r, now));
+}
+
+function writeCache(query: MemoryQuery, rows: MemoryRow[]): void {
+  let perUser = queryCache.get(query.userId);
+  if (!perUser) {
+    perUser = new Map();
+    queryCache.set(query.userId, perUser);
+  }
+  if (perUser.size >= MAX_CACHED_QUERIES_PER_USER) {
+    // Map keeps insertion order: drop the oldest query
+    perUser.delete(perUser.keys().next().value as string);
+  }
+  perUser.set(cacheKey(query), { rows, expiresAt: Date.now() + CACHE_TTL_MS });
+}
+
 export interface MemoryCreateInput {
   user_id: string;
   tier: 'ephemeral' | 'short_term' | 'long_term';
@@ -49,6 +122,7 @@ export class MemoryService {
       return null;
     }
 
+    MemoryService.invalidateCache(input.user_id);
     return data as MemoryRow;
   }
 
@@ -69,6 +143,8 @@ export class MemoryService {
       p_confidence: confidence
     });
 
+    MemoryService.invalidateCache(userId);
+
     if (error) {
       console.error('[memory-upsert-failed]', error);
       return null;
@@ -77,13 +153,46 @@ export class MemoryService {
     return data as string;
   }
 
+  /**
+   * Ranked retrieval (topic overlap, recency, confidence, tier), excluding
+   * expired rows. Read-through cached per user until the next write.
+   */
   static async query(query: MemoryQuery): Promise<MemoryRow[]> {
+    const cached = readCache(query);
+    if (cached) return cached;
+
+    const supabase = getSupabase();
+
+    const { data, error } = await supabase.rpc('rank_user_memories', {
+      p_user_id: query.userId,
+      p_topics: query.topics && query.topics.length > 0 ? query.topics : null,
+      p_tier: query.tier ?? null,
+      p_min_confidence: query.minConfidence ?? null,
+      p_limit: query.limit || 20
+    });
+
+    if (error) {
+      console.error('[memory-query-failed]', error);
+      return this.queryUnranked(query);
+    }
+
+    const rows = (data ?? []).map(({ score: _score, ...row }: MemoryRow & { score: number }) => row as MemoryRow);
+    writeCache(query, rows);
+    return rows;
+  }
+
+  /**
+   * Fallback when rank_user_memories is unavailable: filter in PostgREST,
+   * rank the page client-side. Not cached.
+   */
+  private static async queryUnranked(query: MemoryQuery): Promise<MemoryRow[]> {
     const supabase = getSupabase();
 
     let queryBuilder = supabase
       .from('user_memory')
-      .select('*')
-      .eq('user_id', query.userId);
+      .select(MEMORY_COLUMNS)
+      .eq('user_id', query.userId)
+      .or(`ttl.is.null,ttl.gt.${new Date().toISOString()}`);
 
     if (query.tier) {
       queryBuilder = queryBuilder.eq('tier', query.tier);
@@ -100,7 +209,7 @@ export class MemoryService {
     queryBuilder = queryBuilder
       .order('conflict_priority', { ascending: false })
       .order('created_at', { ascending: false })
-      .limit(query.limit || 20);
+      .limit((query.limit || 20) * 5);
 
     const { data, error } = await queryBuilder;
 
@@ -109,7 +218,24 @@ export class MemoryService {
       return [];
     }
 
-    return data as MemoryRow[];
+    const now = Date.now();
+    const topics = query.topics ?? [];
+    return (data as MemoryRow[])
+      .map(memory => ({ memory, score: scoreMemory(memory, topics, now) }))
+      .sort((a, b) => b.score - a.score)
+      .slice(0, query.limit || 20)
+      .map(s => s.memory);
+  }
+
+  /**
+   * Drop cached query results for one user, or for everyone (sign-out)
+   */
+  static invalidateCache(userId?: string): void {
+    if (userId) {
+      queryCache.delete(userId);
+    } else {
+      queryCache.clear();
+    }
   }
 
   static async getByKey(userId: string, key: string): Promise<MemoryRow | null> {
@@ -147,6 +273,9 @@ export class MemoryService {
       })
       .eq('id', memoryId);
 
+    // Row id only: the owning user isn't known here
+    MemoryService.invalidateCache();
+
     if (error) {
       console.error('[memory-update-failed]', error);
       return false;
@@ -163,6 +292,9 @@ export class MemoryService {
       .delete()
       .eq('id', memoryId);
 
+    // Row id only: the owning user isn't known here
+    MemoryService.invalidateCache();
+
     if (error) {
       console.error('[memory-delete-failed]', error);
       return false;
@@ -179,6 +311,8 @@ export class MemoryService {
       .delete()
       .eq('user_id', userId);
 
+    MemoryService.invalidateCache(userId);
+
     if (error) {
       console.error('[memory-delete-all-failed]', error);
       return false;
@@ -200,6 +334,9 @@ export class MemoryService {
       })
       .eq('id', memoryId);
 
+    // Row id only: the owning user isn't known here
+    MemoryService.invalidateCache();
+
     if (error) {
       console.error('[memory-promote-failed]', error);
       return false;
@@ -231,37 +368,12 @@ export class MemoryService {
     currentTopics: string[],
     limit: number = 5
   ): Promise<MemoryRow[]> {
-    const memories = await this.query({
+    // query() returns rows already ranked by relevance
+    return this.query({
       userId,
       topics: currentTopics,
       minConfidence: 0.3,
-      limit: limit * 2
+      limit
     });
-
-    const scored = memories.map(mem => ({
-      memory: mem,
-      score: this.calculateRelevanceScore(mem, currentTopics)
-    }));
-
-    scored.sort((a, b) => b.score - a.score);
-
-    return scored.slice(0, limit).map(s => s.memory);
-  }
-
-  private static calculateRelevanceScore(memory: MemoryRow, currentTopics: string[]): number {
-    const topicMatch = memory.topics.filter(t => currentTopics.includes(t)).length;
-    const topicScore = topicMatch / Math.max(currentTopics.length, 1);
-
-    const ageInDays = (Date.now() - new Date(memory.created_at).getTime()) / (1000 * 60 * 60 * 24);
-    const recencyScore = Math.max(0, 1 - ageInDays / 30);
-
-    const tierScore = memory.tier === 'long_term' ? 1.0 : memory.tier === 'short_term' ? 0.7 : 0.4;
-
-    return (
-      topicScore * 0.4 +
-      recencyScore * 0.3 +
-      memory.confidence * 0.2 +
-      tierScore * 0.1
-    );
   }
 }
@@ -1,4 +1,6 @@
 import { supabase } from './supabase';
+import { accessRulesLoaded, allowedRolesFor, isRoleAllowed, refreshAccessRules } from './accessRules';
+import { resolveUserContext, type UserContext } from './userContext';
 
 export type RolloutStage = 'admin' | 'beta' | 'public';
 
@@ -9,7 +11,17 @@ export interface RoleAccessRecord {
   updated_at: string;
 }
 
-export async function getAllowedRoles(userId: string): Promise<string[]> {
+/**
+ * Roles the user may use, evaluated against the compiled access rules.
+ * Pass the request's UserContext to skip loading it.
+ */
+export async function getAllowedRoles(userId: string, ctx?: UserContext): Promise<string[]> {
+  const [userContext] = await Promise.all([resolveUserContext(userId, ctx), ensureAccessRules()]);
+  if (accessRulesLoaded()) {
+    return allowedRolesFor(userContext);
+  }
+
+  // access_rules not deployed yet: ask the server
   const { data, error } = await supabase.rpc('allowed_roles');
 
   if (error) {
@@ -20,11 +32,20 @@ export async function getAllowedRoles(userId: string): Promise<string[]> {
   return (data || []).map((r: { role_name: string }) => r.role_name);
 }
 
-export async function hasRoleAccess(userId: string, roleName: string): Promise<boolean> {
-  const allowed = await getAllowedRoles(userId);
+export async function hasRoleAccess(userId: string, roleName: string, ctx?: UserContext): Promise<boolean> {
+  const [userContext] = await Promise.all([resolveUserContext(userId, ctx), ensureAccessRules()]);
+  if (accessRulesLoaded()) {
+    return isRoleAllowed(roleName, userContext);
+  }
+  const allowed = await getAllowedRoles(userId, userContext);
   return allowed.includes(roleName);
 }
 
+/** First use loads the rules; afterwards startAccessRulesSync keeps them current */
+async function ensureAccessRules(): Promise<void> {
+  if (!accessRulesLoaded()) await refreshAccessRules();
+}
+
 export async function getUserRoleFlags(userId: string): Promise<{ isAdmin: boolean; isBeta: boolean }> {
   const { data, error } = await supabase
     .from('user_profiles')
@@ -75,4 +96,7 @@ export async function updateRoleAccess(
   if (error) {
     throw new Error(`Failed to update role access: ${error.message}`);
   }
+
+  // The write bumped the rules version; pick it up without waiting for the broadcast
+  await refreshAccessRules();
 }
@@ -0,0 +1,80 @@
+/**
+ * Route Code Splitting
+ * React.lazy with an explicit preload() so a route's chunk can be fetched
+ * before navigation (nav hover/focus, idle time after the previous page).
+ */
+
+import { lazy, type ComponentType, type LazyExoticComponent } from 'react';
+
+// eslint-disable-next-line @typescript-eslint/no-explicit-any
+type AnyComponent = ComponentType<any>;
+
+export type PreloadableComponent<T extends AnyComponent> = LazyExoticComponent<T> & {
+  preload: () => Promise<{ default: T }>;
+};
+
+const routes = new Map<string, () => Promise<unknown>>();
+
+/**
+ * lazy() whose import is started at most once, by preload() or first render
+ */
+export function lazyWithPreload<T extends AnyComponent>(
+  factory: () => Promise<{ default: T }>
+): PreloadableComponent<T> {
+  let pending: Promise<{ default: T }> | null = null;
+  const load = () => {
+    if (!pending) {
+      pending = factory().catch((err) => {
+        pending = null; // let the next attempt retry (e.g. after a deploy)
+        throw err;
+      });
+    }
+    return pending;
+  };
+  return Object.assign(lazy(load), { preload: load });
+}
+
+/**
+ * Map a path to the component(s) that render it, for prefetchRoute()
+ */
+export function registerRoute(path: string, ...components: Array<{ preload: () => Promise<unknown> }>): void {
+  routes.set(normalize(path), () => Promise.all(components.map((c) => c.preload())));
+}
+
+function normalize(path: string): string {
+  return path.split(/[?#]/)[0].replace(/\/+$/, '') || '/';
+}
+
+/**
+ * Skip speculative downloads on Save-Data / 2G connections
+ */
+function shouldPrefetch(): boolean {
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  const connection = (navigator as any).connection;
+  if (!connection) return true;
+  return !connection.saveData && !/(^|-)2g$/.test(connection.effectiveType ?? '');
+}
+
+/**
+ * Start loading the chunk for a path. Safe to call repeatedly.
+ */
+export function prefetchRoute(path: string): void {
+  const preload = routes.get(normalize(path));
+  if (!preload || !shouldPrefetch()) return;
+  preload().catch((err) => console.warn('[routePreload] prefetch failed', path, err));
+}
+
+/**
+ * Prefetch likely next routes once the main thread is idle
+ */
+export function prefetchOnIdle(paths: string[]): () => void {
+  // eslint-disable-next-line @typescript-eslint/no-explicit-any
+  const w = window as any;
+  const run = () => paths.forEach(prefetchRoute);
+  if (typeof w.requestIdleCallback === 'function') {
+    const id = w.requestIdleCallback(run, { timeout: 3000 });
+    return () => w.cancelIdleCallback(id);
+  }
+  const id = window.setTimeout(run, 1500);
+  return () => window.clearTimeout(id);
+}
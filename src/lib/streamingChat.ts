@@ -5,11 +5,26 @@
  * Provides typing animation as tokens arrive from OpenAI
  */
 
+/**
+ * Result of a tool (log_meal, get_remaining_macros, undo_last_meal) the
+ * model called mid-stream; sent before the follow-up reply text
+ */
+export interface StreamToolResult {
+  id: string;
+  name: string;
+  success: boolean;
+  result?: any;
+  error?: string;
+  duration_ms: number;
+}
+
 export interface StreamingChatOptions {
   messages: Array<{ role: string; content: string }>;
   onToken: (token: string) => void;
   onComplete: (fullText: string) => void;
   onError: (error: string) => void;
+  onToolCall?: (call: { id: string; name: string }) => void;
+  onToolResult?: (result: StreamToolResult) => void;
 }
 
 /**
@@ -17,7 +32,7 @@ export interface StreamingChatOptions {
  * Tokens are delivered in real-time via the onToken callback
  */
 export async function callChatStreaming(options: StreamingChatOptions): Promise<void> {
-  const { messages, onToken, onComplete, onError } = options;
+  const { messages, onToken, onComplete, onError, onToolCall, onToolResult } = options;
 
   let fullText = '';
   let eventSource: EventSource | null = null;
@@ -56,6 +71,8 @@ export async function callChatStreaming(options: StreamingChatOptions): Promise<
     // Read the stream
     const reader = response.body.getReader();
     const decoder = new TextDecoder();
+    // Frames can straddle network chunks; keep the unterminated tail for the next read
+    let pending = '';
 
     while (true) {
       const { done, value } = await reader.read();
@@ -64,8 +81,9 @@ export async function callChatStreaming(options: StreamingChatOptions): Promise<
         break;
       }
 
-      const chunk = decoder.decode(value, { stream: true });
-      const lines = chunk.split('\n');
+      pending += decoder.decode(value, { stream: true });
+      const lines = pending.split(/\r?\n/);
+      pending = lines.pop() ?? '';
 
       for (const line of lines) {
         if (line.startsWith('data: ')) {
@@ -82,10 +100,15 @@ export async function callChatStreaming(options: StreamingChatOptions): Promise<
             if (parsed.token) {
               fullText += parsed.token;
               onToken(parsed.token);
+            } else if (parsed.tool_result) {
+              onToolResult?.(parsed.tool_result);
+            } else if (parsed.tool_call) {
+              onToolCall?.(parsed.tool_call);
+            } else if (parsed.error) {
+              console.warn('Stream error frame:', parsed.error);
             }
           } catch (e) {
-            // Ignore parse errors for incomplete chunks
-            console.debug('Parse error (expected for partial chunks):', e);
+            console.warn('Malformed stream frame:', e);
           }
         }
       }
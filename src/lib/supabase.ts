@@ -1,5 +1,6 @@
 // -- AUTO-GENERATED: canonical Supabase client w/ legacy surface --
 import { createClient } from '@supabase/supabase-js';
+import { createCountingFetch } from './telemetry/queryCounter';
 
 // ENV CHECK - Development only diagnostics
 if (!import.meta.env.PROD) {
@@ -30,6 +31,8 @@ export const supabase = createClient(url, anon, {
     schema: 'public'
   },
   global: {
+    // Counts requests per session (see lib/telemetry/queryCounter.ts)
+    fetch: createCountingFetch(),
     headers: {
       'Cache-Control': 'no-cache, no-store, must-revalidate',
       'Pragma': 'no-cache',
@@ -3,8 +3,14 @@
  *
  * Structured logging for Swarm 2.2 pipeline stages.
  * Tracks performance, LLM calls, and decision points.
+ *
+ * Memory per collector is bounded by a RingBuffer. finish() applies head/tail
+ * sampling and hands the run to the batched telemetrySink (see sink.ts).
  */
 
+import { RingBuffer } from './ringBuffer';
+import { telemetrySink, toWireEvent, type SampleReason, type TelemetrySink } from './sink';
+
 export type EventType =
   | 'intent_classified'
   | 'nlu_extracted'
@@ -72,15 +78,47 @@ export interface TelemetrySummary {
   events: TelemetryEvent[];
 }
 
+export interface TelemetryCollectorOptions {
+  /** Max events retained in memory per collector (oldest dropped) */
+  capacity?: number;
+  /** Head-sampling probability for shipping a healthy run (0..1) */
+  sampleRate?: number;
+  /** Tail sampling: always ship runs at least this slow */
+  slowThresholdMs?: number;
+  /** Sink that receives shipped events; defaults to the shared telemetrySink */
+  sink?: Pick<TelemetrySink, 'enqueue'>;
+}
+
+const DEFAULT_CAPACITY = 128;
+const DEFAULT_SAMPLE_RATE = Number(import.meta.env.VITE_TELEMETRY_SAMPLE_RATE ?? 0.1);
+const DEFAULT_SLOW_THRESHOLD_MS = Number(import.meta.env.VITE_TELEMETRY_SLOW_MS ?? 3000);
+
 export class TelemetryCollector {
-  private events: TelemetryEvent[] = [];
+  private events: RingBuffer<TelemetryEvent>;
   private startTime: number;
 
+  // Running aggregates so summaries never rescan the buffer
+  private stageCount: Record<string, number> = {};
+  private stageDuration: Record<string, number> = {};
+  private llmCallCount = 0;
+  private errorCount = 0;
+  private firstError: TelemetryEvent | null = null;
+
+  private headSampled: boolean;
+  private slowThresholdMs: number;
+  private sink: Pick<TelemetrySink, 'enqueue'>;
+  private finished = false;
+
   constructor(
     private userId: string,
-    private sessionId: string
+    private sessionId: string,
+    options: TelemetryCollectorOptions = {}
   ) {
     this.startTime = Date.now();
+    this.events = new RingBuffer(options.capacity ?? DEFAULT_CAPACITY);
+    this.headSampled = Math.random() < (options.sampleRate ?? DEFAULT_SAMPLE_RATE);
+    this.slowThresholdMs = options.slowThresholdMs ?? DEFAULT_SLOW_THRESHOLD_MS;
+    this.sink = options.sink ?? telemetrySink;
   }
 
   /**
@@ -96,6 +134,14 @@ export class TelemetryCollector {
 
     this.events.push(fullEvent);
 
+    this.stageCount[event.stage] = (this.stageCount[event.stage] || 0) + 1;
+    this.stageDuration[event.stage] = (this.stageDuration[event.stage] || 0) + event.durationMs;
+    if (event.llmProvider) this.llmCallCount++;
+    if (!event.success) {
+      this.errorCount++;
+      if (!this.firstError) this.firstError = fullEvent;
+    }
+
     // Console output for development
     if (import.meta.env.DEV) {
       console.log(`[telemetry:${event.stage}]`, {
@@ -112,21 +158,71 @@ export class TelemetryCollector {
   }
 
   /**
-   * Get summary of all events
+   * Time an async stage and log it (success or error)
    */
-  getSummary(): TelemetrySummary {
-    const stageCount: Record<string, number> = {};
+  async time<T>(
+    stage: Stage,
+    eventType: EventType,
+    fn: () => Promise<T>,
+    extra: Partial<Omit<TelemetryEvent, 'userId' | 'sessionId' | 'timestamp' | 'stage' | 'eventType' | 'durationMs' | 'success'>> = {}
+  ): Promise<T> {
+    const start = performance.now();
+    try {
+      const result = await fn();
+      this.log({ ...extra, stage, eventType, durationMs: Math.round(performance.now() - start), success: true });
+      return result;
+    } catch (err: any) {
+      this.log({
+        ...extra,
+        stage,
+        eventType: 'error',
+        durationMs: Math.round(performance.now() - start),
+        success: false,
+        error: err?.message ?? String(err)
+      });
+      throw err;
+    }
+  }
 
-    this.events.forEach(e => {
-      stageCount[e.stage] = (stageCount[e.stage] || 0) + 1;
+  /**
+   * Close the run and hand events to the sink if sampled.
+   * Head: random `sampleRate` of runs. Tail: every errored or slow run.
+   */
+  finish(): void {
+    if (this.finished) return;
+    this.finished = true;
+
+    const totalDuration = Date.now() - this.startTime;
+    const reason: SampleReason | null = this.headSampled
+      ? 'head'
+      : this.errorCount > 0
+        ? 'tail_error'
+        : totalDuration >= this.slowThresholdMs
+          ? 'tail_slow'
+          : null;
+
+    if (!reason) return;
+
+    this.log({
+      eventType: 'pipeline_complete',
+      stage: 'general',
+      durationMs: totalDuration,
+      success: this.errorCount === 0
     });
 
+    this.sink.enqueue(this.events.toArray().map(e => toWireEvent(e, reason)));
+  }
+
+  /**
+   * Get summary of all events
+   */
+  getSummary(): TelemetrySummary {
     return {
       totalDuration: Date.now() - this.startTime,
-      stageCount,
-      llmCalls: this.events.filter(e => e.llmProvider).length,
-      errors: this.events.filter(e => !e.success).length,
-      events: this.events
+      stageCount: { ...this.stageCount },
+      llmCalls: this.llmCallCount,
+      errors: this.errorCount,
+      events: this.events.toArray()
     };
   }
 
@@ -134,37 +230,42 @@ export class TelemetryCollector {
    * Get all events
    */
   getEvents(): TelemetryEvent[] {
-    return [...this.events];
+    return this.events.toArray();
   }
 
   /**
    * Get events by stage
    */
   getEventsByStage(stage: Stage): TelemetryEvent[] {
-    return this.events.filter(e => e.stage === stage);
+    return this.events.toArray().filter(e => e.stage === stage);
   }
 
   /**
    * Get total duration for a stage
    */
   getStageDuration(stage: Stage): number {
-    return this.events
-      .filter(e => e.stage === stage)
-      .reduce((sum, e) => sum + e.durationMs, 0);
+    return this.stageDuration[stage] || 0;
   }
 
   /**
    * Check if pipeline had any errors
    */
   hasErrors(): boolean {
-    return this.events.some(e => !e.success);
+    return this.errorCount > 0;
   }
 
   /**
    * Get first error
    */
   getFirstError(): TelemetryEvent | null {
-    return this.events.find(e => !e.success) || null;
+    return this.firstError;
+  }
+
+  /**
+   * Events evicted because the buffer was full
+   */
+  getDroppedCount(): number {
+    return this.events.dropped;
   }
 }
 
@@ -0,0 +1,138 @@
+/**
+ * Supabase Query Counter
+ *
+ * Counts every request the Supabase client makes during a browser session,
+ * bucketed by kind (rest table, rpc, auth, functions, storage). Used to
+ * compare queries-per-session before and after dashboard changes.
+ *
+ * Dev: inspect with `window.__patQueryStats()` in the browser console.
+ *
+ * While a trace is active (tracing.ts) each request is also recorded as a
+ * client span, and edge function calls carry a W3C `traceparent` header.
+ */
+
+import { tracer } from './tracing';
+
+export type QueryKind = 'rest' | 'rpc' | 'auth' | 'functions' | 'storage' | 'other';
+
+export interface QueryStats {
+  startedAt: number;
+  total: number;
+  byKind: Record<QueryKind, number>;
+  byTarget: Record<string, number>;
+}
+
+let stats: QueryStats = emptyStats();
+
+function emptyStats(): QueryStats {
+  return {
+    startedAt: Date.now(),
+    total: 0,
+    byKind: { rest: 0, rpc: 0, auth: 0, functions: 0, storage: 0, other: 0 },
+    byTarget: {}
+  };
+}
+
+/**
+ * Classify a Supabase URL into kind + target (table, rpc or function name)
+ */
+export function classifyRequest(url: string): { kind: QueryKind; target: string } {
+  let path: string;
+  try {
+    path = new URL(url).pathname;
+  } catch {
+    path = url;
+  }
+
+  const rpc = path.match(/\/rest\/v1\/rpc\/([^/?]+)/);
+  if (rpc) return { kind: 'rpc', target: `rpc:${rpc[1]}` };
+
+  const rest = path.match(/\/rest\/v1\/([^/?]+)/);
+  if (rest) return { kind: 'rest', target: rest[1] };
+
+  const fn = path.match(/\/functions\/v1\/([^/?]+)/);
+  if (fn) return { kind: 'functions', target: `fn:${fn[1]}` };
+
+  if (path.includes('/auth/v1/')) return { kind: 'auth', target: 'auth' };
+  if (path.includes('/storage/v1/')) return { kind: 'storage', target: 'storage' };
+
+  return { kind: 'other', target: 'other' };
+}
+
+export function recordQuery(url: string): void {
+  const { kind, target } = classifyRequest(url);
+  stats.total += 1;
+  stats.byKind[kind] += 1;
+  stats.byTarget[target] = (stats.byTarget[target] || 0) + 1;
+}
+
+export function getQueryStats(): QueryStats {
+  return {
+    ...stats,
+    byKind: { ...stats.byKind },
+    byTarget: { ...stats.byTarget }
+  };
+}
+
+export function resetQueryStats(): void {
+  stats = emptyStats();
+}
+
+/**
+ * fetch wrapper handed to createClient({ global: { fetch } })
+ */
+export function createCountingFetch(baseFetch?: typeof fetch): typeof fetch {
+  return (input: RequestInfo | URL, init?: RequestInit) => {
+    const url = typeof input === 'string'
+      ? input
+      : input instanceof URL
+        ? input.href
+        : input.url;
+    recordQuery(url);
+    // Resolve global fetch lazily so test mocks installed later still apply
+    const doFetch = baseFetch ?? fetch;
+
+    const parent = tracer.getActiveSpan();
+    if (!parent) return doFetch(input, init);
+
+    const { kind, target } = classifyRequest(url);
+    const span = parent.child(spanName(kind, target), {
+      'http.method': init?.method ?? 'GET',
+      'supabase.kind': kind,
+      'supabase.target': target
+    }, 'client');
+
+    // Only edge functions allow the traceparent header through CORS
+    if (kind === 'functions') {
+      const headers = new Headers(init?.headers ?? (input instanceof Request ? input.headers : undefined));
+      headers.set('traceparent', span.traceparent());
+      init = { ...init, headers };
+    }
+
+    return doFetch(input, init).then(
+      (res) => {
+        span.setAttributes({ 'http.status_code': res.status });
+        span.end(res.ok ? 'ok' : 'error', res.ok ? undefined : `HTTP ${res.status}`);
+        return res;
+      },
+      (err) => {
+        span.end('error', err?.message ?? String(err));
+        throw err;
+      }
+    );
+  };
+}
+
+function spanName(kind: QueryKind, target: string): string {
+  switch (kind) {
+    case 'rest': return `db ${target}`;
+    case 'rpc': return `rpc ${target.slice(4)}`;
+    case 'functions': return `invoke ${target.slice(3)}`;
+    default: return kind;
+  }
+}
+
+if (typeof window !== 'undefined' && !import.meta.env.PROD) {
+  (window as any).__patQueryStats = getQueryStats;
+  (window as any).__patQueryStatsReset = resetQueryStats;
+}
@@ -0,0 +1,77 @@
+/**
+ * Fixed-capacity ring buffer
+ *
+ * Memory is bounded by `capacity`; pushing into a full buffer overwrites the
+ * oldest entry and increments `dropped`.
+ */
+
+export class RingBuffer<T> {
+  private items: (T | undefined)[];
+  private head = 0;   // index of the oldest entry
+  private count = 0;
+  private droppedCount = 0;
+
+  constructor(readonly capacity: number) {
+    if (!Number.isInteger(capacity) || capacity <= 0) {
+      throw new Error(`RingBuffer capacity must be a positive integer, got ${capacity}`);
+    }
+    this.items = new Array(capacity);
+  }
+
+  /**
+   * Append an item; returns the evicted item when the buffer was full
+   */
+  push(item: T): T | undefined {
+    if (this.count < this.capacity) {
+      this.items[(this.head + this.count) % this.capacity] = item;
+      this.count++;
+      return undefined;
+    }
+
+    const evicted = this.items[this.head];
+    this.items[this.head] = item;
+    this.head = (this.head + 1) % this.capacity;
+    this.droppedCount++;
+    return evicted;
+  }
+
+  /**
+   * Remove and return up to `max` oldest items
+   */
+  drain(max: number = this.count): T[] {
+    const n = Math.min(max, this.count);
+    const out: T[] = new Array(n);
+    for (let i = 0; i < n; i++) {
+      out[i] = this.items[this.head] as T;
+      this.items[this.head] = undefined;
+      this.head = (this.head + 1) % this.capacity;
+    }
+    this.count -= n;
+    return out;
+  }
+
+  /**
+   * Oldest-first copy without removing anything
+   */
+  toArray(): T[] {
+    const out: T[] = new Array(this.count);
+    for (let i = 0; i < this.count; i++) {
+      out[i] = this.items[(this.head + i) % this.capacity] as T;
+    }
+    return out;
+  }
+
+  clear(): void {
+    this.items = new Array(this.capacity);
+    this.head = 0;
+    this.count = 0;
+  }
+
+  get size(): number {
+    return this.count;
+  }
+
+  get dropped(): number {
+    return this.droppedCount;
+  }
+}
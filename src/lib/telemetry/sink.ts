@@ -0,0 +1,203 @@
+/**
+ * Telemetry Sink
+ *
+ * Bounded, batched, non-blocking shipping of TelemetryEvents to the
+ * `telemetry-ingest` edge function.
+ *
+ * - Queue is a RingBuffer: memory never exceeds `maxQueue` events; the
+ *   oldest events are dropped (and counted) under sustained backlog.
+ * - Flushes every `flushIntervalMs` or once `batchSize` events are queued,
+ *   using fetch(..., { keepalive: true }) so the page never waits on it.
+ * - On pagehide / tab hidden the remainder goes out via navigator.sendBeacon.
+ */
+
+import { RingBuffer } from './ringBuffer';
+import type { TelemetryEvent } from './events';
+
+export type SampleReason = 'head' | 'tail_error' | 'tail_slow';
+
+/**
+ * Compact wire row (snake_case, matches public.telemetry_events)
+ */
+export interface TelemetryWireEvent {
+  ts: string;
+  session_id: string;
+  event_type: string;
+  stage: string;
+  duration_ms: number;
+  success: boolean;
+  sample_reason: SampleReason;
+  llm_provider?: string;
+  llm_model?: string;
+  tokens_in?: number;
+  tokens_out?: number;
+  item_count?: number;
+  error?: string;
+  metadata?: Record<string, any>;
+}
+
+export interface TelemetrySinkConfig {
+  endpoint: string;
+  maxQueue: number;
+  batchSize: number;
+  flushIntervalMs: number;
+}
+
+// Beacon payloads are capped around 64KB by browsers
+const MAX_BEACON_BYTES = 60_000;
+
+export function toWireEvent(event: TelemetryEvent, sampleReason: SampleReason): TelemetryWireEvent {
+  return {
+    ts: new Date(event.timestamp).toISOString(),
+    session_id: event.sessionId,
+    event_type: event.eventType,
+    stage: event.stage,
+    duration_ms: Math.max(0, Math.round(event.durationMs)),
+    success: event.success,
+    sample_reason: sampleReason,
+    ...(event.llmProvider && { llm_provider: event.llmProvider }),
+    ...(event.llmModel && { llm_model: event.llmModel }),
+    ...(event.llmTokens && { tokens_in: event.llmTokens.input, tokens_out: event.llmTokens.output }),
+    ...(event.itemCount !== undefined && { item_count: event.itemCount }),
+    ...(event.error && { error: event.error.slice(0, 500) }),
+    ...(event.metadata && { metadata: event.metadata })
+  };
+}
+
+export class TelemetrySink {
+  private queue: RingBuffer<TelemetryWireEvent>;
+  private timer: ReturnType<typeof setTimeout> | null = null;
+  private inFlight = false;
+  private accessToken: string | null = null;
+  private listenersAttached = false;
+
+  constructor(private config: TelemetrySinkConfig) {
+    this.queue = new RingBuffer(config.maxQueue);
+  }
+
+  enqueue(events: TelemetryWireEvent[]): void {
+    if (!isSinkEnabled()) return;
+    this.attachPageListeners();
+
+    for (const e of events) this.queue.push(e);
+
+    if (this.queue.size >= this.config.batchSize) {
+      void this.flush();
+    } else {
+      this.scheduleFlush();
+    }
+  }
+
+  /**
+   * Ship one batch in the background. Never throws.
+   */
+  async flush(): Promise<void> {
+    if (this.inFlight || this.queue.size === 0) return;
+    this.inFlight = true;
+    this.clearTimer();
+
+    const batch = this.queue.drain(this.config.batchSize);
+    try {
+      const token = await this.resolveAccessToken();
+      if (!token) return; // Signed out: ingest requires a user, drop quietly
+
+      await fetch(this.config.endpoint, {
+        method: 'POST',
+        keepalive: true,
+        headers: {
+          'Content-Type': 'application/json',
+          'Authorization': `Bearer ${token}`,
+          'apikey': import.meta.env.VITE_SUPABASE_ANON_KEY || ''
+        },
+        body: JSON.stringify({ events: batch, dropped: this.queue.dropped })
+      });
+    } catch (err) {
+      // Telemetry must never surface to the user
+      if (import.meta.env.DEV) console.warn('[telemetry-sink] flush failed:', err);
+    } finally {
+      this.inFlight = false;
+      if (this.queue.size > 0) this.scheduleFlush();
+    }
+  }
+
+  /**
+   * Synchronous best-effort flush for page teardown
+   */
+  flushWithBeacon(): void {
+    if (this.queue.size === 0 || !this.accessToken) return;
+    if (typeof navigator === 'undefined' || typeof navigator.sendBeacon !== 'function') return;
+
+    while (this.queue.size > 0) {
+      const batch = this.queue.drain(this.config.batchSize);
+      // sendBeacon can't set headers; the token travels in the body
+      let body = JSON.stringify({ events: batch, access_token: this.accessToken });
+      while (body.length > MAX_BEACON_BYTES && batch.length > 1) {
+        batch.length = Math.ceil(batch.length / 2);
+        body = JSON.stringify({ events: batch, access_token: this.accessToken });
+      }
+      const ok = navigator.sendBeacon(this.config.endpoint, new Blob([body], { type: 'application/json' }));
+      if (!ok) break;
+    }
+  }
+
+  get pending(): number {
+    return this.queue.size;
+  }
+
+  get dropped(): number {
+    return this.queue.dropped;
+  }
+
+  private scheduleFlush(): void {
+    if (this.timer) return;
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      void this.flush();
+    }, this.config.flushIntervalMs);
+  }
+
+  private clearTimer(): void {
+    if (this.timer) {
+      clearTimeout(this.timer);
+      this.timer = null;
+    }
+  }
+
+  private async resolveAccessToken(): Promise<string | null> {
+    try {
+      const { getSupabase } = await import('../supabase');
+      const { data } = await getSupabase().auth.getSession();
+      this.accessToken = data.session?.access_token ?? null;
+    } catch {
+      // keep last known token
+    }
+    return this.accessToken;
+  }
+
+  private attachPageListeners(): void {
+    if (this.listenersAttached || typeof window === 'undefined') return;
+    this.listenersAttached = true;
+
+    window.addEventListener('pagehide', () => this.flushWithBeacon());
+    document.addEventListener('visibilitychange', () => {
+      if (document.visibilityState === 'hidden') this.flushWithBeacon();
+    });
+  }
+}
+
+export function isSinkEnabled(): boolean {
+  if (typeof window === 'undefined') return false;
+  const flag = String(import.meta.env.VITE_TELEMETRY_SINK || '').toLowerCase();
+  if (flag === 'off' || flag === 'false') return false;
+  if (flag === 'on' || flag === 'true') return true;
+  return Boolean(import.meta.env.PROD);
+}
+
+const supabaseUrl = import.meta.env.VITE_SUPABASE_URL || 'https://jdtogitfqptdrxkczdbw.supabase.co';
+
+export const telemetrySink = new TelemetrySink({
+  endpoint: `${supabaseUrl}/functions/v1/telemetry-ingest`,
+  maxQueue: 500,
+  batchSize: 50,
+  flushIntervalMs: 5000
+});
@@ -0,0 +1,284 @@
+/**
+ * Lightweight Tracing
+ *
+ * W3C trace-context spans for a chat turn:
+ *   ChatPat → handleUserMessage → pipelines → functions.invoke → edge → provider
+ *
+ * - startTrace() opens a root span and makes it active; withSpan() nests work.
+ * - The Supabase fetch wrapper (queryCounter.ts) records a client span for
+ *   every DB query / RPC / function invoke under the active span and sends a
+ *   `traceparent` header to edge functions, which continue the same trace
+ *   (supabase/functions/_shared/tracing.ts).
+ * - Finished traces are kept in a small local ring (`__patTraces()` in dev) and
+ *   exported as OTLP/HTTP JSON when VITE_OTLP_ENDPOINT is set.
+ *
+ * The active span is a single module-level slot, not async-context storage.
+ * A chat turn runs one pipeline at a time, so spans started in parallel under
+ * Promise.all may be attributed to a sibling. Trace ids are always correct.
+ */
+
+import { RingBuffer } from './ringBuffer';
+
+export type SpanKind = 'internal' | 'client' | 'server';
+export type SpanStatus = 'unset' | 'ok' | 'error';
+
+export interface SpanRecord {
+  traceId: string;
+  spanId: string;
+  parentSpanId?: string;
+  name: string;
+  kind: SpanKind;
+  startTime: number;   // epoch ms
+  endTime: number;     // epoch ms
+  durationMs: number;
+  status: SpanStatus;
+  error?: string;
+  attributes: Record<string, string | number | boolean>;
+}
+
+export interface TraceRecord {
+  traceId: string;
+  rootName: string;
+  startTime: number;
+  durationMs: number;
+  spans: SpanRecord[];
+}
+
+const MAX_SPANS_PER_TRACE = 500;
+const MAX_LOCAL_TRACES = 25;
+
+function randomHex(bytes: number): string {
+  const buf = new Uint8Array(bytes);
+  if (typeof crypto !== 'undefined' && crypto.getRandomValues) {
+    crypto.getRandomValues(buf);
+  } else {
+    for (let i = 0; i < bytes; i++) buf[i] = Math.floor(Math.random() * 256);
+  }
+  return Array.from(buf, b => b.toString(16).padStart(2, '0')).join('');
+}
+
+export class Span {
+  readonly spanId = randomHex(8);
+  readonly startTime = Date.now();
+  private startPerf = performance.now();
+  private ended = false;
+  private attributes: Record<string, string | number | boolean> = {};
+
+  constructor(
+    private tracer: Tracer,
+    readonly name: string,
+    readonly traceId: string,
+    readonly parentSpanId: string | undefined,
+    readonly kind: SpanKind = 'internal',
+    attributes: Record<string, string | number | boolean | undefined> = {}
+  ) {
+    this.setAttributes(attributes);
+  }
+
+  child(name: string, attributes: Record<string, string | number | boolean | undefined> = {}, kind: SpanKind = 'internal'): Span {
+    return new Span(this.tracer, name, this.traceId, this.spanId, kind, attributes);
+  }
+
+  setAttributes(attributes: Record<string, string | number | boolean | undefined>): this {
+    for (const [k, v] of Object.entries(attributes)) {
+      if (v !== undefined) this.attributes[k] = v;
+    }
+    return this;
+  }
+
+  /**
+   * W3C traceparent header value for downstream hops
+   */
+  traceparent(): string {
+    return `00-${this.traceId}-${this.spanId}-01`;
+  }
+
+  end(status: SpanStatus = 'ok', error?: string): void {
+    if (this.ended) return;
+    this.ended = true;
+    const durationMs = Math.round((performance.now() - this.startPerf) * 100) / 100;
+    this.tracer.record({
+      traceId: this.traceId,
+      spanId: this.spanId,
+      parentSpanId: this.parentSpanId,
+      name: this.name,
+      kind: this.kind,
+      startTime: this.startTime,
+      endTime: this.startTime + durationMs,
+      durationMs,
+      status,
+      error,
+      attributes: { ...this.attributes }
+    }, this.parentSpanId === undefined);
+  }
+}
+
+export class Tracer {
+  private active: Span | null = null;
+  private open = new Map<string, SpanRecord[]>();
+  private finished = new RingBuffer<TraceRecord>(MAX_LOCAL_TRACES);
+
+  constructor(private exporter?: (trace: TraceRecord) => void) {}
+
+  /**
+   * Open a root span and make it the active span
+   */
+  startTrace(name: string, attributes: Record<string, string | number | boolean | undefined> = {}): Span {
+    const root = new Span(this, name, randomHex(16), undefined, 'internal', attributes);
+    this.open.set(root.traceId, []);
+    this.active = root;
+    return root;
+  }
+
+  getActiveSpan(): Span | null {
+    return this.active;
+  }
+
+  /**
+   * Run fn inside a child span of the active span (no-op when no trace is open)
+   */
+  async withSpan<T>(
+    name: string,
+    fn: (span: Span | null) => Promise<T>,
+    attributes: Record<string, string | number | boolean | undefined> = {}
+  ): Promise<T> {
+    const parent = this.active;
+    if (!parent) return fn(null);
+
+    const span = parent.child(name, attributes);
+    this.active = span;
+    try {
+      const result = await fn(span);
+      span.end('ok');
+      return result;
+    } catch (err: any) {
+      span.end('error', err?.message ?? String(err));
+      throw err;
+    } finally {
+      this.active = parent;
+    }
+  }
+
+  /**
+   * End the root span, close the trace and export it
+   */
+  endTrace(root: Span, status: SpanStatus = 'ok', error?: string): void {
+    root.end(status, error);
+    if (this.active?.traceId === root.traceId) this.active = null;
+  }
+
+  record(span: SpanRecord, isRoot: boolean): void {
+    const spans = this.open.get(span.traceId);
+    if (!spans) return; // trace already closed (late span)
+    if (spans.length < MAX_SPANS_PER_TRACE) spans.push(span);
+
+    if (isRoot) {
+      this.open.delete(span.traceId);
+      const trace: TraceRecord = {
+        traceId: span.traceId,
+        rootName: span.name,
+        startTime: span.startTime,
+        durationMs: span.durationMs,
+        spans: spans.sort((a, b) => a.startTime - b.startTime)
+      };
+      this.finished.push(trace);
+      try {
+        this.exporter?.(trace);
+      } catch {
+        // exporting must never break the app
+      }
+    }
+  }
+
+  getRecentTraces(): TraceRecord[] {
+    return this.finished.toArray();
+  }
+}
+
+/**
+ * Render a trace as an indented waterfall (local trace viewer)
+ */
+export function formatTrace(trace: TraceRecord): string {
+  const children = new Map<string | undefined, SpanRecord[]>();
+  for (const s of trace.spans) {
+    const list = children.get(s.parentSpanId) ?? [];
+    list.push(s);
+    children.set(s.parentSpanId, list);
+  }
+
+  const lines: string[] = [`trace ${trace.traceId} ${trace.rootName} ${trace.durationMs.toFixed(1)}ms`];
+  const walk = (parentId: string | undefined, depth: number) => {
+    for (const s of children.get(parentId) ?? []) {
+      const offset = (s.startTime - trace.startTime).toFixed(0).padStart(6);
+      const flag = s.status === 'error' ? ' ✗' : '';
+      lines.push(`${offset}ms ${'  '.repeat(depth)}${s.name} ${s.durationMs.toFixed(1)}ms${flag}`);
+      walk(s.spanId, depth + 1);
+    }
+  };
+  walk(undefined, 0);
+  return lines.join('\n');
+}
+
+const OTLP_KIND: Record<SpanKind, number> = { internal: 1, server: 2, client: 3 };
+
+/**
+ * OTLP/HTTP JSON payload (POST to <collector>/v1/traces)
+ */
+export function toOtlpPayload(trace: TraceRecord, serviceName: string) {
+  const attr = (key: string, value: string | number | boolean) => ({
+    key,
+    value: typeof value === 'number'
+      ? (Number.isInteger(value) ? { intValue: value } : { doubleValue: value })
+      : typeof value === 'boolean'
+        ? { boolValue: value }
+        : { stringValue: value }
+  });
+  const nanos = (ms: number) => `${Math.round(ms * 1e6)}`;
+
+  return {
+    resourceSpans: [{
+      resource: { attributes: [attr('service.name', serviceName)] },
+      scopeSpans: [{
+        scope: { name: 'pat-tracing' },
+        spans: trace.spans.map(s => ({
+          traceId: s.traceId,
+          spanId: s.spanId,
+          ...(s.parentSpanId && { parentSpanId: s.parentSpanId }),
+          name: s.name,
+          kind: OTLP_KIND[s.kind],
+          startTimeUnixNano: nanos(s.startTime),
+          endTimeUnixNano: nanos(s.endTime),
+          attributes: Object.entries(s.attributes).map(([k, v]) => attr(k, v)),
+          status: s.status === 'error'
+            ? { code: 2, message: s.error ?? '' }
+            : { code: s.status === 'ok' ? 1 : 0 }
+        }))
+      }]
+    }]
+  };
+}
+
+function defaultExporter(trace: TraceRecord): void {
+  const endpoint = import.meta.env.VITE_OTLP_ENDPOINT;
+  if (endpoint) {
+    void fetch(`${String(endpoint).replace(/\/$/, '')}/v1/traces`, {
+      method: 'POST',
+      keepalive: true,
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify(toOtlpPayload(trace, 'pat-web'))
+    }).catch(() => {});
+  }
+  if (import.meta.env.DEV) {
+    console.debug('[trace]\n' + formatTrace(trace));
+  }
+}
+
+export const tracer = new Tracer(defaultExporter);
+
+if (typeof window !== 'undefined' && !import.meta.env.PROD) {
+  (window as any).__patTraces = () => {
+    const traces = tracer.getRecentTraces();
+    traces.forEach(t => console.log(formatTrace(t)));
+    return traces;
+  };
+}
@@ -9,7 +9,7 @@ import { callChat } from '../chat';
 import { fetchFoodMacros } from '../food';
 import { saveMeal } from '../meals/saveMeal';
 import { getSupabase } from '../supabase';
-import { hasRoleAccess } from '../roleAccess';
+import { resolveUserContext, hasRole, type UserContext } from '../userContext';
 import type {
   AnalysisResult,
   MealNLUParseResult,
@@ -23,6 +23,7 @@ interface TMWYAInput {
   source: 'text' | 'voice' | 'photo' | 'barcode';
   userId: string;
   imageData?: string; // base64 for photo/barcode
+  userContext?: UserContext; // Preloaded by handleUserMessage
 }
 
 interface TMWYAResult {
@@ -43,9 +44,9 @@ export async function runTMWYAPipeline(input: TMWYAInput): Promise<TMWYAResult>
     console.log('[SWARM] persona loaded: patSystem.v2');
     console.log('[TMWYA] Starting pipeline for:', input.source);
 
-    // Check role access
-    const hasAccess = await hasRoleAccess(input.userId, 'TMWYA');
-    if (!hasAccess) {
+    // Check role access (from the request's UserContext, not a fresh RPC)
+    const userContext = await resolveUserContext(input.userId, input.userContext);
+    if (!hasRole(userContext, 'TMWYA')) {
       return {
         ok: false,
         error: 'TMWYA feature not available for your account tier',
@@ -96,7 +97,7 @@ export async function runTMWYAPipeline(input: TMWYAInput): Promise<TMWYAResult>
     };
 
     // Step 4: Get TDEE comparison for verification screen
-    const tdeeComparison = await getTDEEComparison(input.userId, analysisResult);
+    const tdeeComparison = await getTDEEComparison(input.userId, analysisResult, userContext);
 
     console.log('[TMWYA] Pipeline complete, ready for verification');
 
@@ -466,7 +467,7 @@ function determineMealSlot(): 'breakfast' | 'lunch' | 'dinner' | 'snack' {
 /**
  * Get TDEE comparison for verification screen
  */
-async function getTDEEComparison(userId: string, analysis: AnalysisResult): Promise<TDEEComparison> {
+async function getTDEEComparison(userId: string, analysis: AnalysisResult, userContext: UserContext): Promise<TDEEComparison> {
   const supabase = getSupabase();
   const today = new Date().toISOString().split('T')[0];
 
@@ -481,12 +482,8 @@ async function getTDEEComparison(userId: string, analysis: AnalysisResult): Prom
     { kcal: 0, protein_g: 0, carbs_g: 0, fat_g: 0 }
   );
 
-  // Get user targets
-  const { data: metrics } = await supabase
-    .from('user_metrics')
-    .select('tdee, protein_g')
-    .eq('user_id', userId)
-    .maybeSingle();
+  // User targets come from the request's UserContext
+  const metrics = userContext.metrics;
 
   const dailyTarget = metrics?.tdee || 2000;
   const proteinTarget = metrics?.protein_g || 150;
@@ -0,0 +1,161 @@
+/**
+ * Request-scoped User Context
+ *
+ * Everything a chat turn / meal resolution needs about the user (profile,
+ * preferences, metrics, account, allowed roles, admin flag), loaded once via the
+ * get_user_context RPC and passed down instead of each layer re-reading
+ * user_preferences / user_metrics / user_profiles.
+ *
+ * Results are cached per user for a few seconds and concurrent loads share
+ * one request, so back-to-back turns and parallel item lookups cost a
+ * single round trip. Writers to those rows should call invalidateUserContext;
+ * sign-out clears the cache.
+ */
+
+import { getSupabase } from './supabase';
+import { isAdmin } from './auth/isAdmin';
+import { accessRulesLoaded, isRoleAllowed } from './accessRules';
+
+export interface UserContext {
+  userId: string;
+  /** Lower-case ISO country from user_preferences.country_code ('us' default) */
+  countryCode: string;
+  profile: Record<string, any> | null;
+  preferences: Record<string, any> | null;
+  metrics: Record<string, any> | null;
+  /** profiles name / has_completed_tdee / chat_count, for Pat's persona */
+  account: Record<string, any> | null;
+  allowedRoles: string[];
+  isAdmin: boolean;
+  isBeta: boolean;
+  loadedAt: number;
+}
+
+const CONTEXT_TTL_MS = 30_000;
+
+const cache = new Map<string, { ctx: UserContext; expiresAt: number }>();
+const inflight = new Map<string, Promise<UserContext>>();
+
+export function buildUserContext(userId: string, raw: Record<string, any> | null | undefined): UserContext {
+  const preferences = raw?.preferences ?? null;
+  return {
+    userId,
+    countryCode: (preferences?.country_code || 'us').toLowerCase(),
+    profile: raw?.profile ?? null,
+    preferences,
+    metrics: raw?.metrics ?? null,
+    account: raw?.account ?? null,
+    allowedRoles: Array.isArray(raw?.allowed_roles) ? raw!.allowed_roles : [],
+    isAdmin: raw?.is_admin === true,
+    isBeta: raw?.is_beta === true,
+    loadedAt: Date.now()
+  };
+}
+
+/**
+ * Per-table reads, used when get_user_context is not deployed or the
+ * requested user is not the signed-in one
+ */
+async function loadFromTables(userId: string): Promise<Record<string, any>> {
+  const supabase = getSupabase();
+  const [preferences, profile, metrics, account, roles, admin] = await Promise.all([
+    supabase.from('user_preferences').select('*').eq('user_id', userId).maybeSingle(),
+    supabase.from('user_profiles').select('*').eq('user_id', userId).maybeSingle(),
+    supabase.from('user_metrics').select('*').eq('user_id', userId).maybeSingle(),
+    // Beta flag lives on profiles, as in get_user_context and allowed_roles()
+    supabase.from('profiles').select('beta_user, name, has_completed_tdee, chat_count').eq('user_id', userId).maybeSingle(),
+    supabase.rpc('allowed_roles'),
+    isAdmin()
+  ]);
+  return {
+    preferences: preferences.data,
+    profile: profile.data,
+    metrics: metrics.data,
+    account: account.data
+      ? { name: account.data.name, has_completed_tdee: account.data.has_completed_tdee, chat_count: account.data.chat_count }
+      : null,
+    allowed_roles: (roles.data || []).map((r: { role_name: string }) => r.role_name),
+    is_admin: admin,
+    is_beta: account.data?.beta_user === true
+  };
+}
+
+async function fetchUserContext(userId: string): Promise<UserContext> {
+  const { data, error } = await getSupabase().rpc('get_user_context');
+  if (!error && data && data.user_id === userId) {
+    return buildUserContext(userId, data);
+  }
+  if (error) {
+    console.warn('[userContext] get_user_context failed, reading tables:', error.message);
+  }
+  try {
+    return buildUserContext(userId, await loadFromTables(userId));
+  } catch (err) {
+    console.error('[userContext] Failed to load user context, using defaults:', err);
+    return buildUserContext(userId, null);
+  }
+}
+
+let authListenerAttached = false;
+
+/** Drop everything on sign-out so the next user never sees a cached context */
+function attachAuthListener(): void {
+  if (authListenerAttached) return;
+  authListenerAttached = true;
+  getSupabase().auth.onAuthStateChange((event) => {
+    if (event === 'SIGNED_OUT') invalidateUserContext();
+  });
+}
+
+/**
+ * Load (or reuse) the user's context
+ */
+export async function loadUserContext(userId: string, options: { force?: boolean } = {}): Promise<UserContext> {
+  attachAuthListener();
+  if (!options.force) {
+    const hit = cache.get(userId);
+    if (hit && hit.expiresAt > Date.now()) return hit.ctx;
+    const pending = inflight.get(userId);
+    if (pending) return pending;
+  }
+
+  const promise = fetchUserContext(userId)
+    .then(ctx => {
+      cache.set(userId, { ctx, expiresAt: Date.now() + CONTEXT_TTL_MS });
+      return ctx;
+    })
+    .finally(() => {
+      if (inflight.get(userId) === promise) inflight.delete(userId);
+    });
+  inflight.set(userId, promise);
+  return promise;
+}
+
+/**
+ * The caller's context if it has one for this user, otherwise the cached load
+ */
+export function resolveUserContext(userId: string, ctx?: UserContext): Promise<UserContext> {
+  return ctx && ctx.userId === userId ? Promise.resolve(ctx) : loadUserContext(userId);
+}
+
+/**
+ * Role check with no I/O: the compiled access rules when loaded (so a
+ * role_access change applies without waiting for the context TTL), the
+ * roles loaded with the context otherwise
+ */
+export function hasRole(ctx: UserContext, roleName: string): boolean {
+  return accessRulesLoaded() ? isRoleAllowed(roleName, ctx) : ctx.allowedRoles.includes(roleName);
+}
+
+/**
+ * Drop cached context (after preference / metrics / role writes, sign-out)
+ */
+export function invalidateUserContext(userId?: string): void {
+  if (userId) {
+    cache.delete(userId);
+    inflight.delete(userId);
+  } else {
+    cache.clear();
+    inflight.clear();
+  }
+}
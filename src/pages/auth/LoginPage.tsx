@@ -3,6 +3,7 @@ import { Mail, Lock, Eye, EyeOff, ArrowRight } from 'lucide-react';
 import { useNavigate } from 'react-router-dom';
 import { getSupabase } from '../../lib/supabase';
 import { PatAvatar } from '../../components/PatAvatar';
+import { prefetchOnIdle } from '../../lib/routePreload';
 
 export const LoginPage: React.FC = () => {
   const navigate = useNavigate();
@@ -12,6 +13,8 @@ export const LoginPage: React.FC = () => {
   const [isLoading, setIsLoading] = useState(false);
   const [error, setError] = useState('');
 
+  // Fetch the dashboard chunk while the user is typing credentials
+  useEffect(() => prefetchOnIdle(['/dashboard']), []);
 
   const validateEmail = (v: string) => /^[^\s@]+@[^\s@]+\.[^\s@]+$/.test(v);
 
@@ -0,0 +1,109 @@
+import { describe, it, expect, beforeEach } from 'vitest';
+import { useDayTotalsStore, type DayTotalsDelta } from '../dayTotals';
+import { classifyRequest } from '../../lib/telemetry/queryCounter';
+
+const USER = '11111111-1111-4111-8111-111111111111';
+const DAY_START = '2025-11-07T05:01:00.000Z';
+const DAY_END = '2025-11-08T04:59:59.999Z';
+
+function delta(overrides: Partial<DayTotalsDelta> = {}): DayTotalsDelta {
+  return {
+    meal_log_id: 'meal-1',
+    ts: '2025-11-07T17:30:00.000Z',
+    op: 'insert',
+    kcal: 500,
+    protein_g: 40,
+    carbs_g: 50,
+    fat_g: 15,
+    fiber_g: 6,
+    items: 2,
+    ...overrides
+  };
+}
+
+describe('useDayTotalsStore', () => {
+  beforeEach(() => {
+    useDayTotalsStore.getState().reset();
+    useDayTotalsStore.getState().seed(USER, DAY_START, DAY_END, {
+      kcal: 1000, protein_g: 80, carbs_g: 100, fat_g: 30, fiber_g: 10, items: 4
+    });
+  });
+
+  it('applies insert and delete deltas to the seeded totals', () => {
+    const store = useDayTotalsStore.getState();
+    store.applyDelta(delta());
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1500);
+    expect(useDayTotalsStore.getState().totals.items).toBe(6);
+
+    store.applyDelta(delta({ op: 'delete', kcal: -500, protein_g: -40, carbs_g: -50, fat_g: -15, fiber_g: -6, items: -2 }));
+    expect(useDayTotalsStore.getState().totals).toEqual({
+      kcal: 1000, protein_g: 80, carbs_g: 100, fat_g: 30, fiber_g: 10, items: 4
+    });
+  });
+
+  it('ignores deltas for meals outside the displayed day', () => {
+    useDayTotalsStore.getState().applyDelta(delta({ ts: '2025-11-06T12:00:00.000Z' }));
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1000);
+  });
+
+  it('ignores deltas until seeded', () => {
+    useDayTotalsStore.getState().invalidate();
+    useDayTotalsStore.getState().applyDelta(delta());
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1000);
+  });
+
+  it('is fresh only while live for the same user', () => {
+    const store = useDayTotalsStore.getState();
+    expect(store.isFresh(USER)).toBe(false);
+    store.setLive(true);
+    // Seeded day ended in the past relative to now
+    expect(useDayTotalsStore.getState().isFresh(USER)).toBe(false);
+
+    const end = new Date(Date.now() + 60_000).toISOString();
+    store.seed(USER, DAY_START, end, useDayTotalsStore.getState().totals);
+    expect(useDayTotalsStore.getState().isFresh(USER)).toBe(true);
+    expect(useDayTotalsStore.getState().isFresh('someone-else')).toBe(false);
+  });
+
+  it('counts an optimistic meal once whether its ack or its delta arrives first', () => {
+    const meal = { ts: '2025-11-07T17:30:00.000Z', totals: { kcal: 500, protein_g: 40, carbs_g: 50, fat_g: 15, fiber_g: 6, items: 2 } };
+    const store = useDayTotalsStore.getState();
+    store.setLive(true);
+
+    // ack, then delta
+    store.addOptimistic('c1', meal);
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1500);
+    store.confirmOptimistic('c1', 'meal-1');
+    store.applyDelta(delta({ meal_log_id: 'meal-1' }));
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1500);
+    expect(useDayTotalsStore.getState().optimistic).toEqual({});
+
+    // delta, then ack
+    store.addOptimistic('c2', meal);
+    store.applyDelta(delta({ meal_log_id: 'meal-2' }));
+    store.confirmOptimistic('c2', 'meal-2');
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(2000);
+
+    // rejected by the server
+    store.addOptimistic('c3', meal);
+    store.rejectOptimistic('c3');
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(2000);
+  });
+
+  it('keeps unsynced optimistic meals on top of a re-seed', () => {
+    const store = useDayTotalsStore.getState();
+    store.addOptimistic('c1', { ts: '2025-11-07T17:30:00.000Z', totals: { kcal: 300, protein_g: 20, carbs_g: 30, fat_g: 10, fiber_g: 2, items: 1 } });
+    store.seed(USER, DAY_START, DAY_END, { kcal: 1000, protein_g: 80, carbs_g: 100, fat_g: 30, fiber_g: 10, items: 4 });
+    expect(useDayTotalsStore.getState().totals.kcal).toBe(1300);
+  });
+});
+
+describe('classifyRequest', () => {
+  it('buckets Supabase URLs by kind', () => {
+    const base = 'https://example.supabase.co';
+    expect(classifyRequest(`${base}/rest/v1/meal_logs?select=*`)).toEqual({ kind: 'rest', target: 'meal_logs' });
+    expect(classifyRequest(`${base}/rest/v1/rpc/log_meal`)).toEqual({ kind: 'rpc', target: 'rpc:log_meal' });
+    expect(classifyRequest(`${base}/functions/v1/openai-chat`)).toEqual({ kind: 'functions', target: 'fn:openai-chat' });
+    expect(classifyRequest(`${base}/auth/v1/user`).kind).toBe('auth');
+  });
+});
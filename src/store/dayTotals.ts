@@ -0,0 +1,190 @@
+import { create } from 'zustand';
+
+export interface DayTotals {
+  kcal: number;
+  protein_g: number;
+  carbs_g: number;
+  fat_g: number;
+  fiber_g: number;
+  items: number;
+}
+
+/**
+ * Compact delta broadcast by the meal_items / meal_logs triggers
+ * (see supabase/migrations/20251107000000_day_totals_realtime.sql)
+ */
+export interface DayTotalsDelta extends DayTotals {
+  meal_log_id: string;
+  ts: string;
+  op: 'insert' | 'delete' | 'update' | 'move';
+}
+
+/**
+ * A meal acknowledged locally by the outbox (src/lib/meals/outbox.ts) but not
+ * yet reflected by a realtime delta. mealLogId is set once the server has it.
+ */
+export interface OptimisticMeal {
+  ts: string;
+  totals: DayTotals;
+  mealLogId?: string;
+}
+
+// Recent insert deltas, so a sync ack that arrives after its delta is matched
+const SEEN_DELTA_LIMIT = 50;
+
+export const EMPTY_DAY_TOTALS: DayTotals = {
+  kcal: 0,
+  protein_g: 0,
+  carbs_g: 0,
+  fat_g: 0,
+  fiber_g: 0,
+  items: 0
+};
+
+type DayTotalsState = {
+  userId: string | null;
+  dayStart: string | null;
+  dayEnd: string | null;
+  totals: DayTotals;
+  seeded: boolean;
+  live: boolean;
+  optimistic: Record<string, OptimisticMeal>;
+  seenMealLogIds: string[];
+  seed: (userId: string, dayStart: string, dayEnd: string, totals: DayTotals) => void;
+  applyDelta: (delta: DayTotalsDelta) => void;
+  setLive: (live: boolean) => void;
+  addOptimistic: (clientId: string, meal: OptimisticMeal) => void;
+  confirmOptimistic: (clientId: string, mealLogId: string) => void;
+  rejectOptimistic: (clientId: string) => void;
+  invalidate: () => void;
+  reset: () => void;
+  isFresh: (userId: string) => boolean;
+};
+
+function addTotals(a: DayTotals, b: DayTotals, sign: 1 | -1 = 1): DayTotals {
+  return {
+    kcal: Math.max(0, a.kcal + sign * (b.kcal || 0)),
+    protein_g: Math.max(0, a.protein_g + sign * (b.protein_g || 0)),
+    carbs_g: Math.max(0, a.carbs_g + sign * (b.carbs_g || 0)),
+    fat_g: Math.max(0, a.fat_g + sign * (b.fat_g || 0)),
+    fiber_g: Math.max(0, a.fiber_g + sign * (b.fiber_g || 0)),
+    items: Math.max(0, a.items + sign * (b.items || 0))
+  };
+}
+
+function inDay(ts: string, dayStart: string | null, dayEnd: string | null): boolean {
+  if (!dayStart || !dayEnd) return false;
+  const t = new Date(ts).getTime();
+  return t >= new Date(dayStart).getTime() && t <= new Date(dayEnd).getTime();
+}
+
+export const useDayTotalsStore = create<DayTotalsState>((set, get) => ({
+  userId: null,
+  dayStart: null,
+  dayEnd: null,
+  totals: { ...EMPTY_DAY_TOTALS },
+  seeded: false,
+  live: false,
+  optimistic: {},
+  seenMealLogIds: [],
+
+  seed: (userId, dayStart, dayEnd, totals) => {
+    // Meals the server has confirmed are in the seeded rows; unsynced ones are not
+    const optimistic: Record<string, OptimisticMeal> = {};
+    let seededTotals = { ...totals };
+    for (const [clientId, meal] of Object.entries(get().optimistic)) {
+      if (meal.mealLogId) continue;
+      optimistic[clientId] = meal;
+      if (inDay(meal.ts, dayStart, dayEnd)) seededTotals = addTotals(seededTotals, meal.totals);
+    }
+    set({ userId, dayStart, dayEnd, totals: seededTotals, seeded: true, optimistic });
+  },
+
+  applyDelta: (delta) => {
+    const { seeded, dayStart, dayEnd, totals, optimistic, seenMealLogIds } = get();
+
+    if (delta.op === 'insert') {
+      set({ seenMealLogIds: [...seenMealLogIds, delta.meal_log_id].slice(-SEEN_DELTA_LIMIT) });
+      // Already counted optimistically: the delta only settles the entry
+      const match = Object.entries(optimistic).find(([, meal]) => meal.mealLogId === delta.meal_log_id);
+      if (match) {
+        const { [match[0]]: _settled, ...rest } = optimistic;
+        set({ optimistic: rest });
+        return;
+      }
+    }
+
+    if (!seeded) return;
+    // Only deltas for meals inside the displayed day count
+    if (!inDay(delta.ts, dayStart, dayEnd)) return;
+
+    set({ totals: addTotals(totals, delta) });
+  },
+
+  setLive: (live) => set({ live }),
+
+  addOptimistic: (clientId, meal) => {
+    const { optimistic, seeded, dayStart, dayEnd, totals } = get();
+    if (optimistic[clientId]) return;
+    set({
+      optimistic: { ...optimistic, [clientId]: meal },
+      ...(seeded && inDay(meal.ts, dayStart, dayEnd) && { totals: addTotals(totals, meal.totals) })
+    });
+  },
+
+  confirmOptimistic: (clientId, mealLogId) => {
+    const { optimistic, seenMealLogIds, live, seeded, dayStart, dayEnd, totals } = get();
+    const meal = optimistic[clientId];
+    if (!meal) return;
+    const { [clientId]: _confirmed, ...rest } = optimistic;
+
+    if (seenMealLogIds.includes(mealLogId)) {
+      // The delta beat the ack and was counted on top of the optimistic entry
+      set({
+        optimistic: rest,
+        ...(seeded && inDay(meal.ts, dayStart, dayEnd) && { totals: addTotals(totals, meal.totals, -1) })
+      });
+    } else if (!live) {
+      // No delta is coming; the optimistic amount stands in for it
+      set({ optimistic: rest });
+    } else {
+      set({ optimistic: { ...optimistic, [clientId]: { ...meal, mealLogId } } });
+    }
+  },
+
+  rejectOptimistic: (clientId) => {
+    const { optimistic, seeded, dayStart, dayEnd, totals } = get();
+    const meal = optimistic[clientId];
+    if (!meal) return;
+    const { [clientId]: _rejected, ...rest } = optimistic;
+    set({
+      optimistic: rest,
+      ...(seeded && inDay(meal.ts, dayStart, dayEnd) && { totals: addTotals(totals, meal.totals, -1) })
+    });
+  },
+
+  // Missed deltas (channel dropped) make the seeded totals untrustworthy
+  invalidate: () => set({ seeded: false, live: false }),
+
+  reset: () => set({
+    userId: null,
+    dayStart: null,
+    dayEnd: null,
+    totals: { ...EMPTY_DAY_TOTALS },
+    seeded: false,
+    live: false,
+    optimistic: {},
+    seenMealLogIds: []
+  }),
+
+  isFresh: (userId) => {
+    const { userId: seededUser, seeded, live, dayEnd } = get();
+    return (
+      seeded &&
+      live &&
+      seededUser === userId &&
+      !!dayEnd &&
+      Date.now() <= new Date(dayEnd).getTime()
+    );
+  }
+}));
@@ -3,6 +3,8 @@
 interface ImportMetaEnv {
   readonly VITE_BETA_HOLD?: string;
   readonly VITE_BETA_VIDEO_URL?: string;
+  readonly VITE_OPENAI_BASE_URL?: string;
+  readonly VITE_ENABLE_PROFILER?: string;
 }
 
 interface ImportMeta {
@@ -0,0 +1,200 @@
+/**
+ * LLM CASSETTES
+ *
+ * Record/replay for upstream provider calls (OpenAI, Gemini). `providerFetch`
+ * is a drop-in fetch; with LLM_CASSETTE_MODE unset it is plain fetch.
+ *
+ *   LLM_CASSETTE_MODE   off | record | replay | auto (replay hit, record miss)
+ *   LLM_CASSETTE_DIR    where cassettes live (default /tmp/llm-cassettes)
+ *   LLM_CASSETTE_SPEED  replay pacing: 1 = as recorded, 10 = 10x faster,
+ *                       0 = no delays (default 1)
+ *
+ * A cassette is keyed by sha256(method, URL without API keys, canonical JSON
+ * body), so reordered keys hit the same file. It stores status, headers,
+ * time to headers and every body chunk with its offset, so streamed (SSE)
+ * replies replay with their original cadence. Only 2xx responses are
+ * recorded. In replay mode a miss throws instead of calling the provider.
+ */
+
+type CassetteMode = 'off' | 'record' | 'replay' | 'auto';
+
+interface CassetteChunk {
+  t: number;      // ms after the request started
+  data: string;
+}
+
+interface Cassette {
+  version: 1;
+  key: string;
+  request: { method: string; url: string; body: unknown };
+  response: {
+    status: number;
+    headers: Record<string, string>;
+    headersMs: number;
+    chunks: CassetteChunk[];
+    totalMs: number;
+  };
+  recordedAt: string;
+}
+
+const MODE = (Deno.env.get('LLM_CASSETTE_MODE') ?? 'off').toLowerCase() as CassetteMode;
+const DIR = (Deno.env.get('LLM_CASSETTE_DIR') ?? '/tmp/llm-cassettes').replace(/\/+$/, '');
+const SPEED = Math.max(0, Number(Deno.env.get('LLM_CASSETTE_SPEED') ?? 1));
+
+const SECRET_PARAMS = /([?&](?:key|api_key|apikey)=)[^&]*/gi;
+const RECORDED_HEADERS = ['content-type', 'cache-control'];
+
+export function cassetteMode(): CassetteMode {
+  return MODE;
+}
+
+function canonical(value: unknown): unknown {
+  if (Array.isArray(value)) return value.map(canonical);
+  if (value && typeof value === 'object') {
+    return Object.fromEntries(
+      Object.keys(value as Record<string, unknown>).sort().map((k) => [k, canonical((value as any)[k])]),
+    );
+  }
+  return value;
+}
+
+function parseBody(body: BodyInit | null | undefined): unknown {
+  if (typeof body !== 'string') return body == null ? null : '[non-string body]';
+  try {
+    return canonical(JSON.parse(body));
+  } catch {
+    return body;
+  }
+}
+
+async function sha256(text: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest)).map((b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+function sleep(ms: number): Promise<void> {
+  return ms > 0 ? new Promise((resolve) => setTimeout(resolve, ms)) : Promise.resolve();
+}
+
+function pathFor(url: string, key: string): string {
+  let host = 'unknown';
+  try { host = new URL(url).host.replace(/[^a-z0-9.-]/gi, '_'); } catch { /* keep default */ }
+  return `${DIR}/${host}/${key}.json`;
+}
+
+async function readCassette(path: string): Promise<Cassette | null> {
+  try {
+    return JSON.parse(await Deno.readTextFile(path)) as Cassette;
+  } catch (err) {
+    if (err instanceof Deno.errors.NotFound) return null;
+    throw err;
+  }
+}
+
+async function writeCassette(path: string, cassette: Cassette): Promise<void> {
+  await Deno.mkdir(path.slice(0, path.lastIndexOf('/')), { recursive: true });
+  // Write-then-rename so a concurrent replay never reads half a file
+  const tmp = `${path}.${crypto.randomUUID().slice(0, 8)}.tmp`;
+  await Deno.writeTextFile(tmp, JSON.stringify(cassette, null, 2));
+  await Deno.rename(tmp, path);
+}
+
+function replay(cassette: Cassette): Promise<Response> {
+  const { response } = cassette;
+  const scale = SPEED === 0 ? 0 : 1 / SPEED;
+  const encoder = new TextEncoder();
+
+  return sleep(response.headersMs * scale).then(() => {
+    const body = new ReadableStream<Uint8Array>({
+      async start(controller) {
+        let elapsed = response.headersMs;
+        for (const chunk of response.chunks) {
+          await sleep((chunk.t - elapsed) * scale);
+          elapsed = Math.max(elapsed, chunk.t);
+          controller.enqueue(encoder.encode(chunk.data));
+        }
+        controller.close();
+      },
+    });
+    return new Response(body, {
+      status: response.status,
+      headers: { ...response.headers, 'x-llm-cassette': 'replay' },
+    });
+  });
+}
+
+/**
+ * Pass the upstream response through unchanged while a tee'd copy is
+ * captured chunk by chunk and saved once the body completes
+ */
+function record(res: Response, started: number, path: string, cassette: Omit<Cassette, 'response'>): Response {
+  if (!res.ok || !res.body) return res;
+
+  const headersMs = performance.now() - started;
+  const [caller, tape] = res.body.tee();
+
+  const saving = (async () => {
+    const reader = tape.getReader();
+    const decoder = new TextDecoder();
+    const chunks: CassetteChunk[] = [];
+    for (;;) {
+      const { done, value } = await reader.read();
+      if (done) break;
+      chunks.push({ t: Math.round(performance.now() - started), data: decoder.decode(value, { stream: true }) });
+    }
+    const tail = decoder.decode();
+    if (tail) chunks.push({ t: Math.round(performance.now() - started), data: tail });
+
+    const headers: Record<string, string> = {};
+    for (const name of RECORDED_HEADERS) {
+      const value = res.headers.get(name);
+      if (value) headers[name] = value;
+    }
+    await writeCassette(path, {
+      ...cassette,
+      response: {
+        status: res.status,
+        headers,
+        headersMs: Math.round(headersMs),
+        chunks,
+        totalMs: Math.round(performance.now() - started),
+      },
+    });
+  })().catch((err) => console.warn('[cassette] failed to record', path, err));
+
+  // deno-lint-ignore no-explicit-any
+  const runtime = (globalThis as any).EdgeRuntime;
+  if (runtime?.waitUntil) runtime.waitUntil(saving);
+
+  return new Response(caller, { status: res.status, statusText: res.statusText, headers: res.headers });
+}
+
+/**
+ * fetch() for upstream provider calls, with cassette record/replay
+ */
+export async function providerFetch(url: string, init?: RequestInit): Promise<Response> {
+  if (MODE === 'off') return fetch(url, init);
+
+  const method = (init?.method ?? 'GET').toUpperCase();
+  const safeUrl = url.replace(SECRET_PARAMS, '$1***');
+  const body = parseBody(init?.body);
+  const key = (await sha256(JSON.stringify([method, safeUrl, body]))).slice(0, 32);
+  const path = pathFor(url, key);
+
+  if (MODE === 'replay' || MODE === 'auto') {
+    const cassette = await readCassette(path);
+    if (cassette) return replay(cassette);
+    if (MODE === 'replay') {
+      throw new Error(`[cassette] no recording for ${method} ${safeUrl} (${path})`);
+    }
+  }
+
+  const started = performance.now();
+  const res = await fetch(url, init);
+  return record(res, started, path, {
+    version: 1,
+    key,
+    request: { method, url: safeUrl, body },
+    recordedAt: new Date().toISOString(),
+  });
+}
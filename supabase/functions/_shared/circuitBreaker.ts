@@ -0,0 +1,168 @@
+/**
+ * CIRCUIT BREAKER + JITTERED RETRY
+ *
+ * Guards an upstream provider so an outage costs one fast failure per
+ * request instead of a full timeout, and recovers without a deploy:
+ *
+ *   closed    - calls go through; `failureThreshold` consecutive failures open it
+ *   open      - calls are rejected immediately for `openMs`
+ *   half-open - one probe call is let through; success closes the breaker,
+ *               failure re-opens it with a doubled open window (capped)
+ *
+ * State lives in the isolate, so each warm instance trips independently.
+ * No Deno APIs: the vitest suite imports this module directly.
+ */
+
+export type BreakerState = 'closed' | 'open' | 'half-open';
+
+export interface CircuitBreakerOptions {
+  failureThreshold?: number;
+  openMs?: number;
+  maxOpenMs?: number;
+  now?: () => number;
+}
+
+export interface BreakerSnapshot {
+  state: BreakerState;
+  failures: number;
+  /** Until the next probe is allowed (0 unless open) */
+  retryAfterMs: number;
+}
+
+export class CircuitOpenError extends Error {
+  readonly retryAfterMs: number;
+
+  constructor(retryAfterMs: number) {
+    super(`Circuit open, retry after ${retryAfterMs}ms`);
+    this.name = 'CircuitOpenError';
+    this.retryAfterMs = retryAfterMs;
+  }
+}
+
+export class CircuitBreaker {
+  private state: BreakerState = 'closed';
+  private failures = 0;
+  private openedAt = 0;
+  private currentOpenMs: number;
+  private probing = false;
+  private readonly failureThreshold: number;
+  private readonly openMs: number;
+  private readonly maxOpenMs: number;
+  private readonly now: () => number;
+
+  constructor(options: CircuitBreakerOptions = {}) {
+    this.failureThreshold = options.failureThreshold ?? 5;
+    this.openMs = options.openMs ?? 30_000;
+    this.maxOpenMs = options.maxOpenMs ?? 5 * 60_000;
+    this.now = options.now ?? Date.now;
+    this.currentOpenMs = this.openMs;
+  }
+
+  snapshot(): BreakerSnapshot {
+    this.refresh();
+    return {
+      state: this.state,
+      failures: this.failures,
+      retryAfterMs: this.state === 'open' ? Math.max(0, this.openedAt + this.currentOpenMs - this.now()) : 0
+    };
+  }
+
+  /** Whether a call may go out now; in half-open only one probe at a time */
+  allow(): boolean {
+    this.refresh();
+    if (this.state === 'closed') return true;
+    if (this.state === 'half-open' && !this.probing) {
+      this.probing = true;
+      return true;
+    }
+    return false;
+  }
+
+  success(): void {
+    this.state = 'closed';
+    this.failures = 0;
+    this.probing = false;
+    this.currentOpenMs = this.openMs;
+  }
+
+  failure(): void {
+    this.failures++;
+    if (this.state === 'half-open') {
+      this.currentOpenMs = Math.min(this.currentOpenMs * 2, this.maxOpenMs);
+      this.trip();
+    } else if (this.state === 'closed' && this.failures >= this.failureThreshold) {
+      this.trip();
+    }
+  }
+
+  /** Run fn through the breaker; throws CircuitOpenError without calling it when open */
+  async run<T>(fn: () => Promise<T>, isFailure: (value: T) => boolean = () => false): Promise<T> {
+    if (!this.allow()) throw new CircuitOpenError(this.snapshot().retryAfterMs);
+    try {
+      const value = await fn();
+      if (isFailure(value)) this.failure();
+      else this.success();
+      return value;
+    } catch (err) {
+      this.failure();
+      throw err;
+    }
+  }
+
+  private trip(): void {
+    this.state = 'open';
+    this.openedAt = this.now();
+    this.probing = false;
+  }
+
+  private refresh(): void {
+    if (this.state === 'open' && this.now() - this.openedAt >= this.currentOpenMs) {
+      this.state = 'half-open';
+      this.probing = false;
+    }
+  }
+}
+
+export interface RetryOptions {
+  retries?: number;
+  baseMs?: number;
+  maxMs?: number;
+  random?: () => number;
+  sleep?: (ms: number) => Promise<void>;
+}
+
+/** 429 and 5xx are worth another try; other 4xx are not */
+export const isRetryableStatus = (status: number) => status === 429 || status >= 500;
+
+/**
+ * "Full jitter" backoff: a random delay in [0, min(maxMs, baseMs * 2^attempt)),
+ * or Retry-After when the upstream sent one
+ */
+export function backoffMs(attempt: number, options: RetryOptions = {}, retryAfterHeader?: string | null): number {
+  const { baseMs = 250, maxMs = 4000, random = Math.random } = options;
+  const retryAfter = retryAfterHeader ? Number(retryAfterHeader) * 1000 : NaN;
+  if (Number.isFinite(retryAfter) && retryAfter >= 0) return Math.min(retryAfter, maxMs);
+  return Math.floor(random() * Math.min(maxMs, baseMs * 2 ** attempt));
+}
+
+/**
+ * fetch-like call retried on network errors, 429 and 5xx with jittered
+ * backoff. The last response (even a failing one) is returned.
+ */
+export async function fetchWithRetry(call: () => Promise<Response>, options: RetryOptions = {}): Promise<Response> {
+  const { retries = 2, sleep = (ms) => new Promise((r) => setTimeout(r, ms)) } = options;
+  for (let attempt = 0; ; attempt++) {
+    let res: Response;
+    try {
+      res = await call();
+    } catch (err) {
+      if (attempt >= retries) throw err;
+      await sleep(backoffMs(attempt, options));
+      continue;
+    }
+    if (!isRetryableStatus(res.status) || attempt >= retries) return res;
+    const retryAfter = res.headers.get('retry-after');
+    await res.body?.cancel();
+    await sleep(backoffMs(attempt, options, retryAfter));
+  }
+}
@@ -1,5 +1,5 @@
 export const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
-  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept",
+  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept, traceparent",
   "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
 };
\ No newline at end of file
@@ -0,0 +1,101 @@
+/**
+ * LLM FETCH
+ *
+ * Provider fetch routed through the isolate's LLM scheduler
+ * (llmScheduler.ts). Use it for every OpenAI call:
+ *
+ *   const res = await llmFetch(OPENAI_CHAT_URL, init, { model: 'gpt-4o-mini', priority: 'background' });
+ *
+ * It waits for a slot on the model + key lane and feeds the response's rate
+ * limit headers back. An interactive or background call that hits a 429 is
+ * retried once when the provider's reset lands inside its deadline. A
+ * request that cannot get a slot in time throws SchedulerShedError, which
+ * handlers turn into `llmBusyResponse`.
+ *
+ * Per-model limits come from LLM_RATE_LIMITS (JSON, see parseLaneLimits).
+ */
+
+import { providerFetch } from './cassette.ts';
+import {
+  createLlmScheduler,
+  estimateChatTokens,
+  parseLaneLimits,
+  SchedulerShedError,
+  type LlmLease,
+  type LlmPriority,
+  type LlmRequest
+} from './llmScheduler.ts';
+
+export { SchedulerShedError, isLlmPriority, type LlmPriority } from './llmScheduler.ts';
+
+export const llmScheduler = createLlmScheduler({
+  limits: parseLaneLimits(Deno.env.get('LLM_RATE_LIMITS'))
+});
+
+export interface LlmFetchOptions {
+  model: string;
+  priority?: LlmPriority;
+  /** Defaults to an estimate from the request body */
+  estimatedTokens?: number;
+  /** Time allowed to wait for a slot (and a 429 retry) */
+  deadlineMs?: number;
+  signal?: AbortSignal;
+  /** Transport, e.g. a traced fetch; defaults to providerFetch */
+  fetch?: (url: string, init: RequestInit) => Promise<Response>;
+  onDispatch?: (lease: LlmLease) => void;
+}
+
+const DEFAULT_DEADLINE_MS: Record<LlmPriority, number> = { interactive: 20_000, background: 60_000, batch: 120_000 };
+
+/** Lane id for the key: enough to tell keys apart, never the key itself */
+function keyId(init: RequestInit): string {
+  const auth = new Headers(init.headers).get('Authorization') ?? '';
+  return auth ? auth.slice(-6) : 'default';
+}
+
+export async function llmFetch(url: string, init: RequestInit, options: LlmFetchOptions): Promise<Response> {
+  const priority = options.priority ?? 'interactive';
+  const deadline = Date.now() + (options.deadlineMs ?? DEFAULT_DEADLINE_MS[priority]);
+  const transport = options.fetch ?? providerFetch;
+  const request: LlmRequest = {
+    model: options.model,
+    keyId: keyId(init),
+    priority,
+    estimatedTokens: options.estimatedTokens ?? estimateChatTokens(init.body),
+    signal: options.signal
+  };
+
+  for (let attempt = 0; ; attempt++) {
+    const lease = await llmScheduler.acquire({ ...request, deadlineMs: Math.max(0, deadline - Date.now()) });
+    options.onDispatch?.(lease);
+
+    const res = await transport(url, init);
+    llmScheduler.observe(request, res.status, res.headers);
+
+    // Batch work goes back to its queue; one retry for everything else
+    if (res.status !== 429 || priority === 'batch' || attempt >= 1) return res;
+    if (Date.now() + llmScheduler.pausedMs(request) >= deadline) return res;
+    await res.body?.cancel();
+  }
+}
+
+/** 503 + Retry-After for a request the scheduler shed */
+export function llmBusyResponse(err: SchedulerShedError, headers: Record<string, string>): Response {
+  const retryAfterSeconds = Math.max(1, Math.ceil(err.retryAfterMs / 1000));
+  return new Response(
+    JSON.stringify({
+      error: 'Pat is handling a lot of requests right now. Please try again in a moment.',
+      code: 'LLM_BUSY',
+      retryAfterMs: err.retryAfterMs
+    }),
+    {
+      status: 503,
+      headers: {
+        ...headers,
+        'Content-Type': 'application/json',
+        'Retry-After': String(retryAfterSeconds),
+        'X-LLM-Queue-Depth': String(llmScheduler.stats().queueDepth)
+      }
+    }
+  );
+}
@@ -0,0 +1,434 @@
+/**
+ * LLM REQUEST SCHEDULER
+ *
+ * Every LLM call an edge function makes waits here for a slot instead of
+ * going straight to the provider and surfacing its 429 to the user:
+ *
+ *   lanes     - one per model + API key, each with a requests/min and a
+ *               tokens/min token bucket (refilled continuously)
+ *   priority  - interactive (chat turns) > background (summaries, post
+ *               refinement) > batch (imports). Lower classes may only spend
+ *               a bucket down to a reserve, so a burst of background work
+ *               always leaves headroom for the next chat turn.
+ *   deadlines - a request that cannot start before its deadline is shed
+ *               with SchedulerShedError (carrying retryAfterMs) instead of
+ *               queueing; queued batch work is shed as soon as interactive
+ *               work has to wait
+ *   feedback  - 429s and x-ratelimit-* headers pause or drain the lane.
+ *               They describe the org-wide limit that other isolates spend
+ *               too, which keeps per-isolate buckets honest.
+ *
+ * State lives in the isolate, like the circuit breaker.
+ * No Deno APIs: the vitest suite imports this module directly.
+ */
+
+export type LlmPriority = 'interactive' | 'background' | 'batch';
+
+export const LLM_PRIORITIES: readonly LlmPriority[] = ['interactive', 'background', 'batch'];
+
+export interface LaneLimits {
+  /** Requests per minute */
+  rpm: number;
+  /** Tokens (prompt + completion) per minute */
+  tpm: number;
+}
+
+export interface LlmSchedulerOptions {
+  /** Per-model limits; models without an entry use defaultLimits */
+  limits?: Record<string, Partial<LaneLimits>>;
+  defaultLimits?: LaneLimits;
+  /** Share of each bucket a class must leave untouched */
+  reserve?: Partial<Record<LlmPriority, number>>;
+  /** Default time a request may wait for a slot */
+  deadlineMs?: Partial<Record<LlmPriority, number>>;
+  /** Queued requests per class and lane before new ones are shed */
+  maxQueue?: Partial<Record<LlmPriority, number>>;
+  now?: () => number;
+  setTimer?: (fn: () => void, ms: number) => unknown;
+  clearTimer?: (handle: unknown) => void;
+}
+
+export interface LlmRequest {
+  model: string;
+  /** Tells API keys sharing a model apart; never the key itself */
+  keyId?: string;
+  priority?: LlmPriority;
+  /** Prompt + max completion tokens */
+  estimatedTokens?: number;
+  deadlineMs?: number;
+  signal?: AbortSignal;
+}
+
+export interface LlmLease {
+  lane: string;
+  priority: LlmPriority;
+  waitedMs: number;
+  /** Requests still queued on the lane when this one was dispatched */
+  queueDepth: number;
+}
+
+export type ShedReason = 'queue_full' | 'deadline' | 'pressure' | 'aborted';
+
+export class SchedulerShedError extends Error {
+  readonly retryAfterMs: number;
+  readonly priority: LlmPriority;
+  readonly reason: ShedReason;
+
+  constructor(priority: LlmPriority, reason: ShedReason, retryAfterMs: number) {
+    super(`LLM request shed (${priority}, ${reason}), retry after ${retryAfterMs}ms`);
+    this.name = 'SchedulerShedError';
+    this.priority = priority;
+    this.reason = reason;
+    this.retryAfterMs = retryAfterMs;
+  }
+}
+
+export interface LaneStats {
+  lane: string;
+  queued: Record<LlmPriority, number>;
+  requestsAvailable: number;
+  tokensAvailable: number;
+  pausedMs: number;
+}
+
+export interface SchedulerStats {
+  queueDepth: number;
+  queued: Record<LlmPriority, number>;
+  dispatched: Record<LlmPriority, number>;
+  shed: Record<LlmPriority, number>;
+  lanes: LaneStats[];
+}
+
+export const DEFAULT_LANE_LIMITS: LaneLimits = { rpm: 500, tpm: 200_000 };
+const DEFAULT_RESERVE: Record<LlmPriority, number> = { interactive: 0, background: 0.25, batch: 0.5 };
+const DEFAULT_DEADLINE_MS: Record<LlmPriority, number> = { interactive: 20_000, background: 60_000, batch: 120_000 };
+const DEFAULT_MAX_QUEUE: Record<LlmPriority, number> = { interactive: 200, background: 100, batch: 50 };
+/** Pause after a 429 that carried no usable reset hint */
+const DEFAULT_PAUSE_MS = 1000;
+
+class TokenBucket {
+  tokens: number;
+  readonly capacity: number;
+  private readonly perMs: number;
+  private last: number;
+
+  constructor(perMinute: number, now: number) {
+    this.capacity = Math.max(1, perMinute);
+    this.perMs = this.capacity / 60_000;
+    this.tokens = this.capacity;
+    this.last = now;
+  }
+
+  refill(now: number): void {
+    this.tokens = Math.min(this.capacity, this.tokens + (now - this.last) * this.perMs);
+    this.last = now;
+  }
+
+  /** ms until `amount` can be taken while leaving `reserve` (share of capacity) */
+  waitMs(amount: number, reserve: number, now: number): number {
+    this.refill(now);
+    const floor = Math.min(reserve * this.capacity, Math.max(0, this.capacity - amount));
+    const missing = amount + floor - this.tokens;
+    return missing <= 0 ? 0 : Math.ceil(missing / this.perMs);
+  }
+
+  take(amount: number): void {
+    this.tokens -= amount;
+  }
+}
+
+interface Waiter {
+  priority: LlmPriority;
+  tokens: number;
+  enqueuedAt: number;
+  deadline: number;
+  resolve: (lease: LlmLease) => void;
+  reject: (err: SchedulerShedError) => void;
+  cleanup: () => void;
+}
+
+interface Lane {
+  key: string;
+  requests: TokenBucket;
+  tokens: TokenBucket;
+  queues: Record<LlmPriority, Waiter[]>;
+  pausedUntil: number;
+  timer: unknown;
+}
+
+const perClass = <T>(value: (p: LlmPriority) => T): Record<LlmPriority, T> => ({
+  interactive: value('interactive'),
+  background: value('background'),
+  batch: value('batch')
+});
+
+export function createLlmScheduler(options: LlmSchedulerOptions = {}) {
+  const now = options.now ?? Date.now;
+  const setTimer = options.setTimer ?? ((fn: () => void, ms: number) => setTimeout(fn, ms));
+  const clearTimer = options.clearTimer ?? ((handle: unknown) => clearTimeout(handle as number));
+  const reserve = { ...DEFAULT_RESERVE, ...options.reserve };
+  const deadlines = { ...DEFAULT_DEADLINE_MS, ...options.deadlineMs };
+  const maxQueue = { ...DEFAULT_MAX_QUEUE, ...options.maxQueue };
+  const defaults = options.defaultLimits ?? DEFAULT_LANE_LIMITS;
+
+  const lanes = new Map<string, Lane>();
+  const dispatched = perClass(() => 0);
+  const shed = perClass(() => 0);
+
+  function laneFor(request: LlmRequest): Lane {
+    const key = `${request.model}:${request.keyId ?? 'default'}`;
+    let lane = lanes.get(key);
+    if (!lane) {
+      const limits = { ...defaults, ...options.limits?.[request.model] };
+      lane = {
+        key,
+        requests: new TokenBucket(limits.rpm, now()),
+        tokens: new TokenBucket(limits.tpm, now()),
+        queues: perClass(() => []),
+        pausedUntil: 0,
+        timer: null
+      };
+      lanes.set(key, lane);
+    }
+    return lane;
+  }
+
+  function depth(lane: Lane): number {
+    return lane.queues.interactive.length + lane.queues.background.length + lane.queues.batch.length;
+  }
+
+  /** ms until a request of `tokens` could start, given `ahead` requests/tokens queued before it */
+  function waitFor(lane: Lane, priority: LlmPriority, tokens: number, ahead = { count: 0, tokens: 0 }): number {
+    const t = now();
+    return Math.max(
+      lane.pausedUntil - t,
+      lane.requests.waitMs(ahead.count + 1, reserve[priority], t),
+      lane.tokens.waitMs(ahead.tokens + tokens, reserve[priority], t)
+    );
+  }
+
+  function reject(lane: Lane, waiter: Waiter, reason: ShedReason, retryAfterMs: number): void {
+    const queue = lane.queues[waiter.priority];
+    const index = queue.indexOf(waiter);
+    if (index >= 0) queue.splice(index, 1);
+    waiter.cleanup();
+    shed[waiter.priority]++;
+    waiter.reject(new SchedulerShedError(waiter.priority, reason, Math.max(0, Math.ceil(retryAfterMs))));
+  }
+
+  function pump(lane: Lane): void {
+    if (lane.timer !== null) {
+      clearTimer(lane.timer);
+      lane.timer = null;
+    }
+
+    for (;;) {
+      const t = now();
+      for (const priority of LLM_PRIORITIES) {
+        for (const waiter of [...lane.queues[priority]]) {
+          if (waiter.deadline <= t) reject(lane, waiter, 'deadline', waitFor(lane, priority, waiter.tokens));
+        }
+      }
+
+      // Strict priority: a lower class never jumps a waiting higher one
+      const priority = LLM_PRIORITIES.find(p => lane.queues[p].length > 0);
+      if (!priority) return;
+      const head = lane.queues[priority][0];
+      const wait = waitFor(lane, priority, head.tokens);
+
+      if (wait > 0) {
+        if (priority === 'interactive') {
+          for (const waiter of [...lane.queues.batch]) reject(lane, waiter, 'pressure', wait + deadlines.batch / 4);
+        }
+        const nextDeadline = Math.min(...LLM_PRIORITIES.flatMap(p => lane.queues[p].map(w => w.deadline)));
+        lane.timer = setTimer(() => {
+          lane.timer = null;
+          pump(lane);
+        }, Math.max(1, Math.min(wait, nextDeadline - t)));
+        return;
+      }
+
+      lane.queues[priority].shift();
+      head.cleanup();
+      lane.requests.take(1);
+      lane.tokens.take(head.tokens);
+      dispatched[priority]++;
+      head.resolve({ lane: lane.key, priority, waitedMs: t - head.enqueuedAt, queueDepth: depth(lane) });
+    }
+  }
+
+  /**
+   * Wait for a slot on the request's lane. Rejects with SchedulerShedError
+   * when the queue is full, the deadline cannot be met, or higher-priority
+   * work needs the capacity.
+   */
+  function acquire(request: LlmRequest): Promise<LlmLease> {
+    const priority = request.priority ?? 'interactive';
+    const deadlineMs = request.deadlineMs ?? deadlines[priority];
+    const lane = laneFor(request);
+    // A request bigger than the whole bucket waits for a full one
+    const tokens = Math.min(Math.max(1, Math.ceil(request.estimatedTokens ?? 1000)), lane.tokens.capacity);
+
+    if (request.signal?.aborted) {
+      shed[priority]++;
+      return Promise.reject(new SchedulerShedError(priority, 'aborted', 0));
+    }
+    if (lane.queues[priority].length >= maxQueue[priority]) {
+      shed[priority]++;
+      return Promise.reject(new SchedulerShedError(priority, 'queue_full', waitFor(lane, priority, tokens)));
+    }
+
+    // Everything of equal or higher priority dispatches first
+    const ahead = { count: 0, tokens: 0 };
+    for (const p of LLM_PRIORITIES.slice(0, LLM_PRIORITIES.indexOf(priority) + 1)) {
+      for (const waiter of lane.queues[p]) {
+        ahead.count++;
+        ahead.tokens += waiter.tokens;
+      }
+    }
+    const expectedWait = waitFor(lane, priority, tokens, ahead);
+    if (expectedWait > deadlineMs) {
+      shed[priority]++;
+      return Promise.reject(new SchedulerShedError(priority, 'deadline', expectedWait));
+    }
+
+    return new Promise<LlmLease>((resolve, reject_) => {
+      const enqueuedAt = now();
+      const waiter: Waiter = {
+        priority,
+        tokens,
+        enqueuedAt,
+        deadline: enqueuedAt + deadlineMs,
+        resolve,
+        reject: reject_,
+        cleanup: () => {}
+      };
+      if (request.signal) {
+        const signal = request.signal;
+        const onAbort = () => reject(lane, waiter, 'aborted', 0);
+        signal.addEventListener('abort', onAbort, { once: true });
+        waiter.cleanup = () => signal.removeEventListener('abort', onAbort);
+      }
+      lane.queues[priority].push(waiter);
+      pump(lane);
+    });
+  }
+
+  /**
+   * Feed an upstream response back into the lane: a 429 pauses it until the
+   * provider's reset, and x-ratelimit-remaining-* drain the buckets when the
+   * org-wide budget is lower than this isolate believes.
+   */
+  function observe(request: LlmRequest, status: number, headers: Headers): void {
+    const lane = laneFor(request);
+    const t = now();
+
+    const remainingRequests = Number(headers.get('x-ratelimit-remaining-requests') ?? NaN);
+    const remainingTokens = Number(headers.get('x-ratelimit-remaining-tokens') ?? NaN);
+    if (Number.isFinite(remainingRequests)) {
+      lane.requests.refill(t);
+      lane.requests.tokens = Math.min(lane.requests.tokens, remainingRequests);
+    }
+    if (Number.isFinite(remainingTokens)) {
+      lane.tokens.refill(t);
+      lane.tokens.tokens = Math.min(lane.tokens.tokens, remainingTokens);
+    }
+
+    if (status === 429) {
+      const pauseMs =
+        parseRetryAfter(headers.get('retry-after')) ??
+        maxDefined(
+          parseResetDuration(headers.get('x-ratelimit-reset-requests')),
+          parseResetDuration(headers.get('x-ratelimit-reset-tokens'))
+        ) ??
+        DEFAULT_PAUSE_MS;
+      lane.pausedUntil = Math.max(lane.pausedUntil, t + pauseMs);
+    }
+
+    if (depth(lane) > 0) pump(lane);
+  }
+
+  /** ms until the lane accepts requests again after a 429 (0 when not paused) */
+  function pausedMs(request: LlmRequest): number {
+    return Math.max(0, laneFor(request).pausedUntil - now());
+  }
+
+  function stats(): SchedulerStats {
+    const t = now();
+    const laneStats = [...lanes.values()].map((lane): LaneStats => {
+      lane.requests.refill(t);
+      lane.tokens.refill(t);
+      return {
+        lane: lane.key,
+        queued: perClass(p => lane.queues[p].length),
+        requestsAvailable: Math.floor(lane.requests.tokens),
+        tokensAvailable: Math.floor(lane.tokens.tokens),
+        pausedMs: Math.max(0, lane.pausedUntil - t)
+      };
+    });
+    const queued = perClass(p => laneStats.reduce((sum, lane) => sum + lane.queued[p], 0));
+    return {
+      queueDepth: queued.interactive + queued.background + queued.batch,
+      queued,
+      dispatched: { ...dispatched },
+      shed: { ...shed },
+      lanes: laneStats
+    };
+  }
+
+  return { acquire, observe, pausedMs, stats };
+}
+
+export type LlmScheduler = ReturnType<typeof createLlmScheduler>;
+
+export function isLlmPriority(value: unknown): value is LlmPriority {
+  return typeof value === 'string' && (LLM_PRIORITIES as readonly string[]).includes(value);
+}
+
+function maxDefined(...values: Array<number | null>): number | null {
+  const defined = values.filter((v): v is number => v !== null);
+  return defined.length ? Math.max(...defined) : null;
+}
+
+/** Retry-After in seconds (HTTP-date form is not sent by LLM providers) */
+export function parseRetryAfter(value: string | null): number | null {
+  if (!value) return null;
+  const seconds = Number(value);
+  return Number.isFinite(seconds) && seconds >= 0 ? Math.ceil(seconds * 1000) : null;
+}
+
+/** OpenAI reset durations: "20ms", "1.5s", "6m0s", "1h2m3s" */
+export function parseResetDuration(value: string | null): number | null {
+  if (!value) return null;
+  const pattern = /(\d+(?:\.\d+)?)(ms|h|m|s)/g;
+  const unitMs: Record<string, number> = { ms: 1, s: 1000, m: 60_000, h: 3_600_000 };
+  let total = 0;
+  let matched = false;
+  for (const [, amount, unit] of value.matchAll(pattern)) {
+    total += Number(amount) * unitMs[unit];
+    matched = true;
+  }
+  return matched ? Math.ceil(total) : null;
+}
+
+/**
+ * Rough token cost of an OpenAI chat request body: ~4 characters per prompt
+ * token plus the completion budget
+ */
+export function estimateChatTokens(body: unknown, fallbackMaxTokens = 700): number {
+  const text = typeof body === 'string' ? body : '';
+  const maxTokens = Number(/"max_(?:completion_)?tokens"\s*:\s*(\d+)/.exec(text)?.[1] ?? fallbackMaxTokens);
+  return Math.ceil(text.length / 4) + maxTokens;
+}
+
+/** LLM_RATE_LIMITS env: {"gpt-4o-mini":{"rpm":500,"tpm":200000}}; bad JSON is ignored */
+export function parseLaneLimits(raw: string | undefined | null): Record<string, Partial<LaneLimits>> | undefined {
+  if (!raw) return undefined;
+  try {
+    const parsed = JSON.parse(raw);
+    return parsed && typeof parsed === 'object' ? parsed : undefined;
+  } catch {
+    console.warn('[llmScheduler] Ignoring invalid LLM_RATE_LIMITS');
+    return undefined;
+  }
+}
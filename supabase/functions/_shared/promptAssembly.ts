@@ -0,0 +1,139 @@
+/**
+ * PROMPT ASSEMBLY
+ *
+ * Orders system-prompt content from most to least stable so provider-side
+ * prompt caching can hit:
+ *
+ *   persona -> rules  (stable prefix: identical across users and turns)
+ *   user              (per-user context)
+ *   turn              (history snippet, data for this turn)
+ *
+ * OpenAI caches the longest previously seen prefix of the request (prompts
+ * of 1024+ tokens), and Gemini's implicit cache works the same way. Anything
+ * that varies must therefore come after everything that doesn't. The stable
+ * prefix goes out as its own system message, and its hash groups cache-hit
+ * telemetry and is sent as OpenAI's `prompt_cache_key`.
+ *
+ * No imports and no Deno APIs: edge functions import it from _shared, and
+ * the client swarm loader and chat handler import the same file.
+ */
+
+export type PromptLayer = 'persona' | 'rules' | 'user' | 'turn';
+
+export interface PromptSection {
+  layer: PromptLayer;
+  /** Rendered as `[label]` above the content */
+  label?: string;
+  content: string;
+}
+
+export interface AssembledPrompt {
+  /** persona + rules */
+  stablePrefix: string;
+  prefixHash: string;
+  /** user + turn layers; empty when there are none */
+  context: string;
+  /** Everything, in layer order */
+  text: string;
+}
+
+const LAYER_ORDER: Record<PromptLayer, number> = { persona: 0, rules: 1, user: 2, turn: 3 };
+const SEPARATOR = '\n\n';
+
+function render(section: PromptSection): string {
+  return section.label ? `[${section.label}]${SEPARATOR}${section.content}` : section.content;
+}
+
+/**
+ * Join sections in layer order (stable within a layer). Empty sections are
+ * dropped so an absent optional block never shifts the prefix.
+ */
+export function assemblePrompt(sections: PromptSection[]): AssembledPrompt {
+  const ordered = sections
+    .filter(s => s.content.trim().length > 0)
+    .map((section, index) => ({ section, index }))
+    .sort((a, b) => LAYER_ORDER[a.section.layer] - LAYER_ORDER[b.section.layer] || a.index - b.index)
+    .map(({ section }) => section);
+
+  const stable = ordered.filter(s => s.layer === 'persona' || s.layer === 'rules').map(render);
+  const dynamic = ordered.filter(s => s.layer === 'user' || s.layer === 'turn').map(render);
+  const stablePrefix = stable.join(SEPARATOR);
+  const context = dynamic.join(SEPARATOR);
+
+  return {
+    stablePrefix,
+    prefixHash: promptPrefixHash(stablePrefix),
+    context,
+    text: [stablePrefix, context].filter(Boolean).join(SEPARATOR)
+  };
+}
+
+/**
+ * Add user/turn sections computed after the base prompt was built. The
+ * stable prefix (and its hash) is untouched.
+ */
+export function extendPrompt(prompt: AssembledPrompt, sections: PromptSection[]): AssembledPrompt {
+  if (sections.some(s => s.layer === 'persona' || s.layer === 'rules')) {
+    throw new Error('extendPrompt only takes user and turn sections; rebuild the prompt to change its prefix');
+  }
+  const added = assemblePrompt(sections).context;
+  if (!added) return prompt;
+  const context = [prompt.context, added].filter(Boolean).join(SEPARATOR);
+  return { ...prompt, context, text: [prompt.stablePrefix, context].filter(Boolean).join(SEPARATOR) };
+}
+
+/**
+ * System messages for an assembled prompt: the stable prefix, then the
+ * context as a second system message so the first stays byte-identical
+ */
+export function systemMessages(prompt: AssembledPrompt): Array<{ role: 'system'; content: string }> {
+  const messages: Array<{ role: 'system'; content: string }> = [];
+  if (prompt.stablePrefix) messages.push({ role: 'system', content: prompt.stablePrefix });
+  if (prompt.context) messages.push({ role: 'system', content: prompt.context });
+  return messages;
+}
+
+/** JSON with object keys sorted, so equal values always render the same text */
+export function stableStringify(value: unknown): string {
+  return JSON.stringify(value, (_key, v) =>
+    v && typeof v === 'object' && !Array.isArray(v)
+      ? Object.fromEntries(Object.keys(v).sort().map(k => [k, v[k]]))
+      : v
+  );
+}
+
+/** `key: value` lines under a heading, keys sorted; null/undefined skipped */
+export function formatContextBlock(heading: string, values: Record<string, unknown>): string {
+  const lines = Object.keys(values)
+    .sort()
+    .filter(key => values[key] !== undefined && values[key] !== null)
+    .map(key => `${key}: ${stableStringify(values[key])}`);
+  return lines.length > 0 ? [heading, ...lines].join(SEPARATOR) : '';
+}
+
+/**
+ * 53-bit hash (cyrb53) of the stable prefix as 14 hex chars. Synchronous and
+ * identical in the browser and Deno; not for security.
+ */
+export function promptPrefixHash(text: string): string {
+  let h1 = 0xdeadbeef;
+  let h2 = 0x41c6ce57;
+  for (let i = 0; i < text.length; i++) {
+    const ch = text.charCodeAt(i);
+    h1 = Math.imul(h1 ^ ch, 2654435761);
+    h2 = Math.imul(h2 ^ ch, 1597334677);
+  }
+  h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+  h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+  return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16).padStart(14, '0');
+}
+
+/**
+ * Cached input tokens reported by the provider: OpenAI
+ * `usage.prompt_tokens_details.cached_tokens`, Gemini
+ * `usageMetadata.cachedContentTokenCount`. Undefined when not reported.
+ */
+export function cachedPromptTokens(usage: any): number | undefined {
+  const cached = usage?.prompt_tokens_details?.cached_tokens ?? usage?.cachedContentTokenCount;
+  return typeof cached === 'number' ? cached : undefined;
+}
@@ -0,0 +1,366 @@
+/**
+ * SSE RELAY
+ *
+ * Incremental Server-Sent Events parsing and a pull-based relay that turns
+ * an upstream provider stream (OpenAI chat.completion.chunk events) into the
+ * `data: {"token": ...}` frames our clients read.
+ *
+ * - SseParser buffers across chunk boundaries: partial lines and multi-byte
+ *   UTF-8 sequences split between reads are completed by the next read.
+ *   It handles \n, \r\n and \r line endings, comments and multi-line data.
+ * - createSseRelay only reads upstream when the consumer pulls, so a slow
+ *   client slows the provider socket instead of growing a queue in memory.
+ * - Tokens are coalesced into one frame per flush window (default 25 ms, or
+ *   sooner once maxBatchChars is reached); tokens already received are
+ *   never held longer than the window.
+ * - A `: ping` comment frame goes out after heartbeatMs of silence, keeping
+ *   proxies from closing the connection while the model is thinking.
+ *   SSE clients ignore comment lines.
+ * - ToolCallAccumulator rebuilds streamed `tool_calls` deltas and reports
+ *   each call the moment its arguments are complete.
+ *
+ * No Deno APIs: this module is also imported by the vitest suite.
+ */
+
+export interface SseEvent {
+  event?: string;
+  data: string;
+  id?: string;
+}
+
+const encoder = new TextEncoder();
+
+export class SseParser {
+  private decoder = new TextDecoder();
+  private buffer = '';
+  private data: string[] = [];
+  private event: string | undefined;
+  private id: string | undefined;
+  // A chunk ending in \r may be the first half of \r\n
+  private pendingCR = false;
+
+  feed(chunk: Uint8Array | string): SseEvent[] {
+    const text = typeof chunk === 'string' ? chunk : this.decoder.decode(chunk, { stream: true });
+    return this.process(text);
+  }
+
+  /** Flush the decoder and dispatch a final unterminated event */
+  end(): SseEvent[] {
+    const events = this.process(this.decoder.decode());
+    if (this.buffer) {
+      this.line(this.buffer);
+      this.buffer = '';
+    }
+    const last = this.dispatch();
+    if (last) events.push(last);
+    return events;
+  }
+
+  private process(text: string): SseEvent[] {
+    const events: SseEvent[] = [];
+    if (this.pendingCR && text.startsWith('\n')) text = text.slice(1);
+    this.pendingCR = false;
+
+    this.buffer += text;
+    let start = 0;
+    for (let i = 0; i < this.buffer.length; i++) {
+      const ch = this.buffer.charCodeAt(i);
+      if (ch !== 10 && ch !== 13) continue;
+
+      const line = this.buffer.slice(start, i);
+      if (ch === 13) {
+        if (i + 1 < this.buffer.length) {
+          if (this.buffer.charCodeAt(i + 1) === 10) i++;
+        } else {
+          this.pendingCR = true;
+        }
+      }
+      start = i + 1;
+
+      if (line === '') {
+        const event = this.dispatch();
+        if (event) events.push(event);
+      } else {
+        this.line(line);
+      }
+    }
+    this.buffer = this.buffer.slice(start);
+    return events;
+  }
+
+  private line(line: string): void {
+    if (line.startsWith(':')) return; // comment
+    const colon = line.indexOf(':');
+    const field = colon === -1 ? line : line.slice(0, colon);
+    let value = colon === -1 ? '' : line.slice(colon + 1);
+    if (value.startsWith(' ')) value = value.slice(1);
+
+    if (field === 'data') this.data.push(value);
+    else if (field === 'event') this.event = value;
+    else if (field === 'id') this.id = value;
+  }
+
+  private dispatch(): SseEvent | null {
+    if (this.data.length === 0) {
+      this.event = undefined;
+      return null;
+    }
+    const event: SseEvent = { data: this.data.join('\n') };
+    if (this.event !== undefined) event.event = this.event;
+    if (this.id !== undefined) event.id = this.id;
+    this.data = [];
+    this.event = undefined;
+    return event;
+  }
+}
+
+/**
+ * Delta text of an OpenAI chat.completion.chunk, or null
+ */
+export function openAIDeltaContent(data: string): string | null {
+  try {
+    const content = JSON.parse(data).choices?.[0]?.delta?.content;
+    return typeof content === 'string' && content.length > 0 ? content : null;
+  } catch {
+    return null;
+  }
+}
+
+/**
+ * `usage` of the final chunk of a stream requested with
+ * stream_options.include_usage (other chunks carry `"usage":null`), or null
+ */
+export function openAIChunkUsage(data: string): Record<string, any> | null {
+  if (!data.includes('"usage":{')) return null;
+  try {
+    return JSON.parse(data).usage ?? null;
+  } catch {
+    return null;
+  }
+}
+
+export interface SseRelayStats {
+  frames: number;
+  tokens: number;
+  heartbeats: number;
+  bytesIn: number;
+  bytesOut: number;
+}
+
+export interface SseRelayOptions {
+  /** Text to relay for one upstream event's data, or null to skip it */
+  extract?: (data: string) => string | null;
+  /** Max time a received token waits for company before being sent */
+  flushIntervalMs?: number;
+  /** Send as soon as a batch reaches this many characters */
+  maxBatchChars?: number;
+  /** Comment frame after this long without output; 0 disables */
+  heartbeatMs?: number;
+  /** Send `data: [DONE]` when upstream finishes (off when more output follows) */
+  done?: boolean;
+  onClose?: (stats: SseRelayStats) => void;
+}
+
+const TIMEOUT = Symbol('timeout');
+export const DONE_FRAME = encoder.encode('data: [DONE]\n\n');
+const HEARTBEAT_FRAME = encoder.encode(': ping\n\n');
+
+export function tokenFrame(token: string): Uint8Array {
+  return encoder.encode(`data: ${JSON.stringify({ token })}\n\n`);
+}
+
+/** `data: <json>` frame for structured events (tool calls / results) */
+export function jsonFrame(payload: unknown): Uint8Array {
+  return encoder.encode(`data: ${JSON.stringify(payload)}\n\n`);
+}
+
+export function createSseRelay(
+  upstream: ReadableStream<Uint8Array>,
+  options: SseRelayOptions = {}
+): ReadableStream<Uint8Array> {
+  const {
+    extract = openAIDeltaContent,
+    flushIntervalMs = 25,
+    maxBatchChars = 256,
+    heartbeatMs = 15_000,
+    done = true,
+    onClose
+  } = options;
+
+  const reader = upstream.getReader();
+  const parser = new SseParser();
+  const queue: SseEvent[] = [];
+  const stats: SseRelayStats = { frames: 0, tokens: 0, heartbeats: 0, bytesIn: 0, bytesOut: 0 };
+  let pendingRead: Promise<ReadableStreamReadResult<Uint8Array>> | null = null;
+  let upstreamDone = false;
+  let sawDone = false;
+  let closed = false;
+
+  /** Next upstream read, or TIMEOUT after `ms` (the read stays pending for the next call) */
+  const readWithin = async (ms: number): Promise<ReadableStreamReadResult<Uint8Array> | typeof TIMEOUT> => {
+    const read = pendingRead ?? (pendingRead = reader.read());
+    if (ms === Infinity) {
+      pendingRead = null;
+      return read;
+    }
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const result = await Promise.race([
+      read,
+      new Promise<typeof TIMEOUT>((resolve) => { timer = setTimeout(() => resolve(TIMEOUT), Math.max(0, ms)); })
+    ]);
+    clearTimeout(timer);
+    if (result !== TIMEOUT) pendingRead = null;
+    return result;
+  };
+
+  const enqueue = (controller: ReadableStreamDefaultController<Uint8Array>, frame: Uint8Array) => {
+    stats.bytesOut += frame.byteLength;
+    controller.enqueue(frame);
+  };
+
+  const finish = (controller: ReadableStreamDefaultController<Uint8Array>) => {
+    if (closed) return;
+    closed = true;
+    if (done) enqueue(controller, DONE_FRAME);
+    controller.close();
+    reader.cancel().catch(() => undefined);
+    onClose?.(stats);
+  };
+
+  return new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      if (closed) return;
+      let batch = '';
+      let deadline = 0;
+
+      try {
+        for (;;) {
+          // Fold already-parsed events into the batch first
+          while (queue.length > 0 && batch.length < maxBatchChars && !sawDone) {
+            const event = queue.shift()!;
+            if (event.data === '[DONE]') {
+              sawDone = true;
+              break;
+            }
+            const token = extract(event.data);
+            if (token === null) continue;
+            if (!batch) deadline = Date.now() + flushIntervalMs;
+            batch += token;
+            stats.tokens++;
+          }
+
+          if (batch.length >= maxBatchChars || sawDone || (upstreamDone && queue.length === 0)) break;
+
+          const wait = batch ? deadline - Date.now() : heartbeatMs > 0 ? heartbeatMs : Infinity;
+          if (batch && wait <= 0) break;
+
+          const result = await readWithin(wait);
+          if (result === TIMEOUT) {
+            if (batch) break;
+            stats.heartbeats++;
+            enqueue(controller, HEARTBEAT_FRAME);
+            return;
+          }
+          if (result.done) {
+            upstreamDone = true;
+            queue.push(...parser.end());
+            continue;
+          }
+          stats.bytesIn += result.value.byteLength;
+          queue.push(...parser.feed(result.value));
+        }
+      } catch (err) {
+        closed = true;
+        controller.error(err);
+        onClose?.(stats);
+        return;
+      }
+
+      if (batch) {
+        stats.frames++;
+        enqueue(controller, tokenFrame(batch));
+      }
+      if (sawDone || (upstreamDone && queue.length === 0)) finish(controller);
+    },
+
+    cancel(reason) {
+      closed = true;
+      onClose?.(stats);
+      return reader.cancel(reason);
+    }
+  });
+}
+
+export interface StreamedToolCall {
+  index: number;
+  id: string;
+  name: string;
+  /** Raw JSON argument text as streamed */
+  arguments: string;
+  /** Parsed arguments once complete; undefined if they were not valid JSON */
+  args?: unknown;
+}
+
+/**
+ * Rebuilds tool calls from streamed `delta.tool_calls` fragments.
+ *
+ * A call is complete as soon as its argument text parses as a JSON object
+ * (an object prefix can't parse until its closing brace), when the next
+ * call index starts, or at finish_reason, whichever comes first, so the
+ * caller can start it while later calls are still streaming.
+ */
+export class ToolCallAccumulator {
+  private calls: StreamedToolCall[] = [];
+  private done = new Set<number>();
+
+  /** Feed one parsed chat.completion.chunk; returns calls completed by it */
+  push(chunk: any): StreamedToolCall[] {
+    const completed: StreamedToolCall[] = [];
+    const choice = chunk?.choices?.[0];
+
+    for (const delta of choice?.delta?.tool_calls ?? []) {
+      const index = typeof delta.index === 'number' ? delta.index : 0;
+      let call = this.calls[index];
+      if (!call) {
+        for (const earlier of this.calls) {
+          if (earlier && earlier.index < index) this.complete(earlier, completed);
+        }
+        call = this.calls[index] = { index, id: '', name: '', arguments: '' };
+      }
+      if (delta.id) call.id = delta.id;
+      if (delta.function?.name) call.name += delta.function.name;
+      if (delta.function?.arguments) {
+        call.arguments += delta.function.arguments;
+        if (call.arguments.trimEnd().endsWith('}')) this.complete(call, completed, true);
+      }
+    }
+
+    if (choice?.finish_reason) completed.push(...this.flush());
+    return completed;
+  }
+
+  /** Complete every remaining call (end of stream) */
+  flush(): StreamedToolCall[] {
+    const completed: StreamedToolCall[] = [];
+    for (const call of this.calls) {
+      if (call) this.complete(call, completed);
+    }
+    return completed;
+  }
+
+  all(): StreamedToolCall[] {
+    return this.calls.filter(Boolean);
+  }
+
+  private complete(call: StreamedToolCall, out: StreamedToolCall[], onlyIfParses = false): void {
+    if (this.done.has(call.index)) return;
+    try {
+      call.args = JSON.parse(call.arguments || '{}');
+    } catch {
+      if (onlyIfParses) return;
+      call.args = undefined;
+    }
+    this.done.add(call.index);
+    out.push(call);
+  }
+}
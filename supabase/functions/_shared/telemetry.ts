@@ -0,0 +1,117 @@
+/**
+ * EDGE TELEMETRY
+ *
+ * Batched telemetry for edge functions. Events are buffered in memory (bounded)
+ * and written with ONE insert into public.telemetry_events when flushed.
+ * Use flushInBackground() so the response never waits on the write.
+ */
+
+import { createClient } from 'npm:@supabase/supabase-js@2.53.0';
+
+export interface EdgeTelemetryEvent {
+  stage: string;
+  event_type: string;
+  duration_ms: number;
+  success: boolean;
+  user_id?: string | null;
+  session_id?: string | null;
+  llm_provider?: string;
+  llm_model?: string;
+  tokens_in?: number;
+  tokens_out?: number;
+  /** Input tokens served from the provider's prompt cache */
+  tokens_cached?: number;
+  /** promptPrefixHash of the stable system prefix (cache-hit grouping) */
+  prompt_prefix_hash?: string;
+  item_count?: number;
+  error?: string;
+  metadata?: Record<string, unknown>;
+}
+
+const MAX_BUFFERED = 200;
+
+export class EdgeTelemetry {
+  private buffer: Array<EdgeTelemetryEvent & { ts: string; source: string; sample_reason: string }> = [];
+  private dropped = 0;
+
+  constructor(
+    private source: string,
+    private supabaseUrl: string,
+    private serviceKey: string
+  ) {}
+
+  record(event: EdgeTelemetryEvent): void {
+    if (this.buffer.length >= MAX_BUFFERED) {
+      this.buffer.shift();
+      this.dropped++;
+    }
+    this.buffer.push({
+      ...event,
+      duration_ms: Math.max(0, Math.round(event.duration_ms)),
+      error: event.error?.slice(0, 500),
+      ts: new Date().toISOString(),
+      source: this.source,
+      // Edge events are not sampled: every request is recorded
+      sample_reason: 'head'
+    });
+  }
+
+  /**
+   * Time an async stage and record it
+   */
+  async time<T>(
+    stage: string,
+    eventType: string,
+    fn: () => Promise<T>,
+    extra: Partial<EdgeTelemetryEvent> = {}
+  ): Promise<T> {
+    const start = performance.now();
+    try {
+      const result = await fn();
+      this.record({ ...extra, stage, event_type: eventType, duration_ms: performance.now() - start, success: true });
+      return result;
+    } catch (err) {
+      this.record({
+        ...extra,
+        stage,
+        event_type: 'error',
+        duration_ms: performance.now() - start,
+        success: false,
+        error: err instanceof Error ? err.message : String(err)
+      });
+      throw err;
+    }
+  }
+
+  async flush(): Promise<void> {
+    if (this.buffer.length === 0) return;
+    const rows = this.buffer;
+    this.buffer = [];
+
+    try {
+      const supabase = createClient(this.supabaseUrl, this.serviceKey);
+      const { error } = await supabase.from('telemetry_events').insert(rows);
+      if (error) {
+        console.warn(`[telemetry:${this.source}] insert failed:`, error.message);
+      }
+      if (this.dropped > 0) {
+        console.warn(`[telemetry:${this.source}] dropped ${this.dropped} events (buffer full)`);
+        this.dropped = 0;
+      }
+    } catch (err) {
+      console.warn(`[telemetry:${this.source}] flush failed:`, err);
+    }
+  }
+
+  /**
+   * Flush after the response is sent when the runtime supports it
+   */
+  flushInBackground(): void {
+    const pending = this.flush();
+    // deno-lint-ignore no-explicit-any
+    const runtime = (globalThis as any).EdgeRuntime;
+    if (runtime?.waitUntil) {
+      runtime.waitUntil(pending);
+    }
+  }
+}
@@ -3,103 +3,264 @@
  *
  * Executes tool calls made by the LLM.
  * Each tool function receives arguments from OpenAI and performs the actual action.
+ *
+ * A model turn can request several tools at once. createToolTurn runs them
+ * concurrently on one Supabase client, so a multi-tool turn costs one round
+ * of latency:
+ * - read-only tools have a deadline (TOOL_SPECS.timeoutMs); a call that
+ *   misses it is aborted and reported as a failed result instead of
+ *   stalling the turn. Writes have none: aborting the request does not stop
+ *   the RPC from committing, and a "failed" log_meal that was in fact saved
+ *   invites the model to log it again
+ * - each tool is a single RPC / query (see 20251108020000_chat_tool_rpcs.sql
+ *   and 20251108080000_tool_log_meal.sql), run for context.userId, which
+ *   callers must take from a verified JWT
+ * - read-only results are cached for the rest of the turn, and identical
+ *   concurrent reads share one request
+ * - reads of the meal log wait for writes already running in the same turn,
+ *   so "log this and tell me what's left" sees the new meal
  */
 
 import { createClient } from 'npm:@supabase/supabase-js@2.53.0';
 
-interface ToolExecutionContext {
+export interface ToolExecutionContext {
   userId: string;
   supabaseUrl: string;
   supabaseKey: string;
 }
 
-export async function executeTool(
-  toolName: string,
-  toolArgs: any,
-  context: ToolExecutionContext
-): Promise<{ success: boolean; result?: any; error?: string }> {
-  console.log(`[executeTool] Executing: ${toolName}`, toolArgs);
+export interface ToolResult {
+  success: boolean;
+  result?: any;
+  error?: string;
+}
+
+export interface ToolCall {
+  id?: string;
+  name: string;
+  args: any;
+}
+
+export interface ToolCallResult extends ToolResult {
+  id?: string;
+  name: string;
+  duration_ms: number;
+  cached?: boolean;
+  timed_out?: boolean;
+}
+
+interface ToolRunContext {
+  userId: string;
+  supabase: any;
+  signal: AbortSignal;
+}
+
+interface ToolSpec {
+  /** Omitted for non-idempotent writes, which run until they settle */
+  timeoutMs?: number;
+  /** No side effects: safe to cache for the turn */
+  readOnly: boolean;
+  /** Reads meal_logs / day_rollups, so it must see writes from the same turn */
+  readsMealLog?: boolean;
+  run: (args: any, ctx: ToolRunContext) => Promise<ToolResult>;
+}
+
+const TOOL_SPECS: Record<string, ToolSpec> = {
+  log_meal: { readOnly: false, run: logMealTool },
+  get_macros: { timeoutMs: 1000, readOnly: true, run: getMacrosTool },
+  get_remaining_macros: { timeoutMs: 4000, readOnly: true, readsMealLog: true, run: getRemainingMacrosTool },
+  undo_last_meal: { readOnly: false, run: undoLastMealTool }
+};
+
+export interface ToolTurnOptions {
+  /** Cancels every tool still running (client disconnect, request deadline) */
+  signal?: AbortSignal;
+  /** Per-tool deadline overrides */
+  timeouts?: Partial<Record<string, number>>;
+}
 
+export interface ToolTurn {
+  run(name: string, args: any, id?: string): Promise<ToolCallResult>;
+  /** Start a turn's calls (writes first); one promise per call, in call order */
+  startAll(calls: ToolCall[]): Promise<ToolCallResult>[];
+  runAll(calls: ToolCall[]): Promise<ToolCallResult[]>;
+}
+
+/**
+ * Executor scoped to one model turn
+ */
+export function createToolTurn(context: ToolExecutionContext, options: ToolTurnOptions = {}): ToolTurn {
   const supabase = createClient(context.supabaseUrl, context.supabaseKey);
+  const cache = new Map<string, Promise<ToolResult>>();
+  const writes = new Set<Promise<unknown>>();
 
-  try {
-    switch (toolName) {
-      case 'log_meal':
-        return await logMealTool(toolArgs, context.userId, supabase);
+  const invoke = async (spec: ToolSpec, name: string, args: any): Promise<ToolResult & { timed_out?: boolean }> => {
+    const timeoutMs = options.timeouts?.[name] ?? spec.timeoutMs;
+    const controller = new AbortController();
+    const onAbort = () => controller.abort(options.signal?.reason);
+    options.signal?.addEventListener('abort', onAbort, { once: true });
 
-      case 'get_macros':
-        return await getMacrosTool(toolArgs);
+    let timer: ReturnType<typeof setTimeout> | undefined;
+    const deadline = timeoutMs === undefined
+      ? []
+      : [new Promise<ToolResult & { timed_out: boolean }>((resolve) => {
+          timer = setTimeout(() => {
+            controller.abort(new Error(`${name} timed out`));
+            resolve({ success: false, error: `${name} timed out after ${timeoutMs}ms`, timed_out: true });
+          }, timeoutMs);
+        })];
 
-      case 'get_remaining_macros':
-        return await getRemainingMacrosTool(context.userId, supabase);
+    try {
+      if (options.signal?.aborted) return { success: false, error: `${name} cancelled` };
+      return await Promise.race([
+        spec.run(args, { userId: context.userId, supabase, signal: controller.signal }),
+        ...deadline
+      ]);
+    } catch (error) {
+      console.error(`[executeTool] Error executing ${name}:`, error);
+      return { success: false, error: String(error) };
+    } finally {
+      clearTimeout(timer);
+      options.signal?.removeEventListener('abort', onAbort);
+    }
+  };
 
-      case 'undo_last_meal':
-        return await undoLastMealTool(context.userId, supabase);
+  const run = async (name: string, args: any, id?: string): Promise<ToolCallResult> => {
+    console.log(`[executeTool] Executing: ${name}`, args);
+    const started = performance.now();
+    const spec = TOOL_SPECS[name];
+    if (!spec) {
+      return { id, name, success: false, error: `Unknown tool: ${name}`, duration_ms: 0 };
+    }
 
-      default:
-        return {
-          success: false,
-          error: `Unknown tool: ${toolName}`
-        };
+    if (!spec.readOnly) {
+      const pending = invoke(spec, name, args);
+      writes.add(pending);
+      const outcome = await pending;
+      writes.delete(pending);
+      // Anything read earlier in the turn may be stale now
+      cache.clear();
+      return { id, name, ...outcome, duration_ms: Math.round(performance.now() - started) };
     }
-  } catch (error) {
-    console.error(`[executeTool] Error executing ${toolName}:`, error);
-    return {
-      success: false,
-      error: String(error)
-    };
-  }
+
+    if (spec.readsMealLog && writes.size > 0) {
+      await Promise.allSettled([...writes]);
+    }
+
+    const key = `${name}:${JSON.stringify(args ?? {})}`;
+    let cached = true;
+    let pending = cache.get(key);
+    if (!pending) {
+      cached = false;
+      pending = invoke(spec, name, args);
+      cache.set(key, pending);
+    }
+    const outcome = await pending;
+    if (!outcome.success) cache.delete(key);
+    return { id, name, ...outcome, cached, duration_ms: Math.round(performance.now() - started) };
+  };
+
+  const startAll = (calls: ToolCall[]): Promise<ToolCallResult>[] => {
+    // Start writes first so meal-log reads in the same batch wait for them
+    const order = calls
+      .map((call, index) => ({ call, index }))
+      .sort((a, b) => Number(TOOL_SPECS[a.call.name]?.readOnly ?? false) - Number(TOOL_SPECS[b.call.name]?.readOnly ?? false));
+    const results = new Array<Promise<ToolCallResult>>(calls.length);
+    for (const { call, index } of order) {
+      results[index] = run(call.name, call.args, call.id);
+    }
+    return results;
+  };
+
+  return {
+    run,
+    startAll,
+    runAll: (calls) => Promise.all(startAll(calls))
+  };
+}
+
+/**
+ * Run every tool call from one model turn concurrently
+ */
+export function executeToolCalls(
+  calls: ToolCall[],
+  context: ToolExecutionContext,
+  options: ToolTurnOptions = {}
+): Promise<ToolCallResult[]> {
+  return createToolTurn(context, options).runAll(calls);
+}
+
+export async function executeTool(
+  toolName: string,
+  toolArgs: any,
+  context: ToolExecutionContext
+): Promise<ToolResult> {
+  const { success, result, error } = await createToolTurn(context).run(toolName, toolArgs);
+  return { success, result, error };
 }
 
 /**
  * LOG MEAL TOOL
- * Logs food items to database using log_meal RPC
+ * Logs food items for the turn's user with the tool_log_meal RPC (log_meal
+ * takes auth.uid(), which is NULL under the service role)
  */
-async function logMealTool(args: any, userId: string, supabase: any) {
+async function logMealTool(args: any, { userId, supabase, signal }: ToolRunContext): Promise<ToolResult> {
   const { items, meal_slot, timestamp } = args;
 
   if (!items || !Array.isArray(items) || items.length === 0) {
     return { success: false, error: 'No items provided' };
   }
 
-  // Prepare items for log_meal RPC
+  // Prepare items for tool_log_meal RPC
   const itemsForDb = items.map((item: any, index: number) => ({
     position: index + 1,
     name: item.name,
     quantity: String(item.quantity || 1),
     unit: item.unit || 'serving',
-    energy_kcal: String(item.macros.kcal || 0),
-    protein_g: String(item.macros.protein_g || 0),
-    fat_g: String(item.macros.fat_g || 0),
-    carbs_g: String(item.macros.carbs_g || 0),
-    fiber_g: String(item.macros.fiber_g || 0)
+    energy_kcal: String(item.macros?.kcal || 0),
+    protein_g: String(item.macros?.protein_g || 0),
+    fat_g: String(item.macros?.fat_g || 0),
+    carbs_g: String(item.macros?.carbs_g || 0),
+    fiber_g: String(item.macros?.fiber_g || 0)
   }));
 
-  // Call log_meal RPC
-  const { data: mealLogId, error } = await supabase.rpc('log_meal', {
+  const { data: mealLogId, error } = await supabase.rpc('tool_log_meal', {
+    p_user_id: userId,
     p_ts: timestamp || new Date().toISOString(),
     p_meal_slot_text: meal_slot || null,
     p_note: null,
     p_items: itemsForDb
-  });
+  }).abortSignal(signal);
 
   if (error) {
     console.error('[logMealTool] RPC error:', error);
-    return { success: false, error: error.message };
+    return {
+      success: false,
+      error: error.message,
+      result: {
+        kind: 'food_log',
+        logged: false,
+        errors: [error.message]
+      }
+    };
   }
 
   // Calculate totals for response
   const totals = items.reduce((acc: any, item: any) => ({
-    kcal: acc.kcal + (item.macros.kcal || 0),
-    protein_g: acc.protein_g + (item.macros.protein_g || 0),
-    fat_g: acc.fat_g + (item.macros.fat_g || 0),
-    carbs_g: acc.carbs_g + (item.macros.carbs_g || 0),
-    fiber_g: acc.fiber_g + (item.macros.fiber_g || 0)
+    kcal: acc.kcal + (item.macros?.kcal || 0),
+    protein_g: acc.protein_g + (item.macros?.protein_g || 0),
+    fat_g: acc.fat_g + (item.macros?.fat_g || 0),
+    carbs_g: acc.carbs_g + (item.macros?.carbs_g || 0),
+    fiber_g: acc.fiber_g + (item.macros?.fiber_g || 0)
   }), { kcal: 0, protein_g: 0, fat_g: 0, carbs_g: 0, fiber_g: 0 });
 
+  console.log(`[logMealTool] Success: logged meal_id=${mealLogId}, items=${items.length}, kcal=${totals.kcal}`);
+
   return {
     success: true,
     result: {
+      kind: 'food_log',
+      logged: true,
       meal_log_id: mealLogId,
       items_logged: items.length,
       totals
@@ -111,7 +272,7 @@ async function logMealTool(args: any, userId: string, supabase: any) {
  * GET MACROS TOOL
  * Calculates macros for food WITHOUT logging (uses USDA/common values)
  */
-async function getMacrosTool(args: any) {
+async function getMacrosTool(args: any): Promise<ToolResult> {
   const { food_description } = args;
 
   // This is a simplified implementation
@@ -128,113 +289,57 @@ async function getMacrosTool(args: any) {
 
 /**
  * GET REMAINING MACROS TOOL
- * Gets user's remaining macros for today
+ * Targets, consumed and remaining for today in one RPC
  */
-async function getRemainingMacrosTool(userId: string, supabase: any) {
-  // Get user's macro targets
-  const { data: userMetrics, error: metricsError } = await supabase
-    .from('user_metrics')
-    .select('calorie_target, protein_g_target, carbs_g_target, fat_g_target, fiber_g_target')
-    .eq('user_id', userId)
-    .maybeSingle();
-
-  if (metricsError) {
-    return { success: false, error: metricsError.message };
+async function getRemainingMacrosTool(_args: any, { userId, supabase, signal }: ToolRunContext): Promise<ToolResult> {
+  const today = new Date().toISOString().split('T')[0];
+  const { data, error } = await supabase
+    .rpc('tool_remaining_macros', { p_user_id: userId, p_day: today })
+    .abortSignal(signal);
+
+  if (error) {
+    return { success: false, error: error.message };
   }
 
-  if (!userMetrics) {
+  if (!data?.has_targets) {
     return {
       success: false,
       error: 'User has not completed TDEE onboarding'
     };
   }
 
-  // Get today's consumed macros
-  const today = new Date().toISOString().split('T')[0];
-  const { data: todayRollup, error: rollupError } = await supabase
-    .from('day_rollups')
-    .select('total_kcal, total_protein_g, total_carbs_g, total_fat_g, total_fiber_g')
-    .eq('user_id', userId)
-    .eq('day_date', today)
-    .maybeSingle();
-
-  if (rollupError) {
-    return { success: false, error: rollupError.message };
-  }
-
-  const consumed = todayRollup || {
-    total_kcal: 0,
-    total_protein_g: 0,
-    total_carbs_g: 0,
-    total_fat_g: 0,
-    total_fiber_g: 0
-  };
-
   return {
     success: true,
     result: {
-      targets: {
-        kcal: userMetrics.calorie_target,
-        protein_g: userMetrics.protein_g_target,
-        carbs_g: userMetrics.carbs_g_target,
-        fat_g: userMetrics.fat_g_target,
-        fiber_g: userMetrics.fiber_g_target
-      },
-      consumed: {
-        kcal: consumed.total_kcal,
-        protein_g: consumed.total_protein_g,
-        carbs_g: consumed.total_carbs_g,
-        fat_g: consumed.total_fat_g,
-        fiber_g: consumed.total_fiber_g
-      },
-      remaining: {
-        kcal: userMetrics.calorie_target - consumed.total_kcal,
-        protein_g: userMetrics.protein_g_target - consumed.total_protein_g,
-        carbs_g: userMetrics.carbs_g_target - consumed.total_carbs_g,
-        fat_g: userMetrics.fat_g_target - consumed.total_fat_g,
-        fiber_g: userMetrics.fiber_g_target - consumed.total_fiber_g
-      }
+      targets: data.targets,
+      consumed: data.consumed,
+      remaining: data.remaining
     }
   };
 }
 
 /**
  * UNDO LAST MEAL TOOL
- * Deletes the most recent meal log
+ * Deletes the most recent meal log (select + delete in one RPC)
  */
-async function undoLastMealTool(userId: string, supabase: any) {
-  // Get most recent meal
-  const { data: lastMeal, error: fetchError } = await supabase
-    .from('meal_logs')
-    .select('id, ts')
-    .eq('user_id', userId)
-    .order('ts', { ascending: false })
-    .limit(1)
-    .maybeSingle();
-
-  if (fetchError) {
-    return { success: false, error: fetchError.message };
-  }
+async function undoLastMealTool(_args: any, { userId, supabase, signal }: ToolRunContext): Promise<ToolResult> {
+  const { data, error } = await supabase
+    .rpc('tool_undo_last_meal', { p_user_id: userId })
+    .abortSignal(signal);
 
-  if (!lastMeal) {
-    return { success: false, error: 'No meals to undo' };
+  if (error) {
+    return { success: false, error: error.message };
   }
 
-  // Delete the meal (cascade will delete items)
-  const { error: deleteError } = await supabase
-    .from('meal_logs')
-    .delete()
-    .eq('id', lastMeal.id);
-
-  if (deleteError) {
-    return { success: false, error: deleteError.message };
+  if (!data) {
+    return { success: false, error: 'No meals to undo' };
   }
 
   return {
     success: true,
     result: {
-      deleted_meal_id: lastMeal.id,
-      deleted_at: lastMeal.ts
+      deleted_meal_id: data.deleted_meal_id,
+      deleted_at: data.deleted_at
     }
   };
 }
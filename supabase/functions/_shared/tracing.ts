@@ -0,0 +1,217 @@
+/**
+ * EDGE TRACING
+ *
+ * Continues the client's W3C trace (src/lib/telemetry/tracing.ts) inside an
+ * edge function. The incoming `traceparent` header becomes the parent of a
+ * server span; provider calls, tools and post-agents are child spans.
+ *
+ * On end() the spans are written as one `[trace]` JSON log line (searchable
+ * by trace_id in the function logs) and, when OTLP_ENDPOINT is set, exported
+ * as OTLP/HTTP JSON in the background.
+ */
+
+import { providerFetch } from './cassette.ts';
+
+type AttrValue = string | number | boolean;
+
+interface EdgeSpan {
+  traceId: string;
+  spanId: string;
+  parentSpanId?: string;
+  name: string;
+  kind: 'server' | 'client' | 'internal';
+  startTime: number;
+  durationMs: number;
+  status: 'ok' | 'error';
+  error?: string;
+  attributes: Record<string, AttrValue>;
+}
+
+const TRACEPARENT_RE = /^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$/;
+const MAX_SPANS = 200;
+
+function randomHex(bytes: number): string {
+  const buf = new Uint8Array(bytes);
+  crypto.getRandomValues(buf);
+  return Array.from(buf, (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+export function parseTraceparent(header: string | null): { traceId: string; parentSpanId: string } | null {
+  const m = header?.trim().toLowerCase().match(TRACEPARENT_RE);
+  if (!m || /^0+$/.test(m[1]) || /^0+$/.test(m[2])) return null;
+  return { traceId: m[1], parentSpanId: m[2] };
+}
+
+export class EdgeTracer {
+  readonly traceId: string;
+  readonly rootSpanId = randomHex(8);
+  private parentSpanId?: string;
+  private rootStart = Date.now();
+  private rootPerf = performance.now();
+  private spans: EdgeSpan[] = [];
+  private rootAttributes: Record<string, AttrValue> = {};
+  private ended = false;
+
+  constructor(private service: string, req: Request) {
+    const parent = parseTraceparent(req.headers.get('traceparent'));
+    this.traceId = parent?.traceId ?? randomHex(16);
+    this.parentSpanId = parent?.parentSpanId;
+  }
+
+  setAttributes(attributes: Record<string, AttrValue | undefined>): void {
+    for (const [k, v] of Object.entries(attributes)) {
+      if (v !== undefined) this.rootAttributes[k] = v;
+    }
+  }
+
+  /**
+   * Time an async step as a child span of the server span
+   */
+  async span<T>(
+    name: string,
+    fn: () => Promise<T>,
+    attributes: Record<string, AttrValue | undefined> = {},
+    kind: 'client' | 'internal' = 'internal'
+  ): Promise<T> {
+    const startTime = Date.now();
+    const start = performance.now();
+    const attrs: Record<string, AttrValue> = {};
+    for (const [k, v] of Object.entries(attributes)) {
+      if (v !== undefined) attrs[k] = v;
+    }
+    try {
+      const result = await fn();
+      this.push({ name, kind, startTime, durationMs: performance.now() - start, status: 'ok', attributes: attrs });
+      return result;
+    } catch (err) {
+      this.push({
+        name,
+        kind,
+        startTime,
+        durationMs: performance.now() - start,
+        status: 'error',
+        error: err instanceof Error ? err.message : String(err),
+        attributes: attrs
+      });
+      throw err;
+    }
+  }
+
+  /**
+   * fetch() to an upstream provider, recorded as a client span (and
+   * through the LLM cassette layer when LLM_CASSETTE_MODE is set)
+   */
+  fetch(name: string, url: string, init?: RequestInit): Promise<Response> {
+    const host = (() => {
+      try { return new URL(url).host; } catch { return 'unknown'; }
+    })();
+    return this.span(name, async () => {
+      const res = await providerFetch(url, init);
+      if (!res.ok) throw Object.assign(new Error(`HTTP ${res.status}`), { response: res });
+      return res;
+    }, { 'http.method': init?.method ?? 'GET', 'net.peer.name': host }, 'client')
+      // Non-2xx is recorded as an error span but still handed back to the caller
+      .catch((err) => {
+        if (err?.response) return err.response as Response;
+        throw err;
+      });
+  }
+
+  /**
+   * Close the server span, log it and export in the background
+   */
+  end(status: 'ok' | 'error' = 'ok', error?: string): void {
+    if (this.ended) return;
+    this.ended = true;
+    const spans: EdgeSpan[] = [
+      {
+        traceId: this.traceId,
+        spanId: this.rootSpanId,
+        parentSpanId: this.parentSpanId,
+        name: this.service,
+        kind: 'server',
+        startTime: this.rootStart,
+        durationMs: performance.now() - this.rootPerf,
+        status,
+        error,
+        attributes: this.rootAttributes
+      },
+      ...this.spans
+    ];
+    this.spans = [];
+
+    console.log('[trace]', JSON.stringify({
+      trace_id: this.traceId,
+      service: this.service,
+      spans: spans.map((s) => ({
+        name: s.name,
+        span_id: s.spanId,
+        parent: s.parentSpanId,
+        start_offset_ms: s.startTime - this.rootStart,
+        ms: Math.round(s.durationMs),
+        status: s.status,
+        ...(s.error && { error: s.error })
+      }))
+    }));
+
+    const endpoint = Deno.env.get('OTLP_ENDPOINT');
+    if (!endpoint) return;
+
+    const pending = fetch(`${endpoint.replace(/\/$/, '')}/v1/traces`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json', ...otlpHeaders() },
+      body: JSON.stringify(toOtlp(this.service, spans))
+    }).then(() => {}).catch((err) => console.warn('[trace] OTLP export failed:', err?.message ?? err));
+
+    // deno-lint-ignore no-explicit-any
+    const runtime = (globalThis as any).EdgeRuntime;
+    if (runtime?.waitUntil) runtime.waitUntil(pending);
+  }
+
+  private push(span: Omit<EdgeSpan, 'traceId' | 'spanId' | 'parentSpanId'>): void {
+    if (this.spans.length >= MAX_SPANS) return;
+    this.spans.push({ ...span, traceId: this.traceId, spanId: randomHex(8), parentSpanId: this.rootSpanId });
+  }
+}
+
+// OTLP_HEADERS="key1=value1,key2=value2" (e.g. vendor API keys)
+function otlpHeaders(): Record<string, string> {
+  const raw = Deno.env.get('OTLP_HEADERS');
+  if (!raw) return {};
+  return Object.fromEntries(
+    raw.split(',')
+      .map((pair) => pair.split('=').map((s) => s.trim()))
+      .filter(([k, v]) => k && v)
+  );
+}
+
+function toOtlp(service: string, spans: EdgeSpan[]) {
+  const attr = (key: string, value: AttrValue) => ({
+    key,
+    value: typeof value === 'number'
+      ? (Number.isInteger(value) ? { intValue: value } : { doubleValue: value })
+      : typeof value === 'boolean' ? { boolValue: value } : { stringValue: value }
+  });
+  const nanos = (ms: number) => `${Math.round(ms * 1e6)}`;
+  const kinds = { internal: 1, server: 2, client: 3 };
+
+  return {
+    resourceSpans: [{
+      resource: { attributes: [attr('service.name', service)] },
+      scopeSpans: [{
+        scope: { name: 'pat-edge-tracing' },
+        spans: spans.map((s) => ({
+          traceId: s.traceId,
+          spanId: s.spanId,
+          ...(s.parentSpanId && { parentSpanId: s.parentSpanId }),
+          name: s.name,
+          kind: kinds[s.kind],
+          startTimeUnixNano: nanos(s.startTime),
+          endTimeUnixNano: nanos(s.startTime + s.durationMs),
+          attributes: Object.entries(s.attributes).map(([k, v]) => attr(k, v)),
+          status: s.status === 'error' ? { code: 2, message: s.error ?? '' } : { code: 1 }
+        }))
+      }]
+    }]
+  };
+}
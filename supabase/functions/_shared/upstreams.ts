@@ -0,0 +1,32 @@
+/**
+ * UPSTREAM ENDPOINTS
+ *
+ * Base URLs for the third-party APIs the edge functions call. Each can be
+ * overridden so local and perf runs hit the deterministic stand-in in
+ * perf/mock_llm instead of the real providers:
+ *
+ *   OPENAI_BASE_URL=http://host.docker.internal:8787/v1
+ *   GEMINI_BASE_URL=http://host.docker.internal:8787/v1beta
+ *   GOOGLE_CSE_URL=http://host.docker.internal:8787/customsearch/v1
+ *
+ * Unset means production.
+ */
+
+function base(name: string, fallback: string): string {
+  return (Deno.env.get(name)?.trim() || fallback).replace(/\/+$/, '');
+}
+
+export const OPENAI_BASE_URL = base('OPENAI_BASE_URL', 'https://api.openai.com/v1');
+export const GEMINI_BASE_URL = base('GEMINI_BASE_URL', 'https://generativelanguage.googleapis.com/v1beta');
+export const GOOGLE_CSE_URL = base('GOOGLE_CSE_URL', 'https://www.googleapis.com/customsearch/v1');
+
+export const OPENAI_CHAT_URL = `${OPENAI_BASE_URL}/chat/completions`;
+
+export function geminiGenerateUrl(model: string, apiKey: string): string {
+  return `${GEMINI_BASE_URL}/models/${model}:generateContent?key=${encodeURIComponent(apiKey)}`;
+}
+
+/** streamGenerateContent as SSE (one GenerateContentResponse per `data:` event) */
+export function geminiStreamUrl(model: string, apiKey: string): string {
+  return `${GEMINI_BASE_URL}/models/${model}:streamGenerateContent?alt=sse&key=${encodeURIComponent(apiKey)}`;
+}
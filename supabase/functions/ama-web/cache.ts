@@ -0,0 +1,196 @@
+/**
+ * AMA Web Cache
+ *
+ * Two-level stale-while-revalidate cache for ama-web:
+ * - L1: per-isolate Map (LRU by insertion order), answers in well under a ms
+ * - L2: ama_web_cache table, shared by every isolate and surviving cold starts
+ *
+ * Entries are fresh until `freshUntil`, then served stale (and refreshed in
+ * the background by the caller) until `staleUntil`. Concurrent misses for
+ * the same key share one loader call.
+ *
+ * No Deno APIs: the vitest suite imports this module directly.
+ */
+
+export interface CacheEntry<T> {
+  value: T;
+  freshUntil: number;
+  staleUntil: number;
+}
+
+export type CacheStatus = 'hit' | 'stale' | 'miss';
+
+export interface CacheStore {
+  get<T>(key: string): Promise<CacheEntry<T> | null>;
+  set<T>(key: string, entry: CacheEntry<T>): Promise<void>;
+}
+
+export interface CacheTtl {
+  freshMs: number;
+  staleMs: number;
+}
+
+export interface SwrResult<T> {
+  value: T;
+  status: CacheStatus;
+  /** Background refresh for stale hits; hand to EdgeRuntime.waitUntil */
+  revalidation?: Promise<void>;
+}
+
+export interface SwrCacheOptions {
+  store?: CacheStore | null;
+  memoryMax?: number;
+  now?: () => number;
+}
+
+export function createSwrCache(options: SwrCacheOptions = {}) {
+  const { store = null, memoryMax = 500, now = Date.now } = options;
+  const memory = new Map<string, CacheEntry<unknown>>();
+  const inflight = new Map<string, Promise<unknown>>();
+
+  const remember = (key: string, entry: CacheEntry<unknown>) => {
+    memory.delete(key);
+    memory.set(key, entry);
+    if (memory.size > memoryMax) {
+      memory.delete(memory.keys().next().value as string);
+    }
+  };
+
+  const lookup = async <T>(key: string): Promise<CacheEntry<T> | null> => {
+    const local = memory.get(key) as CacheEntry<T> | undefined;
+    if (local && local.staleUntil > now()) {
+      remember(key, local);
+      return local;
+    }
+    if (!store) return null;
+    try {
+      const shared = await store.get<T>(key);
+      if (shared && shared.staleUntil > now()) {
+        remember(key, shared);
+        return shared;
+      }
+    } catch (err) {
+      console.warn('[ama-web cache] L2 read failed:', err);
+    }
+    return null;
+  };
+
+  const put = async <T>(key: string, value: T, ttl: CacheTtl): Promise<void> => {
+    const at = now();
+    const entry: CacheEntry<T> = { value, freshUntil: at + ttl.freshMs, staleUntil: at + ttl.freshMs + ttl.staleMs };
+    remember(key, entry);
+    if (!store) return;
+    try {
+      await store.set(key, entry);
+    } catch (err) {
+      console.warn('[ama-web cache] L2 write failed:', err);
+    }
+  };
+
+  /** Run the loader once per key at a time and cache what it returns */
+  const load = <T>(key: string, loader: () => Promise<T>, ttl: CacheTtl): Promise<T> => {
+    const pending = inflight.get(key) as Promise<T> | undefined;
+    if (pending) return pending;
+    const promise = loader()
+      .then(async (value) => {
+        await put(key, value, ttl);
+        return value;
+      })
+      .finally(() => inflight.delete(key));
+    inflight.set(key, promise);
+    return promise;
+  };
+
+  return {
+    /**
+     * Cached value for key, loading it on a miss. A stale hit returns the
+     * old value at once and refreshes it in `revalidation`.
+     */
+    async get<T>(key: string, loader: () => Promise<T>, ttl: CacheTtl): Promise<SwrResult<T>> {
+      const entry = await lookup<T>(key);
+      if (entry && entry.freshUntil > now()) {
+        return { value: entry.value, status: 'hit' };
+      }
+      if (entry) {
+        const revalidation = load(key, loader, ttl).then(
+          () => undefined,
+          (err) => console.warn('[ama-web cache] revalidation failed:', key, err)
+        );
+        return { value: entry.value, status: 'stale', revalidation };
+      }
+      return { value: await load(key, loader, ttl), status: 'miss' };
+    },
+
+    /** Cached value without loading (undefined on miss) */
+    async peek<T>(key: string): Promise<SwrResult<T> | undefined> {
+      const entry = await lookup<T>(key);
+      if (!entry) return undefined;
+      return { value: entry.value, status: entry.freshUntil > now() ? 'hit' : 'stale' };
+    },
+
+    set: put,
+
+    clear(): void {
+      memory.clear();
+      inflight.clear();
+    }
+  };
+}
+
+export type SwrCache = ReturnType<typeof createSwrCache>;
+
+/**
+ * Lower-case, collapse whitespace and drop trailing punctuation so
+ * "What's new in creatine research?" and "what's new in creatine research"
+ * share a cache entry
+ */
+export function normalizeQuery(query: string): string {
+  return query
+    .normalize('NFKC')
+    .toLowerCase()
+    .replace(/\s+/g, ' ')
+    .trim()
+    .replace(/[\s?!.,;:]+$/, '');
+}
+
+const RECENCY_BUCKETS = [1, 7, 30, 90, 365];
+
+/**
+ * Round recencyDays up to a bucket so nearby windows share search results;
+ * the bucket is also what gets searched
+ */
+export function recencyBucket(days: number): number {
+  const d = Math.max(1, Math.ceil(Number.isFinite(days) ? days : 365));
+  return RECENCY_BUCKETS.find((b) => d <= b) ?? Math.ceil(d / 365) * 365;
+}
+
+const HOUR = 3_600_000;
+
+/** Narrow windows change faster, so their results go stale sooner */
+export function searchTtl(bucket: number): CacheTtl {
+  if (bucket <= 1) return { freshMs: 15 * 60_000, staleMs: HOUR };
+  if (bucket <= 7) return { freshMs: HOUR, staleMs: 6 * HOUR };
+  if (bucket <= 30) return { freshMs: 6 * HOUR, staleMs: 24 * HOUR };
+  return { freshMs: 24 * HOUR, staleMs: 6 * 24 * HOUR };
+}
+
+/** Answers are keyed by their source set, so they only age out for space */
+export const ANSWER_TTL: CacheTtl = { freshMs: 7 * 24 * HOUR, staleMs: 0 };
+
+export async function sha256Hex(text: string): Promise<string> {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest), (b) => b.toString(16).padStart(2, '0')).join('');
+}
+
+export async function searchKey(query: string, bucket: number, num: number): Promise<string> {
+  return `search:${(await sha256Hex(normalizeQuery(query))).slice(0, 32)}:d${bucket}:n${num}`;
+}
+
+/** Order-insensitive hash of the source URLs an answer was written from */
+export async function sourceSetHash(urls: string[]): Promise<string> {
+  return (await sha256Hex([...new Set(urls)].sort().join('\n'))).slice(0, 16);
+}
+
+export async function answerKey(query: string, detail: string, sourcesHash: string): Promise<string> {
+  return `answer:${(await sha256Hex(normalizeQuery(query))).slice(0, 32)}:${detail}:${sourcesHash}`;
+}
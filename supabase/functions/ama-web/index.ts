@@ -1,18 +1,177 @@
 /**
  * AMA Web Research Edge Function
  * Google Custom Search + Gemini synthesis for web-enabled AMA queries
+ *
+ * Both steps are cached (see cache.ts):
+ * - search results by normalized query + recency bucket + result count
+ * - answers by normalized query + detail + hash of the source URLs
+ * A repeated question is served from cache; a stale search is served
+ * immediately and refreshed (and its answer re-synthesized) in the
+ * background. With `stream: true` the Gemini synthesis is streamed as SSE:
+ * a `{"citations", "sources"}` frame, `{"token"}` frames, then [DONE].
  */
 
 import { serve } from "https://deno.land/std@0.224.0/http/server.ts";
+import { createClient } from "npm:@supabase/supabase-js@2.53.0";
 import { corsHeaders } from "../_shared/cors.ts";
+import { GOOGLE_CSE_URL, geminiGenerateUrl, geminiStreamUrl } from "../_shared/upstreams.ts";
+import { createSseRelay, jsonFrame, tokenFrame, DONE_FRAME } from "../_shared/sse.ts";
+import {
+  createSwrCache,
+  recencyBucket,
+  searchTtl,
+  searchKey,
+  sourceSetHash,
+  answerKey,
+  ANSWER_TTL,
+  type CacheStore,
+  type CacheStatus
+} from "./cache.ts";
 
 interface RequestBody {
   query: string;
   recencyDays?: number;
   maxResults?: number;
   detail?: 'brief' | 'detailed';
+  stream?: boolean;
 }
 
+interface Citation {
+  title: string;
+  url: string;
+  snippet: string;
+}
+
+class UpstreamError extends Error {
+  constructor(message: string, public status: number) {
+    super(message);
+  }
+}
+
+/** Gemini answered without text; reported to the user but never cached */
+class EmptyAnswerError extends Error {}
+
+const EMPTY_ANSWER = "I couldn't generate a summary. Please try again.";
+
+/**
+ * L2 cache in ama_web_cache (service role); memory-only when unconfigured
+ */
+function createTableStore(): CacheStore | null {
+  const url = Deno.env.get('SUPABASE_URL');
+  const key = Deno.env.get('SUPABASE_SERVICE_ROLE_KEY');
+  if (!url || !key) return null;
+  const supabase = createClient(url, key, { auth: { persistSession: false } });
+
+  return {
+    async get(cacheKey) {
+      const { data, error } = await supabase
+        .from('ama_web_cache')
+        .select('payload, fresh_until, stale_until')
+        .eq('key', cacheKey)
+        .maybeSingle();
+      if (error) throw error;
+      if (!data) return null;
+      return {
+        value: data.payload,
+        freshUntil: Date.parse(data.fresh_until),
+        staleUntil: Date.parse(data.stale_until)
+      };
+    },
+    async set(cacheKey, entry) {
+      const { error } = await supabase.from('ama_web_cache').upsert({
+        key: cacheKey,
+        payload: entry.value,
+        fresh_until: new Date(entry.freshUntil).toISOString(),
+        stale_until: new Date(entry.staleUntil).toISOString(),
+        updated_at: new Date().toISOString()
+      });
+      if (error) throw error;
+    }
+  };
+}
+
+const cache = createSwrCache({ store: createTableStore() });
+
+function background(task: Promise<unknown>): void {
+  // deno-lint-ignore no-explicit-any
+  const runtime = (globalThis as any).EdgeRuntime;
+  if (runtime?.waitUntil) runtime.waitUntil(task);
+}
+
+async function searchWeb(query: string, bucket: number, num: number, cseKey: string, cseCx: string): Promise<Citation[]> {
+  const searchUrl = `${GOOGLE_CSE_URL}?key=${cseKey}&cx=${cseCx}` +
+    `&q=${encodeURIComponent(query)}&num=${num}&dateRestrict=d${bucket}`;
+
+  const searchResponse = await fetch(searchUrl);
+  if (!searchResponse.ok) {
+    const errorText = await searchResponse.text();
+    console.error('[ama-web] Google CSE error:', searchResponse.status, errorText);
+    throw new UpstreamError(`Google search failed: ${searchResponse.status}`, searchResponse.status);
+  }
+
+  const searchJson = await searchResponse.json();
+  return (searchJson.items ?? []).map((it: any) => ({
+    title: it.title,
+    url: it.link,
+    snippet: it.snippet
+  }));
+}
+
+function geminiRequest(query: string, items: Citation[], detail: 'brief' | 'detailed') {
+  const context = items
+    .map((it, i) => `[${i + 1}] ${it.title}\n${it.url}\n${it.snippet}`)
+    .join("\n\n");
+
+  const geminiPrompt = `You are Pat, a helpful AI assistant. Synthesize the latest information to answer: "${query}".
+
+Use only the context below. Cite sources inline as [1], [2], etc. Then list the links at the end under "Sources:".
+
+Context:
+${context}
+
+Provide a clear, concise answer in Pat's first-person, spartan tone.`;
+
+  return {
+    // ✅ Dynamic model selection: detailed → pro, brief → flash
+    model: detail === 'detailed' ? 'gemini-2.5-pro' : 'gemini-2.5-flash',
+    body: {
+      contents: [{
+        role: "user",
+        parts: [{ text: geminiPrompt }]
+      }],
+      generationConfig: {
+        temperature: 0.2,
+        maxOutputTokens: detail === 'detailed' ? 1200 : 600,
+        topP: 0.95,
+      }
+    }
+  };
+}
+
+const geminiText = (json: any): string =>
+  json?.candidates?.[0]?.content?.parts?.map((p: any) => p.text ?? '').join('') ?? '';
+
+async function synthesize(query: string, items: Citation[], detail: 'brief' | 'detailed', geminiKey: string): Promise<string> {
+  const { model, body } = geminiRequest(query, items, detail);
+  const geminiResponse = await fetch(geminiGenerateUrl(model, geminiKey), {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body)
+  });
+
+  if (!geminiResponse.ok) {
+    const errorText = await geminiResponse.text();
+    console.error('[ama-web] Gemini API error:', geminiResponse.status, errorText);
+    throw new UpstreamError(`Gemini synthesis failed: ${geminiResponse.status}`, geminiResponse.status);
+  }
+
+  const answerText = geminiText(await geminiResponse.json());
+  if (!answerText) throw new EmptyAnswerError('Gemini returned no text');
+  return answerText;
+}
+
+const sourcesList = (items: Citation[]) => items.map((it, i) => `[${i + 1}] ${it.url}`).join('\n');
+
 serve(async (req: Request) => {
   // Handle CORS preflight
   if (req.method === 'OPTIONS') {
@@ -28,7 +187,7 @@ serve(async (req: Request) => {
 
   try {
     const body: RequestBody = await req.json();
-    const { query, recencyDays = 365, maxResults = 6, detail = 'brief' } = body;
+    const { query, recencyDays = 365, maxResults = 6, detail = 'brief', stream = false } = body;
 
     if (!query || typeof query !== 'string' || query.trim().length === 0) {
       return new Response(
@@ -54,109 +213,178 @@ serve(async (req: Request) => {
       );
     }
 
-    console.log(`[ama-web] Processing query: "${query}" (recency: ${recencyDays}d, maxResults: ${maxResults}, detail: ${detail})`);
+    const bucket = recencyBucket(recencyDays);
+    const num = Math.min(maxResults, 10);
+    console.log(`[ama-web] Processing query: "${query}" (recency: ${recencyDays}d → d${bucket}, maxResults: ${num}, detail: ${detail})`);
 
-    // Step 1: Google Custom Search
-    const searchUrl = `https://www.googleapis.com/customsearch/v1?key=${CSE_KEY}&cx=${CSE_CX}` +
-      `&q=${encodeURIComponent(query)}&num=${Math.min(maxResults, 10)}&dateRestrict=d${recencyDays}`;
+    // Step 1: Google Custom Search (cached per query + recency bucket)
+    const sKey = await searchKey(query, bucket, num);
+    const search = await cache.get(sKey, () => searchWeb(query, bucket, num, CSE_KEY, CSE_CX), searchTtl(bucket));
+    const items = search.value;
 
-    const searchResponse = await fetch(searchUrl);
-    if (!searchResponse.ok) {
-      const errorText = await searchResponse.text();
-      console.error('[ama-web] Google CSE error:', searchResponse.status, errorText);
-      return new Response(
-        JSON.stringify({ error: `Google search failed: ${searchResponse.status}` }),
-        { status: searchResponse.status, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-      );
+    if (search.revalidation) {
+      // Sources may have moved: warm the answer for the refreshed set too
+      background(search.revalidation.then(async () => {
+        const fresh = await cache.peek<Citation[]>(sKey);
+        if (!fresh || fresh.value.length === 0) return;
+        const key = await answerKey(query, detail, await sourceSetHash(fresh.value.map(it => it.url)));
+        await cache.get(key, () => synthesize(query, fresh.value, detail, GEM_KEY), ANSWER_TTL);
+      }).catch(err => console.warn('[ama-web] Background answer refresh failed:', err)));
     }
 
-    const searchJson = await searchResponse.json();
-    const items = (searchJson.items ?? []).map((it: any) => ({
-      title: it.title,
-      url: it.link,
-      snippet: it.snippet
-    }));
-
     if (items.length === 0) {
       console.warn('[ama-web] No search results found');
       return new Response(
         JSON.stringify({
           answerText: `I couldn't find recent information about "${query}". Try rephrasing or checking if the topic exists.`,
           citations: [],
-          sources: []
+          sources: [],
+          cache: { search: search.status }
         }),
-        { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+        { headers: { ...corsHeaders, 'Content-Type': 'application/json', 'X-Cache': `search=${search.status}` } }
       );
     }
 
-    console.log(`[ama-web] Found ${items.length} search results`);
-
-    // Step 2: Synthesize with Gemini
-    const context = items
-      .map((it, i) => `[${i + 1}] ${it.title}\n${it.url}\n${it.snippet}`)
-      .join("\n\n");
-
-    const geminiPrompt = `You are Pat, a helpful AI assistant. Synthesize the latest information to answer: "${query}".
-
-Use only the context below. Cite sources inline as [1], [2], etc. Then list the links at the end under "Sources:".
-
-Context:
-${context}
-
-Provide a clear, concise answer in Pat's first-person, spartan tone.`;
+    console.log(`[ama-web] Found ${items.length} search results (search cache: ${search.status})`);
 
-    const geminiBody = {
-      contents: [{
-        role: "user",
-        parts: [{ text: geminiPrompt }]
-      }],
-      generationConfig: {
-        temperature: 0.2,
-        maxOutputTokens: detail === 'detailed' ? 1200 : 600,
-        topP: 0.95,
-      }
-    };
+    // Step 2: Synthesize with Gemini (cached per query + detail + source set)
+    const aKey = await answerKey(query, detail, await sourceSetHash(items.map(it => it.url)));
+    const cachedAnswer = await cache.peek<string>(aKey);
 
-    // ✅ Dynamic model selection: detailed → pro, brief → flash
-    const modelForDetail = detail === 'detailed' ? 'gemini-2.5-pro' : 'gemini-2.5-flash';
-    const geminiUrl = `https://generativelanguage.googleapis.com/v1beta/models/${modelForDetail}:generateContent?key=${GEM_KEY}`;
-    const geminiResponse = await fetch(geminiUrl, {
-      method: "POST",
-      headers: { "Content-Type": "application/json" },
-      body: JSON.stringify(geminiBody)
-    });
-
-    if (!geminiResponse.ok) {
-      const errorText = await geminiResponse.text();
-      console.error('[ama-web] Gemini API error:', geminiResponse.status, errorText);
-      return new Response(
-        JSON.stringify({ error: `Gemini synthesis failed: ${geminiResponse.status}` }),
-        { status: geminiResponse.status, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-      );
+    if (stream && !cachedAnswer) {
+      return streamAnswer(query, items, detail, GEM_KEY, aKey, search.status);
     }
 
-    const geminiJson = await geminiResponse.json();
-    const answerText = geminiJson?.candidates?.[0]?.content?.parts
-      ?.map((p: any) => p.text)
-      .join("") ?? "I couldn't generate a summary. Please try again.";
+    const answer: { value: string; status: CacheStatus } = cachedAnswer
+      ?? await cache.get(aKey, () => synthesize(query, items, detail, GEM_KEY), ANSWER_TTL).catch((err) => {
+        if (err instanceof EmptyAnswerError) return { value: EMPTY_ANSWER, status: 'miss' as const };
+        throw err;
+      });
+    const cacheStatus = { search: search.status, answer: answer.status };
+    console.log(`[ama-web] Answer (${answer.value.length} chars, answer cache: ${answer.status})`);
 
-    console.log(`[ama-web] Generated answer (${answerText.length} chars)`);
+    if (stream) {
+      const frames = [
+        jsonFrame({ citations: items, sources: sourcesList(items), cache: cacheStatus }),
+        jsonFrame({ token: answer.value }),
+        DONE_FRAME
+      ];
+      return new Response(new Blob(frames).stream(), {
+        headers: { ...corsHeaders, 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache' }
+      });
+    }
 
     return new Response(
       JSON.stringify({
-        answerText,
+        answerText: answer.value,
         citations: items,
-        sources: items.map((it, i) => `[${i + 1}] ${it.url}`).join('\n')
+        sources: sourcesList(items),
+        cache: cacheStatus
       }),
-      { headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+      {
+        headers: {
+          ...corsHeaders,
+          'Content-Type': 'application/json',
+          'X-Cache': `search=${cacheStatus.search}, answer=${cacheStatus.answer}`
+        }
+      }
     );
 
   } catch (error: any) {
     console.error('[ama-web] Exception:', error);
     return new Response(
       JSON.stringify({ error: error.message || 'Web search failed' }),
-      { status: 500, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+      {
+        status: error instanceof UpstreamError ? error.status : 500,
+        headers: { ...corsHeaders, 'Content-Type': 'application/json' }
+      }
     );
   }
 });
 
+/**
+ * Stream Gemini's synthesis to the client and cache the full answer once
+ * the upstream stream finishes normally
+ */
+async function streamAnswer(
+  query: string,
+  items: Citation[],
+  detail: 'brief' | 'detailed',
+  geminiKey: string,
+  key: string,
+  searchStatus: CacheStatus
+): Promise<Response> {
+  const { model, body } = geminiRequest(query, items, detail);
+  const geminiResponse = await fetch(geminiStreamUrl(model, geminiKey), {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body)
+  });
+
+  if (!geminiResponse.ok || !geminiResponse.body) {
+    const errorText = await geminiResponse.text();
+    console.error('[ama-web] Gemini stream error:', geminiResponse.status, errorText);
+    throw new UpstreamError(`Gemini synthesis failed: ${geminiResponse.status}`, geminiResponse.status || 502);
+  }
+
+  let answerText = '';
+  let finished = false;
+  // [DONE] is sent below, after the empty-answer fallback if one is needed
+  const relay = createSseRelay(geminiResponse.body, {
+    done: false,
+    extract: (data) => {
+      try {
+        const json = JSON.parse(data);
+        if (json?.candidates?.[0]?.finishReason) finished = true;
+        const text = geminiText(json);
+        answerText += text;
+        return text || null;
+      } catch {
+        return null;
+      }
+    },
+    onClose: (stats) => {
+      console.log('[ama-web] Answer streamed:', { ...stats, chars: answerText.length, finished });
+      if (finished && answerText) background(cache.set(key, answerText, ANSWER_TTL));
+    }
+  });
+
+  const header = jsonFrame({
+    citations: items,
+    sources: sourcesList(items),
+    cache: { search: searchStatus, answer: 'miss' }
+  });
+  const reader = relay.getReader();
+  let sentHeader = false;
+
+  const stream = new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      if (!sentHeader) {
+        sentHeader = true;
+        controller.enqueue(header);
+        return;
+      }
+      const { done, value } = await reader.read();
+      if (!done) {
+        controller.enqueue(value);
+        return;
+      }
+      // Same fallback as the buffered path when Gemini streams no text
+      if (!answerText) controller.enqueue(tokenFrame(EMPTY_ANSWER));
+      controller.enqueue(DONE_FRAME);
+      controller.close();
+    },
+    cancel(reason) {
+      return reader.cancel(reason);
+    }
+  });
+
+  return new Response(stream, {
+    headers: {
+      ...corsHeaders,
+      'Content-Type': 'text/event-stream',
+      'Cache-Control': 'no-cache',
+      'Connection': 'keep-alive'
+    }
+  });
+}
@@ -4,7 +4,7 @@ import { createClient } from "npm:@supabase/supabase-js@2";
 const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
   "Access-Control-Allow-Methods": "GET, POST, OPTIONS",
-  "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Client-Info, Apikey",
+  "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Client-Info, Apikey, Traceparent",
 };
 
 Deno.serve(async (req: Request) => {
@@ -21,14 +21,23 @@ Deno.serve(async (req: Request) => {
 
     const supabase = createClient(supabaseUrl, supabaseServiceKey);
 
-    const { data: closedSessions, error } = await supabase.rpc(
-      "close_sessions_at_midnight"
-    );
+    // Closing sessions and summarizing them runs on the job queue in small
+    // batches (rollover_sessions_batch); this endpoint only enqueues.
+    // One job per 30-minute slot, so repeated cron fires are no-ops.
+    const now = new Date();
+    const slot = new Date(now);
+    slot.setUTCMinutes(now.getUTCMinutes() < 30 ? 0 : 30, 0, 0);
+
+    const { data: jobId, error } = await supabase.rpc("enqueue_job", {
+      p_kind: "midnight_rollover",
+      p_payload: {},
+      p_idempotency_key: `rollover:${slot.toISOString().slice(0, 16)}`,
+    });
 
     if (error) {
-      console.error("Failed to close sessions:", error);
+      console.error("Failed to enqueue midnight rollover:", error);
       return new Response(
-        JSON.stringify({ error: "Failed to close sessions", details: error.message }),
+        JSON.stringify({ error: "Failed to enqueue rollover", details: error.message }),
         {
           status: 500,
           headers: { ...corsHeaders, "Content-Type": "application/json" },
@@ -36,17 +45,16 @@ Deno.serve(async (req: Request) => {
       );
     }
 
-    const sessionCount = closedSessions?.length || 0;
-    console.log(`Closed ${sessionCount} sessions at midnight`);
+    console.log(`Enqueued midnight rollover job ${jobId}`);
 
     return new Response(
       JSON.stringify({
         success: true,
-        closed_sessions: sessionCount,
-        sessions: closedSessions,
+        queued: true,
+        job_id: jobId,
       }),
       {
-        status: 200,
+        status: 202,
         headers: { ...corsHeaders, "Content-Type": "application/json" },
       }
     );
@@ -4,7 +4,7 @@ import { createClient } from "npm:@supabase/supabase-js@2";
 const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
   "Access-Control-Allow-Methods": "POST, OPTIONS",
-  "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Client-Info, Apikey",
+  "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Client-Info, Apikey, Traceparent",
 };
 
 interface RequestBody {
@@ -22,7 +22,6 @@ Deno.serve(async (req: Request) => {
   try {
     const supabaseUrl = Deno.env.get("SUPABASE_URL")!;
     const supabaseServiceKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY")!;
-    const openaiApiKey = Deno.env.get("OPENAI_API_KEY");
 
     const supabase = createClient(supabaseUrl, supabaseServiceKey);
 
@@ -48,7 +47,7 @@ Deno.serve(async (req: Request) => {
 
     const { data: session, error: sessionError } = await supabase
       .from("chat_sessions")
-      .select("*")
+      .select("id")
       .eq("id", session_id)
       .eq("user_id", user.id)
       .single();
@@ -60,102 +59,30 @@ Deno.serve(async (req: Request) => {
       );
     }
 
-    const { data: messages, error: messagesError } = await supabase
-      .from("chat_messages")
-      .select("*")
-      .eq("session_id", session_id)
-      .order("timestamp", { ascending: true });
+    // Summarization (and memory extraction from its facts) runs on the job
+    // worker; the idempotency key makes repeated requests return the same job.
+    const { data: jobId, error: enqueueError } = await supabase.rpc("enqueue_job", {
+      p_kind: "summarize_session",
+      p_payload: { session_id, user_id: user.id },
+      p_idempotency_key: `summarize:${session_id}`,
+    });
 
-    if (messagesError) {
+    if (enqueueError) {
+      console.error("Failed to enqueue summary:", enqueueError);
       return new Response(
-        JSON.stringify({ error: "Failed to fetch messages" }),
+        JSON.stringify({ error: "Failed to enqueue summary" }),
         { status: 500, headers: { ...corsHeaders, "Content-Type": "application/json" } }
       );
     }
 
-    if (!messages || messages.length === 0) {
-      return new Response(
-        JSON.stringify({ 
-          summary: "No messages in session",
-          facts: {},
-          message_count: 0
-        }),
-        { status: 200, headers: { ...corsHeaders, "Content-Type": "application/json" } }
-      );
-    }
-
-    const conversationText = messages
-      .map((msg: any) => `${msg.sender === 'user' ? 'User' : 'Pat'}: ${msg.text}`)
-      .join("\n");
-
-    let summary = "Session completed";
-    let facts = {};
-
-    if (openaiApiKey && conversationText.length > 50) {
-      try {
-        const systemPrompt = `You are analyzing a conversation between a user and Pat (AI fitness coach). Extract:
-1. A brief summary of the conversation (1-2 sentences)
-2. Key facts as JSON: goals, dietary_constraints, injuries, preferences, tone_preference
-
-Return ONLY valid JSON with keys: summary (string), facts (object)`;
-
-        const response = await fetch("https://api.openai.com/v1/chat/completions", {
-          method: "POST",
-          headers: {
-            "Content-Type": "application/json",
-            "Authorization": `Bearer ${openaiApiKey}`,
-          },
-          body: JSON.stringify({
-            model: "gpt-4o-mini",
-            messages: [
-              { role: "system", content: systemPrompt },
-              { role: "user", content: conversationText },
-            ],
-            temperature: 0.3,
-            max_tokens: 500,
-          }),
-        });
-
-        if (response.ok) {
-          const data = await response.json();
-          const content = data.choices[0].message.content.trim();
-          
-          try {
-            const parsed = JSON.parse(content);
-            summary = parsed.summary || summary;
-            facts = parsed.facts || {};
-          } catch (parseError) {
-            console.warn("Failed to parse OpenAI response as JSON:", content);
-          }
-        }
-      } catch (aiError) {
-        console.warn("OpenAI summarization failed, using fallback:", aiError);
-      }
-    }
-
-    const { error: summaryError } = await supabase
-      .from("chat_summaries")
-      .insert({
-        session_id: session_id,
-        user_id: user.id,
-        summary: summary,
-        facts: facts,
-        message_count: messages.length,
-      });
-
-    if (summaryError) {
-      console.error("Failed to save summary:", summaryError);
-    }
-
     return new Response(
       JSON.stringify({
         success: true,
-        summary,
-        facts,
-        message_count: messages.length,
+        queued: true,
+        job_id: jobId,
       }),
       {
-        status: 200,
+        status: 202,
         headers: { ...corsHeaders, "Content-Type": "application/json" },
       }
     );
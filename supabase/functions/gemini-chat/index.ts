@@ -1,10 +1,11 @@
 import { serve } from "https://deno.land/std@0.224.0/http/server.ts";
+import { geminiGenerateUrl } from "../_shared/upstreams.ts";
 
 const cors = {
   "Access-Control-Allow-Origin": "*",
   "Access-Control-Allow-Methods": "POST, OPTIONS",
   "Access-Control-Allow-Headers":
-    "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept",
+    "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept, traceparent",
   "Content-Type": "application/json",
 };
 
@@ -29,8 +30,7 @@ serve(async (req: Request) => {
     };
 
     const resp = await fetch(
-      "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent?key=" +
-        encodeURIComponent(GEMINI_API_KEY),
+      geminiGenerateUrl("gemini-2.5-flash", GEMINI_API_KEY),
       {
         method: "POST",
         headers: { "Content-Type": "application/json" },
@@ -0,0 +1,176 @@
+/**
+ * JOB HANDLERS
+ *
+ * One handler per background_jobs.kind. Handlers must be idempotent: a job
+ * can run more than once (retry after a partial failure, lease expiry).
+ * Throwing marks the attempt failed; the queue retries with backoff.
+ */
+
+import type { SupabaseClient } from 'npm:@supabase/supabase-js@2.53.0';
+import { OPENAI_CHAT_URL } from '../_shared/upstreams.ts';
+import { llmFetch } from '../_shared/llmFetch.ts';
+
+export interface Job {
+  id: number;
+  kind: string;
+  payload: Record<string, any>;
+  attempts: number;
+  max_attempts: number;
+}
+
+export interface JobContext {
+  supabase: SupabaseClient;
+  openaiApiKey?: string;
+}
+
+export type JobHandler = (job: Job, ctx: JobContext) => Promise<void>;
+
+const ROLLOVER_BATCH = 500;
+const ROLLOVER_MAX_BATCHES = 40;
+
+// ---------- summarize_session ----------
+
+const SUMMARY_PROMPT = `You are analyzing a conversation between a user and Pat (AI fitness coach). Extract:
+1. A brief summary of the conversation (1-2 sentences)
+2. Key facts as JSON: goals, dietary_constraints, injuries, preferences, tone_preference
+
+Return ONLY valid JSON with keys: summary (string), facts (object)`;
+
+async function summarizeSession(job: Job, { supabase, openaiApiKey }: JobContext): Promise<void> {
+  const { session_id, user_id } = job.payload;
+  if (!session_id || !user_id) throw new Error('summarize_session requires session_id and user_id');
+
+  // Idempotent: a summary already written by an earlier attempt wins
+  const { data: existing } = await supabase
+    .from('chat_summaries')
+    .select('id')
+    .eq('session_id', session_id)
+    .limit(1)
+    .maybeSingle();
+  if (existing) return;
+
+  const { data: messages, error: messagesError } = await supabase
+    .from('chat_messages')
+    .select('sender, text')
+    .eq('session_id', session_id)
+    .order('timestamp', { ascending: true });
+
+  if (messagesError) throw new Error(`Failed to fetch messages: ${messagesError.message}`);
+  if (!messages || messages.length === 0) return;
+
+  const conversationText = messages
+    .map((msg: any) => `${msg.sender === 'user' ? 'User' : 'Pat'}: ${msg.text}`)
+    .join('\n');
+
+  let summary = 'Session completed';
+  let facts: Record<string, unknown> = {};
+
+  if (openaiApiKey && conversationText.length > 50) {
+    // Background class: chat turns go first. A shed request throws, and the
+    // queue retries the job later instead of holding the worker.
+    const response = await llmFetch(OPENAI_CHAT_URL, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+        'Authorization': `Bearer ${openaiApiKey}`,
+      },
+      body: JSON.stringify({
+        model: 'gpt-4o-mini',
+        messages: [
+          { role: 'system', content: SUMMARY_PROMPT },
+          { role: 'user', content: conversationText },
+        ],
+        temperature: 0.3,
+        max_tokens: 500,
+      }),
+    }, { model: 'gpt-4o-mini', priority: 'background', deadlineMs: 15_000 });
+
+    // 429/5xx are worth retrying; the queue backs off
+    if (response.status === 429 || response.status >= 500) {
+      throw new Error(`OpenAI HTTP ${response.status}`);
+    }
+
+    if (response.ok) {
+      const data = await response.json();
+      const content = data.choices?.[0]?.message?.content?.trim() ?? '';
+      try {
+        const parsed = JSON.parse(content);
+        summary = parsed.summary || summary;
+        facts = parsed.facts || {};
+      } catch {
+        console.warn('[job-worker] summary was not valid JSON:', content.slice(0, 200));
+      }
+    }
+  }
+
+  const { error: summaryError } = await supabase
+    .from('chat_summaries')
+    .insert({ session_id, user_id, summary, facts, message_count: messages.length });
+
+  if (summaryError) throw new Error(`Failed to save summary: ${summaryError.message}`);
+
+  if (Object.keys(facts).length > 0) {
+    const { error } = await supabase.rpc('enqueue_job', {
+      p_kind: 'extract_memories',
+      p_payload: { session_id, user_id, facts },
+      p_idempotency_key: `memories:${session_id}`,
+    });
+    if (error) console.warn('[job-worker] failed to enqueue memory extraction:', error.message);
+  }
+}
+
+// ---------- extract_memories ----------
+
+async function extractMemories(job: Job, { supabase }: JobContext): Promise<void> {
+  const { user_id, facts } = job.payload;
+  if (!user_id || !facts || typeof facts !== 'object') return;
+
+  for (const [name, value] of Object.entries(facts as Record<string, unknown>)) {
+    if (value === null || value === undefined || value === '' || (Array.isArray(value) && value.length === 0)) {
+      continue;
+    }
+    // resolve_memory_conflict keeps explicit memories over inferred ones, so re-runs are safe
+    const { error } = await supabase.rpc('resolve_memory_conflict', {
+      p_user_id: user_id,
+      p_key: `fact.${name}`,
+      p_new_value: value,
+      p_source: 'inferred',
+      p_confidence: 0.7,
+    });
+    if (error) throw new Error(`resolve_memory_conflict(${name}) failed: ${error.message}`);
+  }
+}
+
+// ---------- midnight_rollover ----------
+
+async function midnightRollover(_job: Job, { supabase }: JobContext): Promise<void> {
+  let total = 0;
+  for (let i = 0; i < ROLLOVER_MAX_BATCHES; i++) {
+    const { data, error } = await supabase.rpc('rollover_sessions_batch', { p_limit: ROLLOVER_BATCH });
+    if (error) throw new Error(`rollover_sessions_batch failed: ${error.message}`);
+    const closed = Number(data) || 0;
+    total += closed;
+    if (closed < ROLLOVER_BATCH) break;
+  }
+  console.log(`[job-worker] midnight rollover closed ${total} sessions`);
+}
+
+// ---------- maintenance ----------
+
+async function rollupTelemetry(job: Job, { supabase }: JobContext): Promise<void> {
+  const { error } = await supabase.rpc('rollup_telemetry', { p_hours: Number(job.payload.hours) || 2 });
+  if (error) throw new Error(`rollup_telemetry failed: ${error.message}`);
+}
+
+async function compactMemories(_job: Job, { supabase }: JobContext): Promise<void> {
+  const { error } = await supabase.rpc('compact_expired_memories', {});
+  if (error) throw new Error(`compact_expired_memories failed: ${error.message}`);
+}
+
+export const HANDLERS: Record<string, JobHandler> = {
+  summarize_session: summarizeSession,
+  extract_memories: extractMemories,
+  midnight_rollover: midnightRollover,
+  rollup_telemetry: rollupTelemetry,
+  compact_memories: compactMemories,
+};
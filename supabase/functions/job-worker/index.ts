@@ -0,0 +1,130 @@
+import "jsr:@supabase/functions-js/edge-runtime.d.ts";
+import { createClient } from "npm:@supabase/supabase-js@2.53.0";
+import { HANDLERS, type Job } from "./handlers.ts";
+
+/**
+ * JOB WORKER
+ *
+ * Drains public.background_jobs (see migration 20251107030000). Invoke every
+ * minute from a scheduler with the service role key:
+ *
+ *   curl -X POST $SUPABASE_URL/functions/v1/job-worker \
+ *     -H "Authorization: Bearer $SUPABASE_SERVICE_ROLE_KEY"
+ *
+ * Each run claims jobs in batches (claim_jobs respects per-kind concurrency),
+ * runs at most JOB_WORKER_CONCURRENCY at once, completes successes with one
+ * RPC per batch and reports failures for backoff. It stops claiming when the
+ * time budget is spent or the queue is empty.
+ */
+
+const corsHeaders = {
+  "Access-Control-Allow-Origin": "*",
+  "Access-Control-Allow-Methods": "POST, OPTIONS",
+  "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Client-Info, Apikey, Traceparent",
+};
+
+const TIME_BUDGET_MS = Number(Deno.env.get("JOB_WORKER_BUDGET_MS") ?? 50_000);
+const CONCURRENCY = Math.max(1, Number(Deno.env.get("JOB_WORKER_CONCURRENCY") ?? 4));
+const JOB_TIMEOUT_MS = Number(Deno.env.get("JOB_WORKER_JOB_TIMEOUT_MS") ?? 60_000);
+const CLAIM_LIMIT = 20;
+
+function json(body: unknown, status: number) {
+  return new Response(JSON.stringify(body), {
+    status,
+    headers: { ...corsHeaders, "Content-Type": "application/json" },
+  });
+}
+
+function withTimeout<T>(promise: Promise<T>, ms: number): Promise<T> {
+  let timer: number | undefined;
+  const timeout = new Promise<never>((_, reject) => {
+    timer = setTimeout(() => reject(new Error(`job timed out after ${ms}ms`)), ms);
+  });
+  return Promise.race([promise, timeout]).finally(() => clearTimeout(timer));
+}
+
+/**
+ * Run fn over items with at most `limit` in flight
+ */
+async function runPool<T>(items: T[], limit: number, fn: (item: T) => Promise<void>): Promise<void> {
+  let next = 0;
+  const lanes = Array.from({ length: Math.min(limit, items.length) }, async () => {
+    while (next < items.length) {
+      const item = items[next++];
+      await fn(item);
+    }
+  });
+  await Promise.all(lanes);
+}
+
+Deno.serve(async (req: Request) => {
+  if (req.method === "OPTIONS") {
+    return new Response(null, { status: 200, headers: corsHeaders });
+  }
+
+  const supabaseUrl = Deno.env.get("SUPABASE_URL")!;
+  const supabaseServiceKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY")!;
+
+  const token = req.headers.get("Authorization")?.replace("Bearer ", "");
+  if (!token || token !== supabaseServiceKey) {
+    return json({ error: "Unauthorized" }, 401);
+  }
+
+  const supabase = createClient(supabaseUrl, supabaseServiceKey);
+  const ctx = { supabase, openaiApiKey: Deno.env.get("OPENAI_API_KEY") };
+  const workerId = `job-worker:${crypto.randomUUID().slice(0, 8)}`;
+  const kinds: string[] | null = (await req.json().catch(() => null))?.kinds ?? null;
+
+  const started = Date.now();
+  const stats = { claimed: 0, succeeded: 0, failed: 0, dead: 0 };
+
+  try {
+    while (Date.now() - started < TIME_BUDGET_MS) {
+      const { data: jobs, error } = await supabase.rpc("claim_jobs", {
+        p_worker: workerId,
+        p_kinds: kinds,
+        p_limit: CLAIM_LIMIT,
+      });
+
+      if (error) {
+        console.error("[job-worker] claim failed:", error);
+        return json({ error: "Failed to claim jobs", ...stats }, 500);
+      }
+      if (!jobs || jobs.length === 0) break;
+      stats.claimed += jobs.length;
+
+      const succeeded: number[] = [];
+
+      await runPool(jobs as Job[], CONCURRENCY, async (job) => {
+        const handler = HANDLERS[job.kind];
+        try {
+          if (!handler) throw new Error(`No handler for kind ${job.kind}`);
+          await withTimeout(handler(job, ctx), JOB_TIMEOUT_MS);
+          succeeded.push(job.id);
+        } catch (err) {
+          const message = err instanceof Error ? err.message : String(err);
+          console.warn(`[job-worker] ${job.kind}#${job.id} attempt ${job.attempts} failed:`, message);
+          const { data: status } = await supabase.rpc("fail_job", { p_id: job.id, p_error: message });
+          stats.failed++;
+          if (status === "dead") stats.dead++;
+        }
+      });
+
+      if (succeeded.length > 0) {
+        const { error: completeError } = await supabase.rpc("complete_jobs", { p_ids: succeeded });
+        if (completeError) {
+          // Jobs stay 'running' and are re-run after their lease; handlers are idempotent
+          console.error("[job-worker] complete_jobs failed:", completeError);
+        } else {
+          stats.succeeded += succeeded.length;
+        }
+      }
+    }
+
+    console.log("[job-worker] run complete", { ...stats, ms: Date.now() - started });
+    return json({ ok: true, ...stats }, 200);
+  } catch (error: any) {
+    console.error("[job-worker] error:", error);
+    return json({ error: error.message || "Internal server error", ...stats }, 500);
+  }
+});
@@ -1,8 +1,11 @@
 import "jsr:@supabase/functions-js/edge-runtime.d.ts";
+import { EdgeTracer } from '../_shared/tracing.ts';
+import { geminiGenerateUrl } from '../_shared/upstreams.ts';
+import { CircuitBreaker, fetchWithRetry, isRetryableStatus } from '../_shared/circuitBreaker.ts';
 
 const corsHeaders = {
   'Access-Control-Allow-Origin': '*',
-  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept',
+  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept, traceparent',
   'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
 };
 
@@ -19,6 +22,11 @@ type GeminiCandidate = {
 
 interface GeminiResponse {
   candidates?: GeminiCandidate[];
+  usageMetadata?: {
+    promptTokenCount?: number;
+    candidatesTokenCount?: number;
+    cachedContentTokenCount?: number;
+  };
 }
 
 interface GeminiPayload {
@@ -65,55 +73,20 @@ function extractJSONFromText(text: string): string | null {
   return null;
 }
 
-Deno.serve(async (req: Request) => {
-  console.log('[nutrition-gemini] START', { method: req.method });
-  
-  if (req.method === 'OPTIONS') {
-    return new Response(null, {
-      status: 200,
-      headers: corsHeaders
-    });
-  }
+/** Most foods resolved by one batched Gemini call */
+const BATCH_MAX = 25;
 
-  // Health check endpoint
-  if (req.url.includes('?health=1')) {
-    return new Response(JSON.stringify({ status: 'ok', service: 'nutrition-gemini' }), {
-      status: 200,
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' }
-    });
-  }
+// One breaker per isolate: after repeated 429/5xx, fail fast (503) and let
+// a single probe through every openMs until Gemini recovers
+const breaker = new CircuitBreaker({ failureThreshold: 4, openMs: 30_000 });
 
-  try {
-    let body: any = {};
-    try {
-      body = await req.json();
-    } catch {
-      return new Response(JSON.stringify({ error: 'JSON body required' }), { status: 400, headers: { ...corsHeaders, 'Content-Type': 'application/json' } });
-    }
-    
-    const foodName: string = body?.foodName;
-    const canonicalName: string | undefined = body?.canonicalName;
-    console.log('[nutrition-gemini] BODY', { foodName, canonicalName });
+const jsonHeaders = { ...corsHeaders, 'Content-Type': 'application/json' };
 
-    if (!foodName || typeof foodName !== 'string') {
-      return new Response(JSON.stringify({ error: 'foodName is required' }), { status: 400, headers: { ...corsHeaders, 'Content-Type': 'application/json' } });
-    }
+const ENTRY_RULES = `If the food is a branded or restaurant item (e.g., McDonald's, Starbucks, Chick-fil-A, etc.), return the nutrition facts **per serving as sold**. Include the real serving weight in grams.
 
-    const geminiApiKey = (Deno.env.get('GEMINI_API_KEY') ?? Deno.env.get('GOOGLE_GENAI_API_KEY'))?.trim();
-    if (!geminiApiKey) {
-      console.error('[nutrition-gemini] NO_API_KEY');
-      return new Response(JSON.stringify({ error: 'Missing Gemini API key' }), { status: 400, headers: { ...corsHeaders, 'Content-Type': 'application/json' } });
-    }
-    
-    console.log('[nutrition-gemini] CALL_GEMINI', { foodName });
-
-    const prompt = `You are a nutrition database. Respond ONLY with valid JSON. No commentary.
-
-If the food is a branded or restaurant item (e.g., McDonald's, Starbucks, Chick-fil-A, etc.), return the nutrition facts **per serving as sold**. Include the real serving weight in grams.
+If the food is a generic ingredient, return cooked values per 100 g.`;
 
-If the food is a generic ingredient, return cooked values per 100 g.
-
-JSON keys: {
+const ENTRY_KEYS = `{
   "name": string,
   "brand": string | null,
   "serving_label": string,
@@ -127,124 +100,329 @@ JSON keys: {
   },
   "confidence": number (0-1),
   "source": string (data source used)
+}`;
+
+/**
+ * Instructions go in systemInstruction and only the food line in contents,
+ * so the instruction tokens are a fixed prefix Gemini's implicit cache can
+ * reuse across lookups.
+ */
+interface GeminiPrompt {
+  system: string;
+  user: string;
 }
 
-If you cannot find reliable data, return {"error":"unconfident"}.
+const SINGLE_INSTRUCTIONS = `You are a nutrition database. Respond ONLY with valid JSON. No commentary.
 
-Food: ${foodName}`;
+${ENTRY_RULES}
 
-    const modelId = Deno.env.get('GEMINI_MODEL') ?? 'gemini-2.5-flash';
-    console.info('[nutrition-gemini] model', modelId);
-    
-    // Wrap Gemini call in try/catch for upstream errors with fallback retry
-    let response: Response;
-    let responseBody: string;
-    let modelToUse = modelId;
-    
-    const makeGeminiRequest = async (model: string): Promise<Response> => {
-      return await fetch(`https://generativelanguage.googleapis.com/v1beta/models/${model}:generateContent?key=${geminiApiKey}`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
+JSON keys: ${ENTRY_KEYS}
+
+If you cannot find reliable data, return {"error":"unconfident"}.`;
+
+const BATCH_INSTRUCTIONS = `You are a nutrition database. Respond ONLY with valid JSON. No commentary.
+
+${ENTRY_RULES}
+
+Return {"items": [...]} with exactly one entry per food, in the same order as the list in the request. Each entry echoes the food string as "query" and has these keys:
+${ENTRY_KEYS}
+
+For a food without reliable data, put {"query": <food>, "error": "unconfident"} in its slot.`;
+
+function singlePrompt(foodName: string): GeminiPrompt {
+  return { system: SINGLE_INSTRUCTIONS, user: `Food: ${foodName}` };
+}
+
+function batchPrompt(foods: string[]): GeminiPrompt {
+  return { system: BATCH_INSTRUCTIONS, user: `Foods (JSON array): ${JSON.stringify(foods)}` };
+}
+
+const MACROS_SCHEMA = {
+  type: 'OBJECT',
+  properties: {
+    kcal: { type: 'NUMBER' },
+    protein_g: { type: 'NUMBER' },
+    carbs_g: { type: 'NUMBER' },
+    fat_g: { type: 'NUMBER' },
+    fiber_g: { type: 'NUMBER' }
+  }
+};
+
+/** Structured output for batch mode so every slot parses */
+const BATCH_SCHEMA = {
+  type: 'OBJECT',
+  properties: {
+    items: {
+      type: 'ARRAY',
+      items: {
+        type: 'OBJECT',
+        properties: {
+          query: { type: 'STRING' },
+          name: { type: 'STRING' },
+          brand: { type: 'STRING', nullable: true },
+          serving_label: { type: 'STRING' },
+          grams_per_serving: { type: 'NUMBER' },
+          macros: MACROS_SCHEMA,
+          confidence: { type: 'NUMBER' },
+          source: { type: 'STRING' },
+          error: { type: 'STRING' }
         },
-        body: JSON.stringify({
-          contents: [
-            {
-              role: 'user',
-              parts: [{ text: prompt }],
-            },
-          ],
-          generationConfig: {
-            temperature: 0.2,
-            topP: 0.8,
-            maxOutputTokens: 800,
-            responseMimeType: 'application/json',
-          },
-        }),
-      });
-    };
-    
-    try {
-      response = await makeGeminiRequest(modelToUse);
-      responseBody = await response.text();
-      console.log('[nutrition-gemini] provider body:', safeTruncate(responseBody, 1200));
-
-      // ✅ Check for model not found errors and retry with fallback
-      if (!response.ok && (response.status === 404 || responseBody.includes('NOT_FOUND') || responseBody.includes('MODEL_NOT_FOUND'))) {
-        if (modelToUse !== 'gemini-2.5-flash') {
-          console.warn('[nutrition-gemini] fallback to gemini-2.5-flash');
-          modelToUse = 'gemini-2.5-flash';
-          response = await makeGeminiRequest(modelToUse);
-          responseBody = await response.text();
-          console.log('[nutrition-gemini] fallback response body:', safeTruncate(responseBody, 1200));
-        }
+        required: ['query']
       }
+    }
+  },
+  required: ['items']
+};
 
-      if (!response.ok) {
-        console.error('[nutrition-gemini] GEMINI_ERROR_TEXT', safeTruncate(responseBody, 500));
-        return new Response(
-          JSON.stringify({
-            error: 'Upstream error',
-            providerStatus: response.status,
-            providerBody: safeTruncate(responseBody, 500)
-          }),
-          { status: 502, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-        );
+type GeminiCall =
+  | { ok: true; text: string; model: string }
+  | { ok: false; response: Response };
+
+/**
+ * One Gemini generateContent call through the breaker, with jittered
+ * retries on 429/5xx and the model-not-found fallback to gemini-2.5-flash
+ */
+async function callGemini(
+  tracer: EdgeTracer,
+  apiKey: string,
+  prompt: GeminiPrompt,
+  maxOutputTokens: number,
+  responseSchema?: unknown
+): Promise<GeminiCall> {
+  if (!breaker.allow()) {
+    const { retryAfterMs } = breaker.snapshot();
+    console.warn('[nutrition-gemini] CIRCUIT_OPEN', { retryAfterMs });
+    return {
+      ok: false,
+      response: new Response(
+        JSON.stringify({ error: 'Gemini temporarily unavailable', retryAfterMs }),
+        { status: 503, headers: { ...jsonHeaders, 'Retry-After': String(Math.ceil(retryAfterMs / 1000)) } }
+      )
+    };
+  }
+
+  const modelId = Deno.env.get('GEMINI_MODEL') ?? 'gemini-2.5-flash';
+  console.info('[nutrition-gemini] model', modelId);
+
+  const makeGeminiRequest = (model: string): Promise<Response> =>
+    fetchWithRetry(() => tracer.fetch(`gemini ${model}`, geminiGenerateUrl(model, apiKey), {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({
+        systemInstruction: {
+          parts: [{ text: prompt.system }],
+        },
+        contents: [
+          {
+            role: 'user',
+            parts: [{ text: prompt.user }],
+          },
+        ],
+        generationConfig: {
+          temperature: 0.2,
+          topP: 0.8,
+          maxOutputTokens,
+          responseMimeType: 'application/json',
+          ...(responseSchema ? { responseSchema } : {}),
+        },
+      }),
+    }));
+
+  let response: Response;
+  let responseBody: string;
+  let modelToUse = modelId;
+
+  try {
+    response = await makeGeminiRequest(modelToUse);
+    responseBody = await response.text();
+    console.log('[nutrition-gemini] provider body:', safeTruncate(responseBody, 1200));
+
+    // ✅ Check for model not found errors and retry with fallback
+    if (!response.ok && (response.status === 404 || responseBody.includes('NOT_FOUND') || responseBody.includes('MODEL_NOT_FOUND'))) {
+      if (modelToUse !== 'gemini-2.5-flash') {
+        console.warn('[nutrition-gemini] fallback to gemini-2.5-flash');
+        modelToUse = 'gemini-2.5-flash';
+        response = await makeGeminiRequest(modelToUse);
+        responseBody = await response.text();
+        console.log('[nutrition-gemini] fallback response body:', safeTruncate(responseBody, 1200));
       }
-    } catch (err) {
-      console.error('[nutrition-gemini] FETCH_EXCEPTION', err);
-      return new Response(
+    }
+  } catch (err) {
+    breaker.failure();
+    console.error('[nutrition-gemini] FETCH_EXCEPTION', err);
+    return {
+      ok: false,
+      response: new Response(
         JSON.stringify({
           error: 'Network error',
           details: err instanceof Error ? err.message : String(err)
         }),
-        { status: 502, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-      );
-    }
+        { status: 502, headers: jsonHeaders }
+      )
+    };
+  }
 
-    // Parse Gemini response
-    let geminiData: GeminiResponse;
-    try {
-      geminiData = JSON.parse(responseBody) as GeminiResponse;
-    } catch (err) {
-      console.error('[nutrition-gemini] RESPONSE_PARSE_ERROR', err);
-      return new Response(
+  if (!response.ok) {
+    // Only overload / outage counts against the breaker, not bad requests
+    if (isRetryableStatus(response.status)) breaker.failure();
+    else breaker.success();
+    console.error('[nutrition-gemini] GEMINI_ERROR_TEXT', safeTruncate(responseBody, 500));
+    return {
+      ok: false,
+      response: new Response(
+        JSON.stringify({
+          error: 'Upstream error',
+          providerStatus: response.status,
+          providerBody: safeTruncate(responseBody, 500)
+        }),
+        { status: 502, headers: jsonHeaders }
+      )
+    };
+  }
+  breaker.success();
+
+  // Parse Gemini response
+  let geminiData: GeminiResponse;
+  try {
+    geminiData = JSON.parse(responseBody) as GeminiResponse;
+  } catch (err) {
+    console.error('[nutrition-gemini] RESPONSE_PARSE_ERROR', err);
+    return {
+      ok: false,
+      response: new Response(
         JSON.stringify({
           error: 'Invalid response format from Gemini',
           raw: safeTruncate(responseBody, 400)
         }),
-        { status: 200, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-      );
-    }
+        { status: 200, headers: jsonHeaders }
+      )
+    };
+  }
 
-    // Extract text from all parts (Gemini 2.x may have multiple parts)
-    const candidate = geminiData?.candidates?.[0];
-    if (!candidate?.content?.parts || candidate.content.parts.length === 0) {
-      console.error('[nutrition-gemini] NO_CANDIDATES');
-      return new Response(
+  const usage = geminiData?.usageMetadata;
+  tracer.setAttributes({
+    'llm.tokens_in': usage?.promptTokenCount,
+    'llm.tokens_out': usage?.candidatesTokenCount,
+    'llm.tokens_cached': usage?.cachedContentTokenCount ?? 0
+  });
+
+  // Extract text from all parts (Gemini 2.x may have multiple parts)
+  const fullText = (geminiData?.candidates?.[0]?.content?.parts ?? [])
+    .map(part => part.text || '')
+    .join('')
+    .trim();
+
+  console.log('[nutrition-gemini] parsed text:', safeTruncate(fullText, 600));
+
+  if (!fullText) {
+    console.error('[nutrition-gemini] EMPTY_TEXT');
+    return {
+      ok: false,
+      response: new Response(
         JSON.stringify({ error: 'Empty response from Gemini' }),
-        { status: 200, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-      );
+        { status: 200, headers: jsonHeaders }
+      )
+    };
+  }
+
+  return { ok: true, text: fullText, model: modelToUse };
+}
+
+/**
+ * Validate and coerce one entry; null when it is not a usable result
+ */
+function cleanPayload(payload: any, fallbackName: string): GeminiPayload | null {
+  if (!payload?.name || !payload?.macros) return null;
+
+  // Coerce and validate macros (numbers only)
+  const macros = {
+    kcal: Number(payload.macros.kcal) || 0,
+    protein_g: Number(payload.macros.protein_g) || 0,
+    carbs_g: Number(payload.macros.carbs_g) || 0,
+    fat_g: Number(payload.macros.fat_g) || 0,
+    fiber_g: Number(payload.macros.fiber_g) || 0,
+  };
+
+  return {
+    name: payload.name ?? fallbackName,
+    brand: payload.brand ?? null,
+    serving_label: payload.serving_label ?? 'serving',
+    grams_per_serving: typeof payload.grams_per_serving === 'number' ? payload.grams_per_serving : 100,
+    macros,
+    confidence: typeof payload.confidence === 'number' ? payload.confidence : 0.85,
+    source: payload.source ?? 'gemini'
+  };
+}
+
+Deno.serve(async (req: Request) => {
+  console.log('[nutrition-gemini] START', { method: req.method });
+  
+  if (req.method === 'OPTIONS') {
+    return new Response(null, {
+      status: 200,
+      headers: corsHeaders
+    });
+  }
+
+  // Health check endpoint: the client cascade skips Gemini while it is not 'ok'.
+  // The breaker is per isolate, so this is only the answering isolate's view.
+  if (new URL(req.url).searchParams.get('health') === '1') {
+    const snapshot = breaker.snapshot();
+    const status = snapshot.state === 'closed' ? 'ok' : snapshot.state === 'half-open' ? 'degraded' : 'unavailable';
+    return new Response(JSON.stringify({ status, service: 'nutrition-gemini', breaker: snapshot, batchMax: BATCH_MAX }), {
+      status: 200,
+      headers: { ...jsonHeaders, 'Cache-Control': 'no-store' }
+    });
+  }
+
+  const tracer = new EdgeTracer('nutrition-gemini', req);
+  const response = await handleLookup(req, tracer);
+  tracer.end(response.ok ? 'ok' : 'error', response.ok ? undefined : `HTTP ${response.status}`);
+  return response;
+});
+
+async function handleLookup(req: Request, tracer: EdgeTracer): Promise<Response> {
+  try {
+    let body: any = {};
+    try {
+      body = await req.json();
+    } catch {
+      return new Response(JSON.stringify({ error: 'JSON body required' }), { status: 400, headers: jsonHeaders });
     }
 
-    const fullText = candidate.content.parts
-      .map(part => part.text || '')
-      .join('')
-      .trim();
+    const geminiApiKey = (Deno.env.get('GEMINI_API_KEY') ?? Deno.env.get('GOOGLE_GENAI_API_KEY'))?.trim();
 
-    console.log('[nutrition-gemini] parsed text:', safeTruncate(fullText, 600));
+    if (Array.isArray(body?.foods)) {
+      if (!geminiApiKey) {
+        console.error('[nutrition-gemini] NO_API_KEY');
+        return new Response(JSON.stringify({ error: 'Missing Gemini API key' }), { status: 400, headers: jsonHeaders });
+      }
+      return await handleBatch(body.foods, tracer, geminiApiKey);
+    }
 
-    if (!fullText) {
-      console.error('[nutrition-gemini] EMPTY_TEXT');
-      return new Response(
-        JSON.stringify({ error: 'Empty response from Gemini' }),
-        { status: 200, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
-      );
+    const foodName: string = body?.foodName;
+    const canonicalName: string | undefined = body?.canonicalName;
+    console.log('[nutrition-gemini] BODY', { foodName, canonicalName });
+
+    if (!foodName || typeof foodName !== 'string') {
+      return new Response(JSON.stringify({ error: 'foodName is required' }), { status: 400, headers: jsonHeaders });
     }
 
+    if (!geminiApiKey) {
+      console.error('[nutrition-gemini] NO_API_KEY');
+      return new Response(JSON.stringify({ error: 'Missing Gemini API key' }), { status: 400, headers: jsonHeaders });
+    }
+    
+    console.log('[nutrition-gemini] CALL_GEMINI', { foodName });
+
+    const call = await callGemini(tracer, geminiApiKey, singlePrompt(foodName), 800);
+    if (!call.ok) return call.response;
+
     // Extract JSON robustly
-    let jsonText = fullText;
-    const extracted = extractJSONFromText(fullText);
+    let jsonText = call.text;
+    const extracted = extractJSONFromText(call.text);
     if (extracted) {
       jsonText = extracted;
     }
@@ -263,7 +441,7 @@ Food: ${foodName}`;
           raw: safeTruncate(jsonText, 800),
           parseError: err instanceof Error ? err.message : String(err)
         }),
-        { status: 200, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+        { status: 200, headers: jsonHeaders }
       );
     }
 
@@ -271,45 +449,27 @@ Food: ${foodName}`;
     if ('error' in payload && payload.error === 'unconfident') {
       return new Response(
         JSON.stringify({ error: 'unconfident' }),
-        { status: 200, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+        { status: 200, headers: jsonHeaders }
       );
     }
 
     // Validate payload shape
-    if (!payload.name || !payload.macros) {
+    const cleaned = cleanPayload(payload, canonicalName || foodName);
+    if (!cleaned) {
       console.error('[nutrition-gemini] INVALID_SHAPE', payload);
       return new Response(
         JSON.stringify({
           error: 'Invalid response format from Gemini',
           raw: safeTruncate(JSON.stringify(payload), 400)
         }),
-        { status: 200, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
+        { status: 200, headers: jsonHeaders }
       );
     }
 
-    // Coerce and validate macros (numbers only)
-    const macros = {
-      kcal: Number(payload.macros.kcal) || 0,
-      protein_g: Number(payload.macros.protein_g) || 0,
-      carbs_g: Number(payload.macros.carbs_g) || 0,
-      fat_g: Number(payload.macros.fat_g) || 0,
-      fiber_g: Number(payload.macros.fiber_g) || 0,
-    };
-
-    const cleaned: GeminiPayload = {
-      name: payload.name ?? (canonicalName || foodName),
-      brand: payload.brand ?? null,
-      serving_label: payload.serving_label ?? 'serving',
-      grams_per_serving: typeof payload.grams_per_serving === 'number' ? payload.grams_per_serving : 100,
-      macros,
-      confidence: typeof payload.confidence === 'number' ? payload.confidence : 0.85,
-      source: payload.source ?? 'gemini'
-    };
-
     console.log('[nutrition-gemini] FINAL_RESULT', { name: cleaned.name, kcal: cleaned.macros.kcal });
     return new Response(JSON.stringify(cleaned), {
       status: 200,
-      headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+      headers: jsonHeaders,
     });
   } catch (err) {
     console.error('[nutrition-gemini] EXCEPTION', err);
@@ -322,6 +482,59 @@ Food: ${foodName}`;
     return new Response(JSON.stringify({ 
       error: 'Unexpected error',
       details: err instanceof Error ? err.message : String(err)
-    }), { status: 500, headers: { ...corsHeaders, 'Content-Type': 'application/json' } });
+    }), { status: 500, headers: jsonHeaders });
   }
-});
+}
+
+/**
+ * Batch mode: { foods: [{ foodName, canonicalName? }] } → { results: [...] }
+ * One structured Gemini call for up to BATCH_MAX foods. results[i] is the
+ * single-mode payload for foods[i], or { error } for that slot alone.
+ */
+async function handleBatch(foods: any[], tracer: EdgeTracer, geminiApiKey: string): Promise<Response> {
+  const queries = foods.map((f) => String(f?.canonicalName || f?.foodName || '').trim());
+  if (queries.length === 0 || queries.length > BATCH_MAX || queries.some((q) => !q)) {
+    return new Response(
+      JSON.stringify({ error: `foods must be 1-${BATCH_MAX} entries with a foodName` }),
+      { status: 400, headers: jsonHeaders }
+    );
+  }
+  console.log('[nutrition-gemini] CALL_GEMINI_BATCH', { count: queries.length });
+  tracer.setAttributes({ 'nutrition.batch_size': queries.length });
+
+  // ~250 output tokens per entry, plus the envelope
+  const maxOutputTokens = Math.min(8192, 256 * queries.length + 256);
+  const call = await callGemini(tracer, geminiApiKey, batchPrompt(queries), maxOutputTokens, BATCH_SCHEMA);
+  if (!call.ok) return call.response;
+
+  let entries: any[];
+  try {
+    entries = JSON.parse(extractJSONFromText(call.text) ?? call.text)?.items;
+    if (!Array.isArray(entries)) throw new Error('items missing');
+  } catch (err) {
+    console.error('[nutrition-gemini] BATCH_PARSE_ERROR', err, 'text:', safeTruncate(call.text, 800));
+    return new Response(
+      JSON.stringify({ error: 'Invalid response format from Gemini', raw: safeTruncate(call.text, 800) }),
+      { status: 200, headers: jsonHeaders }
+    );
+  }
+
+  // Match by echoed query first, position second
+  const byQuery = new Map<string, any>();
+  for (const entry of entries) {
+    if (typeof entry?.query === 'string') byQuery.set(entry.query.trim().toLowerCase(), entry);
+  }
+
+  const results = queries.map((query, i) => {
+    const entry = byQuery.get(query.toLowerCase()) ?? entries[i];
+    if (!entry) return { error: 'missing' };
+    if (entry.error) return { error: entry.error === 'unconfident' ? 'unconfident' : String(entry.error) };
+    return cleanPayload(entry, query) ?? { error: 'invalid' };
+  });
+
+  console.log('[nutrition-gemini] FINAL_BATCH', {
+    count: results.length,
+    resolved: results.filter((r) => !('error' in r)).length
+  });
+  return new Response(JSON.stringify({ results, model: call.model }), { status: 200, headers: jsonHeaders });
+}
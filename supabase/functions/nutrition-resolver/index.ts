@@ -1,8 +1,11 @@
 import { createClient } from 'npm:@supabase/supabase-js@2.53.0';
+import { EdgeTracer } from '../_shared/tracing.ts';
+import { OPENAI_CHAT_URL } from '../_shared/upstreams.ts';
+import { llmFetch, llmBusyResponse, SchedulerShedError } from '../_shared/llmFetch.ts';
 
 const corsHeaders = {
   'Access-Control-Allow-Origin': '*',
-  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type',
+  'Access-Control-Allow-Headers': 'authorization, x-client-info, apikey, content-type, traceparent',
   'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS',
 };
 
@@ -93,17 +96,21 @@ async function resolveSingleFood(
   foodName: string,
   supabase: any,
   openaiApiKey: string,
-  useCache: boolean = true
+  useCache: boolean = true,
+  tracer?: EdgeTracer
 ): Promise<MacroResponse> {
   const normalizedFood = foodName.trim().toLowerCase();
 
   // Step 1: Check cache
   if (useCache) {
-    const { data: cached, error: cacheError } = await supabase
+    const lookup = () => supabase
       .from('portion_defaults')
       .select('*')
       .eq('food_name', normalizedFood)
       .maybeSingle();
+    const { data: cached, error: cacheError } = tracer
+      ? await tracer.span('db portion_defaults', lookup, { 'food.name': normalizedFood })
+      : await lookup();
 
     if (cached && !cacheError) {
       console.log('[Nutrition Resolver] Cache HIT:', normalizedFood);
@@ -129,7 +136,8 @@ async function resolveSingleFood(
     ? `Return the actual nutrition facts for ${foodName.trim()} as served by the restaurant. Use real menu data. For example, a Big Mac is ~550kcal total, not per 100g. Respond as JSON with keys: kcal, protein_g, carbs_g, fat_g, fiber_g (dietary fiber in grams; use 0 if unavailable) for the ENTIRE item as served.`
     : `Return the nutrition facts per 100g for COOKED ${foodName.trim()}. Default to cooked unless explicitly stated as raw. For example, cooked chicken breast is ~165kcal/100g, cooked/boiled egg is ~155kcal/100g. Respond as JSON with keys: kcal, protein_g, carbs_g, fat_g, fiber_g (dietary fiber in grams; use 0 if unavailable or negligible). Use USDA database values for COOKED ingredients. If unsure, state your best guess based on USDA COOKED values. If you cannot provide a reasonable estimate, respond with a JSON object containing a single key 'error' with value 'unconfident'.`;
 
-  const openaiResponse = await fetch('https://api.openai.com/v1/chat/completions', {
+  const openaiUrl = OPENAI_CHAT_URL;
+  const openaiInit: RequestInit = {
     method: 'POST',
     headers: {
       'Authorization': `Bearer ${openaiApiKey}`,
@@ -150,6 +158,11 @@ async function resolveSingleFood(
       max_tokens: 200,
       temperature: 0.3,
     }),
+  };
+  const openaiResponse = await llmFetch(openaiUrl, openaiInit, {
+    model: 'gpt-4o',
+    priority: 'interactive',
+    fetch: tracer ? (url, init) => tracer.fetch('openai.nutrition', url, init) : undefined
   });
 
   if (!openaiResponse.ok) {
@@ -225,7 +238,8 @@ async function handleBatchRequest(
   items: Array<{ name: string; qty: number; unit: string; brand?: string; basis?: string }>,
   useCache: boolean,
   supabase: any,
-  openaiApiKey: string
+  openaiApiKey: string,
+  tracer?: EdgeTracer
 ): Promise<Response> {
   console.log('[Nutrition Resolver] Batch mode:', items.length, 'items');
 
@@ -234,7 +248,7 @@ async function handleBatchRequest(
   for (const item of items) {
     try {
       // Resolve per-100g macros for this food
-      const perUnitMacros = await resolveSingleFood(item.name, supabase, openaiApiKey, useCache);
+      const perUnitMacros = await resolveSingleFood(item.name, supabase, openaiApiKey, useCache, tracer);
 
       // Convert quantity to grams
       const gramsUsed = convertToGrams(item.qty, item.unit, item.name);
@@ -293,6 +307,8 @@ Deno.serve(async (req: Request) => {
     });
   }
 
+  const tracer = new EdgeTracer('nutrition-resolver', req);
+
   try {
     const { foodName, useCache = true, items }: NutritionRequest = await req.json();
 
@@ -310,7 +326,10 @@ Deno.serve(async (req: Request) => {
 
     // BATCH MODE: Handle multiple items
     if (items && Array.isArray(items) && items.length > 0) {
-      return await handleBatchRequest(items, useCache, supabase, openaiApiKey);
+      tracer.setAttributes({ 'nutrition.items': items.length });
+      const response = await handleBatchRequest(items, useCache, supabase, openaiApiKey, tracer);
+      tracer.end();
+      return response;
     }
 
     // SINGLE MODE: Handle single food item (backward compatible)
@@ -321,7 +340,8 @@ Deno.serve(async (req: Request) => {
       );
     }
 
-    const result = await resolveSingleFood(foodName, supabase, openaiApiKey, useCache);
+    const result = await resolveSingleFood(foodName, supabase, openaiApiKey, useCache, tracer);
+    tracer.end();
 
     return new Response(
       JSON.stringify(result),
@@ -329,7 +349,12 @@ Deno.serve(async (req: Request) => {
     );
 
   } catch (error) {
+    if (error instanceof SchedulerShedError) {
+      tracer.end('error', error.message);
+      return llmBusyResponse(error, corsHeaders);
+    }
     console.error('[Nutrition Resolver] Error:', error);
+    tracer.end('error', error.message);
     return new Response(
       JSON.stringify({ error: error.message || 'Internal server error' }),
       { status: 500, headers: { ...corsHeaders, 'Content-Type': 'application/json' } }
@@ -3,7 +3,7 @@ const corsHeaders = {
   "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept",
   "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
 };
-import { PAT_TOOLS, executeTool } from './tools.ts';
+import { PAT_TOOLS, executeToolCalls } from './tools.ts';
 import { createClient } from 'npm:@supabase/supabase-js@2.53.0';
 
 interface ChatMessage {
@@ -399,26 +399,27 @@ Deno.serve(async (req: Request) => {
         );
       }
 
-      const toolResults = [];
-      for (const toolCall of assistantMessage.tool_calls) {
-        const toolName = toolCall.function.name;
-        const toolArgs = JSON.parse(toolCall.function.arguments);
-
-        console.log(`[openai-chat] Executing tool: ${toolName}`);
-
-        const result = await executeTool(toolName, toolArgs, {
+      // All calls from this turn run concurrently
+      const executed = await executeToolCalls(
+        assistantMessage.tool_calls.map((toolCall: any) => ({
+          id: toolCall.id,
+          name: toolCall.function.name,
+          args: JSON.parse(toolCall.function.arguments)
+        })),
+        {
           userId: effectiveUserId,
           supabaseUrl: Deno.env.get('SUPABASE_URL')!,
           supabaseKey: Deno.env.get('SUPABASE_SERVICE_ROLE_KEY')!
-        });
+        },
+        { signal: req.signal }
+      );
 
-        toolResults.push({
-          tool_call_id: toolCall.id,
-          role: 'tool',
-          name: toolName,
-          content: JSON.stringify(result)
-        });
-      }
+      const toolResults = executed.map(({ id, name, success, result, error }) => ({
+        tool_call_id: id,
+        role: 'tool',
+        name,
+        content: JSON.stringify({ success, result, error })
+      }));
 
       const followUpMessages = [
         ...messagesWithSystem,
@@ -1,12 +1,19 @@
 const corsHeaders = {
   "Access-Control-Allow-Origin": "*",
-  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept",
+  "Access-Control-Allow-Headers": "authorization, x-client-info, apikey, content-type, cache-control, pragma, expires, accept, traceparent",
   "Access-Control-Allow-Methods": "GET, POST, OPTIONS"
 };
-import { PAT_TOOLS, executeTool } from './tools.ts';
+import { PAT_TOOLS, createToolTurn, executeToolCalls } from './tools.ts';
 import { createClient } from 'npm:@supabase/supabase-js@2.53.0';
 import { loadSwarmFromDB, buildSwarmPrompt } from './swarm-loader.ts';
 import { executePostAgents } from './post-executor.ts';
+import { EdgeTelemetry } from '../_shared/telemetry.ts';
+import { EdgeTracer } from '../_shared/tracing.ts';
+import { OPENAI_CHAT_URL } from '../_shared/upstreams.ts';
+import { llmFetch, llmBusyResponse, isLlmPriority, SchedulerShedError, type LlmPriority } from '../_shared/llmFetch.ts';
+import { createSseRelay, openAIChunkUsage, openAIDeltaContent } from '../_shared/sse.ts';
+import { cachedPromptTokens, promptPrefixHash } from '../_shared/promptAssembly.ts';
+import { createToolCallingStream } from './toolStream.ts';
 
 interface ChatMessage {
   role: 'system' | 'user' | 'assistant';
@@ -20,12 +27,26 @@ interface ChatRequest {
   temperature?: number;
   model?: string;
   provider?: string;
+  /** Scheduler class; callers doing background or batch work say so */
+  priority?: LlmPriority;
 }
 
 // CRITICAL: Personality now loads via swarm system (10-agent dynamic composition)
 // Emergency fallback if swarm load fails
 const EMERGENCY_FALLBACK = 'You are Pat. Speak clearly and concisely.';
 
+/**
+ * User id from auth.getUser() on the request's Authorization JWT; undefined
+ * for a missing, anon or invalid token
+ */
+async function verifiedUserId(req: Request): Promise<string | undefined> {
+  const authHeader = req.headers.get('Authorization');
+  if (!authHeader?.startsWith('Bearer ')) return undefined;
+  const supabase = createClient(Deno.env.get('SUPABASE_URL')!, Deno.env.get('SUPABASE_ANON_KEY')!);
+  const { data: { user } } = await supabase.auth.getUser(authHeader.slice('Bearer '.length));
+  return user?.id;
+}
+
 Deno.serve(async (req: Request) => {
   if (req.method === 'OPTIONS') {
     return new Response(null, {
@@ -34,21 +55,34 @@ Deno.serve(async (req: Request) => {
     });
   }
 
+  const tracer = new EdgeTracer('openai-chat', req);
+
   try {
-    const { messages, stream = false, userId, temperature = 0.55, model, provider }: ChatRequest = await req.json();
-
-    let effectiveUserId = userId;
-    if (!effectiveUserId) {
-      const authHeader = req.headers.get('Authorization');
-      if (authHeader?.startsWith('Bearer ')) {
-        const supabaseUrl = Deno.env.get('SUPABASE_URL')!;
-        const supabaseKey = Deno.env.get('SUPABASE_ANON_KEY')!;
-        const supabase = createClient(supabaseUrl, supabaseKey, {
-          global: { headers: { Authorization: authHeader } }
-        });
-        const { data: { user } } = await supabase.auth.getUser();
-        effectiveUserId = user?.id;
-      }
+    const { messages, stream = false, userId, temperature = 0.55, model, provider, priority: requestedPriority }: ChatRequest = await req.json();
+    const priority: LlmPriority = isLlmPriority(requestedPriority) ? requestedPriority : 'interactive';
+    const llmOptions = {
+      model: model || 'gpt-4o-mini',
+      priority,
+      signal: req.signal,
+      onDispatch: (lease: { waitedMs: number; queueDepth: number }) => tracer.setAttributes({
+        'llm.priority': priority,
+        'llm.queue_wait_ms': lease.waitedMs,
+        'llm.queue_depth': lease.queueDepth
+      })
+    };
+
+    // Tools read and write the user's meal log with the service role, so the
+    // user only ever comes from the JWT; a body userId must agree with it
+    const effectiveUserId = await verifiedUserId(req);
+    if (userId && userId !== effectiveUserId) {
+      tracer.end('error', 'userId does not match the signed-in user');
+      return new Response(
+        JSON.stringify({ error: 'userId does not match the signed-in user' }),
+        {
+          status: 403,
+          headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+        }
+      );
     }
 
     if (!messages || !Array.isArray(messages)) {
@@ -91,6 +125,8 @@ Deno.serve(async (req: Request) => {
       );
     }
 
+    const telemetry = new EdgeTelemetry('openai-chat', supabaseUrl, supabaseServiceKey);
+
     let systemPrompt: string;
     const hasSystemPrompt = messages.length > 0 && messages[0].role === 'system';
 
@@ -100,7 +136,8 @@ Deno.serve(async (req: Request) => {
       console.log('[openai-chat] systemPrompt: source=client');
     } else {
       // Load personality swarm from database
-      const swarm = await loadSwarmFromDB('personality', supabaseUrl, supabaseServiceKey);
+      const promptStart = performance.now();
+      const swarm = await tracer.span('swarm.load', () => loadSwarmFromDB('personality', supabaseUrl, supabaseServiceKey));
 
       if (!swarm) {
         console.error('[openai-chat] ✗ CRITICAL: Personality swarm not found in database!');
@@ -108,22 +145,36 @@ Deno.serve(async (req: Request) => {
         systemPrompt = EMERGENCY_FALLBACK;
       } else {
         console.log(`[openai-chat] ✓ Loaded swarm: personality (${swarm.agents.length} agents)`);
-        systemPrompt = await buildSwarmPrompt(swarm, supabaseUrl, supabaseServiceKey);
+        systemPrompt = await tracer.span('swarm.build_prompt', () => buildSwarmPrompt(swarm, supabaseUrl, supabaseServiceKey));
       }
+      telemetry.record({
+        stage: 'prompt',
+        event_type: 'swarm_prompt_built',
+        duration_ms: performance.now() - promptStart,
+        success: Boolean(swarm),
+        user_id: effectiveUserId
+      });
     }
 
     const messagesWithSystem: ChatMessage[] = hasSystemPrompt
       ? messages
       : [{ role: 'system', content: systemPrompt }, ...messages];
 
+    // The first system message is the stable persona/rules prefix (promptAssembly);
+    // its hash routes requests to the same prompt cache and groups cache-hit telemetry
+    const prefixHash = promptPrefixHash(messagesWithSystem[0]?.content ?? '');
+    tracer.setAttributes({ 'llm.prompt_prefix_hash': prefixHash });
+
     console.log('[openai-chat] Total messages:', messagesWithSystem.length);
     console.log('[openai-chat] System prompt length:', systemPrompt.length);
     console.log('[openai-chat] Temperature:', temperature);
 
     if (stream) {
-      console.log('[openai-chat] Streaming mode - tools disabled');
+      // Tools write to the user's meal log, so they need a JWT-verified user
+      const toolsEnabled = Boolean(effectiveUserId);
+      console.log(`[openai-chat] Streaming mode - tools ${toolsEnabled ? 'enabled' : 'disabled (no user)'}`);
 
-      const openaiResponse = await fetch('https://api.openai.com/v1/chat/completions', {
+      const streamRequest = (msgs: unknown[], withTools: boolean) => ({
         method: 'POST',
         headers: {
           'Authorization': `Bearer ${openaiApiKey}`,
@@ -131,16 +182,53 @@ Deno.serve(async (req: Request) => {
         },
         body: JSON.stringify({
           model: model || 'gpt-4o-mini',
-          messages: messagesWithSystem,
+          messages: msgs,
           max_tokens: 700,
           temperature: temperature,
           stream: true,
+          stream_options: { include_usage: true },
+          prompt_cache_key: prefixHash,
+          ...(withTools ? { tools: PAT_TOOLS, tool_choice: 'auto' } : {}),
         }),
       });
 
+      // Usage arrives in each completion's last chunk, after the response has started
+      const streamUsage = { tokensIn: 0, tokensOut: 0, tokensCached: 0, pending: false };
+      const noteUsage = (usage: Record<string, any>) => {
+        streamUsage.tokensIn += usage.prompt_tokens ?? 0;
+        streamUsage.tokensOut += usage.completion_tokens ?? 0;
+        streamUsage.tokensCached += cachedPromptTokens(usage) ?? 0;
+        streamUsage.pending = true;
+      };
+      const recordStreamUsage = () => {
+        if (!streamUsage.pending) return;
+        streamUsage.pending = false;
+        telemetry.record({
+          stage: 'llm',
+          event_type: 'stream_usage',
+          duration_ms: performance.now() - llmStart,
+          success: true,
+          user_id: effectiveUserId,
+          llm_provider: 'openai',
+          llm_model: model || 'gpt-4o-mini',
+          tokens_in: streamUsage.tokensIn,
+          tokens_out: streamUsage.tokensOut,
+          tokens_cached: streamUsage.tokensCached,
+          prompt_prefix_hash: prefixHash
+        });
+        telemetry.flushInBackground();
+      };
+
+      const llmStart = performance.now();
+      const openaiResponse = await llmFetch(OPENAI_CHAT_URL, streamRequest(messagesWithSystem, toolsEnabled), {
+        ...llmOptions,
+        fetch: (url, init) => tracer.fetch('openai.chat.stream', url, init)
+      });
+
       if (!openaiResponse.ok) {
         const errorData = await openaiResponse.text();
         console.error('OpenAI API error:', errorData);
+        tracer.end('error', `OpenAI HTTP ${openaiResponse.status}`);
 
         return new Response(
           JSON.stringify({ error: 'Failed to start stream' }),
@@ -151,57 +239,78 @@ Deno.serve(async (req: Request) => {
         );
       }
 
-      const reader = openaiResponse.body?.getReader();
-      const decoder = new TextDecoder();
-
-      const stream = new ReadableStream({
-        async start(controller) {
-          if (!reader) {
-            controller.close();
-            return;
-          }
-
-          try {
-            while (true) {
-              const { done, value } = await reader.read();
-
-              if (done) {
-                controller.enqueue(new TextEncoder().encode('data: [DONE]\n\n'));
-                controller.close();
-                break;
-              }
+      telemetry.record({
+        stage: 'llm',
+        event_type: 'stream_opened',
+        duration_ms: performance.now() - llmStart,
+        success: true,
+        user_id: effectiveUserId,
+        llm_provider: 'openai',
+        llm_model: model || 'gpt-4o-mini',
+        prompt_prefix_hash: prefixHash
+      });
+      telemetry.flushInBackground();
+      // Server span covers time-to-stream-open; token relay is not traced
+      tracer.setAttributes({ 'llm.model': model || 'gpt-4o-mini', 'llm.stream': true });
+      tracer.end();
+
+      if (!openaiResponse.body) {
+        return new Response('data: [DONE]\n\n', {
+          headers: { ...corsHeaders, 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache' },
+        });
+      }
 
-              const chunk = decoder.decode(value);
-              const lines = chunk.split('\n').filter(line => line.trim() !== '');
-
-              for (const line of lines) {
-                if (line.startsWith('data: ')) {
-                  const data = line.substring(6);
-
-                  if (data === '[DONE]') {
-                    controller.enqueue(new TextEncoder().encode('data: [DONE]\n\n'));
-                    continue;
-                  }
-
-                  try {
-                    const parsed = JSON.parse(data);
-                    const content = parsed.choices?.[0]?.delta?.content;
-
-                    if (content) {
-                      controller.enqueue(new TextEncoder().encode(`data: ${JSON.stringify({ token: content })}\n\n`));
-                    }
-                  } catch (e) {
-                    console.warn('Failed to parse streaming chunk:', e);
-                  }
-                }
+      // One executor per turn: shared client, read deadlines, cancelled if the client leaves.
+      // Only created for a verified user, never for an empty or body-supplied id
+      const toolTurn = effectiveUserId
+        ? createToolTurn({ userId: effectiveUserId, supabaseUrl, supabaseKey: supabaseServiceKey }, { signal: req.signal })
+        : null;
+
+      // Incremental SSE parse, pull-based backpressure, ~25 ms token batches, heartbeats
+      const stream = toolTurn
+        ? createToolCallingStream({
+            upstream: openaiResponse.body,
+            messages: messagesWithSystem,
+            runTools: (calls) => toolTurn.startAll(calls),
+            startFollowUp: async (followUp) => {
+              const res = await llmFetch(OPENAI_CHAT_URL, streamRequest(followUp, false), llmOptions).catch((err) => {
+                if (!(err instanceof SchedulerShedError)) throw err;
+                console.warn('[openai-chat] Follow-up completion shed:', err.message);
+                return null;
+              });
+              if (!res) return null;
+              if (!res.ok || !res.body) {
+                console.error('[openai-chat] Follow-up completion failed:', res.status, await res.text().catch(() => ''));
+                return null;
               }
-            }
-          } catch (error) {
-            console.error('Streaming error:', error);
-            controller.error(error);
-          }
-        },
-      });
+              return res.body;
+            },
+            onToolsSettled: (results, durationMs) => {
+              telemetry.record({
+                stage: 'tools',
+                event_type: 'tools_executed',
+                duration_ms: durationMs,
+                success: results.every(r => r.success),
+                user_id: effectiveUserId,
+                item_count: results.length,
+                metadata: { streamed: true }
+              });
+              telemetry.flushInBackground();
+            },
+            onUsage: noteUsage,
+            onClose: recordStreamUsage,
+          })
+        : createSseRelay(openaiResponse.body, {
+            extract: (data) => {
+              const usage = openAIChunkUsage(data);
+              if (usage) noteUsage(usage);
+              return openAIDeltaContent(data);
+            },
+            onClose: (stats) => {
+              console.log('[openai-chat] stream relayed:', stats);
+              recordStreamUsage();
+            },
+          });
 
       return new Response(stream, {
         headers: {
@@ -213,7 +322,8 @@ Deno.serve(async (req: Request) => {
       });
     }
 
-    const openaiResponse = await fetch('https://api.openai.com/v1/chat/completions', {
+    const llmStart = performance.now();
+    const openaiResponse = await llmFetch(OPENAI_CHAT_URL, {
       method: 'POST',
       headers: {
         'Authorization': `Bearer ${openaiApiKey}`,
@@ -224,21 +334,42 @@ Deno.serve(async (req: Request) => {
         messages: messagesWithSystem,
         max_tokens: 700,
         temperature: temperature,
-        tools: PAT_TOOLS,
-        tool_choice: 'auto'
+        // Tools act on the verified user's data; without one, plain chat
+        ...(effectiveUserId ? { tools: PAT_TOOLS, tool_choice: 'auto' } : {}),
+        prompt_cache_key: prefixHash
       }),
+    }, {
+      ...llmOptions,
+      fetch: (url, init) => tracer.fetch('openai.chat', url, init)
     });
 
     if (!openaiResponse.ok) {
       const errorData = await openaiResponse.text();
       console.error('OpenAI API error:', errorData);
+      telemetry.record({
+        stage: 'llm',
+        event_type: 'chat_completion',
+        duration_ms: performance.now() - llmStart,
+        success: false,
+        user_id: effectiveUserId,
+        llm_provider: 'openai',
+        llm_model: model || 'gpt-4o-mini',
+        error: `HTTP ${openaiResponse.status}`
+      });
+      telemetry.flushInBackground();
+      tracer.end('error', `OpenAI HTTP ${openaiResponse.status}`);
 
+      // Only reached when the provider's reset fell outside this request's deadline
       if (openaiResponse.status === 429) {
         return new Response(
           JSON.stringify({ error: 'Rate limit exceeded. Please try again in a moment.' }),
           {
             status: 429,
-            headers: { ...corsHeaders, 'Content-Type': 'application/json' },
+            headers: {
+              ...corsHeaders,
+              'Content-Type': 'application/json',
+              'Retry-After': openaiResponse.headers.get('retry-after') ?? '1',
+            },
           }
         );
       }
@@ -254,8 +385,28 @@ Deno.serve(async (req: Request) => {
 
     const data = await openaiResponse.json();
     const firstChoice = data.choices?.[0];
+    telemetry.record({
+      stage: 'llm',
+      event_type: 'chat_completion',
+      duration_ms: performance.now() - llmStart,
+      success: Boolean(firstChoice),
+      user_id: effectiveUserId,
+      llm_provider: 'openai',
+      llm_model: model || 'gpt-4o-mini',
+      tokens_in: data.usage?.prompt_tokens,
+      tokens_out: data.usage?.completion_tokens,
+      tokens_cached: cachedPromptTokens(data.usage),
+      prompt_prefix_hash: prefixHash
+    });
+    tracer.setAttributes({
+      'llm.model': model || 'gpt-4o-mini',
+      'llm.tokens_in': data.usage?.prompt_tokens,
+      'llm.tokens_out': data.usage?.completion_tokens,
+      'llm.tokens_cached': cachedPromptTokens(data.usage)
+    });
 
     if (!firstChoice) {
+      tracer.end('error', 'No response from OpenAI');
       return new Response(
         JSON.stringify({ error: 'No response from OpenAI' }),
         {
@@ -266,24 +417,45 @@ Deno.serve(async (req: Request) => {
     }
 
     const toolCalls = firstChoice.message?.tool_calls;
-    if (toolCalls && toolCalls.length > 0) {
+    if (effectiveUserId && toolCalls && toolCalls.length > 0) {
       console.log('[openai-chat] Tool calls detected:', toolCalls.length);
-      const toolResults = [];
-
-      for (const toolCall of toolCalls) {
-        const { name, arguments: argsJson } = toolCall.function;
-        console.log(`[openai-chat] Executing tool: ${name}`);
+      const toolsStart = performance.now();
 
+      // Independent calls run concurrently; bad argument JSON fails only that call
+      const calls = toolCalls.map((toolCall: any) => {
         try {
-          const args = JSON.parse(argsJson);
-          const result = await executeTool(name, args, effectiveUserId);
-          toolResults.push({ name, result });
-          console.log(`[openai-chat] Tool ${name} succeeded:`, result);
-        } catch (err) {
-          console.error(`[openai-chat] Tool ${name} failed:`, err);
-          toolResults.push({ name, error: String(err) });
+          return { id: toolCall.id, name: toolCall.function.name, args: JSON.parse(toolCall.function.arguments || '{}') };
+        } catch {
+          return { id: toolCall.id, name: toolCall.function.name, args: null };
         }
-      }
+      });
+      const executed = await tracer.span('tools', () => executeToolCalls(
+        calls.filter((c: any) => c.args !== null),
+        { userId: effectiveUserId, supabaseUrl, supabaseKey: supabaseServiceKey },
+        { signal: req.signal }
+      ), { 'tools.count': calls.length });
+
+      const toolResults = calls.map((call: any) => {
+        const r = executed.find(e => e.id === call.id);
+        if (!r) return { name: call.name, error: 'Invalid tool arguments' };
+        if (r.success) {
+          console.log(`[openai-chat] Tool ${call.name} succeeded in ${r.duration_ms}ms${r.cached ? ' (cached)' : ''}`);
+        } else {
+          console.error(`[openai-chat] Tool ${call.name} failed:`, r.error);
+        }
+        return { name: call.name, result: { success: r.success, result: r.result, error: r.error } };
+      });
+
+      telemetry.record({
+        stage: 'tools',
+        event_type: 'tools_executed',
+        duration_ms: performance.now() - toolsStart,
+        success: toolResults.every(r => 'result' in r && r.result.success),
+        user_id: effectiveUserId,
+        item_count: toolResults.length
+      });
+      telemetry.flushInBackground();
+      tracer.end();
 
       return new Response(
         JSON.stringify({
@@ -303,7 +475,7 @@ Deno.serve(async (req: Request) => {
 
     if (!hasSystemPrompt) {
       // Load swarm again to check for post-agents
-      const swarm = await loadSwarmFromDB('personality', supabaseUrl, supabaseServiceKey);
+      const swarm = await tracer.span('swarm.load', () => loadSwarmFromDB('personality', supabaseUrl, supabaseServiceKey));
       const postMode = (Deno.env.get('VITE_PERSONALITY_POST_EXECUTOR') || 'combined') as 'combined' | 'sequential' | 'off';
 
       if (swarm && postMode !== 'off') {
@@ -312,14 +484,14 @@ Deno.serve(async (req: Request) => {
         if (hasPostAgents) {
           try {
             console.log(`[openai-chat] Executing post-agents in ${postMode} mode`);
-            const refined = await executePostAgents(
+            const refined = await telemetry.time('post', 'post_agents', () => tracer.span('post_agents', () => executePostAgents(
               finalMessage,
               swarm,
               supabaseUrl,
               supabaseServiceKey,
               openaiApiKey,
               postMode
-            );
+            ), { 'post.mode': postMode })), { user_id: effectiveUserId, metadata: { mode: postMode } });
             console.log(`[personality-post] mode=${postMode}, original=${finalMessage.length}, refined=${refined.length}`);
             finalMessage = refined;
           } catch (postError) {
@@ -330,6 +502,9 @@ Deno.serve(async (req: Request) => {
       }
     }
 
+    telemetry.flushInBackground();
+    tracer.end();
+
     return new Response(
       JSON.stringify({
         message: finalMessage,
@@ -341,7 +516,14 @@ Deno.serve(async (req: Request) => {
       }
     );
   } catch (error) {
+    if (error instanceof SchedulerShedError) {
+      console.warn('[openai-chat] LLM request shed:', error.message);
+      tracer.end('error', error.message);
+      return llmBusyResponse(error, corsHeaders);
+    }
+
     console.error('Unexpected error:', error);
+    tracer.end('error', String(error));
 
     return new Response(
       JSON.stringify({ error: 'Internal server error', details: String(error) }),
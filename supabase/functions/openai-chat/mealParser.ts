@@ -1,5 +1,7 @@
 import type { V1FoodItem } from '../../../src/types/foodlog.ts';
 import type { ParsedMeal } from './mealHandler.ts';
+import { OPENAI_CHAT_URL } from '../_shared/upstreams.ts';
+import { llmFetch } from '../_shared/llmFetch.ts';
 
 const MEAL_PARSING_SYSTEM_PROMPT = `You are a food parsing expert. Extract structured food data from user messages.
 
@@ -51,7 +53,7 @@ export async function parseMealWithOpenAI(userMessage: string): Promise<ParsedMe
   }
 
   try {
-    const response = await fetch('https://api.openai.com/v1/chat/completions', {
+    const response = await llmFetch(OPENAI_CHAT_URL, {
       method: 'POST',
       headers: {
         'Content-Type': 'application/json',
@@ -66,7 +68,7 @@ export async function parseMealWithOpenAI(userMessage: string): Promise<ParsedMe
         temperature: 0.1,
         response_format: { type: 'json_object' },
       }),
-    });
+    }, { model: 'gpt-4o-mini', priority: 'interactive' });
 
     if (!response.ok) {
       throw new Error(`OpenAI API error: ${response.status}`);
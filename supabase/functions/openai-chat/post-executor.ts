@@ -6,6 +6,8 @@
 
 import type { SwarmConfig, AgentConfig } from './swarm-loader.ts';
 import { resolvePromptRef } from './swarm-loader.ts';
+import { OPENAI_CHAT_URL } from '../_shared/upstreams.ts';
+import { llmFetch } from '../_shared/llmFetch.ts';
 
 export type ExecutionMode = 'combined' | 'sequential' | 'off';
 
@@ -144,10 +146,12 @@ async function executeSequentialPass(
 
 /**
  * Call LLM for post-processing
- * Uses gpt-4o-mini with lower temperature for faithful refinement
+ * Uses gpt-4o-mini with lower temperature for faithful refinement.
+ * Scheduled as background work with a short deadline: under load it is shed
+ * and the caller keeps the unrefined reply rather than delaying the turn.
  */
 async function callLLMForPost(systemPrompt: string, openaiApiKey: string): Promise<string> {
-  const response = await fetch('https://api.openai.com/v1/chat/completions', {
+  const response = await llmFetch(OPENAI_CHAT_URL, {
     method: 'POST',
     headers: {
       'Authorization': `Bearer ${openaiApiKey}`,
@@ -162,7 +166,7 @@ async function callLLMForPost(systemPrompt: string, openaiApiKey: string): Promi
       max_tokens: 700,
       temperature: 0.4, // Lower temperature for faithful post-processing
     }),
-  });
+  }, { model: 'gpt-4o-mini', priority: 'background', deadlineMs: 3000 });
 
   if (!response.ok) {
     const errorText = await response.text();
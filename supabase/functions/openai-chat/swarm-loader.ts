@@ -6,6 +6,7 @@
  */
 
 import { createClient } from 'npm:@supabase/supabase-js@2.53.0';
+import { assemblePrompt, formatContextBlock, type PromptSection } from '../_shared/promptAssembly.ts';
 
 export interface AgentConfig {
   id: string;
@@ -108,7 +109,8 @@ export async function resolvePromptRef(
 
 /**
  * Build system prompt from swarm agents
- * Combines all enabled pre-phase and main-phase agents' prompts
+ * Combines all enabled pre-phase (persona) and main-phase (rules) agents'
+ * prompts, then user context, so the swarm text is a stable cacheable prefix
  * Post-phase agents are NOT included (they run after LLM response)
  *
  * @param swarm - Swarm configuration
@@ -122,7 +124,7 @@ export async function buildSwarmPrompt(
   supabaseKey: string,
   userContext?: Record<string, any>
 ): Promise<string> {
-  const sections: string[] = [];
+  const sections: PromptSection[] = [];
 
   // Get all enabled agents sorted by phase and order
   const enabledAgents = swarm.agents
@@ -140,37 +142,33 @@ export async function buildSwarmPrompt(
   console.log(`[swarm-loader] Building prompt with ${promptAgents.length} agents (${promptAgents.filter(a => a.phase === 'pre').length} pre, ${promptAgents.filter(a => a.phase === 'main').length} main)`);
 
   for (const agent of promptAgents) {
+    const layer = agent.phase === 'pre' ? 'persona' : 'rules';
     if (agent.prompt) {
       // Direct prompt
-      sections.push(`[${agent.name}]`);
-      sections.push(agent.prompt);
+      sections.push({ layer, label: agent.name, content: agent.prompt });
     } else if (agent.promptRef) {
       // Reference to prompt library (database)
       const prompt = await resolvePromptRef(agent.promptRef, supabaseUrl, supabaseKey);
       if (prompt) {
-        sections.push(`[${agent.name}]`);
-        sections.push(prompt);
+        sections.push({ layer, label: agent.name, content: prompt });
       } else {
         console.warn(`[swarm-loader] Skipping agent ${agent.name}, prompt not found`);
       }
     }
   }
 
-  // Inject user context at the end
-  if (userContext && Object.keys(userContext).length > 0) {
-    sections.push('');
-    sections.push('=== USER CONTEXT (USE THIS TO PERSONALIZE YOUR RESPONSES) ===');
-    for (const [key, value] of Object.entries(userContext)) {
-      if (value !== undefined && value !== null) {
-        sections.push(`${key}: ${JSON.stringify(value)}`);
-      }
-    }
+  // User context after the swarm text (sorted keys: same data, same bytes)
+  if (userContext) {
+    sections.push({
+      layer: 'user',
+      content: formatContextBlock('=== USER CONTEXT (USE THIS TO PERSONALIZE YOUR RESPONSES) ===', userContext)
+    });
   }
 
-  const finalPrompt = sections.join('\n\n');
-  console.log(`[swarm-loader] Built system prompt: ${finalPrompt.length} chars from ${promptAgents.length} agents`);
+  const assembled = assemblePrompt(sections);
+  console.log(`[swarm-loader] Built system prompt: ${assembled.text.length} chars from ${promptAgents.length} agents (prefix ${assembled.prefixHash})`);
 
-  return finalPrompt;
+  return assembled.text;
 }
 
 /**
@@ -0,0 +1,230 @@
+/**
+ * STREAMING TOOL CALLS
+ *
+ * Streams a tool-enabled completion to the client:
+ *
+ *   1. Relay the first completion's text tokens as usual while rebuilding
+ *      any streamed `tool_calls`.
+ *   2. Send a `{"tool_call": ...}` frame the moment a call's arguments are
+ *      complete so the UI can react before the model has finished talking.
+ *      When the first completion ends, hand the turn's calls to `runTools`
+ *      together, so the executor can order meal-log reads after writes,
+ *      and send each `{"tool_result": ...}` frame as it settles.
+ *   3. Once every tool has settled, stream the follow-up completion (with
+ *      the tool results appended) through the same relay, then [DONE].
+ *
+ * The output is pull-based end to end: upstream is only read when the
+ * client pulls. No Deno APIs, so the vitest suite can drive it with
+ * recorded streams.
+ */
+
+import {
+  createSseRelay,
+  openAIChunkUsage,
+  openAIDeltaContent,
+  jsonFrame,
+  ToolCallAccumulator,
+  DONE_FRAME,
+  type SseRelayOptions,
+  type StreamedToolCall
+} from '../_shared/sse.ts';
+
+export interface ToolOutcome {
+  success: boolean;
+  result?: any;
+  error?: string;
+}
+
+export interface ToolResultEvent {
+  id: string;
+  name: string;
+  success: boolean;
+  result?: any;
+  error?: string;
+  duration_ms: number;
+}
+
+export interface ToolStreamOptions {
+  /** Body of the first completion (already streaming, tools offered) */
+  upstream: ReadableStream<Uint8Array>;
+  /** Conversation sent with the first request, including the system prompt */
+  messages: unknown[];
+  /** Start every call of the turn; one promise per call, in call order */
+  runTools: (calls: Array<{ id: string; name: string; args: unknown }>) => Promise<ToolOutcome>[];
+  /** Open the follow-up completion for the extended conversation */
+  startFollowUp: (messages: unknown[]) => Promise<ReadableStream<Uint8Array> | null>;
+  relay?: Omit<SseRelayOptions, 'extract' | 'done' | 'onClose'>;
+  onToolsSettled?: (results: ToolResultEvent[], durationMs: number) => void;
+  /** Usage of each completion, when the requests asked for it (include_usage) */
+  onUsage?: (usage: Record<string, any>) => void;
+  onClose?: () => void;
+}
+
+export function createToolCallingStream(options: ToolStreamOptions): ReadableStream<Uint8Array> {
+  const { upstream, messages, runTools, startFollowUp, relay = {}, onToolsSettled, onUsage, onClose } = options;
+
+  const accumulator = new ToolCallAccumulator();
+  const frames: Uint8Array[] = [];
+  const running = new Set<Promise<void>>();
+  const results: ToolResultEvent[] = [];
+  let toolsStartedAt = 0;
+  let assistantText = '';
+  let closed = false;
+
+  const announced: StreamedToolCall[] = [];
+
+  const announce = (call: StreamedToolCall) => {
+    if (!call.id) call.id = `call_${call.index}`;
+    announced.push(call);
+    frames.push(jsonFrame({ tool_call: { id: call.id, name: call.name } }));
+  };
+
+  const settle = (call: StreamedToolCall, outcome: Promise<ToolOutcome>, began: number) => {
+    // Results are queued as they settle and go out on the next pull
+    const settled: Promise<void> = outcome
+      .catch((err) => ({ success: false, error: String(err) }))
+      .then((o) => {
+        const result: ToolResultEvent = {
+          id: call.id,
+          name: call.name,
+          success: o.success,
+          result: o.result,
+          error: o.error,
+          duration_ms: Math.round(performance.now() - began)
+        };
+        results.push(result);
+        frames.push(jsonFrame({ tool_result: result }));
+        running.delete(settled);
+      });
+    running.add(settled);
+  };
+
+  const runAnnounced = () => {
+    toolsStartedAt = performance.now();
+    const valid = announced.filter((call) => call.args !== undefined);
+    let outcomes: Promise<ToolOutcome>[];
+    try {
+      outcomes = runTools(valid.map((call) => ({ id: call.id, name: call.name, args: call.args })));
+    } catch (err) {
+      outcomes = valid.map(() => Promise.reject(err));
+    }
+    for (const call of announced) {
+      const i = valid.indexOf(call);
+      const outcome = i >= 0 ? outcomes[i] : Promise.resolve<ToolOutcome>({ success: false, error: 'Invalid tool arguments' });
+      settle(call, outcome, toolsStartedAt);
+    }
+  };
+
+  const extract = (data: string): string | null => {
+    let chunk: any;
+    try {
+      chunk = JSON.parse(data);
+    } catch {
+      return null;
+    }
+    for (const call of accumulator.push(chunk)) announce(call);
+    if (chunk?.usage) onUsage?.(chunk.usage);
+    const content = chunk?.choices?.[0]?.delta?.content;
+    if (typeof content !== 'string' || content.length === 0) return null;
+    assistantText += content;
+    return content;
+  };
+
+  let reader = createSseRelay(upstream, { ...relay, extract, done: false }).getReader();
+  let phase: 'first' | 'tools' | 'follow-up' = 'first';
+
+  const followUpMessages = () => {
+    const calls = accumulator.all();
+    return [
+      ...messages,
+      {
+        role: 'assistant',
+        content: assistantText || null,
+        tool_calls: calls.map((c) => ({
+          id: c.id,
+          type: 'function',
+          function: { name: c.name, arguments: c.arguments }
+        }))
+      },
+      ...calls.map((c) => {
+        const r = results.find((x) => x.id === c.id);
+        return {
+          role: 'tool',
+          tool_call_id: c.id,
+          content: JSON.stringify(r ? { success: r.success, result: r.result, error: r.error } : { success: false })
+        };
+      })
+    ];
+  };
+
+  const close = (controller: ReadableStreamDefaultController<Uint8Array>) => {
+    if (closed) return;
+    closed = true;
+    controller.enqueue(DONE_FRAME);
+    controller.close();
+    onClose?.();
+  };
+
+  return new ReadableStream<Uint8Array>({
+    async pull(controller) {
+      if (closed) return;
+      try {
+        for (;;) {
+          if (frames.length > 0) {
+            controller.enqueue(frames.shift()!);
+            return;
+          }
+
+          if (phase === 'tools') {
+            if (running.size > 0) {
+              await Promise.race(running);
+              continue;
+            }
+            onToolsSettled?.(results, performance.now() - toolsStartedAt);
+            const body = await startFollowUp(followUpMessages());
+            if (!body) {
+              controller.enqueue(jsonFrame({ error: 'follow_up_failed' }));
+              close(controller);
+              return;
+            }
+            const followUpExtract = (data: string) => {
+              const usage = openAIChunkUsage(data);
+              if (usage) onUsage?.(usage);
+              return openAIDeltaContent(data);
+            };
+            reader = createSseRelay(body, { ...relay, extract: followUpExtract, done: false }).getReader();
+            phase = 'follow-up';
+            continue;
+          }
+
+          const { done, value } = await reader.read();
+          if (!done) {
+            controller.enqueue(value);
+            return;
+          }
+
+          if (phase === 'first') {
+            for (const call of accumulator.flush()) announce(call);
+            if (accumulator.all().length > 0) {
+              runAnnounced();
+              phase = 'tools';
+              continue;
+            }
+          }
+          close(controller);
+          return;
+        }
+      } catch (err) {
+        closed = true;
+        controller.error(err);
+        onClose?.();
+      }
+    },
+
+    cancel(reason) {
+      closed = true;
+      onClose?.();
+      return reader.cancel(reason);
+    }
+  });
+}
@@ -0,0 +1,125 @@
+import "jsr:@supabase/functions-js/edge-runtime.d.ts";
+import { createClient } from "npm:@supabase/supabase-js@2";
+
+/**
+ * TELEMETRY INGEST
+ *
+ * Receives batched client telemetry (src/lib/telemetry/sink.ts) and writes it
+ * with a single insert. Accepts the user JWT in the Authorization header
+ * (fetch keepalive) or as `access_token` in the body (navigator.sendBeacon
+ * cannot set headers), so deploy with --no-verify-jwt:
+ *
+ *   supabase functions deploy telemetry-ingest --no-verify-jwt
+ */
+
+const corsHeaders = {
+  "Access-Control-Allow-Origin": "*",
+  "Access-Control-Allow-Methods": "POST, OPTIONS",
+  "Access-Control-Allow-Headers": "Content-Type, Authorization, X-Client-Info, Apikey, Traceparent",
+};
+
+const MAX_EVENTS_PER_BATCH = 200;
+const STAGES = new Set([
+  "intent", "nlu", "resolve", "aggregate", "validate", "format", "tone", "store", "cache", "general",
+]);
+const SAMPLE_REASONS = new Set(["head", "tail_error", "tail_slow"]);
+
+interface WireEvent {
+  ts?: string;
+  session_id?: string;
+  event_type?: string;
+  stage?: string;
+  duration_ms?: number;
+  success?: boolean;
+  sample_reason?: string;
+  llm_provider?: string;
+  llm_model?: string;
+  tokens_in?: number;
+  tokens_out?: number;
+  item_count?: number;
+  error?: string;
+  metadata?: Record<string, unknown>;
+}
+
+function json(body: unknown, status: number) {
+  return new Response(JSON.stringify(body), {
+    status,
+    headers: { ...corsHeaders, "Content-Type": "application/json" },
+  });
+}
+
+function toRow(e: WireEvent, userId: string) {
+  if (!e || typeof e !== "object") return null;
+  if (!e.stage || !STAGES.has(e.stage)) return null;
+  if (typeof e.duration_ms !== "number" || !Number.isFinite(e.duration_ms)) return null;
+
+  return {
+    ts: e.ts && !Number.isNaN(Date.parse(e.ts)) ? e.ts : new Date().toISOString(),
+    source: "client",
+    user_id: userId,
+    session_id: typeof e.session_id === "string" ? e.session_id.slice(0, 64) : null,
+    event_type: String(e.event_type || "unknown").slice(0, 64),
+    stage: e.stage,
+    duration_ms: Math.max(0, Math.min(Math.round(e.duration_ms), 600_000)),
+    success: e.success !== false,
+    sample_reason: e.sample_reason && SAMPLE_REASONS.has(e.sample_reason) ? e.sample_reason : "head",
+    llm_provider: e.llm_provider?.slice(0, 32) ?? null,
+    llm_model: e.llm_model?.slice(0, 64) ?? null,
+    tokens_in: typeof e.tokens_in === "number" ? e.tokens_in : null,
+    tokens_out: typeof e.tokens_out === "number" ? e.tokens_out : null,
+    item_count: typeof e.item_count === "number" ? e.item_count : null,
+    error: e.error?.slice(0, 500) ?? null,
+    metadata: e.metadata && typeof e.metadata === "object" ? e.metadata : null,
+  };
+}
+
+Deno.serve(async (req: Request) => {
+  if (req.method === "OPTIONS") {
+    return new Response(null, { status: 200, headers: corsHeaders });
+  }
+
+  if (req.method !== "POST") {
+    return json({ error: "Method not allowed" }, 405);
+  }
+
+  try {
+    const supabaseUrl = Deno.env.get("SUPABASE_URL")!;
+    const supabaseServiceKey = Deno.env.get("SUPABASE_SERVICE_ROLE_KEY")!;
+    const supabase = createClient(supabaseUrl, supabaseServiceKey);
+
+    const body = await req.json();
+    const headerToken = req.headers.get("Authorization")?.replace("Bearer ", "");
+    const token = headerToken || body?.access_token;
+
+    if (!token) {
+      return json({ error: "Unauthorized" }, 401);
+    }
+
+    const { data: { user } } = await supabase.auth.getUser(token);
+    if (!user) {
+      return json({ error: "Unauthorized" }, 401);
+    }
+
+    const events: WireEvent[] = Array.isArray(body?.events) ? body.events.slice(0, MAX_EVENTS_PER_BATCH) : [];
+    const rows = events.map((e) => toRow(e, user.id)).filter((r) => r !== null);
+
+    if (rows.length === 0) {
+      return json({ accepted: 0 }, 200);
+    }
+
+    const { error } = await supabase.from("telemetry_events").insert(rows);
+    if (error) {
+      console.error("[telemetry-ingest] insert failed:", error);
+      return json({ error: "Failed to store telemetry" }, 500);
+    }
+
+    if (typeof body?.dropped === "number" && body.dropped > 0) {
+      console.warn(`[telemetry-ingest] client reported ${body.dropped} dropped events`);
+    }
+
+    return json({ accepted: rows.length }, 200);
+  } catch (error: any) {
+    console.error("[telemetry-ingest] error:", error);
+    return json({ error: error.message || "Internal server error" }, 500);
+  }
+});
@@ -0,0 +1,235 @@
+/*
+  # Realtime day-total deltas for meal_logs / meal_items
+
+  ## Problem
+  After a meal is saved (saveMeal, log_meal RPC, openai-chat log_meal tool,
+  undo_meal) the dashboard has no way to learn about it except re-running the
+  full day query (meal_logs + nested meal_items, weekly items, metrics ...).
+  Every navigation back to the dashboard and every meal delete refetched
+  whole tables.
+
+  ## Solution
+  1. Statement-level triggers on meal_items aggregate the affected rows per
+     meal and broadcast ONE compact delta per meal on the private topic
+     `day_totals:<user_id>` via realtime.send().
+  2. A BEFORE DELETE row trigger on meal_logs broadcasts the negative item
+     sums before ON DELETE CASCADE removes the items (the cascaded item
+     delete can no longer see its parent and is skipped).
+  3. A row trigger on meal_logs.ts updates moves the meal between days.
+  4. RLS on realtime.messages lets a user receive only their own topic.
+
+  ## Payload
+  { meal_log_id, ts, op, kcal, protein_g, carbs_g, fat_g, fiber_g, items }
+  Values are signed deltas; the client decides whether `ts` falls inside the
+  day it is displaying.
+
+  ## Notes
+  - realtime.send() writes to realtime.messages, so nothing is published if
+    the surrounding transaction rolls back.
+  - Triggers fire for every write path (client, RPC, edge functions with the
+    service role), so no caller has to remember to publish.
+*/
+
+-- ========== PART 1: PUBLISH HELPER ==========
+
+CREATE OR REPLACE FUNCTION public.publish_day_totals_delta(
+  p_user_id uuid,
+  p_meal_log_id uuid,
+  p_ts timestamptz,
+  p_op text,
+  p_kcal numeric,
+  p_protein_g numeric,
+  p_carbs_g numeric,
+  p_fat_g numeric,
+  p_fiber_g numeric,
+  p_items int
+)
+RETURNS void
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF p_user_id IS NULL THEN
+    RETURN;
+  END IF;
+
+  PERFORM realtime.send(
+    jsonb_build_object(
+      'meal_log_id', p_meal_log_id,
+      'ts', p_ts,
+      'op', p_op,
+      'kcal', COALESCE(p_kcal, 0),
+      'protein_g', COALESCE(p_protein_g, 0),
+      'carbs_g', COALESCE(p_carbs_g, 0),
+      'fat_g', COALESCE(p_fat_g, 0),
+      'fiber_g', COALESCE(p_fiber_g, 0),
+      'items', COALESCE(p_items, 0)
+    ),
+    'delta',
+    'day_totals:' || p_user_id::text,
+    true
+  );
+EXCEPTION WHEN OTHERS THEN
+  -- Never block a meal write because realtime is unavailable
+  RAISE WARNING 'publish_day_totals_delta failed: %', SQLERRM;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.publish_day_totals_delta(uuid, uuid, timestamptz, text, numeric, numeric, numeric, numeric, numeric, int) FROM PUBLIC;
+
+-- ========== PART 2: meal_items STATEMENT TRIGGERS ==========
+
+CREATE OR REPLACE FUNCTION public.meal_items_day_totals_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  r RECORD;
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    FOR r IN
+      SELECT ml.user_id, ml.id, ml.ts,
+             SUM(n.energy_kcal) AS kcal, SUM(n.protein_g) AS protein_g,
+             SUM(n.carbs_g) AS carbs_g, SUM(n.fat_g) AS fat_g,
+             SUM(n.fiber_g) AS fiber_g, COUNT(*)::int AS items
+      FROM new_rows n
+      JOIN meal_logs ml ON ml.id = n.meal_log_id
+      GROUP BY ml.user_id, ml.id, ml.ts
+    LOOP
+      PERFORM publish_day_totals_delta(r.user_id, r.id, r.ts, 'insert',
+        r.kcal, r.protein_g, r.carbs_g, r.fat_g, r.fiber_g, r.items);
+    END LOOP;
+
+  ELSIF TG_OP = 'DELETE' THEN
+    -- Cascaded deletes find no parent here; meal_logs_day_totals_delete covers them
+    FOR r IN
+      SELECT ml.user_id, ml.id, ml.ts,
+             SUM(o.energy_kcal) AS kcal, SUM(o.protein_g) AS protein_g,
+             SUM(o.carbs_g) AS carbs_g, SUM(o.fat_g) AS fat_g,
+             SUM(o.fiber_g) AS fiber_g, COUNT(*)::int AS items
+      FROM old_rows o
+      JOIN meal_logs ml ON ml.id = o.meal_log_id
+      GROUP BY ml.user_id, ml.id, ml.ts
+    LOOP
+      PERFORM publish_day_totals_delta(r.user_id, r.id, r.ts, 'delete',
+        -r.kcal, -r.protein_g, -r.carbs_g, -r.fat_g, -r.fiber_g, -r.items);
+    END LOOP;
+
+  ELSIF TG_OP = 'UPDATE' THEN
+    FOR r IN
+      SELECT ml.user_id, ml.id, ml.ts,
+             SUM(d.kcal) AS kcal, SUM(d.protein_g) AS protein_g,
+             SUM(d.carbs_g) AS carbs_g, SUM(d.fat_g) AS fat_g,
+             SUM(d.fiber_g) AS fiber_g, SUM(d.items)::int AS items
+      FROM (
+        SELECT meal_log_id, energy_kcal AS kcal, protein_g, carbs_g, fat_g, fiber_g, 1 AS items
+        FROM new_rows
+        UNION ALL
+        SELECT meal_log_id, -energy_kcal, -protein_g, -carbs_g, -fat_g, -fiber_g, -1
+        FROM old_rows
+      ) d
+      JOIN meal_logs ml ON ml.id = d.meal_log_id
+      GROUP BY ml.user_id, ml.id, ml.ts
+    LOOP
+      IF r.kcal <> 0 OR r.protein_g <> 0 OR r.carbs_g <> 0 OR r.fat_g <> 0
+         OR r.fiber_g <> 0 OR r.items <> 0 THEN
+        PERFORM publish_day_totals_delta(r.user_id, r.id, r.ts, 'update',
+          r.kcal, r.protein_g, r.carbs_g, r.fat_g, r.fiber_g, r.items);
+      END IF;
+    END LOOP;
+  END IF;
+
+  RETURN NULL;
+END;
+$$;
+
+-- Transition tables require one trigger per event
+DROP TRIGGER IF EXISTS meal_items_day_totals_insert ON public.meal_items;
+CREATE TRIGGER meal_items_day_totals_insert
+  AFTER INSERT ON public.meal_items
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.meal_items_day_totals_delta();
+
+DROP TRIGGER IF EXISTS meal_items_day_totals_delete ON public.meal_items;
+CREATE TRIGGER meal_items_day_totals_delete
+  AFTER DELETE ON public.meal_items
+  REFERENCING OLD TABLE AS old_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.meal_items_day_totals_delta();
+
+DROP TRIGGER IF EXISTS meal_items_day_totals_update ON public.meal_items;
+CREATE TRIGGER meal_items_day_totals_update
+  AFTER UPDATE ON public.meal_items
+  REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION public.meal_items_day_totals_delta();
+
+-- ========== PART 3: meal_logs ROW TRIGGERS ==========
+
+CREATE OR REPLACE FUNCTION public.meal_logs_day_totals_delta()
+RETURNS TRIGGER
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_kcal numeric;
+  v_protein numeric;
+  v_carbs numeric;
+  v_fat numeric;
+  v_fiber numeric;
+  v_items int;
+BEGIN
+  SELECT SUM(energy_kcal), SUM(protein_g), SUM(carbs_g), SUM(fat_g), SUM(fiber_g), COUNT(*)::int
+  INTO v_kcal, v_protein, v_carbs, v_fat, v_fiber, v_items
+  FROM meal_items
+  WHERE meal_log_id = OLD.id;
+
+  IF v_items = 0 THEN
+    IF TG_OP = 'DELETE' THEN
+      RETURN OLD;
+    END IF;
+    RETURN NEW;
+  END IF;
+
+  IF TG_OP = 'DELETE' THEN
+    -- Items are still visible here; the FK cascade runs after this trigger
+    PERFORM publish_day_totals_delta(OLD.user_id, OLD.id, OLD.ts, 'delete',
+      -v_kcal, -v_protein, -v_carbs, -v_fat, -v_fiber, -v_items);
+    RETURN OLD;
+  END IF;
+
+  -- ts moved: remove from the old day, add to the new one
+  PERFORM publish_day_totals_delta(OLD.user_id, OLD.id, OLD.ts, 'move',
+    -v_kcal, -v_protein, -v_carbs, -v_fat, -v_fiber, -v_items);
+  PERFORM publish_day_totals_delta(NEW.user_id, NEW.id, NEW.ts, 'move',
+    v_kcal, v_protein, v_carbs, v_fat, v_fiber, v_items);
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS meal_logs_day_totals_delete ON public.meal_logs;
+CREATE TRIGGER meal_logs_day_totals_delete
+  BEFORE DELETE ON public.meal_logs
+  FOR EACH ROW EXECUTE FUNCTION public.meal_logs_day_totals_delta();
+
+DROP TRIGGER IF EXISTS meal_logs_day_totals_move ON public.meal_logs;
+CREATE TRIGGER meal_logs_day_totals_move
+  AFTER UPDATE OF ts ON public.meal_logs
+  FOR EACH ROW
+  WHEN (OLD.ts IS DISTINCT FROM NEW.ts)
+  EXECUTE FUNCTION public.meal_logs_day_totals_delta();
+
+-- ========== PART 4: REALTIME AUTHORIZATION ==========
+
+-- Users may only receive broadcasts on their own day_totals topic
+DROP POLICY IF EXISTS "Users receive own day_totals deltas" ON realtime.messages;
+CREATE POLICY "Users receive own day_totals deltas"
+  ON realtime.messages
+  FOR SELECT
+  TO authenticated
+  USING (
+    realtime.messages.extension = 'broadcast'
+    AND realtime.topic() = 'day_totals:' || auth.uid()::text
+  );
@@ -0,0 +1,193 @@
+/*
+  # Telemetry events + per-stage latency rollups
+
+  ## Problem
+  TelemetryCollector kept every event in an unbounded in-memory array and
+  nothing left the browser except a dev console.log, so there was no way to
+  see where chat / meal-logging latency goes in production.
+
+  ## Solution
+  1. `telemetry_events` - append-only raw events from the client sink
+     (telemetry-ingest edge function) and edge functions (_shared/telemetry.ts).
+  2. `telemetry_stage_rollups` - hourly per-source/stage count, error count,
+     avg and p50/p95/p99 latency, maintained by `rollup_telemetry()`.
+  3. `prune_telemetry_events()` - raw-event retention (rollups are kept).
+  4. `v_telemetry_stage_latency_24h` - rollups for the last 24 hours.
+
+  ## Sampling
+  Clients ship a random `head` sample of runs plus every errored (`tail_error`)
+  or slow (`tail_slow`) run. Percentiles use head-sampled rows only, so tail
+  sampling doesn't skew them; error counts use every row.
+
+  ## Scheduling
+  Call from any scheduler (pg_cron, GitHub Action, edge cron):
+    SELECT rollup_telemetry();              -- every 5-15 minutes
+    SELECT prune_telemetry_events(7);       -- daily
+*/
+
+-- ========== PART 1: RAW EVENTS ==========
+
+CREATE TABLE IF NOT EXISTS public.telemetry_events (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  ts timestamptz NOT NULL DEFAULT now(),
+  source text NOT NULL DEFAULT 'client',
+  user_id uuid,
+  session_id text,
+  event_type text NOT NULL,
+  stage text NOT NULL,
+  duration_ms integer NOT NULL CHECK (duration_ms >= 0),
+  success boolean NOT NULL DEFAULT true,
+  sample_reason text NOT NULL DEFAULT 'head'
+    CHECK (sample_reason IN ('head', 'tail_error', 'tail_slow')),
+  llm_provider text,
+  llm_model text,
+  tokens_in integer,
+  tokens_out integer,
+  item_count integer,
+  error text,
+  metadata jsonb,
+  created_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Rollups scan by time window, grouped by source/stage
+CREATE INDEX IF NOT EXISTS idx_telemetry_events_ts_stage
+  ON public.telemetry_events (ts, source, stage);
+
+CREATE INDEX IF NOT EXISTS idx_telemetry_events_user_ts
+  ON public.telemetry_events (user_id, ts DESC);
+
+ALTER TABLE public.telemetry_events ENABLE ROW LEVEL SECURITY;
+
+-- Writes go through service-role edge functions only; admins may read
+DROP POLICY IF EXISTS "Admins can read telemetry events" ON public.telemetry_events;
+CREATE POLICY "Admins can read telemetry events"
+  ON public.telemetry_events
+  FOR SELECT
+  TO authenticated
+  USING (
+    EXISTS (
+      SELECT 1 FROM profiles
+      WHERE profiles.user_id = auth.uid()
+      AND profiles.role = 'admin'
+    )
+  );
+
+-- ========== PART 2: HOURLY ROLLUPS ==========
+
+CREATE TABLE IF NOT EXISTS public.telemetry_stage_rollups (
+  bucket timestamptz NOT NULL,
+  source text NOT NULL,
+  stage text NOT NULL,
+  event_count integer NOT NULL,
+  error_count integer NOT NULL,
+  sampled_count integer NOT NULL,
+  avg_ms numeric,
+  p50_ms numeric,
+  p95_ms numeric,
+  p99_ms numeric,
+  max_ms integer,
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  PRIMARY KEY (bucket, source, stage)
+);
+
+ALTER TABLE public.telemetry_stage_rollups ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Admins can read telemetry rollups" ON public.telemetry_stage_rollups;
+CREATE POLICY "Admins can read telemetry rollups"
+  ON public.telemetry_stage_rollups
+  FOR SELECT
+  TO authenticated
+  USING (
+    EXISTS (
+      SELECT 1 FROM profiles
+      WHERE profiles.user_id = auth.uid()
+      AND profiles.role = 'admin'
+    )
+  );
+
+-- Recompute the last p_hours hourly buckets (idempotent upsert)
+CREATE OR REPLACE FUNCTION public.rollup_telemetry(p_hours int DEFAULT 2)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  INSERT INTO telemetry_stage_rollups (
+    bucket, source, stage, event_count, error_count, sampled_count,
+    avg_ms, p50_ms, p95_ms, p99_ms, max_ms, updated_at
+  )
+  SELECT
+    date_trunc('hour', ts) AS bucket,
+    source,
+    stage,
+    COUNT(*)::int,
+    COUNT(*) FILTER (WHERE NOT success)::int,
+    COUNT(*) FILTER (WHERE sample_reason = 'head')::int,
+    ROUND(AVG(duration_ms) FILTER (WHERE sample_reason = 'head'), 1),
+    percentile_cont(0.50) WITHIN GROUP (ORDER BY duration_ms) FILTER (WHERE sample_reason = 'head'),
+    percentile_cont(0.95) WITHIN GROUP (ORDER BY duration_ms) FILTER (WHERE sample_reason = 'head'),
+    percentile_cont(0.99) WITHIN GROUP (ORDER BY duration_ms) FILTER (WHERE sample_reason = 'head'),
+    MAX(duration_ms),
+    now()
+  FROM telemetry_events
+  WHERE ts >= date_trunc('hour', now()) - make_interval(hours => GREATEST(p_hours, 1) - 1)
+  GROUP BY 1, 2, 3
+  ON CONFLICT (bucket, source, stage) DO UPDATE SET
+    event_count = EXCLUDED.event_count,
+    error_count = EXCLUDED.error_count,
+    sampled_count = EXCLUDED.sampled_count,
+    avg_ms = EXCLUDED.avg_ms,
+    p50_ms = EXCLUDED.p50_ms,
+    p95_ms = EXCLUDED.p95_ms,
+    p99_ms = EXCLUDED.p99_ms,
+    max_ms = EXCLUDED.max_ms,
+    updated_at = now();
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$;
+
+-- Drop raw events older than p_keep_days (rollups are retained)
+CREATE OR REPLACE FUNCTION public.prune_telemetry_events(p_keep_days int DEFAULT 7)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  DELETE FROM telemetry_events
+  WHERE ts < now() - make_interval(days => GREATEST(p_keep_days, 1));
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.rollup_telemetry(int) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.prune_telemetry_events(int) FROM PUBLIC, anon, authenticated;
+
+-- ========== PART 3: DASHBOARD VIEW ==========
+
+CREATE OR REPLACE VIEW public.v_telemetry_stage_latency_24h
+WITH (security_invoker = true) AS
+SELECT
+  source,
+  stage,
+  SUM(event_count)::int AS event_count,
+  SUM(error_count)::int AS error_count,
+  ROUND(SUM(error_count)::numeric / NULLIF(SUM(event_count), 0), 4) AS error_rate,
+  -- Hourly percentiles weighted by sample count (approximation across buckets)
+  ROUND(SUM(p50_ms * sampled_count) / NULLIF(SUM(sampled_count), 0), 1) AS p50_ms,
+  ROUND(SUM(p95_ms * sampled_count) / NULLIF(SUM(sampled_count), 0), 1) AS p95_ms,
+  ROUND(SUM(p99_ms * sampled_count) / NULLIF(SUM(sampled_count), 0), 1) AS p99_ms,
+  MAX(max_ms) AS max_ms
+FROM telemetry_stage_rollups
+WHERE bucket >= now() - interval '24 hours'
+GROUP BY source, stage
+ORDER BY source, stage;
@@ -0,0 +1,167 @@
+/*
+  # User memory retrieval: indexes, ranking RPC, TTL compaction
+
+  ## Problem
+  MemoryService.query selected `*` from user_memory, filtered topics with
+  `overlaps` and ordered by conflict_priority/created_at only:
+  - relevance (topic overlap, recency, confidence) played no part in the order
+  - rows past their `ttl` were still returned until the nightly decay job
+  - no index covered (user_id, tier, ...) or the topics array
+
+  ## Solution
+  1. Composite B-tree indexes for the per-user filters and getByKey, a GIN
+     index on `topics` for overlap (&&), and a partial index on `ttl` for
+     expiry compaction.
+  2. `rank_user_memories()` - filters out expired rows and ranks the candidate
+     set in SQL by topic overlap, recency, confidence and tier. Weights match
+     `scoreMemory()` in src/lib/memory.ts.
+  3. `compact_expired_memories()` - batched delete of rows past `ttl`,
+     scheduled every 15 minutes when pg_cron is available.
+
+  ## Benchmark
+  tests/scripts/bench-user-memory.sql seeds 10k memories for one user inside
+  a rolled-back transaction and runs EXPLAIN ANALYZE on the ranking RPC.
+*/
+
+-- ========== PART 1: TABLE (no-op where P0 infrastructure already ran) ==========
+
+CREATE TABLE IF NOT EXISTS public.user_memory (
+  id uuid PRIMARY KEY DEFAULT gen_random_uuid(),
+  user_id uuid NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  tier text NOT NULL CHECK (tier IN ('ephemeral', 'short_term', 'long_term')),
+  key text NOT NULL,
+  value jsonb,
+  source text NOT NULL CHECK (source IN ('explicit', 'inferred', 'system')),
+  confidence numeric NOT NULL DEFAULT 1.0,
+  ttl timestamptz,
+  topics text[] NOT NULL DEFAULT '{}',
+  is_pii boolean NOT NULL DEFAULT false,
+  conflict_priority integer NOT NULL DEFAULT 0,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.user_memory ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users manage own memories" ON public.user_memory;
+CREATE POLICY "Users manage own memories"
+  ON public.user_memory
+  FOR ALL
+  TO authenticated
+  USING (auth.uid() = user_id)
+  WITH CHECK (auth.uid() = user_id);
+
+-- ========== PART 2: INDEXES ==========
+
+-- Per-user listing / tier filter, ordered like the legacy query
+CREATE INDEX IF NOT EXISTS idx_user_memory_user_tier_priority
+  ON public.user_memory (user_id, tier, conflict_priority DESC, created_at DESC);
+
+-- getByKey and resolve_memory_conflict lookups
+CREATE INDEX IF NOT EXISTS idx_user_memory_user_key
+  ON public.user_memory (user_id, key, conflict_priority DESC, created_at DESC);
+
+-- Topic overlap (topics && $1)
+CREATE INDEX IF NOT EXISTS idx_user_memory_topics_gin
+  ON public.user_memory USING gin (topics);
+
+-- Expiry compaction only touches rows that can expire
+CREATE INDEX IF NOT EXISTS idx_user_memory_ttl
+  ON public.user_memory (ttl)
+  WHERE ttl IS NOT NULL;
+
+-- ========== PART 3: RANKED RETRIEVAL ==========
+
+/*
+  score = 0.4 * topic_overlap / max(#query_topics, 1)
+        + 0.3 * recency          (linear decay to 0 over 30 days)
+        + 0.2 * confidence
+        + 0.1 * tier_weight      (long_term 1.0, short_term 0.7, ephemeral 0.4)
+
+  SECURITY INVOKER: RLS on user_memory still applies.
+*/
+CREATE OR REPLACE FUNCTION public.rank_user_memories(
+  p_user_id uuid,
+  p_topics text[] DEFAULT NULL,
+  p_tier text DEFAULT NULL,
+  p_min_confidence numeric DEFAULT NULL,
+  p_limit int DEFAULT 20
+)
+RETURNS TABLE (
+  id uuid,
+  user_id uuid,
+  tier text,
+  key text,
+  value jsonb,
+  source text,
+  confidence numeric,
+  ttl timestamptz,
+  topics text[],
+  is_pii boolean,
+  conflict_priority integer,
+  created_at timestamptz,
+  updated_at timestamptz,
+  score numeric
+)
+LANGUAGE sql
+STABLE
+SECURITY INVOKER
+SET search_path = public
+AS $$
+  SELECT
+    m.id, m.user_id, m.tier::text, m.key, m.value::jsonb, m.source::text, m.confidence::numeric, m.ttl,
+    m.topics, m.is_pii, m.conflict_priority, m.created_at, m.updated_at,
+    ROUND((
+      0.4 * COALESCE(cardinality(ARRAY(
+              SELECT unnest(m.topics) INTERSECT SELECT unnest(p_topics)
+            )), 0)::numeric / GREATEST(COALESCE(cardinality(p_topics), 0), 1)
+      + 0.3 * GREATEST(0, 1 - EXTRACT(EPOCH FROM (now() - m.created_at)) / 2592000.0)::numeric
+      + 0.2 * m.confidence::numeric
+      + 0.1 * CASE m.tier WHEN 'long_term' THEN 1.0 WHEN 'short_term' THEN 0.7 ELSE 0.4 END
+    ), 6) AS score
+  FROM user_memory m
+  WHERE m.user_id = p_user_id
+    AND (m.ttl IS NULL OR m.ttl > now())
+    AND (p_tier IS NULL OR m.tier::text = p_tier)
+    AND (p_min_confidence IS NULL OR m.confidence >= p_min_confidence)
+    AND (COALESCE(cardinality(p_topics), 0) = 0 OR m.topics && p_topics)
+  ORDER BY score DESC, m.conflict_priority DESC, m.created_at DESC
+  LIMIT LEAST(GREATEST(COALESCE(p_limit, 20), 1), 200);
+$$;
+
+GRANT EXECUTE ON FUNCTION public.rank_user_memories(uuid, text[], text, numeric, int) TO authenticated;
+
+-- ========== PART 4: TTL COMPACTION ==========
+
+-- Delete up to p_batch expired rows per call; returns rows deleted
+CREATE OR REPLACE FUNCTION public.compact_expired_memories(p_batch int DEFAULT 5000)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  DELETE FROM user_memory
+  WHERE id IN (
+    SELECT id FROM user_memory
+    WHERE ttl IS NOT NULL AND ttl <= now()
+    ORDER BY ttl
+    LIMIT GREATEST(p_batch, 1)
+  );
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.compact_expired_memories(int) FROM PUBLIC, anon, authenticated;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.unschedule(jobid) FROM cron.job WHERE jobname = 'compact-expired-memories';
+    PERFORM cron.schedule('compact-expired-memories', '*/15 * * * *', 'SELECT public.compact_expired_memories()');
+  END IF;
+END $$;
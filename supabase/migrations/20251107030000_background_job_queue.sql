@@ -0,0 +1,440 @@
+/*
+  # Background job queue for post-turn and maintenance work
+
+  ## Problem
+  Heavy work ran inline or behind ad-hoc endpoints:
+  - chat-summarize-session called OpenAI while the caller waited
+  - chat-midnight-rollover closed every due session in one UPDATE and returned
+    the full session list in the HTTP response
+  - memory extraction and telemetry rollups had no runner at all
+
+  ## Solution
+  A durable Postgres queue drained by the `job-worker` edge function.
+  1. `background_jobs` - one row per job. Fields: kind, payload, optional
+     idempotency key, priority, attempts, run_at, lease and last_error.
+  2. `background_job_kinds` - per-kind concurrency limit, claim batch size,
+     lease length and max attempts.
+  3. `enqueue_job()` - idempotent insert. A second enqueue with the same key
+     returns the existing job id.
+  4. `claim_jobs()` - FOR UPDATE SKIP LOCKED claim that respects each kind's
+     concurrency limit. It also reclaims running jobs whose lease expired
+     (crashed worker).
+  5. `complete_jobs()` / `fail_job()` - batched completion, and exponential
+     backoff with jitter until max_attempts, then 'dead'.
+  6. `rollover_sessions_batch()` - closes at most N sessions that have reached
+     local midnight and enqueues one summary job per session.
+  7. `close_chat_session()` now enqueues a summary when none is supplied.
+
+  ## Job kinds
+  - summarize_session  {session_id, user_id}
+  - extract_memories   {session_id, user_id, facts}
+  - midnight_rollover  {}
+  - rollup_telemetry   {hours}
+  - compact_memories   {}
+
+  ## Scheduling
+  Run the worker every minute (Supabase cron or any external scheduler):
+    POST /functions/v1/job-worker   (Authorization: Bearer <service role key>)
+  With pg_cron, the maintenance jobs below are enqueued automatically.
+*/
+
+-- ========== PART 1: TABLES ==========
+
+CREATE TABLE IF NOT EXISTS public.background_job_kinds (
+  kind text PRIMARY KEY,
+  max_concurrency integer NOT NULL DEFAULT 4 CHECK (max_concurrency > 0),
+  batch_size integer NOT NULL DEFAULT 10 CHECK (batch_size > 0),
+  lease_seconds integer NOT NULL DEFAULT 120 CHECK (lease_seconds > 0),
+  max_attempts integer NOT NULL DEFAULT 5 CHECK (max_attempts > 0)
+);
+
+INSERT INTO public.background_job_kinds (kind, max_concurrency, batch_size, lease_seconds, max_attempts) VALUES
+  ('summarize_session', 4, 20, 120, 5),
+  ('extract_memories',  4, 50,  60, 5),
+  ('midnight_rollover', 1,  1, 300, 3),
+  ('rollup_telemetry',  1,  1, 300, 3),
+  ('compact_memories',  1,  1, 300, 3)
+ON CONFLICT (kind) DO NOTHING;
+
+CREATE TABLE IF NOT EXISTS public.background_jobs (
+  id bigint GENERATED ALWAYS AS IDENTITY PRIMARY KEY,
+  kind text NOT NULL REFERENCES public.background_job_kinds(kind),
+  payload jsonb NOT NULL DEFAULT '{}',
+  idempotency_key text,
+  status text NOT NULL DEFAULT 'queued'
+    CHECK (status IN ('queued', 'running', 'succeeded', 'dead')),
+  priority smallint NOT NULL DEFAULT 0,
+  attempts integer NOT NULL DEFAULT 0,
+  max_attempts integer NOT NULL DEFAULT 5,
+  run_at timestamptz NOT NULL DEFAULT now(),
+  locked_at timestamptz,
+  locked_by text,
+  last_error text,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now(),
+  completed_at timestamptz
+);
+
+-- Idempotency: one job per key (keys are namespaced, e.g. 'summarize:<session>')
+CREATE UNIQUE INDEX IF NOT EXISTS idx_background_jobs_idempotency
+  ON public.background_jobs (idempotency_key)
+  WHERE idempotency_key IS NOT NULL;
+
+-- Claim scan: ready jobs per kind in priority order
+CREATE INDEX IF NOT EXISTS idx_background_jobs_ready
+  ON public.background_jobs (kind, priority DESC, run_at)
+  WHERE status = 'queued';
+
+-- Concurrency accounting and lease recovery
+CREATE INDEX IF NOT EXISTS idx_background_jobs_running
+  ON public.background_jobs (kind, locked_at)
+  WHERE status = 'running';
+
+-- Retention
+CREATE INDEX IF NOT EXISTS idx_background_jobs_completed
+  ON public.background_jobs (completed_at)
+  WHERE status = 'succeeded';
+
+-- Service role only (worker); no client policies
+ALTER TABLE public.background_jobs ENABLE ROW LEVEL SECURITY;
+ALTER TABLE public.background_job_kinds ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Admins can read background jobs" ON public.background_jobs;
+CREATE POLICY "Admins can read background jobs"
+  ON public.background_jobs
+  FOR SELECT
+  TO authenticated
+  USING (
+    EXISTS (
+      SELECT 1 FROM profiles
+      WHERE profiles.user_id = auth.uid()
+      AND profiles.role = 'admin'
+    )
+  );
+
+-- ========== PART 2: QUEUE FUNCTIONS ==========
+
+CREATE OR REPLACE FUNCTION public.enqueue_job(
+  p_kind text,
+  p_payload jsonb DEFAULT '{}',
+  p_idempotency_key text DEFAULT NULL,
+  p_run_at timestamptz DEFAULT now(),
+  p_priority smallint DEFAULT 0
+)
+RETURNS bigint
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_id bigint;
+BEGIN
+  INSERT INTO background_jobs (kind, payload, idempotency_key, run_at, priority, max_attempts)
+  SELECT p_kind, COALESCE(p_payload, '{}'), p_idempotency_key, COALESCE(p_run_at, now()),
+         COALESCE(p_priority, 0), k.max_attempts
+  FROM background_job_kinds k
+  WHERE k.kind = p_kind
+  ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+  RETURNING id INTO v_id;
+
+  IF v_id IS NULL THEN
+    SELECT id INTO v_id FROM background_jobs WHERE idempotency_key = p_idempotency_key;
+    IF v_id IS NULL THEN
+      RAISE EXCEPTION 'Unknown job kind: %', p_kind;
+    END IF;
+  END IF;
+
+  RETURN v_id;
+END;
+$$;
+
+/*
+  Claim up to p_limit jobs across kinds. Each kind gets at most
+  min(batch_size, max_concurrency - running) jobs. Jobs whose lease expired
+  go back to 'queued' first.
+*/
+CREATE OR REPLACE FUNCTION public.claim_jobs(
+  p_worker text,
+  p_kinds text[] DEFAULT NULL,
+  p_limit int DEFAULT 20
+)
+RETURNS SETOF public.background_jobs
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_kind record;
+  v_slots int;
+  v_remaining int := GREATEST(p_limit, 1);
+BEGIN
+  -- Lease recovery: a worker died mid-job
+  UPDATE background_jobs j
+  SET status = 'queued',
+      locked_at = NULL,
+      locked_by = NULL,
+      last_error = COALESCE(j.last_error, 'lease expired'),
+      updated_at = now()
+  FROM background_job_kinds k
+  WHERE j.kind = k.kind
+    AND j.status = 'running'
+    AND j.locked_at < now() - make_interval(secs => k.lease_seconds);
+
+  FOR v_kind IN
+    SELECT k.kind, k.batch_size, k.max_concurrency,
+           (SELECT COUNT(*) FROM background_jobs r WHERE r.kind = k.kind AND r.status = 'running') AS running
+    FROM background_job_kinds k
+    WHERE p_kinds IS NULL OR k.kind = ANY (p_kinds)
+  LOOP
+    EXIT WHEN v_remaining <= 0;
+    v_slots := LEAST(v_kind.batch_size, v_kind.max_concurrency - v_kind.running, v_remaining);
+    CONTINUE WHEN v_slots <= 0;
+
+    RETURN QUERY
+    WITH ready AS (
+      SELECT id FROM background_jobs
+      WHERE kind = v_kind.kind
+        AND status = 'queued'
+        AND run_at <= now()
+      ORDER BY priority DESC, run_at
+      LIMIT v_slots
+      FOR UPDATE SKIP LOCKED
+    )
+    UPDATE background_jobs j
+    SET status = 'running',
+        attempts = j.attempts + 1,
+        locked_at = now(),
+        locked_by = p_worker,
+        updated_at = now()
+    FROM ready
+    WHERE j.id = ready.id
+    RETURNING j.*;
+
+    GET DIAGNOSTICS v_slots = ROW_COUNT;
+    v_remaining := v_remaining - v_slots;
+  END LOOP;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION public.complete_jobs(p_ids bigint[])
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  UPDATE background_jobs
+  SET status = 'succeeded',
+      completed_at = now(),
+      locked_at = NULL,
+      updated_at = now(),
+      last_error = NULL
+  WHERE id = ANY (p_ids)
+    AND status = 'running';
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$;
+
+-- Backoff: 15s * 2^(attempts-1), capped at 1h, +/-20% jitter
+CREATE OR REPLACE FUNCTION public.fail_job(p_id bigint, p_error text)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_status text;
+BEGIN
+  UPDATE background_jobs
+  SET status = CASE WHEN attempts >= max_attempts THEN 'dead' ELSE 'queued' END,
+      run_at = now() + make_interval(secs =>
+        LEAST(15 * power(2, GREATEST(attempts - 1, 0)), 3600) * (0.8 + random() * 0.4)),
+      last_error = left(p_error, 1000),
+      locked_at = NULL,
+      locked_by = NULL,
+      updated_at = now()
+  WHERE id = p_id
+    AND status = 'running'
+  RETURNING status INTO v_status;
+
+  RETURN v_status;
+END;
+$$;
+
+-- Keep 7 days of succeeded jobs, 30 days of dead ones
+CREATE OR REPLACE FUNCTION public.prune_background_jobs()
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  DELETE FROM background_jobs
+  WHERE (status = 'succeeded' AND completed_at < now() - interval '7 days')
+     OR (status = 'dead' AND updated_at < now() - interval '30 days');
+
+  GET DIAGNOSTICS v_rows = ROW_COUNT;
+  RETURN v_rows;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.enqueue_job(text, jsonb, text, timestamptz, smallint) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.claim_jobs(text, text[], int) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.complete_jobs(bigint[]) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.fail_job(bigint, text) FROM PUBLIC, anon, authenticated;
+REVOKE ALL ON FUNCTION public.prune_background_jobs() FROM PUBLIC, anon, authenticated;
+
+-- ========== PART 3: CHAT SESSION PRODUCERS ==========
+
+-- Users may request a summary for their own session (chat-summarize-session)
+CREATE OR REPLACE FUNCTION public.request_session_summary(p_session_id uuid)
+RETURNS bigint
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id uuid;
+BEGIN
+  SELECT user_id INTO v_user_id FROM chat_sessions WHERE id = p_session_id;
+
+  IF v_user_id IS NULL OR (auth.uid() IS NOT NULL AND v_user_id <> auth.uid()) THEN
+    RAISE EXCEPTION 'Session % not found', p_session_id;
+  END IF;
+
+  RETURN enqueue_job(
+    'summarize_session',
+    jsonb_build_object('session_id', p_session_id, 'user_id', v_user_id),
+    'summarize:' || p_session_id
+  );
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.request_session_summary(uuid) FROM PUBLIC, anon;
+GRANT EXECUTE ON FUNCTION public.request_session_summary(uuid) TO authenticated;
+
+-- Closing a session without a client summary queues one instead
+CREATE OR REPLACE FUNCTION close_chat_session(
+  p_session_id uuid,
+  p_summary text DEFAULT NULL
+)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_user_id uuid;
+  v_message_count int;
+BEGIN
+  -- Get session info
+  SELECT user_id INTO v_user_id
+  FROM chat_sessions
+  WHERE id = p_session_id;
+
+  IF v_user_id IS NULL THEN
+    RAISE EXCEPTION 'Session % not found', p_session_id;
+  END IF;
+
+  -- Count messages in session
+  SELECT COUNT(*) INTO v_message_count
+  FROM chat_messages
+  WHERE session_id = p_session_id;
+
+  -- Close the session
+  UPDATE chat_sessions
+  SET active = false,
+      ended_at = now()
+  WHERE id = p_session_id;
+
+  IF p_summary IS NOT NULL THEN
+    INSERT INTO chat_summaries (session_id, user_id, summary, message_count)
+    VALUES (p_session_id, v_user_id, p_summary, v_message_count);
+  ELSIF v_message_count > 0 THEN
+    PERFORM request_session_summary(p_session_id);
+  END IF;
+END;
+$$;
+
+/*
+  Close at most p_limit sessions whose owner just passed local midnight and
+  queue a summary for each. The midnight_rollover job calls this until it
+  returns less than p_limit, so each statement stays small.
+*/
+CREATE OR REPLACE FUNCTION public.rollover_sessions_batch(p_limit int DEFAULT 500)
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_rows integer;
+BEGIN
+  WITH due AS (
+    SELECT cs.id, cs.user_id
+    FROM chat_sessions cs
+    JOIN user_preferences up ON up.user_id = cs.user_id
+    WHERE cs.active = true
+      AND cs.session_type = 'user_chat'
+      AND EXTRACT(HOUR FROM (now() AT TIME ZONE COALESCE(up.timezone, 'UTC'))) = 0
+      AND EXTRACT(MINUTE FROM (now() AT TIME ZONE COALESCE(up.timezone, 'UTC'))) < 30
+    LIMIT GREATEST(p_limit, 1)
+    FOR UPDATE OF cs SKIP LOCKED
+  ),
+  closed AS (
+    UPDATE chat_sessions cs
+    SET active = false,
+        ended_at = now()
+    FROM due
+    WHERE cs.id = due.id
+    RETURNING cs.id, cs.user_id
+  ),
+  queued AS (
+    INSERT INTO background_jobs (kind, payload, idempotency_key, max_attempts)
+    SELECT 'summarize_session',
+           jsonb_build_object('session_id', c.id, 'user_id', c.user_id),
+           'summarize:' || c.id,
+           (SELECT max_attempts FROM background_job_kinds WHERE kind = 'summarize_session')
+    FROM closed c
+    ON CONFLICT (idempotency_key) WHERE idempotency_key IS NOT NULL DO NOTHING
+    RETURNING 1
+  )
+  SELECT COUNT(*) INTO v_rows FROM closed;
+
+  RETURN v_rows;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.rollover_sessions_batch(int) FROM PUBLIC, anon, authenticated;
+
+-- Rollover scans active user_chat sessions only
+CREATE INDEX IF NOT EXISTS chat_sessions_active_user_chat_idx
+  ON chat_sessions (user_id)
+  WHERE active = true AND session_type = 'user_chat';
+
+-- ========== PART 4: SCHEDULED PRODUCERS (pg_cron) ==========
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.unschedule(jobid) FROM cron.job
+    WHERE jobname IN ('enqueue-midnight-rollover', 'enqueue-telemetry-rollup', 'enqueue-compact-memories', 'prune-background-jobs');
+
+    -- Idempotency key per slot: a double cron fire enqueues once
+    PERFORM cron.schedule('enqueue-midnight-rollover', '*/30 * * * *',
+      $job$SELECT public.enqueue_job('midnight_rollover', '{}', 'rollover:' || to_char(date_trunc('hour', now()) + (floor(extract(minute FROM now()) / 30) * interval '30 minutes'), 'YYYY-MM-DD"T"HH24:MI'))$job$);
+    PERFORM cron.schedule('enqueue-telemetry-rollup', '*/10 * * * *',
+      $job$SELECT public.enqueue_job('rollup_telemetry', '{"hours": 2}', 'rollup:' || to_char(now(), 'YYYY-MM-DD"T"HH24:MI'))$job$);
+    PERFORM cron.schedule('enqueue-compact-memories', '7 * * * *',
+      $job$SELECT public.enqueue_job('compact_memories', '{}', 'compact-memories:' || to_char(now(), 'YYYY-MM-DD"T"HH24'))$job$);
+    PERFORM cron.schedule('prune-background-jobs', '17 3 * * *',
+      'SELECT public.prune_background_jobs()');
+
+    -- Memory compaction now runs through the queue
+    PERFORM cron.unschedule(jobid) FROM cron.job WHERE jobname = 'compact-expired-memories';
+  END IF;
+END $$;
@@ -0,0 +1,181 @@
+/*
+  # Idempotent batched meal logging for the client outbox
+
+  ## Problem
+  Every meal log was one round trip (log_meal RPC, or saveMeal's two inserts
+  plus a compensating delete) while the user waited. On flaky mobile links a
+  log either stalled or failed, and a retry after a lost response could write
+  the same meal twice.
+
+  ## Solution
+  The client now acknowledges logs locally and queues them in an IndexedDB
+  outbox (src/lib/meals/outbox.ts). This migration is the server side:
+  1. `meal_logs.client_id` - idempotency key generated on the device, unique
+     per user. A replayed meal resolves to the row written the first time.
+  2. `log_meals_batch(p_meals jsonb)` - writes N queued meals in one call.
+     Each meal runs in its own subtransaction, so one bad entry does not
+     roll back the rest. It returns one result per entry:
+       { client_id, status: 'created' | 'duplicate' | 'rejected',
+         meal_log_id, error }
+     'duplicate' means the key was already written and counts as success.
+     'rejected' is permanent (bad slot, bad numbers), so the client drops the
+     entry and reverts its optimistic totals. Only data errors (SQLSTATE
+     classes 22 and 23) are rejected; any other error fails the whole call,
+     which rolls the batch back and leaves it queued for retry. Replays are
+     safe because of client_id.
+
+  ## Payload
+  p_meals: [{ client_id, ts, meal_slot, note, items: [{ position, name,
+  quantity, unit, energy_kcal, protein_g, fat_g, carbs_g, fiber_g }] }]
+  Item values follow log_meal (numeric strings are accepted).
+
+  ## Notes
+  - Meals are written with auth.uid(), like log_meal. The day_totals triggers
+    broadcast a delta per created meal; duplicates write nothing, so nothing
+    is broadcast twice.
+  - log_meal is unchanged for callers that still log online-only.
+*/
+
+-- ========== PART 1: IDEMPOTENCY KEY ==========
+
+ALTER TABLE public.meal_logs
+  ADD COLUMN IF NOT EXISTS client_id uuid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_meal_logs_user_client_id
+  ON public.meal_logs (user_id, client_id)
+  WHERE client_id IS NOT NULL;
+
+-- ========== PART 2: BATCH RPC ==========
+
+CREATE OR REPLACE FUNCTION public.log_meals_batch(
+  p_meals jsonb
+) RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id   uuid := auth.uid();
+  v_meal      jsonb;
+  v_client_id uuid;
+  v_log_id    uuid;
+  v_meal_slot meal_slot_enum;
+  v_items     jsonb;
+  v_totals    jsonb;
+  v_results   jsonb := '[]'::jsonb;
+BEGIN
+  IF v_user_id IS NULL THEN
+    RAISE EXCEPTION 'log_meals_batch requires an authenticated user'
+      USING ERRCODE = '42501';
+  END IF;
+
+  IF jsonb_typeof(p_meals) IS DISTINCT FROM 'array' THEN
+    RAISE EXCEPTION 'p_meals must be a JSON array' USING ERRCODE = '22023';
+  END IF;
+
+  FOR v_meal IN SELECT * FROM jsonb_array_elements(p_meals)
+  LOOP
+    v_client_id := NULL;
+    v_log_id := NULL;
+
+    BEGIN
+      v_client_id := (v_meal->>'client_id')::uuid;
+      IF v_client_id IS NULL THEN
+        RAISE EXCEPTION 'client_id is required' USING ERRCODE = '22023';
+      END IF;
+
+      -- Replay of a meal that was already written (response lost in transit)
+      SELECT id INTO v_log_id
+      FROM meal_logs
+      WHERE user_id = v_user_id AND client_id = v_client_id;
+
+      IF v_log_id IS NOT NULL THEN
+        v_results := v_results || jsonb_build_object(
+          'client_id', v_client_id, 'status', 'duplicate', 'meal_log_id', v_log_id);
+        CONTINUE;
+      END IF;
+
+      v_items := coalesce(v_meal->'items', '[]'::jsonb);
+      IF jsonb_typeof(v_items) IS DISTINCT FROM 'array' OR jsonb_array_length(v_items) = 0 THEN
+        RAISE EXCEPTION 'meal has no items' USING ERRCODE = '22023';
+      END IF;
+
+      v_meal_slot := NULL;
+      IF coalesce(v_meal->>'meal_slot', '') != '' THEN
+        v_meal_slot := lower(trim(v_meal->>'meal_slot'))::meal_slot_enum;
+      END IF;
+
+      SELECT jsonb_build_object(
+        'kcal', coalesce(sum(nullif(item->>'energy_kcal', '')::numeric), 0),
+        'calories', coalesce(sum(nullif(item->>'energy_kcal', '')::numeric), 0),
+        'protein_g', coalesce(sum(nullif(item->>'protein_g', '')::numeric), 0),
+        'fat_g', coalesce(sum(nullif(item->>'fat_g', '')::numeric), 0),
+        'carbs_g', coalesce(sum(nullif(item->>'carbs_g', '')::numeric), 0),
+        'fiber_g', coalesce(sum(nullif(item->>'fiber_g', '')::numeric), 0)
+      )
+      INTO v_totals
+      FROM jsonb_array_elements(v_items) AS item;
+
+      INSERT INTO meal_logs (user_id, ts, meal_slot, note, totals, client_id)
+      VALUES (
+        v_user_id,
+        coalesce((v_meal->>'ts')::timestamptz, now()),
+        v_meal_slot,
+        nullif(v_meal->>'note', ''),
+        v_totals,
+        v_client_id
+      )
+      RETURNING id INTO v_log_id;
+
+      INSERT INTO meal_items (
+        meal_log_id, position, name, quantity, unit,
+        energy_kcal, protein_g, fat_g, carbs_g, fiber_g
+      )
+      SELECT
+        v_log_id,
+        coalesce((i->>'position')::int, row_number() over()),
+        i->>'name',
+        coalesce(nullif(i->>'quantity', '')::numeric, 1),
+        i->>'unit',
+        coalesce(nullif(i->>'energy_kcal', '')::numeric, 0),
+        coalesce(nullif(i->>'protein_g', '')::numeric, 0),
+        coalesce(nullif(i->>'fat_g', '')::numeric, 0),
+        coalesce(nullif(i->>'carbs_g', '')::numeric, 0),
+        coalesce(nullif(i->>'fiber_g', '')::numeric, 0)
+      FROM jsonb_array_elements(v_items) AS i;
+
+      v_results := v_results || jsonb_build_object(
+        'client_id', v_client_id, 'status', 'created', 'meal_log_id', v_log_id);
+
+    EXCEPTION
+      WHEN unique_violation THEN
+        -- A concurrent flush of the same entry won the insert
+        SELECT id INTO v_log_id
+        FROM meal_logs
+        WHERE user_id = v_user_id AND client_id = v_client_id;
+
+        v_results := v_results || jsonb_build_object(
+          'client_id', v_client_id,
+          'status', CASE WHEN v_log_id IS NULL THEN 'rejected' ELSE 'duplicate' END,
+          'meal_log_id', v_log_id,
+          'error', CASE WHEN v_log_id IS NULL THEN SQLERRM END);
+      WHEN OTHERS THEN
+        -- Only bad data is permanent (class 22 data exception, class 23
+        -- constraint violation). Serialization failures, deadlocks, lock
+        -- timeouts etc. abort the call so the client retries the batch.
+        IF left(SQLSTATE, 2) NOT IN ('22', '23') THEN
+          RAISE;
+        END IF;
+        v_results := v_results || jsonb_build_object(
+          'client_id', coalesce(v_client_id::text, v_meal->>'client_id'),
+          'status', 'rejected',
+          'error', SQLERRM);
+    END;
+  END LOOP;
+
+  RETURN v_results;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.log_meals_batch(jsonb) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.log_meals_batch(jsonb) TO authenticated;
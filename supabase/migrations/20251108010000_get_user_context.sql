@@ -0,0 +1,71 @@
+/*
+  # One-round-trip user context for nutrition / TMWYA requests
+
+  ## Problem
+  Resolving one meal read the same user rows over and over:
+  - brandMap and generic providers: user_preferences.country_code per item
+  - runTMWYAPipeline: allowed_roles() per invocation
+  - computeTDEE: user_metrics, then user_profiles
+  - getFeatureFlags: user_preferences again (plus profiles via isAdmin)
+  A five-item meal issued 10+ identical reads.
+
+  ## Solution
+  `get_user_context()` returns everything those callers need in one JSON
+  document for auth.uid():
+    { user_id, profile, preferences, metrics, allowed_roles, is_admin, is_beta }
+  profile / preferences / metrics are whole rows (to_jsonb), or null when the
+  user has none yet. allowed_roles and is_admin use the same rules as
+  allowed_roles() and src/lib/auth/isAdmin.ts.
+
+  The client caches the result per user for a few seconds and threads it
+  through the request (src/lib/userContext.ts).
+*/
+
+CREATE OR REPLACE FUNCTION public.get_user_context()
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id uuid := auth.uid();
+  v_jwt     jsonb := auth.jwt();
+  v_role    text;
+  v_is_beta boolean;
+BEGIN
+  IF v_user_id IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT role, beta_user INTO v_role, v_is_beta
+  FROM profiles
+  WHERE user_id = v_user_id;
+
+  RETURN jsonb_build_object(
+    'user_id', v_user_id,
+    'profile', (SELECT to_jsonb(up) FROM user_profiles up WHERE up.user_id = v_user_id LIMIT 1),
+    'preferences', (SELECT to_jsonb(pr) FROM user_preferences pr WHERE pr.user_id = v_user_id LIMIT 1),
+    'metrics', (SELECT to_jsonb(um) FROM user_metrics um WHERE um.user_id = v_user_id LIMIT 1),
+    'allowed_roles', coalesce((
+      SELECT jsonb_agg(ra.role_name ORDER BY ra.role_name)
+      FROM role_access ra
+      WHERE ra.enabled = true
+        AND (
+          ra.stage = 'public'
+          OR (ra.stage = 'beta' AND coalesce(v_is_beta, false))
+          OR (ra.stage = 'admin' AND v_role = 'admin')
+        )
+    ), '[]'::jsonb),
+    'is_admin', (
+      coalesce(v_role = 'admin', false)
+      OR coalesce(v_jwt->'app_metadata'->'roles' ? 'admin', false)
+      OR coalesce(v_jwt->>'email' = 'info@hipat.app', false)
+    ),
+    'is_beta', coalesce(v_is_beta, false)
+  );
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.get_user_context() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.get_user_context() TO authenticated;
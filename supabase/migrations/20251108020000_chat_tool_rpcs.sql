@@ -0,0 +1,109 @@
+/*
+  # Single-round-trip RPCs for chat tools
+
+  ## Problem
+  The chat tool executor (supabase/functions/_shared/tools/executor.ts)
+  issued sequential queries per tool call:
+  - get_remaining_macros: user_metrics, then day_rollups
+  - undo_last_meal: select the latest meal_logs row, then delete it
+  Each tool paid two round trips before the model could continue, and the
+  select-then-delete pair could race a concurrent log.
+
+  ## Solution
+  1. `tool_remaining_macros(p_user_id, p_day)` - targets, consumed and
+     remaining for one day in a single query. `has_targets` is false when
+     the user has no user_metrics row (TDEE onboarding not done).
+  2. `tool_undo_last_meal(p_user_id)` - deletes the user's most recent meal
+     in one statement and returns { deleted_meal_id, deleted_at }, or null
+     when there is nothing to undo. Items cascade as before.
+
+  ## Notes
+  - The executor runs with the service role and passes the user id it
+    resolved from the request, so both functions take p_user_id and are
+    only executable by service_role.
+  - Column names match what the tools read before this change.
+*/
+
+CREATE OR REPLACE FUNCTION public.tool_remaining_macros(p_user_id uuid, p_day date)
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH targets AS (
+    SELECT calorie_target, protein_g_target, carbs_g_target, fat_g_target, fiber_g_target
+    FROM user_metrics
+    WHERE user_id = p_user_id
+    LIMIT 1
+  ),
+  consumed AS (
+    SELECT
+      coalesce(max(total_kcal), 0)      AS kcal,
+      coalesce(max(total_protein_g), 0) AS protein_g,
+      coalesce(max(total_carbs_g), 0)   AS carbs_g,
+      coalesce(max(total_fat_g), 0)     AS fat_g,
+      coalesce(max(total_fiber_g), 0)   AS fiber_g
+    FROM day_rollups
+    WHERE user_id = p_user_id
+      AND day_date = p_day
+  )
+  SELECT jsonb_build_object(
+    'has_targets', EXISTS (SELECT 1 FROM targets),
+    'targets', (
+      SELECT jsonb_build_object(
+        'kcal', t.calorie_target,
+        'protein_g', t.protein_g_target,
+        'carbs_g', t.carbs_g_target,
+        'fat_g', t.fat_g_target,
+        'fiber_g', t.fiber_g_target
+      ) FROM targets t
+    ),
+    'consumed', (
+      SELECT jsonb_build_object(
+        'kcal', c.kcal,
+        'protein_g', c.protein_g,
+        'carbs_g', c.carbs_g,
+        'fat_g', c.fat_g,
+        'fiber_g', c.fiber_g
+      ) FROM consumed c
+    ),
+    'remaining', (
+      SELECT jsonb_build_object(
+        'kcal', t.calorie_target - c.kcal,
+        'protein_g', t.protein_g_target - c.protein_g,
+        'carbs_g', t.carbs_g_target - c.carbs_g,
+        'fat_g', t.fat_g_target - c.fat_g,
+        'fiber_g', t.fiber_g_target - c.fiber_g
+      ) FROM targets t, consumed c
+    )
+  );
+$$;
+
+CREATE OR REPLACE FUNCTION public.tool_undo_last_meal(p_user_id uuid)
+RETURNS jsonb
+LANGUAGE sql
+VOLATILE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  WITH deleted AS (
+    DELETE FROM meal_logs
+    WHERE id = (
+      SELECT id
+      FROM meal_logs
+      WHERE user_id = p_user_id
+      ORDER BY ts DESC
+      LIMIT 1
+      FOR UPDATE
+    )
+    RETURNING id, ts
+  )
+  SELECT jsonb_build_object('deleted_meal_id', d.id, 'deleted_at', d.ts)
+  FROM deleted d;
+$$;
+
+REVOKE ALL ON FUNCTION public.tool_remaining_macros(uuid, date) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.tool_undo_last_meal(uuid) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.tool_remaining_macros(uuid, date) TO service_role;
+GRANT EXECUTE ON FUNCTION public.tool_undo_last_meal(uuid) TO service_role;
@@ -0,0 +1,62 @@
+/*
+  # Shared cache for ama-web search results and answers
+
+  ## Problem
+  Every ama-web call ran a Google Custom Search request and a Gemini
+  synthesis (gemini-2.5-pro for detailed answers), even though the same
+  research questions repeat within their recency window. Repeats paid full
+  search spend and several seconds of latency.
+
+  ## Solution
+  ama-web keeps a two-level stale-while-revalidate cache
+  (supabase/functions/ama-web/cache.ts): a per-isolate Map in front of this
+  table. Two kinds of entries share it:
+  - `search:<query hash>:d<recency bucket>:n<count>` - CSE results
+  - `answer:<query hash>:<detail>:<source-set hash>` - synthesized text
+  Rows are fresh until `fresh_until`, served stale (while ama-web refreshes
+  them in the background) until `stale_until`, then ignored.
+
+  ## Notes
+  - Only the service role reads or writes the table (RLS on, no policies).
+  - prune_ama_web_cache() deletes rows past stale_until; it runs hourly
+    when pg_cron is installed.
+*/
+
+CREATE TABLE IF NOT EXISTS public.ama_web_cache (
+  key text PRIMARY KEY,
+  payload jsonb NOT NULL,
+  fresh_until timestamptz NOT NULL,
+  stale_until timestamptz NOT NULL,
+  created_at timestamptz NOT NULL DEFAULT now(),
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.ama_web_cache ENABLE ROW LEVEL SECURITY;
+
+CREATE INDEX IF NOT EXISTS ama_web_cache_stale_until_idx ON public.ama_web_cache(stale_until);
+
+CREATE OR REPLACE FUNCTION public.prune_ama_web_cache()
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_deleted integer;
+BEGIN
+  DELETE FROM ama_web_cache WHERE stale_until < now();
+  GET DIAGNOSTICS v_deleted = ROW_COUNT;
+  RETURN v_deleted;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.prune_ama_web_cache() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.prune_ama_web_cache() TO service_role;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.unschedule(jobid) FROM cron.job WHERE jobname = 'prune-ama-web-cache';
+    PERFORM cron.schedule('prune-ama-web-cache', '41 * * * *', 'SELECT public.prune_ama_web_cache()');
+  END IF;
+END $$;
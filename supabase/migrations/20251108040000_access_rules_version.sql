@@ -0,0 +1,147 @@
+/*
+  # Versioned access rules: role_access + feature flag configs
+
+  ## Problem
+  Role and flag checks sat on the request path with fresh reads:
+  - hasRoleAccess / getAllowedRoles called allowed_roles() for every check
+  - getFeatureFlags read user_preferences (plus profiles via isAdmin)
+  - featureFlags.v2 only had hard-coded configs, so turning a flag on
+    needed a deploy
+  The rules themselves change a few times a month.
+
+  ## Solution
+  1. `feature_flag_configs` holds flag rollout settings. The table is sparse:
+     a flag without a row keeps its default from src/lib/featureFlags.v2.ts.
+  2. `access_rules_version` is a single row whose `version` is bumped by
+     statement triggers on role_access and feature_flag_configs. Each bump
+     also broadcasts `{ version }` on the public realtime topic
+     `access_rules`.
+  3. `access_rules()` returns every rule in one JSON document:
+       { version, roles: [{ role_name, stage, enabled }], flags: [...] }
+     `access_rules_version()` returns just the number, for a cheap poll.
+
+  The client compiles the document into in-memory lookup tables
+  (src/lib/accessRules.ts). It evaluates checks with no I/O and re-fetches
+  only when the version moves.
+
+  ## Notes
+  - Who a user is (admin / beta) still comes from get_user_context; only
+    the rules are compiled.
+  - A failed broadcast never blocks a rule write; clients also poll.
+*/
+
+CREATE TABLE IF NOT EXISTS public.feature_flag_configs (
+  flag text PRIMARY KEY,
+  enabled boolean NOT NULL DEFAULT false,
+  rollout_percentage integer CHECK (rollout_percentage BETWEEN 0 AND 100),
+  allowed_roles text[],
+  allowed_users uuid[],
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.feature_flag_configs ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Anyone can read feature flag configs" ON public.feature_flag_configs;
+CREATE POLICY "Anyone can read feature flag configs"
+  ON public.feature_flag_configs FOR SELECT
+  TO authenticated
+  USING (true);
+
+DROP POLICY IF EXISTS "Only admins can modify feature flag configs" ON public.feature_flag_configs;
+CREATE POLICY "Only admins can modify feature flag configs"
+  ON public.feature_flag_configs FOR ALL
+  TO authenticated
+  USING ((SELECT role FROM public.profiles WHERE user_id = auth.uid()) = 'admin')
+  WITH CHECK ((SELECT role FROM public.profiles WHERE user_id = auth.uid()) = 'admin');
+
+CREATE TABLE IF NOT EXISTS public.access_rules_version (
+  id boolean PRIMARY KEY DEFAULT true CHECK (id),
+  version bigint NOT NULL DEFAULT 1,
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.access_rules_version ENABLE ROW LEVEL SECURITY;
+
+INSERT INTO public.access_rules_version (id) VALUES (true) ON CONFLICT (id) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION public.bump_access_rules_version()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_version bigint;
+BEGIN
+  UPDATE access_rules_version
+  SET version = version + 1, updated_at = now()
+  WHERE id
+  RETURNING version INTO v_version;
+
+  BEGIN
+    PERFORM realtime.send(jsonb_build_object('version', v_version), 'version', 'access_rules', false);
+  EXCEPTION WHEN OTHERS THEN
+    -- Never block a rule write because realtime is unavailable
+    RAISE WARNING 'access_rules broadcast failed: %', SQLERRM;
+  END;
+
+  RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS role_access_bump_version ON public.role_access;
+CREATE TRIGGER role_access_bump_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.role_access
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.bump_access_rules_version();
+
+DROP TRIGGER IF EXISTS feature_flag_configs_bump_version ON public.feature_flag_configs;
+CREATE TRIGGER feature_flag_configs_bump_version
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON public.feature_flag_configs
+  FOR EACH STATEMENT
+  EXECUTE FUNCTION public.bump_access_rules_version();
+
+CREATE OR REPLACE FUNCTION public.access_rules_version()
+RETURNS bigint
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT version FROM access_rules_version WHERE id;
+$$;
+
+CREATE OR REPLACE FUNCTION public.access_rules()
+RETURNS jsonb
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT jsonb_build_object(
+    'version', (SELECT version FROM access_rules_version WHERE id),
+    'roles', coalesce((
+      SELECT jsonb_agg(jsonb_build_object(
+        'role_name', ra.role_name,
+        'stage', ra.stage,
+        'enabled', ra.enabled
+      ) ORDER BY ra.role_name)
+      FROM role_access ra
+    ), '[]'::jsonb),
+    'flags', coalesce((
+      SELECT jsonb_agg(jsonb_build_object(
+        'flag', f.flag,
+        'enabled', f.enabled,
+        'rollout_percentage', f.rollout_percentage,
+        'allowed_roles', f.allowed_roles,
+        'allowed_users', f.allowed_users
+      ) ORDER BY f.flag)
+      FROM feature_flag_configs f
+    ), '[]'::jsonb)
+  );
+$$;
+
+REVOKE ALL ON FUNCTION public.access_rules_version() FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.access_rules() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.access_rules_version() TO authenticated;
+GRANT EXECUTE ON FUNCTION public.access_rules() TO authenticated;
@@ -0,0 +1,296 @@
+/*
+  # Credit reservations and batched usage settlement
+
+  ## Problem
+  Every billable call paid a synchronous spend_credits() round trip, and
+  src/lib/credits/spendHook.ts read v_user_credits before and after it. A
+  chat turn that charged several LLM calls blocked on several billing
+  round trips. Money columns were numeric(10,2), so per-call LLM costs
+  (fractions of a cent) rounded to zero.
+
+  ## Solution
+  The client meter (src/lib/credits/meter.ts) works in three steps:
+  1. `reserve_credits(id, session, amount)` places a hold on part of the
+     balance: min(amount, balance minus other open holds). Insufficient
+     credits fail here, before any usage.
+  2. Charges are recorded locally against the hold with no I/O. The meter
+     refuses any charge the hold cannot cover, so nobody can spend past
+     their balance.
+  3. `settle_credit_usage(id, entries, close)` applies a batch of
+     `{ key, amount_usd, reason, at }`. Each entry becomes one
+     token_transactions row keyed by its client-generated idempotency key,
+     so a retried batch never double-charges. Only newly inserted rows move
+     the balance.
+  `reconcile_credit_usage(keys)` reports which ledger keys token_transactions
+  already holds, so a client that lost a settle response can drop them.
+
+  ## Notes
+  - Holds expire after `expires_at` (2 hours). expire_credit_reservations()
+    runs every 10 minutes when pg_cron is installed. Usage recorded before
+    expiry can still be settled against an expired hold.
+  - Unlimited plans get their holds granted in full and are never
+    deducted, matching spend_credits().
+  - spend_credits() / add_credits() keep working for one-off charges.
+*/
+
+-- ========== PART 1: PRECISION ==========
+
+DROP VIEW IF EXISTS public.v_user_credits;
+
+ALTER TABLE public.token_wallets ALTER COLUMN balance_usd TYPE numeric(12,6);
+ALTER TABLE public.token_transactions ALTER COLUMN delta_usd TYPE numeric(12,6);
+
+CREATE VIEW public.v_user_credits AS
+SELECT
+  w.user_id,
+  w.plan,
+  (w.plan = 'unlimited') AS is_unlimited,
+  w.balance_usd,
+  COALESCE((
+    SELECT SUM(delta_usd)
+    FROM public.token_transactions t
+    WHERE t.user_id = w.user_id
+      AND date_trunc('month', t.created_at) = date_trunc('month', now())
+  ), 0) AS month_delta_usd
+FROM public.token_wallets w;
+
+-- ========== PART 2: TABLES ==========
+
+CREATE TABLE IF NOT EXISTS public.credit_reservations (
+  id uuid PRIMARY KEY,
+  user_id uuid NOT NULL REFERENCES auth.users(id) ON DELETE CASCADE,
+  session_id text,
+  reserved_usd numeric(12,6) NOT NULL CHECK (reserved_usd >= 0),
+  spent_usd numeric(12,6) NOT NULL DEFAULT 0,
+  status text NOT NULL DEFAULT 'open' CHECK (status IN ('open', 'settled', 'expired')),
+  created_at timestamptz NOT NULL DEFAULT now(),
+  expires_at timestamptz NOT NULL DEFAULT now() + interval '2 hours',
+  updated_at timestamptz NOT NULL DEFAULT now()
+);
+
+ALTER TABLE public.credit_reservations ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can view own credit reservations" ON public.credit_reservations;
+CREATE POLICY "Users can view own credit reservations"
+  ON public.credit_reservations FOR SELECT
+  TO authenticated
+  USING (auth.uid() = user_id);
+
+CREATE INDEX IF NOT EXISTS idx_credit_reservations_user_open
+  ON public.credit_reservations(user_id)
+  WHERE status = 'open';
+
+ALTER TABLE public.token_transactions
+  ADD COLUMN IF NOT EXISTS idempotency_key text,
+  ADD COLUMN IF NOT EXISTS reservation_id uuid REFERENCES public.credit_reservations(id) ON DELETE SET NULL;
+
+CREATE UNIQUE INDEX IF NOT EXISTS token_transactions_idempotency_key_key
+  ON public.token_transactions(idempotency_key);
+
+-- ========== PART 3: RESERVE ==========
+
+CREATE OR REPLACE FUNCTION public.reserve_credits(
+  p_reservation_id uuid,
+  p_session_id text,
+  p_amount_usd numeric
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user uuid := auth.uid();
+  v_bal numeric;
+  v_plan text;
+  v_held numeric;
+  v_granted numeric;
+  v_existing credit_reservations%ROWTYPE;
+BEGIN
+  IF v_user IS NULL THEN
+    RAISE EXCEPTION 'Not authenticated';
+  END IF;
+  IF p_amount_usd IS NULL OR p_amount_usd <= 0 THEN
+    RAISE EXCEPTION 'Reservation amount must be positive';
+  END IF;
+
+  SELECT plan, balance_usd INTO v_plan, v_bal
+  FROM token_wallets
+  WHERE user_id = v_user
+  FOR UPDATE;
+
+  -- Retried call: return the hold made the first time
+  SELECT * INTO v_existing FROM credit_reservations WHERE id = p_reservation_id AND user_id = v_user;
+  IF FOUND THEN
+    RETURN jsonb_build_object(
+      'reservation_id', v_existing.id,
+      'granted_usd', v_existing.reserved_usd,
+      'balance_usd', COALESCE(v_bal, 0),
+      'unlimited', v_plan = 'unlimited',
+      'expires_at', v_existing.expires_at
+    );
+  END IF;
+
+  IF v_plan = 'unlimited' THEN
+    v_granted := p_amount_usd;
+  ELSE
+    SELECT COALESCE(SUM(GREATEST(reserved_usd - spent_usd, 0)), 0) INTO v_held
+    FROM credit_reservations
+    WHERE user_id = v_user AND status = 'open' AND expires_at > now();
+
+    v_granted := LEAST(p_amount_usd, COALESCE(v_bal, 0) - v_held);
+    IF v_granted <= 0 THEN
+      RAISE EXCEPTION 'Insufficient credits';
+    END IF;
+  END IF;
+
+  INSERT INTO credit_reservations (id, user_id, session_id, reserved_usd)
+  VALUES (p_reservation_id, v_user, p_session_id, v_granted)
+  RETURNING * INTO v_existing;
+
+  RETURN jsonb_build_object(
+    'reservation_id', v_existing.id,
+    'granted_usd', v_granted,
+    'balance_usd', COALESCE(v_bal, 0),
+    'unlimited', COALESCE(v_plan = 'unlimited', false),
+    'expires_at', v_existing.expires_at
+  );
+END;
+$$;
+
+-- ========== PART 4: SETTLE ==========
+
+CREATE OR REPLACE FUNCTION public.settle_credit_usage(
+  p_reservation_id uuid,
+  p_entries jsonb,
+  p_close boolean DEFAULT false
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user uuid := auth.uid();
+  v_plan text;
+  v_bal numeric;
+  v_entry jsonb;
+  v_amount numeric;
+  v_applied text[] := '{}';
+  v_duplicates text[] := '{}';
+  v_total numeric := 0;
+  v_inserted int;
+BEGIN
+  IF v_user IS NULL THEN
+    RAISE EXCEPTION 'Not authenticated';
+  END IF;
+  IF NOT EXISTS (SELECT 1 FROM credit_reservations WHERE id = p_reservation_id AND user_id = v_user) THEN
+    RAISE EXCEPTION 'Unknown reservation';
+  END IF;
+
+  SELECT plan, balance_usd INTO v_plan, v_bal
+  FROM token_wallets
+  WHERE user_id = v_user
+  FOR UPDATE;
+
+  FOR v_entry IN SELECT * FROM jsonb_array_elements(COALESCE(p_entries, '[]'::jsonb))
+  LOOP
+    v_amount := GREATEST((v_entry->>'amount_usd')::numeric, 0);
+
+    IF v_plan = 'unlimited' THEN
+      -- Unlimited plans are never deducted (same as spend_credits)
+      v_applied := v_applied || (v_entry->>'key');
+      CONTINUE;
+    END IF;
+
+    INSERT INTO token_transactions (user_id, delta_usd, reason, idempotency_key, reservation_id, created_at)
+    VALUES (
+      v_user,
+      -v_amount,
+      COALESCE(v_entry->>'reason', 'spend'),
+      v_entry->>'key',
+      p_reservation_id,
+      COALESCE((v_entry->>'at')::timestamptz, now())
+    )
+    ON CONFLICT (idempotency_key) DO NOTHING;
+    GET DIAGNOSTICS v_inserted = ROW_COUNT;
+
+    IF v_inserted = 1 THEN
+      v_applied := v_applied || (v_entry->>'key');
+      v_total := v_total + v_amount;
+    ELSE
+      v_duplicates := v_duplicates || (v_entry->>'key');
+    END IF;
+  END LOOP;
+
+  IF v_total > 0 THEN
+    UPDATE token_wallets
+    SET balance_usd = balance_usd - v_total,
+        updated_at = now()
+    WHERE user_id = v_user
+    RETURNING balance_usd INTO v_bal;
+  END IF;
+
+  UPDATE credit_reservations
+  SET spent_usd = spent_usd + v_total,
+      status = CASE WHEN p_close AND status = 'open' THEN 'settled' ELSE status END,
+      updated_at = now()
+  WHERE id = p_reservation_id;
+
+  RETURN jsonb_build_object(
+    'applied', to_jsonb(v_applied),
+    'duplicates', to_jsonb(v_duplicates),
+    'settled_usd', v_total,
+    'balance_usd', COALESCE(v_bal, 0)
+  );
+END;
+$$;
+
+-- ========== PART 5: RECONCILE / EXPIRE ==========
+
+CREATE OR REPLACE FUNCTION public.reconcile_credit_usage(p_keys text[])
+RETURNS text[]
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+  SELECT COALESCE(array_agg(idempotency_key), '{}')
+  FROM token_transactions
+  WHERE user_id = auth.uid()
+    AND idempotency_key = ANY(p_keys);
+$$;
+
+CREATE OR REPLACE FUNCTION public.expire_credit_reservations()
+RETURNS integer
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_expired integer;
+BEGIN
+  UPDATE credit_reservations
+  SET status = 'expired', updated_at = now()
+  WHERE status = 'open' AND expires_at <= now();
+  GET DIAGNOSTICS v_expired = ROW_COUNT;
+  RETURN v_expired;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.reserve_credits(uuid, text, numeric) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.settle_credit_usage(uuid, jsonb, boolean) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.reconcile_credit_usage(text[]) FROM PUBLIC;
+REVOKE ALL ON FUNCTION public.expire_credit_reservations() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.reserve_credits(uuid, text, numeric) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.settle_credit_usage(uuid, jsonb, boolean) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.reconcile_credit_usage(text[]) TO authenticated;
+GRANT EXECUTE ON FUNCTION public.expire_credit_reservations() TO service_role;
+
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_cron') THEN
+    PERFORM cron.unschedule(jobid) FROM cron.job WHERE jobname = 'expire-credit-reservations';
+    PERFORM cron.schedule('expire-credit-reservations', '*/10 * * * *', 'SELECT public.expire_credit_reservations()');
+  END IF;
+END $$;
@@ -0,0 +1,46 @@
+/*
+  # Prompt-cache telemetry
+
+  ## Problem
+  System prompts mixed per-user and per-turn text into the swarm prompt,
+  so provider-side prompt caching (OpenAI cached input tokens, Gemini
+  implicit caching) rarely hit. Nothing recorded how often it did.
+
+  ## Solution
+  Prompts are now assembled as a stable persona/rules prefix followed by
+  user and turn context (supabase/functions/_shared/promptAssembly.ts).
+  Edge functions record two new fields:
+  1. `telemetry_events.tokens_cached`: input tokens the provider served from
+     its cache. OpenAI reports these as usage.prompt_tokens_details.cached_tokens,
+     Gemini as usageMetadata.cachedContentTokenCount.
+  2. `telemetry_events.prompt_prefix_hash`: hash of the stable prefix, so
+     hit rates can be grouped per prompt version.
+  `v_prompt_cache_24h` gives the cached share of input tokens per source,
+  model and prefix.
+
+  ## Notes
+  - Rows from before this migration have NULL tokens_cached and are left
+    out of the view.
+  - A prefix whose hit rate stays near zero usually has something varying
+    early in it. OpenAI only caches prompts of 1024+ tokens.
+*/
+
+ALTER TABLE public.telemetry_events
+  ADD COLUMN IF NOT EXISTS tokens_cached integer,
+  ADD COLUMN IF NOT EXISTS prompt_prefix_hash text;
+
+CREATE OR REPLACE VIEW public.v_prompt_cache_24h
+WITH (security_invoker = true) AS
+SELECT
+  source,
+  llm_model,
+  prompt_prefix_hash,
+  COUNT(*)::int AS calls,
+  SUM(tokens_in)::bigint AS tokens_in,
+  SUM(tokens_cached)::bigint AS tokens_cached,
+  ROUND(SUM(tokens_cached)::numeric / NULLIF(SUM(tokens_in), 0), 4) AS cached_share
+FROM telemetry_events
+WHERE ts >= now() - interval '24 hours'
+  AND tokens_cached IS NOT NULL
+GROUP BY source, llm_model, prompt_prefix_hash
+ORDER BY source, llm_model, calls DESC;
@@ -0,0 +1,80 @@
+/*
+  # Persona fields in get_user_context
+
+  ## Problem
+  Every chat turn read profiles, user_metrics and user_preferences for Pat's
+  persona (patSystem.loadUserContext), then handleUserMessage loaded the same
+  metrics / preferences again through get_user_context. The persona also
+  needs three profiles columns that get_user_context did not return.
+
+  ## Solution
+  `get_user_context()` adds
+    account: { name, has_completed_tdee, chat_count }
+  from the same profiles row it already reads for role / beta_user. The
+  persona context is now built from the request's user context
+  (src/core/personality/patSystem.ts personaContextFrom), so a turn costs
+  one round trip for both.
+
+  ## Notes
+  - account is null when the user has no profiles row yet.
+  - Everything else in the document is unchanged.
+*/
+
+CREATE OR REPLACE FUNCTION public.get_user_context()
+RETURNS jsonb
+LANGUAGE plpgsql
+STABLE
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_user_id uuid := auth.uid();
+  v_jwt     jsonb := auth.jwt();
+  v_role    text;
+  v_is_beta boolean;
+  v_account jsonb;
+BEGIN
+  IF v_user_id IS NULL THEN
+    RETURN NULL;
+  END IF;
+
+  SELECT
+    role,
+    beta_user,
+    jsonb_build_object(
+      'name', name,
+      'has_completed_tdee', has_completed_tdee,
+      'chat_count', chat_count
+    )
+  INTO v_role, v_is_beta, v_account
+  FROM profiles
+  WHERE user_id = v_user_id;
+
+  RETURN jsonb_build_object(
+    'user_id', v_user_id,
+    'profile', (SELECT to_jsonb(up) FROM user_profiles up WHERE up.user_id = v_user_id LIMIT 1),
+    'preferences', (SELECT to_jsonb(pr) FROM user_preferences pr WHERE pr.user_id = v_user_id LIMIT 1),
+    'metrics', (SELECT to_jsonb(um) FROM user_metrics um WHERE um.user_id = v_user_id LIMIT 1),
+    'account', v_account,
+    'allowed_roles', coalesce((
+      SELECT jsonb_agg(ra.role_name ORDER BY ra.role_name)
+      FROM role_access ra
+      WHERE ra.enabled = true
+        AND (
+          ra.stage = 'public'
+          OR (ra.stage = 'beta' AND coalesce(v_is_beta, false))
+          OR (ra.stage = 'admin' AND v_role = 'admin')
+        )
+    ), '[]'::jsonb),
+    'is_admin', (
+      coalesce(v_role = 'admin', false)
+      OR coalesce(v_jwt->'app_metadata'->'roles' ? 'admin', false)
+      OR coalesce(v_jwt->>'email' = 'info@hipat.app', false)
+    ),
+    'is_beta', coalesce(v_is_beta, false)
+  );
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.get_user_context() FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.get_user_context() TO authenticated;
@@ -0,0 +1,82 @@
+/*
+  # tool_log_meal: log_meal for the chat tool executor
+
+  ## Problem
+  The chat tool executor (supabase/functions/_shared/tools/executor.ts) runs
+  with the service role and called log_meal, which takes the user from
+  auth.uid(). Under the service role auth.uid() is NULL, so the log_meal
+  tool could not write a meal for the user.
+
+  ## Solution
+  `tool_log_meal(p_user_id, p_ts, p_meal_slot_text, p_note, p_items)` is
+  log_meal with the user passed in, like tool_remaining_macros and
+  tool_undo_last_meal (20251108020000_chat_tool_rpcs.sql). The executor
+  passes the user id openai-chat verified from the request's JWT.
+
+  ## Notes
+  - Only executable by service_role; clients keep calling log_meal.
+  - Same slot casting, totals and item conversions as log_meal.
+*/
+
+CREATE OR REPLACE FUNCTION public.tool_log_meal(
+  p_user_id        uuid,
+  p_ts             timestamptz,
+  p_meal_slot_text text DEFAULT NULL,
+  p_note           text DEFAULT NULL,
+  p_items          jsonb DEFAULT '[]'::jsonb
+) RETURNS uuid
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+DECLARE
+  v_log_id    uuid;
+  v_meal_slot meal_slot_enum := NULL;
+  v_totals    jsonb;
+BEGIN
+  IF p_user_id IS NULL THEN
+    RAISE EXCEPTION 'tool_log_meal requires a user id' USING ERRCODE = '22023';
+  END IF;
+
+  IF p_meal_slot_text IS NOT NULL AND p_meal_slot_text != '' THEN
+    v_meal_slot := lower(trim(p_meal_slot_text))::meal_slot_enum;
+  END IF;
+
+  SELECT jsonb_build_object(
+    'kcal', coalesce(sum(nullif(item->>'energy_kcal', '')::numeric), 0),
+    'calories', coalesce(sum(nullif(item->>'energy_kcal', '')::numeric), 0),
+    'protein_g', coalesce(sum(nullif(item->>'protein_g', '')::numeric), 0),
+    'fat_g', coalesce(sum(nullif(item->>'fat_g', '')::numeric), 0),
+    'carbs_g', coalesce(sum(nullif(item->>'carbs_g', '')::numeric), 0),
+    'fiber_g', coalesce(sum(nullif(item->>'fiber_g', '')::numeric), 0)
+  )
+  INTO v_totals
+  FROM jsonb_array_elements(p_items) AS item;
+
+  INSERT INTO meal_logs (user_id, ts, meal_slot, note, totals)
+  VALUES (p_user_id, coalesce(p_ts, now()), v_meal_slot, p_note, v_totals)
+  RETURNING id INTO v_log_id;
+
+  INSERT INTO meal_items (
+    meal_log_id, position, name, quantity, unit,
+    energy_kcal, protein_g, fat_g, carbs_g, fiber_g
+  )
+  SELECT
+    v_log_id,
+    coalesce((i->>'position')::int, row_number() over()),
+    i->>'name',
+    coalesce(nullif(i->>'quantity', '')::numeric, 1),
+    i->>'unit',
+    coalesce(nullif(i->>'energy_kcal', '')::numeric, 0),
+    coalesce(nullif(i->>'protein_g', '')::numeric, 0),
+    coalesce(nullif(i->>'fat_g', '')::numeric, 0),
+    coalesce(nullif(i->>'carbs_g', '')::numeric, 0),
+    coalesce(nullif(i->>'fiber_g', '')::numeric, 0)
+  FROM jsonb_array_elements(p_items) AS i;
+
+  RETURN v_log_id;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION public.tool_log_meal(uuid, timestamptz, text, text, jsonb) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION public.tool_log_meal(uuid, timestamptz, text, text, jsonb) TO service_role;
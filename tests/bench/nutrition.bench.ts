@@ -0,0 +1,148 @@
+/**
+ * Nutrition Hot-Path Benchmarks
+ * Run: npm run bench            (writes tmp/bench/latest.json)
+ *      npm run bench:compare    (fails on regressions vs tests/bench/baseline.json)
+ *
+ * Batch sizes: 3 = typical meal, 12 = a big multi-item log, 200 = a day's
+ * history replayed (totals/validation) or a burst of chat messages (routing).
+ */
+
+import { bench, describe, vi } from 'vitest';
+
+// saveMeal/generic import the Supabase client; keep the bench hermetic
+vi.mock('../../src/lib/supabase', () => ({ getSupabase: () => ({}), supabase: {} }));
+
+import { portionResolver } from '../../src/agents/shared/nutrition/portionResolver';
+import { convertToGrams } from '../../src/agents/shared/nutrition/providers/generic';
+import { sanitizeNormalizedItems } from '../../src/core/nutrition/sanitizeNormalizedItems';
+import { normalizeNutritionIntent } from '../../src/core/router/nutritionIntent';
+import { routeToSwarm } from '../../src/orchestrator/router';
+import { computeTotals } from '../../src/lib/meals/saveMeal';
+import { validateMacros } from '../../src/lib/macro/validator';
+import { formatMacroPayload, type MacroPayload } from '../../src/lib/macro/formatter';
+import { sample, userMessages, portionMacros, roundMacro } from './usdaCorpus';
+
+const BATCH_SIZES = [3, 12, 200];
+
+const batches = BATCH_SIZES.map((size) => {
+  const portions = sample(size, size);
+  const macros = portions.map(portionMacros);
+
+  const rawItems = portions.map((p) => ({ name: p.name, amount: p.amount, unit: p.unit }));
+  const parsedItems = portions.map((p) => ({ name: p.description, amount: p.amount, unit: p.unit }));
+
+  const mealItems = portions.map((p, i) => ({
+    name: p.name,
+    quantity: p.amount,
+    unit: p.unit,
+    energy_kcal: macros[i].kcal,
+    protein_g: macros[i].protein_g,
+    fat_g: macros[i].fat_g,
+    carbs_g: macros[i].carbs_g,
+    fiber_g: macros[i].fiber_g
+  }));
+
+  const payload: MacroPayload = {
+    items: portions.map((p, i) => ({
+      name: p.name,
+      qty: p.amount,
+      unit: p.unit,
+      grams_used: p.gramWeight,
+      basis: 'cooked',
+      ...macros[i]
+    })),
+    totals: macros.reduce(
+      (t, m) => ({
+        kcal: t.kcal + m.kcal,
+        protein_g: t.protein_g + m.protein_g,
+        carbs_g: t.carbs_g + m.carbs_g,
+        fat_g: t.fat_g + m.fat_g,
+        fiber_g: t.fiber_g + m.fiber_g
+      }),
+      { kcal: 0, protein_g: 0, carbs_g: 0, fat_g: 0, fiber_g: 0 }
+    )
+  };
+
+  // Every third pair drifts past tolerance so both branches are exercised
+  const macroPairs = macros.map((m, i) => ({
+    expected: m,
+    actual: i % 3 === 0 ? { ...m, kcal: m.kcal + 12, protein_g: roundMacro(m.protein_g * 1.1) } : m
+  }));
+
+  return {
+    size,
+    portions,
+    rawItems,
+    parsedItems,
+    mealItems,
+    payload,
+    macroPairs,
+    messages: userMessages(size, size)
+  };
+});
+
+describe('portionResolver', () => {
+  for (const b of batches) {
+    bench(`${b.size} items`, () => {
+      portionResolver(b.rawItems);
+    });
+  }
+});
+
+describe('sanitizeNormalizedItems', () => {
+  for (const b of batches) {
+    bench(`${b.size} items`, () => {
+      sanitizeNormalizedItems(b.parsedItems);
+    });
+  }
+});
+
+describe('normalizeNutritionIntent', () => {
+  for (const b of batches) {
+    bench(`${b.size} messages`, () => {
+      for (const m of b.messages) normalizeNutritionIntent(m);
+    });
+  }
+});
+
+describe('routeToSwarm', () => {
+  for (const b of batches) {
+    bench(`${b.size} messages`, () => {
+      for (let i = 0; i < b.messages.length; i++) {
+        routeToSwarm(b.messages[i], { hasUnconsumedMacroPayload: i % 2 === 0 });
+      }
+    });
+  }
+});
+
+describe('convertToGrams', () => {
+  for (const b of batches) {
+    bench(`${b.size} portions`, () => {
+      for (const p of b.portions) convertToGrams(p.amount, p.unit, p.name);
+    });
+  }
+});
+
+describe('computeTotals', () => {
+  for (const b of batches) {
+    bench(`${b.size} items`, () => {
+      computeTotals(b.mealItems);
+    });
+  }
+});
+
+describe('validateMacros', () => {
+  for (const b of batches) {
+    bench(`${b.size} items`, () => {
+      for (const { actual, expected } of b.macroPairs) validateMacros(actual, expected);
+    });
+  }
+});
+
+describe('formatMacroPayload', () => {
+  for (const b of batches) {
+    bench(`${b.size} items`, () => {
+      formatMacroPayload(b.payload);
+    });
+  }
+});
@@ -0,0 +1,193 @@
+/**
+ * USDA Bench Corpus
+ * Builds deterministic benchmark inputs from the checked-in SR Legacy CSVs
+ * (data/usda). Foods, household portions and gram weights are real; the
+ * checked-in export has no food_nutrient.csv, so per-100g macros are drawn
+ * from a seeded PRNG and priced with each food's own Atwater factors.
+ */
+
+import { readFileSync } from 'node:fs';
+import { resolve } from 'node:path';
+
+const SR_LEGACY_DIR = resolve(__dirname, '../../data/usda/FoodData_Central_sr_legacy_food_csv_2018-04');
+
+export interface UsdaPortion {
+  fdcId: string;
+  description: string;
+  /** First comma-separated segment, lowercased ("Eggs, Grade A, large" → "eggs") */
+  name: string;
+  amount: number;
+  unit: string;
+  modifier: string;
+  gramWeight: number;
+  per100g: { kcal: number; protein_g: number; carbs_g: number; fat_g: number; fiber_g: number };
+}
+
+/**
+ * Minimal RFC 4180 parser (quoted fields, "" escapes, embedded commas)
+ */
+export function parseCsv(text: string): Record<string, string>[] {
+  const rows: string[][] = [];
+  let row: string[] = [];
+  let field = '';
+  let quoted = false;
+
+  for (let i = 0; i < text.length; i++) {
+    const c = text[i];
+    if (quoted) {
+      if (c === '"') {
+        if (text[i + 1] === '"') { field += '"'; i++; } else { quoted = false; }
+      } else {
+        field += c;
+      }
+    } else if (c === '"') {
+      quoted = true;
+    } else if (c === ',') {
+      row.push(field); field = '';
+    } else if (c === '\n' || c === '\r') {
+      if (c === '\r' && text[i + 1] === '\n') i++;
+      row.push(field); field = '';
+      rows.push(row); row = [];
+    } else {
+      field += c;
+    }
+  }
+  if (field || row.length) { row.push(field); rows.push(row); }
+
+  const [header, ...body] = rows;
+  return body
+    .filter((r) => r.length === header.length)
+    .map((r) => Object.fromEntries(header.map((h, i) => [h, r[i]])));
+}
+
+function readTable(file: string): Record<string, string>[] {
+  return parseCsv(readFileSync(resolve(SR_LEGACY_DIR, file), 'utf8'));
+}
+
+/**
+ * Seeded PRNG (mulberry32) so every run benches identical inputs
+ */
+export function rng(seed: number): () => number {
+  let a = seed >>> 0;
+  return () => {
+    a = (a + 0x6d2b79f5) >>> 0;
+    let t = a;
+    t = Math.imul(t ^ (t >>> 15), t | 1);
+    t ^= t + Math.imul(t ^ (t >>> 7), t | 61);
+    return ((t ^ (t >>> 14)) >>> 0) / 4294967296;
+  };
+}
+
+let corpus: UsdaPortion[] | null = null;
+
+/**
+ * Every SR Legacy household portion joined with its food and unit name
+ */
+export function loadPortions(): UsdaPortion[] {
+  if (corpus) return corpus;
+
+  const foods = new Map(readTable('food.csv').map((f) => [f.fdc_id, f.description]));
+  const units = new Map(readTable('measure_unit.csv').map((u) => [u.id, u.name]));
+  const factorFood = new Map(readTable('food_nutrient_conversion_factor.csv').map((f) => [f.id, f.fdc_id]));
+  const atwater = new Map(
+    readTable('food_calorie_conversion_factor.csv').map((f) => [
+      factorFood.get(f.food_nutrient_conversion_factor_id),
+      { p: Number(f.protein_value) || 4, f: Number(f.fat_value) || 9, c: Number(f.carbohydrate_value) || 4 }
+    ])
+  );
+
+  const random = rng(0x05da);
+  const per100gByFood = new Map<string, UsdaPortion['per100g']>();
+  const macrosFor = (fdcId: string) => {
+    let m = per100gByFood.get(fdcId);
+    if (!m) {
+      const factors = atwater.get(fdcId) ?? { p: 4, f: 9, c: 4 };
+      const protein_g = +(random() * 30).toFixed(1);
+      const fat_g = +(random() * 25).toFixed(1);
+      const carbs_g = +(random() * 60).toFixed(1);
+      const fiber_g = +(random() * Math.min(carbs_g, 10)).toFixed(1);
+      const kcal = Math.round(protein_g * factors.p + fat_g * factors.f + carbs_g * factors.c);
+      m = { kcal, protein_g, carbs_g, fat_g, fiber_g };
+      per100gByFood.set(fdcId, m);
+    }
+    return m;
+  };
+
+  corpus = readTable('food_portion.csv').flatMap((p) => {
+    const description = foods.get(p.fdc_id);
+    const gramWeight = Number(p.gram_weight);
+    if (!description || !(gramWeight > 0)) return [];
+    // SR Legacy uses measure_unit 9999 ("undetermined") and puts the unit in modifier
+    const unitName = units.get(p.measure_unit_id);
+    const unit = unitName && unitName !== 'undetermined' ? unitName : (p.modifier.match(/^(fl oz|[a-z]+)/i)?.[0].toLowerCase() ?? 'serving');
+    return [{
+      fdcId: p.fdc_id,
+      description,
+      name: description.split(',')[0].trim().toLowerCase(),
+      amount: Number(p.amount) || 1,
+      unit,
+      modifier: p.modifier,
+      gramWeight,
+      per100g: macrosFor(p.fdc_id)
+    }];
+  });
+  return corpus;
+}
+
+/**
+ * `n` portions sampled with a fixed seed (same seed → same batch)
+ */
+export function sample(n: number, seed = 1): UsdaPortion[] {
+  const all = loadPortions();
+  const random = rng(seed);
+  return Array.from({ length: n }, () => all[Math.floor(random() * all.length)]);
+}
+
+const LOG_TEMPLATES = [
+  (q: string) => `I ate ${q}`,
+  (q: string) => `i had ${q} for lunch`,
+  (q: string) => `log this: ${q}`,
+  (q: string) => `what are the macros for ${q}?`,
+  (q: string) => `how many calories in ${q}`,
+  (q: string) => `${q} and a coffee`
+];
+
+const CHAT_LINES = [
+  'How much protein should I eat to build muscle?',
+  'Is it bad to eat carbs at night?',
+  'log it',
+  'log the rice only',
+  'What should I eat before a morning workout?',
+  'Can you make me a grocery list for the week?'
+];
+
+/**
+ * Chat messages mixing meal logs, macro questions and plain chat, with
+ * real food names and household measures
+ */
+export function userMessages(n: number, seed = 2): string[] {
+  const random = rng(seed);
+  return sample(n, seed).map((p) => {
+    if (random() < 0.25) return CHAT_LINES[Math.floor(random() * CHAT_LINES.length)];
+    const template = LOG_TEMPLATES[Math.floor(random() * LOG_TEMPLATES.length)];
+    return template(`${p.amount} ${p.unit} ${p.name}`);
+  });
+}
+
+export function roundMacro(n: number): number {
+  return Math.round(n * 10) / 10;
+}
+
+/**
+ * Macros for one portion scaled from the per-100g profile
+ */
+export function portionMacros(p: UsdaPortion) {
+  const scale = p.gramWeight / 100;
+  return {
+    kcal: Math.round(p.per100g.kcal * scale),
+    protein_g: roundMacro(p.per100g.protein_g * scale),
+    carbs_g: roundMacro(p.per100g.carbs_g * scale),
+    fat_g: roundMacro(p.per100g.fat_g * scale),
+    fiber_g: roundMacro(p.per100g.fiber_g * scale)
+  };
+}
@@ -0,0 +1,105 @@
+/**
+ * ama-web two-level stale-while-revalidate cache (ama-web/cache.ts)
+ */
+
+import { describe, it, expect } from 'vitest';
+import {
+  createSwrCache,
+  normalizeQuery,
+  recencyBucket,
+  searchKey,
+  sourceSetHash,
+  type CacheEntry,
+  type CacheStore
+} from '../../supabase/functions/ama-web/cache';
+
+const TTL = { freshMs: 1000, staleMs: 5000 };
+
+function memoryStore() {
+  const rows = new Map<string, CacheEntry<unknown>>();
+  const store: CacheStore = {
+    async get<T>(key: string) { return (rows.get(key) as CacheEntry<T>) ?? null; },
+    async set(key, entry) { rows.set(key, entry); }
+  };
+  return { rows, store };
+}
+
+describe('createSwrCache', () => {
+  it('loads once on a miss and serves later calls from memory', async () => {
+    let loads = 0;
+    const cache = createSwrCache();
+    const loader = async () => { loads++; return ['a']; };
+
+    const [first, second] = await Promise.all([cache.get('k', loader, TTL), cache.get('k', loader, TTL)]);
+    const third = await cache.get('k', loader, TTL);
+
+    expect(loads).toBe(1);
+    expect(first.status).toBe('miss');
+    expect(second.value).toEqual(['a']);
+    expect(third.status).toBe('hit');
+  });
+
+  it('serves a stale value at once and refreshes it in the background', async () => {
+    let clock = 0;
+    let version = 0;
+    const cache = createSwrCache({ now: () => clock });
+    const loader = async () => ++version;
+
+    await cache.get('k', loader, TTL);
+    clock = 2000; // past fresh, within stale
+
+    const stale = await cache.get('k', loader, TTL);
+    expect(stale).toMatchObject({ value: 1, status: 'stale' });
+    await stale.revalidation;
+
+    expect(await cache.get('k', loader, TTL)).toMatchObject({ value: 2, status: 'hit' });
+
+    clock = 100_000; // past stale: a plain miss
+    expect(await cache.get('k', loader, TTL)).toMatchObject({ value: 3, status: 'miss' });
+  });
+
+  it('shares entries across isolates through the L2 store', async () => {
+    const { store } = memoryStore();
+    let loads = 0;
+    const loader = async () => { loads++; return 'answer'; };
+
+    await createSwrCache({ store }).get('k', loader, TTL);
+    const other = await createSwrCache({ store }).get('k', loader, TTL);
+
+    expect(other).toMatchObject({ value: 'answer', status: 'hit' });
+    expect(loads).toBe(1);
+  });
+
+  it('keeps serving from memory when the L2 store fails', async () => {
+    const cache = createSwrCache({
+      store: {
+        get: async () => { throw new Error('db down'); },
+        set: async () => { throw new Error('db down'); }
+      }
+    });
+    await cache.get('k', async () => 1, TTL);
+    expect(await cache.get('k', async () => 2, TTL)).toMatchObject({ value: 1, status: 'hit' });
+  });
+
+  it('does not cache loader failures', async () => {
+    const cache = createSwrCache();
+    await expect(cache.get('k', async () => { throw new Error('429'); }, TTL)).rejects.toThrow();
+    expect(await cache.get('k', async () => 'ok', TTL)).toMatchObject({ value: 'ok', status: 'miss' });
+  });
+});
+
+describe('cache keys', () => {
+  it('normalizes equivalent questions to one key', async () => {
+    expect(normalizeQuery('  What is NEW in Creatine   research?? ')).toBe('what is new in creatine research');
+    expect(await searchKey('Creatine research?', 30, 6)).toBe(await searchKey('creatine  research', 30, 6));
+  });
+
+  it('buckets recency windows', () => {
+    expect([1, 3, 7, 20, 31, 365, 400].map(recencyBucket)).toEqual([1, 7, 7, 30, 90, 365, 730]);
+  });
+
+  it('hashes source sets independent of order', async () => {
+    expect(await sourceSetHash(['https://b', 'https://a'])).toBe(await sourceSetHash(['https://a', 'https://b']));
+    expect(await sourceSetHash(['https://a'])).not.toBe(await sourceSetHash(['https://a', 'https://c']));
+  });
+});
@@ -0,0 +1,111 @@
+/**
+ * Circuit breaker and jittered retry (_shared/circuitBreaker.ts)
+ */
+
+import { describe, it, expect } from 'vitest';
+import {
+  CircuitBreaker,
+  CircuitOpenError,
+  backoffMs,
+  fetchWithRetry
+} from '../../supabase/functions/_shared/circuitBreaker';
+
+const noSleep = async () => {};
+
+describe('CircuitBreaker', () => {
+  it('opens after consecutive failures and rejects without calling', async () => {
+    const breaker = new CircuitBreaker({ failureThreshold: 3, openMs: 1000, now: () => 0 });
+    let calls = 0;
+    const failing = () => { calls++; return Promise.reject(new Error('503')); };
+
+    for (let i = 0; i < 3; i++) await expect(breaker.run(failing)).rejects.toThrow('503');
+    await expect(breaker.run(failing)).rejects.toBeInstanceOf(CircuitOpenError);
+
+    expect(calls).toBe(3);
+    expect(breaker.snapshot()).toMatchObject({ state: 'open', retryAfterMs: 1000 });
+  });
+
+  it('lets one probe through when half-open and closes on success', () => {
+    let clock = 0;
+    const breaker = new CircuitBreaker({ failureThreshold: 1, openMs: 1000, now: () => clock });
+    breaker.failure();
+
+    clock = 1000;
+    expect(breaker.snapshot().state).toBe('half-open');
+    expect(breaker.allow()).toBe(true);
+    expect(breaker.allow()).toBe(false); // second caller waits for the probe
+
+    breaker.success();
+    expect(breaker.snapshot()).toMatchObject({ state: 'closed', failures: 0 });
+    expect(breaker.allow()).toBe(true);
+  });
+
+  it('doubles the open window when a probe fails, up to the cap', () => {
+    let clock = 0;
+    const breaker = new CircuitBreaker({ failureThreshold: 1, openMs: 1000, maxOpenMs: 3000, now: () => clock });
+    breaker.failure();
+
+    clock = 1000;
+    breaker.allow();
+    breaker.failure();
+    expect(breaker.snapshot()).toMatchObject({ state: 'open', retryAfterMs: 2000 });
+
+    clock = 3000;
+    breaker.allow();
+    breaker.failure();
+    expect(breaker.snapshot().retryAfterMs).toBe(3000);
+  });
+
+  it('counts resolved values as failures when isFailure says so', async () => {
+    const breaker = new CircuitBreaker({ failureThreshold: 2, now: () => 0 });
+    const status = (s: number) => breaker.run(async () => s, (v) => v >= 500);
+
+    await status(503);
+    await status(200);
+    await status(503);
+    expect(breaker.snapshot().state).toBe('closed'); // a success resets the count
+
+    await status(503);
+    expect(breaker.snapshot().state).toBe('open');
+  });
+});
+
+describe('backoffMs', () => {
+  it('draws from an exponentially growing, capped window', () => {
+    expect(backoffMs(0, { random: () => 0.999 })).toBe(249);
+    expect(backoffMs(2, { random: () => 0.5 })).toBe(500);
+    expect(backoffMs(10, { random: () => 0.999, maxMs: 4000 })).toBe(3996);
+  });
+
+  it('honours Retry-After, capped at maxMs', () => {
+    expect(backoffMs(0, {}, '2')).toBe(2000);
+    expect(backoffMs(0, { maxMs: 1000 }, '30')).toBe(1000);
+    expect(backoffMs(0, { random: () => 0 }, 'soon')).toBe(0);
+  });
+});
+
+describe('fetchWithRetry', () => {
+  it('retries 429 and 5xx, then returns the first good response', async () => {
+    const statuses = [429, 503, 200];
+    let calls = 0;
+    const res = await fetchWithRetry(async () => new Response('x', { status: statuses[calls++] }), { sleep: noSleep });
+    expect(res.status).toBe(200);
+    expect(calls).toBe(3);
+  });
+
+  it('does not retry other 4xx and returns the last failure when out of retries', async () => {
+    let calls = 0;
+    expect((await fetchWithRetry(async () => { calls++; return new Response('', { status: 404 }); }, { sleep: noSleep })).status).toBe(404);
+    expect(calls).toBe(1);
+
+    calls = 0;
+    expect((await fetchWithRetry(async () => { calls++; return new Response('', { status: 500 }); }, { retries: 1, sleep: noSleep })).status).toBe(500);
+    expect(calls).toBe(2);
+  });
+
+  it('retries network errors and rethrows the last one', async () => {
+    let calls = 0;
+    await expect(fetchWithRetry(async () => { calls++; throw new TypeError('fetch failed'); }, { sleep: noSleep })).rejects.toThrow('fetch failed');
+    expect(calls).toBe(3);
+  });
+});
@@ -0,0 +1,133 @@
+/**
+ * LLM request scheduler (_shared/llmScheduler.ts)
+ */
+
+import { describe, it, expect } from 'vitest';
+import {
+  createLlmScheduler,
+  SchedulerShedError,
+  estimateChatTokens,
+  parseResetDuration,
+  type LlmSchedulerOptions
+} from '../../supabase/functions/_shared/llmScheduler';
+
+/** Scheduler on a manual clock; advance() fires due timers */
+function setup(options: LlmSchedulerOptions = {}) {
+  let clock = 0;
+  let timers: Array<{ at: number; fn: () => void; id: number }> = [];
+  let ids = 0;
+  const scheduler = createLlmScheduler({
+    now: () => clock,
+    setTimer: (fn, ms) => {
+      const id = ++ids;
+      timers.push({ at: clock + ms, fn, id });
+      return id;
+    },
+    clearTimer: (id) => {
+      timers = timers.filter(t => t.id !== id);
+    },
+    ...options
+  });
+  const advance = async (ms: number) => {
+    const target = clock + ms;
+    for (;;) {
+      const due = timers.filter(t => t.at <= target).sort((a, b) => a.at - b.at)[0];
+      if (!due) break;
+      timers = timers.filter(t => t !== due);
+      clock = due.at;
+      due.fn();
+      await Promise.resolve();
+    }
+    clock = target;
+    await Promise.resolve();
+  };
+  return { scheduler, advance };
+}
+
+const settled = async (promise: Promise<unknown>) => {
+  let state = 'pending';
+  promise.then(() => { state = 'resolved'; }, () => { state = 'rejected'; });
+  await Promise.resolve();
+  await Promise.resolve();
+  return state;
+};
+
+describe('llm scheduler', () => {
+  it('dispatches immediately while the buckets have room', async () => {
+    const { scheduler } = setup({ defaultLimits: { rpm: 60, tpm: 10_000 } });
+
+    const lease = await scheduler.acquire({ model: 'gpt-4o-mini', estimatedTokens: 500 });
+
+    expect(lease).toMatchObject({ priority: 'interactive', waitedMs: 0, queueDepth: 0 });
+    expect(scheduler.stats().lanes[0]).toMatchObject({ requestsAvailable: 59, tokensAvailable: 9500 });
+  });
+
+  it('keeps a reserve that only interactive work may spend', async () => {
+    const { scheduler } = setup({ defaultLimits: { rpm: 4, tpm: 100_000 }, reserve: { background: 0.5 } });
+
+    await scheduler.acquire({ model: 'm', priority: 'background' });
+    await scheduler.acquire({ model: 'm', priority: 'background' });
+    // Half the request bucket is left: background must wait, interactive goes now
+    const background = scheduler.acquire({ model: 'm', priority: 'background' });
+    expect(await settled(background)).toBe('pending');
+    expect(await settled(scheduler.acquire({ model: 'm', priority: 'interactive' }))).toBe('resolved');
+    expect(scheduler.stats().queued.background).toBe(1);
+  });
+
+  it('serves queued interactive work before background work', async () => {
+    const { scheduler, advance } = setup({ defaultLimits: { rpm: 60, tpm: 1_000_000 } });
+    for (let i = 0; i < 60; i++) await scheduler.acquire({ model: 'm' });
+
+    const order: string[] = [];
+    const background = scheduler.acquire({ model: 'm', priority: 'background' }).then(() => order.push('background'));
+    const interactive = scheduler.acquire({ model: 'm', priority: 'interactive' }).then(() => order.push('interactive'));
+    expect(scheduler.stats().queueDepth).toBe(2);
+
+    await advance(60_000);
+    await Promise.all([background, interactive]);
+    expect(order).toEqual(['interactive', 'background']);
+  });
+
+  it('sheds work that cannot start before its deadline', async () => {
+    const { scheduler } = setup({ defaultLimits: { rpm: 1, tpm: 1_000_000 } });
+    await scheduler.acquire({ model: 'm' });
+
+    const err = await scheduler.acquire({ model: 'm', deadlineMs: 5_000 }).catch(e => e);
+    expect(err).toBeInstanceOf(SchedulerShedError);
+    expect(err.reason).toBe('deadline');
+    expect(err.retryAfterMs).toBe(60_000);
+    expect(scheduler.stats().shed.interactive).toBe(1);
+  });
+
+  it('sheds queued batch work once interactive work has to wait', async () => {
+    const { scheduler } = setup({ defaultLimits: { rpm: 6, tpm: 1_000_000 }, reserve: { batch: 0 } });
+    for (let i = 0; i < 6; i++) await scheduler.acquire({ model: 'm' });
+
+    const batch = scheduler.acquire({ model: 'm', priority: 'batch' }).catch(e => e);
+    scheduler.acquire({ model: 'm', priority: 'interactive' });
+
+    expect(await batch).toMatchObject({ reason: 'pressure', priority: 'batch' });
+    expect(scheduler.stats().queued).toEqual({ interactive: 1, background: 0, batch: 0 });
+  });
+
+  it('pauses the lane on a 429 and drains to the reported remaining budget', async () => {
+    const { scheduler, advance } = setup();
+    scheduler.observe({ model: 'm' }, 429, new Headers({ 'x-ratelimit-reset-requests': '2s', 'x-ratelimit-remaining-tokens': '1200' }));
+
+    expect(scheduler.pausedMs({ model: 'm' })).toBe(2000);
+    expect(scheduler.stats().lanes[0].tokensAvailable).toBe(1200);
+
+    const next = scheduler.acquire({ model: 'm', estimatedTokens: 100 });
+    expect(await settled(next)).toBe('pending');
+    await advance(2000);
+    expect(await settled(next)).toBe('resolved');
+  });
+
+  it('parses reset durations and estimates request size', () => {
+    expect(parseResetDuration('6m0s')).toBe(360_000);
+    expect(parseResetDuration('1.5s')).toBe(1500);
+    expect(parseResetDuration('20ms')).toBe(20);
+    expect(parseResetDuration('soon')).toBeNull();
+    expect(estimateChatTokens(JSON.stringify({ messages: [], max_tokens: 500 }))).toBeGreaterThan(500);
+  });
+});
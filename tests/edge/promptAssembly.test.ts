@@ -0,0 +1,59 @@
+/**
+ * Prompt assembly (_shared/promptAssembly.ts)
+ */
+
+import { describe, it, expect } from 'vitest';
+import {
+  assemblePrompt,
+  cachedPromptTokens,
+  formatContextBlock,
+  promptPrefixHash,
+  systemMessages
+} from '../../supabase/functions/_shared/promptAssembly';
+
+const persona = { layer: 'persona' as const, label: 'Voice', content: 'You are Pat.' };
+const rules = { layer: 'rules' as const, label: 'Core Responder', content: 'Answer briefly.' };
+
+describe('prompt assembly', () => {
+  it('orders persona, rules, user, turn regardless of input order', () => {
+    const prompt = assemblePrompt([
+      { layer: 'turn', content: 'Recent: hi' },
+      { layer: 'user', content: 'name: "Sam"' },
+      rules,
+      persona
+    ]);
+
+    expect(prompt.stablePrefix).toBe('[Voice]\n\nYou are Pat.\n\n[Core Responder]\n\nAnswer briefly.');
+    expect(prompt.context).toBe('name: "Sam"\n\nRecent: hi');
+    expect(prompt.text).toBe(`${prompt.stablePrefix}\n\n${prompt.context}`);
+  });
+
+  it('keeps the prefix hash fixed across users and turns', () => {
+    const a = assemblePrompt([persona, rules, { layer: 'user', content: 'name: "Sam"' }]);
+    const b = assemblePrompt([persona, rules, { layer: 'user', content: 'name: "Ana"' }, { layer: 'turn', content: 'meal' }]);
+    const c = assemblePrompt([persona, { ...rules, content: 'Answer at length.' }]);
+
+    expect(a.prefixHash).toBe(b.prefixHash);
+    expect(a.prefixHash).not.toBe(c.prefixHash);
+    expect(a.prefixHash).toMatch(/^[0-9a-f]{14}$/);
+    expect(promptPrefixHash('')).toBe(assemblePrompt([]).prefixHash);
+  });
+
+  it('renders context with sorted keys so equal data gives equal text', () => {
+    expect(formatContextBlock('=== USER ===', { b: { y: 1, x: 2 }, a: 'v', c: null }))
+      .toBe(formatContextBlock('=== USER ===', { a: 'v', b: { x: 2, y: 1 } }));
+    expect(formatContextBlock('=== USER ===', { c: null })).toBe('');
+  });
+
+  it('splits the stable prefix and context into separate system messages', () => {
+    expect(systemMessages(assemblePrompt([persona]))).toHaveLength(1);
+    expect(systemMessages(assemblePrompt([persona, { layer: 'turn', content: 'x' }])).map(m => m.content))
+      .toEqual(['[Voice]\n\nYou are Pat.', 'x']);
+  });
+
+  it('reads cached token counts from OpenAI and Gemini usage', () => {
+    expect(cachedPromptTokens({ prompt_tokens: 2000, prompt_tokens_details: { cached_tokens: 1792 } })).toBe(1792);
+    expect(cachedPromptTokens({ promptTokenCount: 3000, cachedContentTokenCount: 2048 })).toBe(2048);
+    expect(cachedPromptTokens({ prompt_tokens: 10 })).toBeUndefined();
+  });
+});
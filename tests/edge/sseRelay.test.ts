@@ -0,0 +1,177 @@
+/**
+ * SSE relay fuzz / throughput tests
+ *
+ * Replays recorded OpenAI streams (tests/edge/fixtures/*.cassette.json)
+ * through SseParser and createSseRelay with the upstream body split at
+ * every byte offset, so partial lines, \r\n pairs and multi-byte UTF-8
+ * sequences land on every possible chunk boundary.
+ */
+
+import { describe, it, expect } from 'vitest';
+import { readFileSync } from 'node:fs';
+import { SseParser, createSseRelay, openAIDeltaContent, type SseRelayOptions } from '../../supabase/functions/_shared/sse';
+
+const encoder = new TextEncoder();
+
+function loadCassette(name: string): Uint8Array {
+  const raw = JSON.parse(readFileSync(new URL(`./fixtures/${name}.cassette.json`, import.meta.url), 'utf8'));
+  return encoder.encode(raw.response.chunks.map((c: { data: string }) => c.data).join(''));
+}
+
+function expectedText(body: Uint8Array): string {
+  const parser = new SseParser();
+  let text = '';
+  for (const event of [...parser.feed(body), ...parser.end()]) {
+    if (event.data === '[DONE]') break;
+    text += openAIDeltaContent(event.data) ?? '';
+  }
+  return text;
+}
+
+function streamOf(parts: Uint8Array[], onPull?: () => void): ReadableStream<Uint8Array> {
+  let i = 0;
+  return new ReadableStream<Uint8Array>({
+    pull(controller) {
+      onPull?.();
+      if (i < parts.length) controller.enqueue(parts[i++]);
+      else controller.close();
+    }
+  });
+}
+
+async function relay(parts: Uint8Array[], options: SseRelayOptions = { flushIntervalMs: 0, heartbeatMs: 0 }) {
+  const reader = createSseRelay(streamOf(parts), options).getReader();
+  const parser = new SseParser();
+  let text = '';
+  let frames = 0;
+  let done = 0;
+  for (;;) {
+    const { done: end, value } = await reader.read();
+    if (end) break;
+    for (const event of parser.feed(value)) {
+      if (event.data === '[DONE]') {
+        done++;
+      } else {
+        frames++;
+        text += JSON.parse(event.data).token;
+      }
+    }
+  }
+  return { text, frames, done };
+}
+
+const split = (body: Uint8Array, at: number) => [body.subarray(0, at), body.subarray(at)];
+
+const short = loadCassette('openai-chat-short');
+const long = loadCassette('openai-chat-long');
+const shortText = expectedText(short);
+const longText = expectedText(long);
+
+describe('SseParser', () => {
+  it('reads the fixtures', () => {
+    expect(shortText).toContain('🥑');
+    expect(shortText).toContain('鸡蛋');
+    expect(longText.length).toBeGreaterThan(2000);
+  });
+
+  it('yields the same events for a split at every byte offset', () => {
+    const whole = new SseParser();
+    const reference = [...whole.feed(short), ...whole.end()];
+
+    for (let at = 0; at <= short.length; at++) {
+      const parser = new SseParser();
+      const events = split(short, at).flatMap(part => parser.feed(part));
+      events.push(...parser.end());
+      expect(events).toEqual(reference);
+    }
+  });
+
+  it('treats \\r\\n and \\r like \\n, including a \\r\\n split across reads', () => {
+    const lf = new TextDecoder().decode(short);
+    const reference = new SseParser().feed(lf);
+
+    for (const eol of ['\r\n', '\r']) {
+      const body = encoder.encode(lf.replace(/\n/g, eol));
+      for (let at = 0; at <= body.length; at += 7) {
+        const parser = new SseParser();
+        const events = split(body, at).flatMap(part => parser.feed(part));
+        events.push(...parser.end());
+        expect(events).toEqual(reference);
+      }
+    }
+  });
+
+  it('skips comments and joins multi-line data', () => {
+    const parser = new SseParser();
+    const events = parser.feed(': keep-alive\nevent: delta\nid: 7\ndata: a\ndata: b\n\n');
+    expect(events).toEqual([{ event: 'delta', id: '7', data: 'a\nb' }]);
+  });
+});
+
+describe('createSseRelay', () => {
+  it('relays the full text and one [DONE] for a split at every byte offset', async () => {
+    for (let at = 0; at <= short.length; at++) {
+      const result = await relay(split(short, at));
+      expect(result.text).toBe(shortText);
+      expect(result.done).toBe(1);
+    }
+  });
+
+  it('relays single-byte upstream chunks', async () => {
+    const bytes = Array.from(long, (_, i) => long.subarray(i, i + 1));
+    const result = await relay(bytes, { flushIntervalMs: 5, heartbeatMs: 0 });
+    expect(result.text).toBe(longText);
+    expect(result.done).toBe(1);
+  });
+
+  it('coalesces tokens into fewer frames', async () => {
+    const result = await relay([long], { flushIntervalMs: 25, maxBatchChars: 256, heartbeatMs: 0 });
+    expect(result.text).toBe(longText);
+    expect(result.frames).toBeLessThan(longText.length / 100);
+  });
+
+  it('sends [DONE] when upstream ends without one', async () => {
+    const body = encoder.encode('data: {"choices":[{"delta":{"content":"hi"}}]}\n\n');
+    expect(await relay([body])).toEqual({ text: 'hi', frames: 1, done: 1 });
+  });
+
+  it('only reads upstream as fast as the consumer pulls', async () => {
+    const events = new TextDecoder().decode(long).split(/(?<=\n\n)/).map(e => encoder.encode(e));
+    let pulls = 0;
+    const reader = createSseRelay(streamOf(events, () => pulls++), {
+      flushIntervalMs: 0,
+      maxBatchChars: 1,
+      heartbeatMs: 0
+    }).getReader();
+
+    await reader.read();
+    await reader.read();
+    await new Promise(resolve => setTimeout(resolve, 20));
+
+    expect(pulls).toBeLessThan(10);
+    await reader.cancel();
+  });
+
+  it('sends a heartbeat while upstream is silent', async () => {
+    const stalled = new ReadableStream<Uint8Array>({ pull: () => new Promise(() => undefined) });
+    const reader = createSseRelay(stalled, { heartbeatMs: 10 }).getReader();
+
+    const { value } = await reader.read();
+
+    expect(new TextDecoder().decode(value)).toBe(': ping\n\n');
+    await reader.cancel();
+  });
+
+  it('relays the long fixture at a useful rate', async () => {
+    const rounds = 20;
+    const started = performance.now();
+    for (let i = 0; i < rounds; i++) {
+      const result = await relay([long], { flushIntervalMs: 25, heartbeatMs: 0 });
+      expect(result.text).toBe(longText);
+    }
+    const seconds = (performance.now() - started) / 1000;
+    const mbPerSecond = (long.length * rounds) / seconds / 1e6;
+    console.log(`[sseRelay] ${mbPerSecond.toFixed(1)} MB/s upstream (${long.length} B x ${rounds})`);
+    expect(mbPerSecond).toBeGreaterThan(1);
+  });
+});
@@ -0,0 +1,54 @@
+/**
+ * Chat tool executor (_shared/tools/executor.ts)
+ *
+ * The executor runs with the service role, so every tool RPC has to carry
+ * the turn's user id explicitly; these check that it reaches the writes.
+ */
+
+import { describe, it, expect, vi, beforeEach } from 'vitest';
+
+vi.mock('npm:@supabase/supabase-js@2.53.0', () => {
+  const rpc = vi.fn();
+  return { createClient: () => ({ rpc }), __rpc: rpc };
+});
+
+// @ts-expect-error test-only export of the mocked client
+import { __rpc as rpcMock } from 'npm:@supabase/supabase-js@2.53.0';
+import { createToolTurn } from '../../supabase/functions/_shared/tools/executor';
+
+const rpc = rpcMock as ReturnType<typeof vi.fn>;
+const USER = '11111111-1111-4111-8111-111111111111';
+const context = { userId: USER, supabaseUrl: 'http://localhost', supabaseKey: 'service-role' };
+
+const respond = (data: unknown) => ({ abortSignal: async () => ({ data, error: null }) });
+
+describe('tool executor', () => {
+  beforeEach(() => {
+    rpc.mockReset();
+  });
+
+  it('logs a meal for the turn user with tool_log_meal', async () => {
+    rpc.mockImplementation(() => respond('log-1'));
+
+    const result = await createToolTurn(context).run('log_meal', {
+      items: [{ name: 'oats', quantity: 1, unit: 'cup', macros: { kcal: 300, protein_g: 10 } }],
+      meal_slot: 'breakfast',
+      timestamp: '2025-11-08T14:00:00.000Z'
+    });
+
+    expect(result).toMatchObject({ success: true, result: { logged: true, meal_log_id: 'log-1' } });
+    expect(rpc.mock.calls).toHaveLength(1);
+    const [name, params] = rpc.mock.calls[0];
+    expect(name).toBe('tool_log_meal');
+    expect(params).toMatchObject({ p_user_id: USER, p_meal_slot_text: 'breakfast', p_ts: '2025-11-08T14:00:00.000Z' });
+  });
+
+  it('undoes the turn user\'s last meal', async () => {
+    rpc.mockImplementation(() => respond({ deleted_meal_id: 'log-1', deleted_at: '2025-11-08T14:00:00.000Z' }));
+
+    const result = await createToolTurn(context).run('undo_last_meal', {});
+
+    expect(result.success).toBe(true);
+    expect(rpc.mock.calls).toEqual([['tool_undo_last_meal', { p_user_id: USER }]]);
+  });
+});
@@ -0,0 +1,155 @@
+/**
+ * Streaming tool calls (openai-chat/toolStream.ts)
+ *
+ * Builds chat.completion.chunk streams with split tool_calls deltas and
+ * checks that each call is announced as soon as its arguments are complete,
+ * that the turn's calls are handed to runTools together once the first
+ * completion ends, that results surface as tool_result frames as they
+ * settle, and that the follow-up completion streams after them.
+ */
+
+import { describe, it, expect } from 'vitest';
+import { SseParser } from '../../supabase/functions/_shared/sse';
+import { createToolCallingStream, type ToolOutcome } from '../../supabase/functions/openai-chat/toolStream';
+
+const encoder = new TextEncoder();
+
+const chunk = (delta: Record<string, unknown>, finish: string | null = null) =>
+  `data: ${JSON.stringify({ object: 'chat.completion.chunk', choices: [{ index: 0, delta, finish_reason: finish }] })}\n\n`;
+
+const toolDelta = (index: number, fields: { id?: string; name?: string; args?: string }) => ({
+  tool_calls: [{
+    index,
+    ...(fields.id ? { id: fields.id, type: 'function' } : {}),
+    function: { ...(fields.name ? { name: fields.name } : {}), ...(fields.args !== undefined ? { arguments: fields.args } : {}) }
+  }]
+});
+
+/** Upstream that hands out one event per pull and records when each was read */
+function upstream(events: string[], reads?: string[]): ReadableStream<Uint8Array> {
+  let i = 0;
+  return new ReadableStream<Uint8Array>({
+    pull(controller) {
+      if (i < events.length) {
+        reads?.push(`upstream:${i}`);
+        controller.enqueue(encoder.encode(events[i++]));
+      } else {
+        controller.close();
+      }
+    }
+  }, { highWaterMark: 0 });
+}
+
+async function collect(stream: ReadableStream<Uint8Array>) {
+  const reader = stream.getReader();
+  const parser = new SseParser();
+  const frames: any[] = [];
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    for (const event of parser.feed(value)) frames.push(event.data === '[DONE]' ? '[DONE]' : JSON.parse(event.data));
+  }
+  return frames;
+}
+
+const deferred = <T>() => {
+  let resolve!: (value: T) => void;
+  const promise = new Promise<T>(r => { resolve = r; });
+  return { promise, resolve };
+};
+
+const relay = { flushIntervalMs: 0, heartbeatMs: 0 };
+
+describe('createToolCallingStream', () => {
+  it('runs the turn\'s tools together, emits their results, then streams the follow-up', async () => {
+    const reads: string[] = [];
+    const macros = deferred<ToolOutcome>();
+    const batches: string[][] = [];
+    let followUpMessages: any[] = [];
+
+    const stream = createToolCallingStream({
+      upstream: upstream([
+        chunk({ role: 'assistant', content: null }),
+        chunk(toolDelta(0, { id: 'call_a', name: 'get_remaining_macros', args: '' })),
+        chunk(toolDelta(0, { args: '{}' })),
+        chunk(toolDelta(1, { id: 'call_b', name: 'log_meal', args: '{"items":[{"name":"oat' })),
+        chunk(toolDelta(1, { args: 's","quantity":1}]}' })),
+        chunk({}, 'tool_calls'),
+        'data: [DONE]\n\n'
+      ], reads),
+      messages: [{ role: 'user', content: 'log oats and tell me what is left' }],
+      relay,
+      runTools: (calls) => {
+        batches.push(calls.map(c => c.name));
+        reads.push('tools');
+        return calls.map(({ name, args }) => name === 'get_remaining_macros'
+          ? macros.promise
+          : Promise.resolve({ success: true, result: { kind: 'food_log', items_logged: (args as any).items.length } }));
+      },
+      startFollowUp: async (messages) => {
+        followUpMessages = messages as any[];
+        return upstream([chunk({ content: 'Logged ' }), chunk({ content: 'your oats.' }, 'stop'), 'data: [DONE]\n\n']);
+      }
+    });
+
+    const pending = collect(stream);
+    await new Promise(resolve => setTimeout(resolve, 10));
+    // log_meal finished first even though it was called second
+    macros.resolve({ success: true, result: { remaining: { kcal: 900 } } });
+    const frames = await pending;
+
+    // One batch, started after the first completion ended, so the executor
+    // can put log_meal ahead of the read
+    expect(batches).toEqual([['get_remaining_macros', 'log_meal']]);
+    expect(reads.indexOf('tools')).toBeGreaterThan(reads.indexOf('upstream:6'));
+
+    const results = frames.filter(f => f.tool_result).map(f => f.tool_result.name);
+    expect(results).toEqual(['log_meal', 'get_remaining_macros']);
+    expect(frames.filter(f => f.tool_call).map(f => f.tool_call.id)).toEqual(['call_a', 'call_b']);
+
+    const text = frames.filter(f => f.token).map(f => f.token).join('');
+    expect(text).toBe('Logged your oats.');
+    expect(frames.indexOf(frames.find(f => f.token))).toBeGreaterThan(frames.findIndex(f => f.tool_result));
+    expect(frames.filter(f => f === '[DONE]')).toHaveLength(1);
+    expect(frames[frames.length - 1]).toBe('[DONE]');
+
+    expect(followUpMessages.slice(-3).map(m => m.role)).toEqual(['assistant', 'tool', 'tool']);
+    expect(followUpMessages[followUpMessages.length - 3].tool_calls.map((c: any) => c.function.name))
+      .toEqual(['get_remaining_macros', 'log_meal']);
+  });
+
+  it('relays plain text and finishes without a follow-up when no tool is called', async () => {
+    let followUps = 0;
+    const frames = await collect(createToolCallingStream({
+      upstream: upstream([chunk({ content: 'Hi ' }), chunk({ content: 'there' }, 'stop'), 'data: [DONE]\n\n']),
+      messages: [],
+      relay,
+      runTools: (calls) => calls.map(async () => ({ success: true })),
+      startFollowUp: async () => { followUps++; return null; }
+    }));
+
+    expect(frames).toEqual([{ token: 'Hi ' }, { token: 'there' }, '[DONE]']);
+    expect(followUps).toBe(0);
+  });
+
+  it('reports bad arguments and tool failures as unsuccessful results', async () => {
+    const frames = await collect(createToolCallingStream({
+      upstream: upstream([
+        chunk(toolDelta(0, { id: 'call_x', name: 'log_meal', args: '{"items": [' })),
+        chunk(toolDelta(1, { id: 'call_y', name: 'undo_last_meal', args: '{}' })),
+        chunk({}, 'tool_calls')
+      ]),
+      messages: [],
+      relay,
+      runTools: (calls) => calls.map(async () => { throw new Error('db down'); }),
+      startFollowUp: async () => upstream([chunk({ content: 'Sorry.' }, 'stop')])
+    }));
+
+    const results = frames.filter(f => f.tool_result).map(f => f.tool_result);
+    expect(results).toMatchObject([
+      { id: 'call_x', success: false, error: 'Invalid tool arguments' },
+      { id: 'call_y', success: false, error: 'Error: db down' }
+    ]);
+    expect(frames.slice(-2)).toEqual([{ token: 'Sorry.' }, '[DONE]']);
+  });
+});
@@ -0,0 +1,73 @@
+-- Benchmark: ranked user memory retrieval at 10k memories per user
+-- Run against a dev/staging database (psql -f). Everything happens inside a
+-- transaction that is rolled back, so no data is left behind.
+--
+-- Target: rank_user_memories() under a few ms for topic-filtered queries.
+-- Compare the "Execution Time" lines of each EXPLAIN ANALYZE below. The RPC
+-- is not inlined (it pins search_path), so query 1b repeats its filter to
+-- show the index plan.
+
+BEGIN;
+
+-- Synthetic user (auth.users FK); rolled back at the end
+INSERT INTO auth.users (id, email)
+VALUES ('00000000-0000-4000-8000-00000000bee5', 'memory-bench@example.invalid')
+ON CONFLICT (id) DO NOTHING;
+
+-- 10k memories: 40 topics, 3 tiers, mixed confidence/age, ~10% already expired
+INSERT INTO public.user_memory (
+  user_id, tier, key, value, source, confidence, ttl, topics, conflict_priority, created_at
+)
+SELECT
+  '00000000-0000-4000-8000-00000000bee5',
+  (ARRAY['ephemeral', 'short_term', 'long_term'])[1 + (g % 3)],
+  'bench_key_' || g,
+  jsonb_build_object('n', g),
+  (ARRAY['explicit', 'inferred', 'system'])[1 + (g % 3)],
+  round((0.2 + (g % 80) / 100.0)::numeric, 2),
+  CASE WHEN g % 10 = 0 THEN now() - interval '1 hour'
+       WHEN g % 10 = 1 THEN now() + interval '7 days'
+       ELSE NULL END,
+  ARRAY['topic_' || (g % 40), 'topic_' || ((g * 7) % 40)],
+  2 - (g % 3),
+  now() - make_interval(mins => g * 7)
+FROM generate_series(1, 10000) AS g;
+
+ANALYZE public.user_memory;
+
+-- 1. Topic-filtered ranking (the chat path)
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.rank_user_memories(
+  '00000000-0000-4000-8000-00000000bee5',
+  ARRAY['topic_3', 'topic_17'],
+  NULL, 0.3, 10
+);
+
+-- 1b. Same filter, planned directly: expect a Bitmap Index Scan on
+--     idx_user_memory_topics_gin
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT id FROM public.user_memory
+WHERE user_id = '00000000-0000-4000-8000-00000000bee5'
+  AND (ttl IS NULL OR ttl > now())
+  AND confidence >= 0.3
+  AND topics && ARRAY['topic_3', 'topic_17'];
+
+-- 2. Tier-filtered ranking without topics
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.rank_user_memories(
+  '00000000-0000-4000-8000-00000000bee5',
+  NULL, 'long_term', NULL, 20
+);
+
+-- 3. getByKey path: should use idx_user_memory_user_key
+EXPLAIN (ANALYZE, BUFFERS)
+SELECT * FROM public.user_memory
+WHERE user_id = '00000000-0000-4000-8000-00000000bee5'
+  AND key = 'bench_key_4242'
+ORDER BY conflict_priority DESC, created_at DESC
+LIMIT 1;
+
+-- 4. Compaction removes the ~1k expired rows
+SELECT public.compact_expired_memories() AS expired_rows_deleted;
+
+ROLLBACK;
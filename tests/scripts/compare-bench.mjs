@@ -0,0 +1,121 @@
+// Compare a `vitest bench --outputJson` run against the stored baseline
+// Run with: npm run bench:compare              (flags >15% slower as a regression)
+//           node tests/scripts/compare-bench.mjs --threshold 10 --current tmp/bench/latest.json
+//           node tests/scripts/compare-bench.mjs --update   (rewrite the baseline from the current run)
+//
+// A benchmark regresses when its mean time grows by more than the threshold
+// AND by more than the two runs' combined relative margin of error, so noisy
+// sub-microsecond benches don't flap. Exit code 1 on any regression.
+
+import { readFileSync, writeFileSync, existsSync } from 'fs';
+import { fileURLToPath } from 'url';
+import { dirname, join, relative, resolve } from 'path';
+import os from 'os';
+
+const __filename = fileURLToPath(import.meta.url);
+const __dirname = dirname(__filename);
+const ROOT = join(__dirname, '..', '..');
+
+function arg(name, fallback) {
+  const i = process.argv.indexOf(`--${name}`);
+  return i >= 0 && process.argv[i + 1] && !process.argv[i + 1].startsWith('--') ? process.argv[i + 1] : fallback;
+}
+
+const baselinePath = resolve(ROOT, arg('baseline', 'tests/bench/baseline.json'));
+const currentPath = resolve(ROOT, arg('current', 'tmp/bench/latest.json'));
+const threshold = Number(arg('threshold', process.env.BENCH_THRESHOLD ?? '15'));
+const update = process.argv.includes('--update');
+
+/**
+ * Flatten vitest's { files: [{ filepath, groups: [{ fullName, benchmarks }] }] }
+ * into "file > group > bench" → stats
+ */
+function flatten(report) {
+  const out = {};
+  for (const file of report.files ?? []) {
+    const filepath = relative(ROOT, file.filepath);
+    for (const group of file.groups ?? []) {
+      for (const b of group.benchmarks ?? []) {
+        out[`${filepath} > ${group.fullName.split(' > ').slice(1).join(' > ') || group.fullName} > ${b.name}`] = {
+          mean: b.mean,
+          median: b.median,
+          p99: b.p99,
+          hz: b.hz,
+          rme: b.rme,
+          samples: b.sampleCount ?? b.samples?.length ?? 0
+        };
+      }
+    }
+  }
+  return out;
+}
+
+function machine() {
+  const cpus = os.cpus();
+  return { node: process.version, platform: `${process.platform}-${process.arch}`, cpu: cpus[0]?.model ?? 'unknown', cores: cpus.length };
+}
+
+function fmt(ms) {
+  if (ms < 0.001) return `${(ms * 1e6).toFixed(0)}ns`;
+  if (ms < 1) return `${(ms * 1e3).toFixed(2)}µs`;
+  return `${ms.toFixed(3)}ms`;
+}
+
+if (!existsSync(currentPath)) {
+  console.error(`ERROR: no bench results at ${relative(ROOT, currentPath)} — run \`npm run bench\` first`);
+  process.exit(1);
+}
+
+const current = flatten(JSON.parse(readFileSync(currentPath, 'utf8')));
+
+if (update) {
+  writeFileSync(baselinePath, JSON.stringify({
+    generatedAt: new Date().toISOString(),
+    machine: machine(),
+    benchmarks: current
+  }, null, 2) + '\n');
+  console.log(`✅ Baseline updated: ${Object.keys(current).length} benchmarks → ${relative(ROOT, baselinePath)}`);
+  process.exit(0);
+}
+
+const baseline = existsSync(baselinePath) ? JSON.parse(readFileSync(baselinePath, 'utf8')) : { benchmarks: {} };
+const here = machine();
+if (baseline.machine && (baseline.machine.cpu !== here.cpu || baseline.machine.node !== here.node)) {
+  console.warn(`⚠️  Baseline was recorded on ${baseline.machine.cpu} / ${baseline.machine.node}; this is ${here.cpu} / ${here.node}. Deltas may reflect the machine.\n`);
+}
+
+const regressions = [];
+const rows = [];
+for (const [key, now] of Object.entries(current)) {
+  const base = baseline.benchmarks[key];
+  if (!base) {
+    rows.push(['NEW', key, '-', fmt(now.mean), '-']);
+    continue;
+  }
+  const delta = ((now.mean - base.mean) / base.mean) * 100;
+  const noise = (base.rme ?? 0) + (now.rme ?? 0);
+  let status = 'ok';
+  if (delta > threshold && delta > noise) {
+    status = 'SLOWER';
+    regressions.push({ key, delta });
+  } else if (-delta > threshold && -delta > noise) {
+    status = 'faster';
+  }
+  rows.push([status, key, fmt(base.mean), fmt(now.mean), `${delta >= 0 ? '+' : ''}${delta.toFixed(1)}% (±${noise.toFixed(1)}%)`]);
+}
+const missing = Object.keys(baseline.benchmarks).filter((k) => !(k in current));
+
+const widths = [6, Math.max(...rows.map((r) => r[1].length), 9), 10, 10];
+console.log(['status'.padEnd(widths[0]), 'benchmark'.padEnd(widths[1]), 'baseline'.padStart(widths[2]), 'current'.padStart(widths[3]), 'delta'].join('  '));
+for (const r of rows) {
+  console.log([r[0].padEnd(widths[0]), r[1].padEnd(widths[1]), r[2].padStart(widths[2]), r[3].padStart(widths[3]), r[4]].join('  '));
+}
+for (const k of missing) console.log(`${'GONE'.padEnd(widths[0])}  ${k}`);
+
+console.log(`\nThreshold: ${threshold}% slower (mean) and outside combined rme`);
+if (regressions.length) {
+  console.error(`❌ ${regressions.length} regression(s):`);
+  for (const r of regressions) console.error(`   ${r.key}  +${r.delta.toFixed(1)}%`);
+  process.exit(1);
+}
+console.log('✅ No regressions');
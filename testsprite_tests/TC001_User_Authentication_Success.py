@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import Steps
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC001")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -50,19 +53,19 @@ async def run_test():
         frame = context.pages[-1]
         # Input valid email address
         elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
+        await steps.fill(elem, 'any2crds+pat1@gmail.com', "Input valid email address")
         
 
         frame = context.pages[-1]
         # Input valid password
         elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
+        await steps.fill(elem, 'admin123', "Input valid password")
         
 
         frame = context.pages[-1]
         # Click the Sign In button to submit the login form
         elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the Sign In button to submit the login form")
         
 
         # --> Assertions to verify final state
@@ -74,9 +77,10 @@ async def run_test():
         await expect(frame.locator('text=Ready to start your day? Let\'s log some nutrition data!').first).to_be_visible(timeout=30000)
         await expect(frame.locator('text=Chat with Pat').first).to_be_visible(timeout=30000)
         await expect(frame.locator('text=© 2024 Pat AI Assistant').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
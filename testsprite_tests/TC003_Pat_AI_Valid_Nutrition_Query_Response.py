@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import CHAT_FUNCTIONS, Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC003")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,89 +50,77 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In button to log in.
-        frame = context.pages[-1]
-        # Input email address
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click Sign In button
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Click on 'Chat with Pat' button to open the chat interface.
         frame = context.pages[-1]
         # Click on 'Chat with Pat' button
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click on 'Chat with Pat' button")
         
 
         # -> Input the nutrition-related question 'What are the benefits of protein?' into the chat input and send it.
         frame = context.pages[-1]
         # Input nutrition-related question into chat input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('What are the benefits of protein?')
+        await steps.fill(elem, 'What are the benefits of protein?', "Input nutrition-related question into chat input")
         
 
         frame = context.pages[-1]
         # Click send button to submit the question
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click send button to submit the question", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # -> Try to click on the 'Tell me what you ate' button or 'Show me what you're eating' button to see if it resets the chat input or reveals an input field to type the question.
         frame = context.pages[-1]
         # Click 'Tell me what you ate' button to try to reset or reveal chat input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click 'Tell me what you ate' button to try to reset or reveal chat input")
         
 
         frame = context.pages[-1]
         # Click 'Show me what you're eating' button to try to reset or reveal chat input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click 'Show me what you're eating' button to try to reset or reveal chat input")
         
 
         # -> Input the nutrition-related question 'What are the benefits of protein?' into the chat input field and send it.
         frame = context.pages[-1]
         # Input nutrition-related question into chat input field
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('What are the benefits of protein?')
+        await steps.fill(elem, 'What are the benefits of protein?', "Input nutrition-related question into chat input field")
         
 
         frame = context.pages[-1]
         # Click send button to submit the question
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click send button to submit the question", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # -> Try to click the menu button (index 1) to see if there is an option to reset or restart the chat session to recover from the stuck listening state.
         frame = context.pages[-1]
         # Click menu button to check for reset or restart options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click menu button to check for reset or restart options")
         
 
         # -> Click 'New chat' button to start a fresh chat and input the nutrition-related question 'What are the benefits of protein?' again to verify response in a new session.
         frame = context.pages[-1]
         # Click 'New chat' button to start a fresh chat
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[2]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click 'New chat' button to start a fresh chat")
         
 
         # -> Click the menu button (index 1) to check for other navigation or reset options, or try clicking other buttons (index 2, 3, 4) to reveal the chat input field.
         frame = context.pages[-1]
         # Click menu button to check for options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click menu button to check for options")
         
 
         # --> Assertions to verify final state
@@ -138,9 +129,10 @@ async def run_test():
             await expect(frame.locator('text=Pat AI is offline').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError("Test case failed: The AI Chat Assistant (Pat) did not respond appropriately to the nutrition-related question 'What are the benefits of protein?'. Test plan execution failed.")
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
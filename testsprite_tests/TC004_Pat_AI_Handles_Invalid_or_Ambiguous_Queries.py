@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import CHAT_FUNCTIONS, Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC004")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,91 +50,81 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In to access the AI chat interface.
-        frame = context.pages[-1]
-        # Input the email address for login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input the password for login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click the Sign In button to log in
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Click the 'Chat with Pat' button to open the AI chat interface.
         frame = context.pages[-1]
         # Click the 'Chat with Pat' button to open the AI chat interface
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Chat with Pat' button to open the AI chat interface")
         
 
         # -> Input the ambiguous question 'What is the color of nutrition?' into the chat input and submit it.
         frame = context.pages[-1]
         # Input ambiguous nutrition question into chat input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('What is the color of nutrition?')
+        await steps.fill(elem, 'What is the color of nutrition?', "Input ambiguous nutrition question into chat input")
         
 
         frame = context.pages[-1]
         # Submit the ambiguous nutrition question to Pat AI
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Submit the ambiguous nutrition question to Pat AI", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # -> Try to refresh or reload the chat interface to see if the response appears or try submitting the query again to trigger a response.
         frame = context.pages[-1]
         # Click the submit button again to resend the ambiguous nutrition question to Pat AI
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the submit button again to resend the ambiguous nutrition question to Pat AI", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # -> Try to input a different ambiguous or nonsensical nutrition query to see if Pat AI responds with a polite clarification or error message.
         frame = context.pages[-1]
         # Input a different ambiguous nutrition question into chat input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('Can you explain the taste of calories?')
+        await steps.fill(elem, 'Can you explain the taste of calories?', "Input a different ambiguous nutrition question into chat input")
         
 
         frame = context.pages[-1]
         # Submit the ambiguous nutrition question to Pat AI
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Submit the ambiguous nutrition question to Pat AI", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # -> Try clicking the microphone button to see if voice input or another interaction triggers a response or error message from Pat AI.
         frame = context.pages[-1]
         # Click the microphone button to test if voice input triggers a response or error message from Pat AI
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the microphone button to test if voice input triggers a response or error message from Pat AI")
         
 
         # -> Click the menu button at index 1 to check for any hidden logs, settings, or error messages that might explain the lack of response.
         frame = context.pages[-1]
         # Click the Open menu button to check for hidden logs or error messages
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the Open menu button to check for hidden logs or error messages")
         
 
         # -> Click on the recent chat with the ambiguous query 'what is protein' that received the polite clarification to verify the full message and confirm graceful handling.
         frame = context.pages[-1]
         # Click the recent chat with ambiguous query 'what is protein' that received a polite clarification message
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[4]/div[2]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the recent chat with ambiguous query 'what is protein' that received a polite clarification message")
         
 
         # --> Assertions to verify final state
         frame = context.pages[-1]
         await expect(frame.locator('text=I\'m sorry, but I can\'t assist with that.').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC007")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,29 +50,15 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In to authenticate.
-        frame = context.pages[-1]
-        # Input the email address for login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input the password for login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click the Sign In button to submit login form
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Access the meal logging page to add a meal suggested by Gemini AI.
         frame = context.pages[-1]
         # Click Open menu to find navigation to meal logging page
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu to find navigation to meal logging page")
         
 
         # --> Assertions to verify final state
@@ -78,9 +67,10 @@ async def run_test():
             await expect(frame.locator('text=Gemini AI meal macro calculation success').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError('Test failed: Gemini AI generated meal entries did not provide accurate macro calculations as expected according to the test plan.')
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
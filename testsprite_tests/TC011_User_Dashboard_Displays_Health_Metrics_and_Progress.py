@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import CHAT_FUNCTIONS, Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC011")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,63 +50,50 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In to log in.
-        frame = context.pages[-1]
-        # Input the email address for login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input the password for login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click the Sign In button to submit login form
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Verify if there is any option or button to view or log meals to check meal logs and macro summaries.
         frame = context.pages[-1]
         # Click the 'Edit macro targets' button to check macro summary details and options to log meals
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div/div[3]/div[2]/div/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Edit macro targets' button to check macro summary details and options to log meals")
         
 
         # -> Close the 'Edit Macro Targets' modal and check the main dashboard for meal logs, TDEE, and visual progress indicators.
         frame = context.pages[-1]
         # Click the 'Cancel' button to close the 'Edit Macro Targets' modal
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div/div[5]/div[2]/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Cancel' button to close the 'Edit Macro Targets' modal")
         
 
         # -> Log a sample meal entry to verify that meal logs and macro summaries update correctly on the dashboard.
         frame = context.pages[-1]
         # Click the 'Chat with Pat' button to interact with AI assistant for meal logging or commands
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Chat with Pat' button to interact with AI assistant for meal logging or commands")
         
 
         # -> Click the 'Tell me what you ate' button to start logging a meal via chat.
         frame = context.pages[-1]
         # Click the 'Tell me what you ate' button to start meal logging via chat
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Tell me what you ate' button to start meal logging via chat")
         
 
         # -> Input a sample meal description in the chat input area and send it to log the meal.
         frame = context.pages[-1]
         # Input a sample meal description to log a meal via chat
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('I ate a chicken salad with avocado and olive oil.')
+        await steps.fill(elem, 'I ate a chicken salad with avocado and olive oil.', "Input a sample meal description to log a meal via chat")
         
 
         frame = context.pages[-1]
         # Send the meal description message to log the meal
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Send the meal description message to log the meal", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # --> Assertions to verify final state
@@ -112,9 +102,10 @@ async def run_test():
             await expect(frame.locator('text=Complete Health Dashboard Overview').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError("Test case failed: The personalized user dashboard did not display relevant health metrics, meal logs, and progress indicators as required by the test plan.")
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC012")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,80 +50,55 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Simulate tablet screen size and reload the page to check responsiveness and content visibility.
-        await page.goto('http://localhost:5173/', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/', "Simulate tablet screen size and reload the page to check responsiveness and content visibility.")
         
 
         await page.mouse.wheel(0, 300)
         
 
         # -> Input username and password, then click Sign In to access the dashboard.
-        frame = context.pages[-1]
-        # Input username
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click Sign In button
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Simulate tablet screen size and reload the dashboard to verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size and reload the dashboard to verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size and reload dashboard to verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size and reload dashboard to verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size by resizing viewport, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size by resizing viewport, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size by resizing viewport, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size by resizing viewport, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size by resizing viewport, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size by resizing viewport, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # -> Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.
-        await page.goto('http://localhost:5173/dashboard', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/dashboard', "Simulate tablet screen size, reload dashboard, and verify UI responsiveness and element visibility.")
         
 
         # --> Assertions to verify final state
@@ -129,9 +107,10 @@ async def run_test():
             await expect(frame.locator('text=Dashboard UI is perfectly responsive on all devices').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError('Test plan failed: Dashboard UI responsiveness and element visibility verification failed across multiple screen sizes including mobile and desktop.')
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC013")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,43 +50,29 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In button to authenticate.
-        frame = context.pages[-1]
-        # Input email address
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click Sign In button
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Click the 'Chat with Pat' button to open the AI chat interface.
         frame = context.pages[-1]
         # Click the 'Chat with Pat' button to open AI chat interface
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Chat with Pat' button to open AI chat interface")
         
 
         # -> Input a query that triggers an AI response in the chat textarea.
         frame = context.pages[-1]
         # Input a query to trigger AI response
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('What is the recommended daily intake of protein?')
+        await steps.fill(elem, 'What is the recommended daily intake of protein?', "Input a query to trigger AI response")
         
 
         # -> Click the 'Voice Chat' button to activate text-to-speech for the AI response.
         frame = context.pages[-1]
         # Click the 'Voice Chat' button to activate text-to-speech
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Voice Chat' button to activate text-to-speech")
         
 
         # --> Assertions to verify final state
@@ -95,9 +84,10 @@ async def run_test():
         await expect(frame.locator('text=neutral').first).to_be_visible(timeout=30000)
         await expect(frame.locator('text=Start Voice Chat').first).to_be_visible(timeout=30000)
         await expect(frame.locator('text=Chat with Pat').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC014")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,50 +50,36 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In button to authenticate.
-        frame = context.pages[-1]
-        # Input the email address
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input the password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click the Sign In button
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Click the 'Talk with Pat' button to open the voice input interface for Pat AI.
         frame = context.pages[-1]
         # Click the 'Talk with Pat' button to open voice input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Talk with Pat' button to open voice input")
         
 
         # -> Click the 'Start Voice Chat' button to initiate voice input for asking a nutrition-related question.
         frame = context.pages[-1]
         # Click the 'Start Voice Chat' button to initiate voice input
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/button[4]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Start Voice Chat' button to initiate voice input")
         
 
         # -> Click the 'Stop Listening' button to simulate end of voice input and trigger AI response processing.
         frame = context.pages[-1]
         # Click the 'Stop Listening' button to end voice input and trigger AI response
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/button[4]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click the 'Stop Listening' button to end voice input and trigger AI response")
         
 
         # -> Try to trigger or reveal the AI response or transcription area by clicking on 'Tell me what you ate' button to check if the AI response is shown there.
         frame = context.pages[-1]
         # Click 'Tell me what you ate' button to check for AI response or query transcription
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click 'Tell me what you ate' button to check for AI response or query transcription")
         
 
         # --> Assertions to verify final state
@@ -101,9 +90,10 @@ async def run_test():
         await expect(frame.locator('text=Silent Mode').first).to_be_visible(timeout=30000)
         await expect(frame.locator('text=Stop Listening').first).to_be_visible(timeout=30000)
         await expect(frame.locator('text=Chat with Pat').first).to_be_visible(timeout=30000)
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
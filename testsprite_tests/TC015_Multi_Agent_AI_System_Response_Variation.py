@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import CHAT_FUNCTIONS, Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC015")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,42 +50,29 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In button to authenticate user.
-        frame = context.pages[-1]
-        # Input email address
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click Sign In button
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Submit the same nutrition question multiple times using different AI agents to verify distinct responses.
         frame = context.pages[-1]
         # Click Chat with Pat button to submit nutrition question to Pat AI agent
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Chat with Pat button to submit nutrition question to Pat AI agent")
         
 
         # -> Submit the nutrition question 'What are the benefits of eating apples?' to the first AI agent by typing in the textarea and submitting.
         frame = context.pages[-1]
         # Input nutrition question in the chat textarea
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('What are the benefits of eating apples?')
+        await steps.fill(elem, 'What are the benefits of eating apples?', "Input nutrition question in the chat textarea")
         
 
         frame = context.pages[-1]
         # Submit the nutrition question to the first AI agent
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Submit the nutrition question to the first AI agent", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # --> Assertions to verify final state
@@ -91,9 +81,10 @@ async def run_test():
             await expect(frame.locator('text=Distinct AI Personality Response').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError("Test case failed: The multi-agent AI system did not provide distinct responses from different AI personalities as expected based on the test plan.")
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
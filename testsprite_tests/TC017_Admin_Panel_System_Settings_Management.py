@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC017")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,102 +50,86 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input admin email and password, then click Sign In button to access admin panel.
-        frame = context.pages[-1]
-        # Input admin email address
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input admin password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click Sign In button to login
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Click on the menu button to open navigation and find the admin panel settings section.
         frame = context.pages[-1]
         # Click Open menu button to reveal navigation options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu button to reveal navigation options")
         
 
         # -> Look for admin panel settings section in the menu and click it to access system settings.
         frame = context.pages[-1]
         # Click Close button to close menu and check if settings appear elsewhere
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Close button to close menu and check if settings appear elsewhere")
         
 
         # -> Click the menu button to open navigation options and look for admin panel settings section.
         frame = context.pages[-1]
         # Click Open menu button to reveal navigation options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu button to reveal navigation options")
         
 
         # -> Check if the admin panel settings section is accessible from the Profile or Dashboard buttons or elsewhere on the page.
         frame = context.pages[-1]
         # Click Profile button to check for admin settings access
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[2]/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Profile button to check for admin settings access")
         
 
         # -> Click on Preferences tab to check for system settings or admin panel settings access.
         frame = context.pages[-1]
         # Click Preferences tab on Profile page
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Preferences tab on Profile page")
         
 
         # -> Change a configurable system parameter, such as the Dashboard Week Start Day from Sunday to Monday.
         frame = context.pages[-1]
         # Click Monday button to change Dashboard Week Start Day from Sunday to Monday
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[2]/div[2]/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Monday button to change Dashboard Week Start Day from Sunday to Monday")
         
 
         # -> Check if there is a save button to save the updated settings or if changes are auto-saved.
         frame = context.pages[-1]
         # Click Save or equivalent button if present to save updated settings
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[2]/div[3]/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Save or equivalent button if present to save updated settings")
         
 
         # -> Reload the Profile page and navigate back to Preferences tab to verify that the Week Start Day change persists.
-        await page.goto('http://localhost:5173/profile', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/profile', "Reload the Profile page and navigate back to Preferences tab to verify that the Week Start Day change persists.")
         
 
         # -> Click Preferences tab to verify if the Dashboard Week Start Day change to Monday persists.
         frame = context.pages[-1]
         # Click Preferences tab to check if Week Start Day change persists
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Preferences tab to check if Week Start Day change persists")
         
 
         # -> Try changing the Week Start Day back to Monday again and verify if there is any save or confirmation mechanism to persist the change.
         frame = context.pages[-1]
         # Click Monday button to change Dashboard Week Start Day from Sunday to Monday again
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[2]/div[2]/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Monday button to change Dashboard Week Start Day from Sunday to Monday again")
         
 
         # -> Try changing the Appearance theme from Dark to Light and verify if the change persists after reload.
         frame = context.pages[-1]
         # Click Light theme button to change Appearance theme from Dark to Light
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[2]/div/div/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Light theme button to change Appearance theme from Dark to Light")
         
 
         # -> Reload the Profile page and navigate back to Preferences tab to verify if the Appearance theme change persists.
-        await page.goto('http://localhost:5173/profile', timeout=10000)
-        await asyncio.sleep(3)
+        await steps.goto('http://localhost:5173/profile', "Reload the Profile page and navigate back to Preferences tab to verify if the Appearance theme change persists.")
         
 
         # --> Assertions to verify final state
@@ -151,9 +138,10 @@ async def run_test():
             await expect(frame.locator('text=System Settings Updated Successfully').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError("Test failed: Admin users cannot view and update system settings through the admin panel as expected. The changes to system settings did not persist or affect system behavior.")
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
@@ -1,11 +1,13 @@
 import asyncio
 from playwright import async_api
 from playwright.async_api import expect
+from tc_support import CHAT_FUNCTIONS, Steps, ensure_logged_in
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -28,6 +30,7 @@ async def run_test():
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC018")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,29 +50,15 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input trainer email and password, then click Sign In button to log in as a trainer.
-        frame = context.pages[-1]
-        # Input trainer email
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input trainer password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click Sign In button to log in
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Open the menu to find and navigate to the client management dashboard.
         frame = context.pages[-1]
         # Click Open menu button to access navigation options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu button to access navigation options")
         
 
         # -> Look for a client management dashboard or clients section in the menu or dashboard to navigate to it.
@@ -79,28 +68,28 @@ async def run_test():
         frame = context.pages[-1]
         # Click Profile button to check if client management is under profile or related section
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[2]/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Profile button to check if client management is under profile or related section")
         
 
         # -> Click the Open menu button to explore navigation options again for client management or clients section.
         frame = context.pages[-1]
         # Click Open menu button to access navigation options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu button to access navigation options")
         
 
         # -> Check if there is a 'Dashboard' button in the menu that might lead to client management or client list, and click it to explore.
         frame = context.pages[-1]
         # Click Dashboard button in the menu to check for client management or client list
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Dashboard button in the menu to check for client management or client list")
         
 
         # -> Click the Open menu button to explore navigation options for client management or clients section.
         frame = context.pages[-1]
         # Click Open menu button to access navigation options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu button to access navigation options")
         
 
         # -> Scroll down the menu to check for any hidden client management or clients section or button.
@@ -120,48 +109,49 @@ async def run_test():
         frame = context.pages[-1]
         # Click New chat button to check if client management or client adding is accessible via chat interface
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[2]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click New chat button to check if client management or client adding is accessible via chat interface")
         
 
         # -> Click the Open menu button to explore navigation options for client management or clients section.
         frame = context.pages[-1]
         # Click Open menu button to access navigation options
         elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Open menu button to access navigation options")
         
 
         # -> Try to interact with the Profile button to check if client management or clients section is nested there.
         frame = context.pages[-1]
         # Click Profile button to check for client management or clients section
         elem = frame.locator('xpath=html/body/div/div[3]/div/aside/nav/div[2]/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Profile button to check for client management or clients section")
         
 
         # -> Click the Edit button to check if client management or client adding options are available in edit mode.
         frame = context.pages[-1]
         # Click Edit button on Profile page to check for client management or client adding options
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click Edit button on Profile page to check for client management or client adding options")
         
 
         # -> Use the chat interface to ask the AI assistant if it can help navigate to client management or add clients.
         frame = context.pages[-1]
         # Click 'Chat with Pat' button to open AI chat interface for assistance
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[5]/div[2]/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click 'Chat with Pat' button to open AI chat interface for assistance")
         
 
         # -> Use the chat input to ask the AI assistant how to add, view, and manage multiple clients as a personal trainer.
         frame = context.pages[-1]
         # Ask AI assistant about managing multiple clients
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('How can I add, view, and manage multiple clients and their data as a personal trainer?')
+        await steps.fill(elem, 'How can I add, view, and manage multiple clients and their data as a personal trainer?', "Ask AI assistant about managing multiple clients")
         
 
         frame = context.pages[-1]
         # Submit the question to AI assistant
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Submit the question to AI assistant", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
         
 
         # --> Assertions to verify final state
@@ -170,9 +160,10 @@ async def run_test():
             await expect(frame.locator('text=Client Management Dashboard').first).to_be_visible(timeout=1000)
         except AssertionError:
             raise AssertionError("Test case failed: Unable to find 'Client Management Dashboard' indicating that personal trainers cannot add, view, and manage multiple clients and their data as required by the test plan.")
-        await asyncio.sleep(5)
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
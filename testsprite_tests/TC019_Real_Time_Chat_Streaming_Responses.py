@@ -1,11 +1,24 @@
 import asyncio
+import json
+import os
 from playwright import async_api
-from playwright.async_api import expect
+import stream_probe
+from tc_support import Steps, ensure_logged_in
+
+# Prompts to time; override with STREAM_PROMPTS='["...", "..."]'
+PROMPTS = json.loads(os.environ.get("STREAM_PROMPTS", "null")) or [
+    "Can you explain the benefits of a balanced diet and how it affects overall health?",
+    "What are the key nutrients in a balanced diet and how do they contribute to health?",
+    "Can you describe the importance of hydration and its effects on bodily functions?",
+]
+STREAM_TIMEOUT_MS = int(os.environ.get("STREAM_TIMEOUT_MS", "60000"))
 
 async def run_test():
     pw = None
     browser = None
     context = None
+    steps = None
+    runs = []
     
     try:
         # Start a Playwright session in asynchronous mode
@@ -25,9 +38,11 @@ async def run_test():
         # Create a new browser context (like an incognito window)
         context = await browser.new_context()
         context.set_default_timeout(5000)
+        await stream_probe.install(context)
         
         # Open a new page in the browser context
         page = await context.new_page()
+        steps = Steps(page, "TC019")
         
         # Navigate to your target URL and wait until the network request is committed
         await page.goto("http://localhost:5173", wait_until="commit", timeout=10000)
@@ -47,121 +62,66 @@ async def run_test():
         
         # Interact with the page elements to simulate user flow
         # -> Input email and password, then click Sign In button to authenticate.
-        frame = context.pages[-1]
-        # Input the email address
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('any2crds+pat1@gmail.com')
-        
-
-        frame = context.pages[-1]
-        # Input the password
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/div[2]/div/input').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('admin123')
-        
-
-        frame = context.pages[-1]
-        # Click the Sign In button
-        elem = frame.locator('xpath=html/body/div/div[3]/div/form/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        # Log in (skipped when run_suite.py provides an authenticated context)
+        await ensure_logged_in(page)
         
 
         # -> Click 'Chat with Pat' button to open AI chat interface.
         frame = context.pages[-1]
         # Click 'Chat with Pat' button to open AI chat interface
         elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/div[3]/div[2]/div[3]/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+        await steps.click(elem, "Click 'Chat with Pat' button to open AI chat interface")
         
 
-        # -> Input a nutrition query that triggers a multi-sentence AI response in the textarea and submit it.
-        frame = context.pages[-1]
-        # Input a nutrition query that triggers a multi-sentence AI response
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('Can you explain the benefits of a balanced diet and how it affects overall health?')
-        
+        # -> For each prompt: type it, send it, and time the SSE reply that callChatStreaming reads.
+        for i, prompt in enumerate(PROMPTS, 1):
+            before = await stream_probe.record_count(page)
 
-        frame = context.pages[-1]
-        # Click the submit button to send the query
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+            frame = context.pages[-1]
+            # Input a multi-sentence nutrition query to trigger streaming AI response
+            elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
+            await steps.fill(elem, prompt, f"Input streaming prompt {i}")
 
-        # -> Try clicking the submit button again or input a new multi-sentence nutrition query to trigger the AI response streaming.
-        frame = context.pages[-1]
-        # Click the submit button again to retry triggering AI response streaming
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[3]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Input a different multi-sentence nutrition query to trigger the AI response streaming and observe if it appears incrementally.
-        frame = context.pages[-1]
-        # Input a different multi-sentence nutrition query to trigger AI response streaming
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('What are the key nutrients in a balanced diet and how do they contribute to health?')
-        
+            # Click the submit button to send the query
+            elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
+            await steps.click(elem, f"Send streaming prompt {i}", expect_function=stream_probe.STREAM_FUNCTIONS)
 
-        frame = context.pages[-1]
-        # Click the submit button to send the new query
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
+            streamed = await stream_probe.wait_for_stream(page, before, timeout=STREAM_TIMEOUT_MS)
+            records = await stream_probe.collect(page, before)
+            chosen = next((r for r in records if r["stream"]), records[-1] if records else None)
+            if chosen is None:
+                runs.append({"prompt": prompt, "stream": False, "error": "no chat request was sent"})
+            else:
+                run = stream_probe.measure(chosen)
+                run["prompt"] = prompt
+                if not streamed and not run["error"]:
+                    run["error"] = f"no streamed response within {STREAM_TIMEOUT_MS}ms (status {run['status']})"
+                runs.append(run)
 
-        # -> Try clicking the 'Show me what you're eating' button to see if it triggers a streaming AI response or reveals the chat output area.
-        frame = context.pages[-1]
-        # Click 'Show me what you're eating' button to check for AI response or chat output
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div/div/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Back to Voice' button to return to the chat interface and continue testing AI response streaming.
-        frame = context.pages[-1]
-        # Click 'Back to Voice' button to return to chat interface
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Click 'Chat with Pat' button to open the AI chat interface and input a multi-sentence nutrition query to test streaming AI response.
-        frame = context.pages[-1]
-        # Click 'Chat with Pat' button to open AI chat interface
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div[2]/div/button[5]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Input a multi-sentence nutrition query that triggers a streaming AI response and submit it.
-        frame = context.pages[-1]
-        # Input a multi-sentence nutrition query to trigger streaming AI response
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/textarea').nth(0)
-        await page.wait_for_timeout(3000); await elem.fill('Can you describe the importance of hydration and its effects on bodily functions?')
-        
-
-        frame = context.pages[-1]
-        # Click the submit button to send the query
-        elem = frame.locator('xpath=html/body/div/div[3]/main/div/div/div[2]/div/button[2]').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Try to interact with the UI elements to find any hidden or collapsed chat response area or logs that might show the streaming AI response. Possibly click the menu button to check for chat logs or response history.
-        frame = context.pages[-1]
-        # Click the 'Open menu' button to check for chat logs or response history
-        elem = frame.locator('xpath=html/body/div/div[3]/header/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
-        
-
-        # -> Close the menu panel to return focus to the main chat interface and submit a new multi-sentence nutrition query to observe streaming AI response.
-        frame = context.pages[-1]
-        # Click Close button to close the menu panel
-        elem = frame.locator('xpath=html/body/div/div[3]/div/aside/div/button').nth(0)
-        await page.wait_for_timeout(3000); await elem.click(timeout=5000)
+            await steps.wait_for_reply(f"Wait for reply {i} to settle")
         
 
         # --> Assertions to verify final state
-        frame = context.pages[-1]
-        try:
-            await expect(frame.locator('text=Streaming AI response successful').first).to_be_visible(timeout=1000)
-        except AssertionError:
-            raise AssertionError("Test case failed: Streaming AI chat responses did not appear incrementally and smoothly as expected in the chat interface, indicating a failure in real-time response streaming.")
-        await asyncio.sleep(5)
+        summary = stream_probe.summarize(runs)
+        limits = stream_probe.budgets()
+        failures = [f"prompt {i}: {r['error']}" for i, r in enumerate(runs, 1) if not r.get("stream") or r.get("error")]
+        failures += [f"prompt {i}: no tokens received" for i, r in enumerate(runs, 1) if r.get("stream") and not r.get("tokens")]
+        failures += stream_probe.check_budgets(summary, limits)
+
+        report = {"case": "TC019", "budgets_p95_ms": limits, "summary": summary, "runs": runs, "failures": failures}
+        path = stream_probe.write_report("TC019", report)
+        print(json.dumps({"summary": summary, "failures": failures}, indent=2))
+
+        if failures:
+            raise AssertionError(
+                "Test case failed: chat streaming did not meet expectations: "
+                + "; ".join(failures)
+                + f". Per-prompt timings in {path}"
+            )
     
     finally:
+        if steps:
+            steps.save()
         if context:
             await context.close()
         if browser:
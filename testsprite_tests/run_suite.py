@@ -0,0 +1,358 @@
+"""Parallel runner for the testsprite_tests Playwright scripts.
+
+Each TC script launches its own Chromium and logs in through the UI, so
+running them one by one pays browser start-up and login 19 times, serially.
+This runner:
+
+- discovers ``TC*.py`` in this directory (filter with ``-k``)
+- launches ONE shared Chromium and gives each case its own browser context
+- logs in once and hands the captured ``storage_state`` to every case
+  (TC001/TC002 exercise the login form and get a fresh, logged-out context)
+- runs cases concurrently on ``--workers`` contexts
+- writes per-case status and timings into a test_results.json-compatible
+  report, keeping TestSprite ids for cases that already have an entry, and
+  folds in the per-step UI timings each case records via ``tc_support.Steps``
+
+The scripts are not edited to cooperate. Each is loaded without its trailing
+``asyncio.run(run_test())`` and its module-level ``async_api`` is swapped for
+a shim whose ``async_playwright().start()`` / ``chromium.launch()`` /
+``new_context()`` return the shared browser and a fresh context.
+
+Usage:
+    python testsprite_tests/run_suite.py                 # all cases, 4 workers
+    python testsprite_tests/run_suite.py -w 8 -k TC00    # TC001-TC009
+    TESTSPRITE_WORKERS=6 python testsprite_tests/run_suite.py --report out.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import asyncio
+import json
+import os
+import re
+import sys
+import tempfile
+import time
+import traceback
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Optional
+
+from playwright import async_api
+from playwright.async_api import Browser, BrowserContext, async_playwright
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE))
+
+import tc_support  # noqa: E402  (needs HERE on sys.path)
+
+DEFAULT_REPORT = HERE / "tmp" / "test_results.json"
+
+# Cases that exercise the login form itself
+FRESH_SESSION_CASES = {"TC001", "TC002"}
+
+BROWSER_ARGS = [
+    "--window-size=1280,720",
+    "--disable-dev-shm-usage",
+]
+
+
+@dataclass
+class CaseResult:
+    case_id: str
+    path: Path
+    status: str = "PENDING"  # PASSED | FAILED
+    error: str = ""
+    started_at: float = 0.0
+    duration_ms: float = 0.0
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+# ---------- Shim handed to each TC module as `async_api` ----------
+
+class _CaseBrowser:
+    """Looks like a Browser; contexts come from the shared browser."""
+
+    def __init__(self, shared: Browser, storage_state: Optional[str]):
+        self._shared = shared
+        self._storage_state = storage_state
+        self._contexts: list[BrowserContext] = []
+
+    async def new_context(self, **kwargs: Any) -> BrowserContext:
+        if self._storage_state and "storage_state" not in kwargs:
+            kwargs["storage_state"] = self._storage_state
+        context = await self._shared.new_context(**kwargs)
+        self._contexts.append(context)
+        return context
+
+    async def close(self) -> None:
+        # Only this case's contexts; the shared browser outlives the case
+        for context in self._contexts:
+            try:
+                await context.close()
+            except async_api.Error:
+                pass
+        self._contexts.clear()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._shared, name)
+
+
+class _CaseBrowserType:
+    def __init__(self, browser: _CaseBrowser):
+        self._browser = browser
+
+    async def launch(self, **_kwargs: Any) -> _CaseBrowser:
+        return self._browser
+
+
+class _CasePlaywright:
+    def __init__(self, browser: _CaseBrowser):
+        self.chromium = _CaseBrowserType(browser)
+
+    async def stop(self) -> None:
+        await self.chromium._browser.close()
+
+
+class _CaseStarter:
+    def __init__(self, browser: _CaseBrowser):
+        self._browser = browser
+
+    async def start(self) -> _CasePlaywright:
+        return _CasePlaywright(self._browser)
+
+
+class _CaseAsyncApi:
+    """Stands in for `playwright.async_api` inside one TC module."""
+
+    def __init__(self, browser: _CaseBrowser):
+        self._browser = browser
+
+    def async_playwright(self) -> _CaseStarter:
+        return _CaseStarter(self._browser)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(async_api, name)
+
+
+# ---------- Discovery / loading ----------
+
+def discover(pattern: Optional[str]) -> list[Path]:
+    cases = sorted(HERE.glob("TC*.py"))
+    if pattern:
+        rx = re.compile(pattern)
+        cases = [p for p in cases if rx.search(p.stem)]
+    return cases
+
+
+def case_id(path: Path) -> str:
+    return path.stem.split("_", 1)[0]
+
+
+def _is_asyncio_run(node: ast.stmt) -> bool:
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Call)
+        and isinstance(node.value.func, ast.Attribute)
+        and node.value.func.attr == "run"
+        and isinstance(node.value.func.value, ast.Name)
+        and node.value.func.value.id == "asyncio"
+    )
+
+
+def load_case(path: Path) -> ModuleType:
+    """Import a TC script without executing its `asyncio.run(run_test())`."""
+    tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+    tree.body = [node for node in tree.body if not _is_asyncio_run(node)]
+    module = ModuleType(f"testsprite_case_{path.stem}")
+    module.__file__ = str(path)
+    exec(compile(tree, str(path), "exec"), module.__dict__)
+    if not hasattr(module, "run_test"):
+        raise RuntimeError(f"{path.name} has no run_test()")
+    return module
+
+
+# ---------- Auth ----------
+
+async def capture_storage_state(browser: Browser, out_dir: Path) -> str:
+    """Log in once and save cookies + localStorage (Supabase session)."""
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        await page.goto(tc_support.BASE_URL, wait_until="domcontentloaded", timeout=30000)
+        await tc_support.ensure_logged_in(page)
+        path = out_dir / "storage_state.json"
+        await context.storage_state(path=str(path))
+        return str(path)
+    finally:
+        await context.close()
+
+
+# ---------- Running ----------
+
+async def run_case(
+    path: Path,
+    browser: Browser,
+    storage_state: Optional[str],
+    timeout_s: float,
+    sem: asyncio.Semaphore,
+) -> CaseResult:
+    result = CaseResult(case_id=case_id(path), path=path)
+    async with sem:
+        shim_browser = _CaseBrowser(
+            browser,
+            None if result.case_id in FRESH_SESSION_CASES else storage_state,
+        )
+        steps_file = tc_support.STEPS_DIR / f"{result.case_id}.json"
+        steps_file.unlink(missing_ok=True)
+        result.started_at = time.time()
+        start = time.perf_counter()
+        try:
+            module = load_case(path)
+            module.async_api = _CaseAsyncApi(shim_browser)
+            await asyncio.wait_for(module.run_test(), timeout=timeout_s)
+            result.status = "PASSED"
+        except asyncio.TimeoutError:
+            result.status = "FAILED"
+            result.error = f"Timed out after {timeout_s:.0f}s"
+        except Exception as exc:  # noqa: BLE001 - report every failure
+            result.status = "FAILED"
+            result.error = f"{type(exc).__name__}: {exc}"
+            result.extra["traceback"] = traceback.format_exc(limit=5)
+        finally:
+            result.duration_ms = round((time.perf_counter() - start) * 1000, 1)
+            await shim_browser.close()
+            if steps_file.exists():
+                try:
+                    result.extra["steps"] = json.loads(steps_file.read_text(encoding="utf-8"))["steps"]
+                except (json.JSONDecodeError, KeyError, OSError):
+                    pass
+
+    mark = "✓" if result.status == "PASSED" else "✗"
+    print(f"  {mark} {path.stem} {result.duration_ms / 1000:.1f}s {result.error[:120]}", flush=True)
+    return result
+
+
+async def run_suite(args: argparse.Namespace) -> list[CaseResult]:
+    cases = discover(args.pattern)
+    if not cases:
+        print("No TC*.py cases matched", file=sys.stderr)
+        return []
+
+    print(f"Running {len(cases)} cases on {args.workers} workers", flush=True)
+    sem = asyncio.Semaphore(args.workers)
+
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=not args.headed, args=BROWSER_ARGS)
+        try:
+            storage_state = None
+            if not args.no_auth_reuse:
+                auth_dir = Path(tempfile.mkdtemp(prefix="testsprite-auth-"))
+                t0 = time.perf_counter()
+                storage_state = await capture_storage_state(browser, auth_dir)
+                print(f"Captured auth state in {time.perf_counter() - t0:.1f}s", flush=True)
+
+            return await asyncio.gather(*(
+                run_case(path, browser, storage_state, args.case_timeout, sem)
+                for path in cases
+            ))
+        finally:
+            await browser.close()
+
+
+# ---------- Report ----------
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def write_report(results: list[CaseResult], report_path: Path, wall_ms: float, workers: int) -> None:
+    """Merge results into a test_results.json-shaped list.
+
+    Existing entries (matched on the TCxxx prefix of `title`) keep their
+    TestSprite ids and metadata; status, error and timings are replaced.
+    """
+    existing: list[dict[str, Any]] = []
+    if report_path.exists():
+        try:
+            existing = json.loads(report_path.read_text(encoding="utf-8"))
+        except (json.JSONDecodeError, OSError):
+            existing = []
+
+    by_case = {str(e.get("title", ""))[:5]: e for e in existing if isinstance(e, dict)}
+    now = _iso(time.time())
+
+    for r in results:
+        entry = by_case.get(r.case_id)
+        if entry is None:
+            title = r.path.stem.split("_", 1)
+            entry = {
+                "title": f"{title[0]}-{title[1].replace('_', ' ')}" if len(title) > 1 else r.case_id,
+                "description": "",
+                "code": r.path.read_text(encoding="utf-8"),
+                "testType": "FRONTEND",
+                "createFrom": "run_suite",
+                "created": _iso(r.started_at),
+            }
+            existing.append(entry)
+            by_case[r.case_id] = entry
+
+        entry.update({
+            "testStatus": r.status,
+            "testError": r.error,
+            "modified": now,
+            "startedAt": _iso(r.started_at),
+            "durationMs": r.duration_ms,
+            "runner": {"workers": workers, "suiteWallMs": wall_ms},
+        })
+        if "steps" in r.extra:
+            entry["steps"] = r.extra["steps"]
+        if "traceback" in r.extra:
+            entry["testErrorTrace"] = r.extra["traceback"]
+        else:
+            entry.pop("testErrorTrace", None)
+
+    existing.sort(key=lambda e: str(e.get("title", "")))
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(existing, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-w", "--workers", type=int, default=int(os.environ.get("TESTSPRITE_WORKERS", "4")),
+                        help="concurrent browser contexts (default 4, env TESTSPRITE_WORKERS)")
+    parser.add_argument("-k", "--pattern", help="regex matched against case file names")
+    parser.add_argument("--report", type=Path, default=DEFAULT_REPORT,
+                        help=f"results file to update (default {DEFAULT_REPORT.relative_to(HERE.parent)})")
+    parser.add_argument("--case-timeout", type=float, default=180.0, help="per-case timeout in seconds")
+    parser.add_argument("--headed", action="store_true", help="show the browser")
+    parser.add_argument("--no-auth-reuse", action="store_true",
+                        help="log in inside every case instead of sharing storage_state")
+    args = parser.parse_args(argv)
+    args.workers = max(1, args.workers)
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    t0 = time.perf_counter()
+    results = asyncio.run(run_suite(args))
+    wall_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+    write_report(results, args.report, wall_ms, args.workers)
+
+    passed = sum(1 for r in results if r.status == "PASSED")
+    case_ms = sum(r.duration_ms for r in results)
+    print(
+        f"\n{passed}/{len(results)} passed in {wall_ms / 1000:.1f}s wall "
+        f"({case_ms / 1000:.1f}s summed case time); report: {args.report}"
+    )
+    return 0 if results and passed == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
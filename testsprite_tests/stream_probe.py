@@ -0,0 +1,227 @@
+"""Streaming latency probe for the chat SSE endpoints.
+
+``install(context)`` adds an init script that wraps ``window.fetch`` so every
+``functions/v1/openai-chat`` / ``intelligent-chat`` response is tee'd: the app
+(``callChatStreaming`` in src/lib/streamingChat.ts) reads one branch as usual,
+the probe parses the other and timestamps headers, each ``data: {"token"}``
+event and the end of the body. Timings are ``performance.now()`` in the page,
+so they are what the user's browser actually saw.
+
+``collect`` pulls the records back, ``summarize`` turns them into TTFB / TTFT /
+inter-token gap / total distributions, and ``check_budgets`` compares the p95s
+against limits that can be overridden with env vars:
+
+    STREAM_BUDGET_TTFB_P95_MS   (default 2000)
+    STREAM_BUDGET_TTFT_P95_MS   (default 3000)
+    STREAM_BUDGET_GAP_P95_MS    (default 250)
+    STREAM_BUDGET_TOTAL_P95_MS  (default 20000)
+"""
+
+import json
+import math
+import os
+from pathlib import Path
+from typing import Any, Optional
+
+from playwright.async_api import BrowserContext, Page
+
+STREAM_FUNCTIONS = ("openai-chat", "intelligent-chat")
+
+REPORT_DIR = Path(os.environ.get("STREAM_REPORT_DIR", Path(__file__).resolve().parent / "tmp" / "stream_latency"))
+
+DEFAULT_BUDGETS_MS = {
+    "ttfb": 2000.0,
+    "ttft": 3000.0,
+    "gap": 250.0,
+    "total": 20000.0,
+}
+
+_PROBE_SCRIPT = """
+(() => {
+  if (window.__patStreamProbe) return;
+  const records = [];
+  window.__patStreamProbe = records;
+  const PATTERN = /\\/functions\\/v1\\/(%(functions)s)(?:[?/]|$)/;
+  const nativeFetch = window.fetch.bind(window);
+
+  window.fetch = async (input, init) => {
+    const url = typeof input === 'string' ? input : (input instanceof URL ? input.href : input.url);
+    const match = PATTERN.exec(url);
+    if (!match) return nativeFetch(input, init);
+
+    const rec = {
+      fn: match[1], start: performance.now(), headers: null, status: null,
+      stream: false, firstToken: null, tokens: [], done: null, error: null,
+    };
+    records.push(rec);
+
+    let response;
+    try {
+      response = await nativeFetch(input, init);
+    } catch (err) {
+      rec.error = String(err);
+      rec.done = performance.now();
+      throw err;
+    }
+    rec.headers = performance.now();
+    rec.status = response.status;
+
+    const type = response.headers.get('content-type') || '';
+    if (!response.body || !type.includes('text/event-stream')) {
+      rec.done = rec.headers;
+      return response;
+    }
+
+    rec.stream = true;
+    const [probe, app] = response.body.tee();
+    (async () => {
+      const reader = probe.getReader();
+      const decoder = new TextDecoder();
+      let buffer = '';
+      try {
+        for (;;) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          const now = performance.now();
+          buffer += decoder.decode(value, { stream: true });
+          let nl;
+          while ((nl = buffer.indexOf('\\n')) >= 0) {
+            const line = buffer.slice(0, nl).trim();
+            buffer = buffer.slice(nl + 1);
+            if (!line.startsWith('data:')) continue;
+            const data = line.slice(5).trim();
+            if (!data || data === '[DONE]') continue;
+            try {
+              const parsed = JSON.parse(data);
+              const token = parsed.token ?? parsed.choices?.[0]?.delta?.content;
+              if (token) {
+                if (rec.firstToken === null) rec.firstToken = now;
+                rec.tokens.push([now, token.length]);
+              }
+            } catch { /* partial or non-JSON event */ }
+          }
+        }
+      } catch (err) {
+        rec.error = String(err);
+      }
+      rec.done = performance.now();
+    })();
+
+    return new Response(app, {
+      status: response.status,
+      statusText: response.statusText,
+      headers: response.headers,
+    });
+  };
+})();
+"""
+
+
+async def install(context: BrowserContext, functions: tuple[str, ...] = STREAM_FUNCTIONS) -> None:
+    """Wrap fetch in every page of `context` (call before new_page)."""
+    await context.add_init_script(script=_PROBE_SCRIPT % {"functions": "|".join(functions)})
+
+
+async def record_count(page: Page) -> int:
+    return await page.evaluate("() => (window.__patStreamProbe || []).length")
+
+
+async def wait_for_stream(page: Page, since: int, timeout: float = 60000) -> bool:
+    """Wait until a streamed response started after record `since` has finished."""
+    try:
+        await page.wait_for_function(
+            """since => (window.__patStreamProbe || []).slice(since)
+                 .some(r => r.stream && r.done !== null)""",
+            arg=since,
+            timeout=timeout,
+        )
+        return True
+    except Exception:  # noqa: BLE001 - Playwright TimeoutError; caller reports the miss
+        return False
+
+
+async def collect(page: Page, since: int = 0) -> list[dict[str, Any]]:
+    return await page.evaluate("since => (window.__patStreamProbe || []).slice(since)", since)
+
+
+def measure(record: dict[str, Any]) -> dict[str, Any]:
+    """Per-request timings in ms, relative to the fetch call."""
+    start = record["start"]
+    token_times = [t for t, _ in record.get("tokens", [])]
+    gaps = [round(b - a, 1) for a, b in zip(token_times, token_times[1:])]
+    total = (record["done"] - start) if record.get("done") is not None else None
+    stream_ms = (token_times[-1] - token_times[0]) if len(token_times) > 1 else 0.0
+    return {
+        "function": record["fn"],
+        "status": record.get("status"),
+        "stream": record.get("stream", False),
+        "error": record.get("error"),
+        "ttfb_ms": _rel(record.get("headers"), start),
+        "ttft_ms": _rel(record.get("firstToken"), start),
+        "total_ms": round(total, 1) if total is not None else None,
+        "tokens": len(token_times),
+        "chars": sum(n for _, n in record.get("tokens", [])),
+        "tokens_per_s": round((len(token_times) - 1) / (stream_ms / 1000), 1) if stream_ms > 0 else None,
+        "gaps_ms": gaps,
+    }
+
+
+def percentile(values: list[float], p: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no samples."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return round(ordered[rank - 1], 1)
+
+
+def distribution(values: list[float]) -> dict[str, Any]:
+    return {
+        "n": len(values),
+        "p50": percentile(values, 50),
+        "p90": percentile(values, 90),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": round(max(values), 1) if values else None,
+    }
+
+
+def summarize(runs: list[dict[str, Any]]) -> dict[str, Any]:
+    """Aggregate per-prompt measurements into distributions."""
+    streamed = [r for r in runs if r.get("stream")]
+    return {
+        "prompts": len(runs),
+        "streamed": len(streamed),
+        "ttfb": distribution([r["ttfb_ms"] for r in streamed if r["ttfb_ms"] is not None]),
+        "ttft": distribution([r["ttft_ms"] for r in streamed if r["ttft_ms"] is not None]),
+        "gap": distribution([g for r in streamed for g in r["gaps_ms"]]),
+        "total": distribution([r["total_ms"] for r in streamed if r["total_ms"] is not None]),
+    }
+
+
+def budgets() -> dict[str, float]:
+    return {
+        name: float(os.environ.get(f"STREAM_BUDGET_{name.upper()}_P95_MS", default))
+        for name, default in DEFAULT_BUDGETS_MS.items()
+    }
+
+
+def check_budgets(summary: dict[str, Any], limits: dict[str, float]) -> list[str]:
+    """Return one message per exceeded p95 budget."""
+    violations = []
+    for name, limit in limits.items():
+        p95 = summary[name]["p95"]
+        if p95 is not None and p95 > limit:
+            violations.append(f"{name} p95 {p95:.0f}ms > budget {limit:.0f}ms")
+    return violations
+
+
+def write_report(case_id: str, report: dict[str, Any]) -> Path:
+    REPORT_DIR.mkdir(parents=True, exist_ok=True)
+    path = REPORT_DIR / f"{case_id}.json"
+    path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    return path
+
+
+def _rel(value: Optional[float], start: float) -> Optional[float]:
+    return round(value - start, 1) if value is not None else None
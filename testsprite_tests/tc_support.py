@@ -0,0 +1,307 @@
+"""Shared helpers for the testsprite_tests Playwright scripts.
+
+The TC scripts stay runnable on their own (``python TC003_....py``). When
+run_suite.py drives them, the browser context already holds an authenticated
+storage_state, and ``ensure_logged_in`` skips the login form.
+
+``Steps`` replaces the fixed ``wait_for_timeout(3000)`` before every action:
+it relies on Playwright's actionability waits, optionally waits for the
+``functions/v1/<name>`` request an action triggers and for the chat status
+indicator to clear, and records how long each step took.
+"""
+
+import asyncio
+import json
+import os
+import time
+from contextlib import asynccontextmanager
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional, Union
+
+from playwright.async_api import Locator, Page, Request, Response, TimeoutError as PlaywrightTimeoutError
+
+BASE_URL = "http://localhost:5173"
+LOGIN_EMAIL = "any2crds+pat1@gmail.com"
+LOGIN_PASSWORD = "admin123"
+
+LOGIN_EMAIL_INPUT = "xpath=html/body/div/div[3]/div/form/div/div/input"
+LOGIN_PASSWORD_INPUT = "xpath=html/body/div/div[3]/div/form/div[2]/div/input"
+LOGIN_SUBMIT = "xpath=html/body/div/div[3]/div/form/button"
+
+# Visible on every authenticated landing page
+AUTHENTICATED_MARKER = "text=Dashboard"
+
+
+async def login(page: Page, email: str = LOGIN_EMAIL, password: str = LOGIN_PASSWORD) -> None:
+    """Fill and submit the sign-in form, then wait for the dashboard."""
+    await page.locator(LOGIN_EMAIL_INPUT).nth(0).fill(email)
+    await page.locator(LOGIN_PASSWORD_INPUT).nth(0).fill(password)
+    await page.locator(LOGIN_SUBMIT).nth(0).click(timeout=5000)
+    await page.locator(AUTHENTICATED_MARKER).first.wait_for(state="visible", timeout=30000)
+
+
+async def ensure_logged_in(page: Page, timeout: float = 15000) -> bool:
+    """Log in unless the context is already authenticated.
+
+    Waits for whichever shows up first: the login form or the dashboard.
+    Returns True if the form was submitted.
+    """
+    login_form = page.locator(LOGIN_EMAIL_INPUT).nth(0)
+    dashboard = page.locator(AUTHENTICATED_MARKER).first
+    try:
+        await login_form.or_(dashboard).first.wait_for(state="visible", timeout=timeout)
+    except PlaywrightTimeoutError:
+        # Neither appeared; let the login attempt surface a useful error
+        pass
+
+    if await dashboard.is_visible():
+        return False
+
+    await login(page)
+    return True
+
+
+# ---------- Step timing ----------
+
+FUNCTIONS_PATH = "/functions/v1/"
+CHAT_FUNCTIONS = ("openai-chat", "intelligent-chat")
+
+# Rendered by ChatPat while Pat is sending/thinking/streaming
+CHAT_STATUS = "[data-testid=chat-status]"
+
+STEPS_DIR = Path(os.environ.get("TESTSPRITE_STEPS_DIR", Path(__file__).resolve().parent / "tmp" / "steps"))
+
+FunctionNames = Union[str, Iterable[str]]
+
+
+@dataclass
+class StepRecord:
+    name: str
+    action: str
+    ms: float = 0.0
+    ok: bool = True
+    error: str = ""
+    # Set when the step waited on an edge function request
+    function: Optional[str] = None
+    function_status: Optional[int] = None
+    function_headers_ms: Optional[float] = None
+    function_done_ms: Optional[float] = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+
+def _function_name(url: str, names: tuple[str, ...]) -> Optional[str]:
+    idx = url.find(FUNCTIONS_PATH)
+    if idx < 0:
+        return None
+    fn = url[idx + len(FUNCTIONS_PATH):].split("?", 1)[0].split("/", 1)[0]
+    return fn if not names or fn in names else None
+
+
+class _FunctionWatch:
+    """Captures the first matching functions/v1 request after `arm()`.
+
+    `response` fires when headers arrive (TTFB for SSE); `requestfinished`
+    fires once the body is fully read, which is what "done" means for a
+    streamed reply.
+    """
+
+    def __init__(self, page: Page, names: tuple[str, ...]):
+        self.page = page
+        self.names = names
+        loop = asyncio.get_running_loop()
+        self.request: Optional[Request] = None
+        self.started: asyncio.Future = loop.create_future()
+        self.headers: asyncio.Future = loop.create_future()
+        self.done: asyncio.Future = loop.create_future()
+
+    def _on_request(self, request: Request) -> None:
+        if self.request is None and _function_name(request.url, self.names):
+            self.request = request
+            self.started.set_result(time.perf_counter())
+
+    def _on_response(self, response: Response) -> None:
+        if response.request is self.request and not self.headers.done():
+            self.headers.set_result((time.perf_counter(), response.status))
+
+    def _on_finished(self, request: Request) -> None:
+        if request is self.request and not self.done.done():
+            self.done.set_result(time.perf_counter())
+
+    def _on_failed(self, request: Request) -> None:
+        if request is self.request and not self.done.done():
+            self.done.set_exception(RuntimeError(f"request failed: {request.failure}"))
+
+    def __enter__(self) -> "_FunctionWatch":
+        self.page.on("request", self._on_request)
+        self.page.on("response", self._on_response)
+        self.page.on("requestfinished", self._on_finished)
+        self.page.on("requestfailed", self._on_failed)
+        return self
+
+    def __exit__(self, *_exc: Any) -> None:
+        self.page.remove_listener("request", self._on_request)
+        self.page.remove_listener("response", self._on_response)
+        self.page.remove_listener("requestfinished", self._on_finished)
+        self.page.remove_listener("requestfailed", self._on_failed)
+
+
+class Steps:
+    """Runs and times the UI steps of one test case.
+
+    Actions rely on Playwright's own waits (visible, enabled, stable) instead
+    of a fixed sleep. Function and reply waits are soft: a timeout is recorded
+    on the step and the case continues, so the closing assertions still
+    decide pass/fail the way they did before.
+
+        steps = Steps(page, "TC003")
+        await steps.fill(textarea, "What are the benefits of protein?", "type question")
+        await steps.click(send, "send", expect_function=CHAT_FUNCTIONS)
+        await steps.wait_for_reply()
+        steps.save()
+    """
+
+    REQUEST_START_TIMEOUT = 5000
+
+    def __init__(self, page: Page, case_id: str, action_timeout: float = 5000):
+        self.page = page
+        self.case_id = case_id
+        self.action_timeout = action_timeout
+        self.records: list[StepRecord] = []
+        self._started = time.perf_counter()
+
+    @asynccontextmanager
+    async def step(self, name: str, action: str = "custom") -> AsyncIterator[StepRecord]:
+        record = StepRecord(name=name, action=action)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as exc:
+            record.ok = False
+            record.error = f"{type(exc).__name__}: {exc}".splitlines()[0][:300]
+            raise
+        finally:
+            record.ms = round((time.perf_counter() - start) * 1000, 1)
+            self.records.append(record)
+
+    async def click(
+        self,
+        locator: Locator,
+        name: str,
+        *,
+        expect_function: Optional[FunctionNames] = None,
+        function_timeout: float = 60000,
+    ) -> StepRecord:
+        async with self.step(name, "click") as record:
+            await self._act(record, lambda: locator.click(timeout=self.action_timeout), expect_function, function_timeout)
+        return record
+
+    async def fill(self, locator: Locator, value: str, name: str) -> StepRecord:
+        async with self.step(name, "fill") as record:
+            await locator.fill(value, timeout=self.action_timeout)
+        return record
+
+    async def press(
+        self,
+        locator: Locator,
+        key: str,
+        name: str,
+        *,
+        expect_function: Optional[FunctionNames] = None,
+        function_timeout: float = 60000,
+    ) -> StepRecord:
+        async with self.step(name, "press") as record:
+            await self._act(record, lambda: locator.press(key, timeout=self.action_timeout), expect_function, function_timeout)
+        return record
+
+    async def goto(self, url: str, name: str, idle_timeout: float = 5000) -> StepRecord:
+        """Navigate and wait for the network to go quiet (soft; capped at idle_timeout)."""
+        async with self.step(name, "goto") as record:
+            await self.page.goto(url, wait_until="domcontentloaded", timeout=10000)
+            try:
+                await self.page.wait_for_load_state("networkidle", timeout=idle_timeout)
+            except PlaywrightTimeoutError:
+                # Realtime sockets and polling can keep the page from idling
+                record.extra["networkidle"] = "timeout"
+        return record
+
+    async def wait_for_visible(self, locator: Locator, name: str, timeout: float = 15000) -> StepRecord:
+        async with self.step(name, "wait_visible") as record:
+            await locator.wait_for(state="visible", timeout=timeout)
+        return record
+
+    async def wait_for_reply(self, name: str = "wait for reply", appear_timeout: float = 3000, timeout: float = 60000) -> StepRecord:
+        """Wait for the chat status indicator to show and then clear.
+
+        If it never shows (reply already rendered, or the send did nothing)
+        the step is recorded with ``extra.indicator = "not shown"``.
+        """
+        status = self.page.locator(CHAT_STATUS).first
+        async with self.step(name, "wait_reply") as record:
+            try:
+                await status.wait_for(state="visible", timeout=appear_timeout)
+            except PlaywrightTimeoutError:
+                record.extra["indicator"] = "not shown"
+                return record
+            try:
+                await status.wait_for(state="hidden", timeout=timeout)
+            except PlaywrightTimeoutError:
+                record.ok = False
+                record.error = f"reply still in progress after {timeout:.0f}ms"
+        return record
+
+    async def _act(
+        self,
+        record: StepRecord,
+        action: Callable[[], Awaitable[None]],
+        expect_function: Optional[FunctionNames],
+        timeout: float,
+    ) -> None:
+        if expect_function is None:
+            await action()
+            return
+
+        names = (expect_function,) if isinstance(expect_function, str) else tuple(expect_function)
+        with _FunctionWatch(self.page, names) as watch:
+            start = time.perf_counter()
+            await action()
+            done_at = None
+            try:
+                # The request goes out on the click; don't sit out the full
+                # timeout when the action never triggered one
+                await asyncio.wait_for(asyncio.shield(watch.started), self.REQUEST_START_TIMEOUT / 1000)
+                done_at = await asyncio.wait_for(asyncio.shield(watch.done), timeout / 1000)
+            except asyncio.TimeoutError:
+                phase = "request" if watch.request is None else "response"
+                record.error = f"no {'/'.join(names)} {phase} within timeout"
+            except RuntimeError as exc:
+                record.ok = False
+                record.error = str(exc)
+
+            if watch.request is not None:
+                record.function = _function_name(watch.request.url, names)
+            if watch.headers.done():
+                headers_at, status = watch.headers.result()
+                record.function_status = status
+                record.function_headers_ms = round((headers_at - start) * 1000, 1)
+                if status >= 400:
+                    record.ok = False
+            if done_at is not None:
+                record.function_done_ms = round((done_at - start) * 1000, 1)
+
+    def summary(self) -> dict[str, Any]:
+        return {
+            "case": self.case_id,
+            "totalMs": round((time.perf_counter() - self._started) * 1000, 1),
+            "steps": [
+                {k: v for k, v in asdict(r).items() if v not in (None, "", {})}
+                for r in self.records
+            ],
+        }
+
+    def save(self) -> Path:
+        """Write <STEPS_DIR>/<case>.json; run_suite.py folds it into the report."""
+        STEPS_DIR.mkdir(parents=True, exist_ok=True)
+        path = STEPS_DIR / f"{self.case_id}.json"
+        path.write_text(json.dumps(self.summary(), indent=2) + "\n", encoding="utf-8")
+        return path
@@ -0,0 +1,132 @@
+"""Chat transcript profiling gate.
+
+Opens the ``/dev/transcript-profile`` harness (src/components/dev/
+TranscriptProfiler.tsx), which replays a 500-message session through the
+virtualized ChatTranscript: mount, a 400-token streamed reply, then a full
+scroll to the top and back. It asserts on what the page recorded:
+
+- frame time p95 and long frames (> 50 ms) per phase
+- React commits while streaming: coalescing means at most one text commit
+  (plus one re-measure) per frame, and far fewer commits than tokens
+- commit cost p95 while streaming: finished bubbles are memoized, so a commit
+  only re-renders the streaming row
+- rendered rows: only the viewport plus overscan is in the DOM
+
+The harness route exists on the dev server, or in a build made with
+VITE_ENABLE_PROFILER=true (closer to production React):
+
+    npm run dev
+    python testsprite_tests/transcript_profile.py
+    python testsprite_tests/transcript_profile.py --coalesce off   # per-token setState, for comparison
+
+Budget overrides: TRANSCRIPT_BUDGET_FRAME_P95_MS (default 33),
+TRANSCRIPT_BUDGET_COMMIT_P95_MS (8), TRANSCRIPT_BUDGET_ROWS (80).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Optional
+
+from playwright.async_api import async_playwright
+
+from tc_support import BASE_URL
+
+HERE = Path(__file__).resolve().parent
+REPORT_PATH = HERE / "tmp" / "transcript_profile.json"
+
+DEFAULT_BUDGETS = {
+    "frame_p95_ms": 33.0,
+    "commit_p95_ms": 8.0,
+    "rows": 80.0,
+}
+
+
+def budgets() -> dict[str, float]:
+    return {
+        name: float(os.environ.get(f"TRANSCRIPT_BUDGET_{name.upper()}", default))
+        for name, default in DEFAULT_BUDGETS.items()
+    }
+
+
+def check(profile: dict[str, Any], limits: dict[str, float]) -> list[str]:
+    failures = []
+    phases = profile["phases"]
+
+    for name in ("stream", "scroll"):
+        p = phases[name]
+        if p["frameP95"] > limits["frame_p95_ms"]:
+            failures.append(f"{name}: frame p95 {p['frameP95']} ms > {limits['frame_p95_ms']:.0f} ms")
+        if p["longFrames"] > max(2, p["frames"] // 50):
+            failures.append(f"{name}: {p['longFrames']} long frames (> 50 ms) in {p['frames']}")
+
+    stream = phases["stream"]
+    # Per frame: one coalesced text commit, plus at most one when the growing
+    # row's new height is measured (+2 for the append and the final flush)
+    if stream["commits"] > 2 * stream["frames"] + 2:
+        failures.append(f"stream: {stream['commits']} commits in {stream['frames']} frames (expected <= 2 per frame)")
+    if stream["commits"] > profile["tokens"] / 2:
+        failures.append(f"stream: {stream['commits']} commits for {profile['tokens']} tokens (not coalesced)")
+    if stream["commitP95"] > limits["commit_p95_ms"]:
+        failures.append(f"stream: commit p95 {stream['commitP95']} ms > {limits['commit_p95_ms']:.0f} ms")
+
+    if profile["renderedRows"] > limits["rows"]:
+        failures.append(f"{profile['renderedRows']} rows in the DOM for {profile['messages']} messages (> {limits['rows']:.0f})")
+    return failures
+
+
+async def profile_once(args: argparse.Namespace) -> dict[str, Any]:
+    query = f"messages={args.messages}&tokens={args.tokens}&coalesce={'1' if args.coalesce == 'on' else '0'}"
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=not args.headed)
+        try:
+            page = await browser.new_page(viewport={"width": 390, "height": 844})
+            await page.goto(f"{BASE_URL.rstrip('/')}/dev/transcript-profile?{query}", wait_until="domcontentloaded")
+            await page.wait_for_function("() => window.__transcriptProfile && window.__transcriptProfile.done",
+                                         timeout=args.timeout * 1000)
+            return await page.evaluate("() => window.__transcriptProfile")
+        finally:
+            await browser.close()
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=500, help="session length to replay (default 500)")
+    parser.add_argument("--tokens", type=int, default=400, help="tokens in the streamed reply (default 400)")
+    parser.add_argument("--coalesce", choices=("on", "off"), default="on",
+                        help="off = one setState per token, to compare against")
+    parser.add_argument("--timeout", type=float, default=120.0, help="seconds to wait for the replay")
+    parser.add_argument("--headed", action="store_true", help="show the browser")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    args = parse_args(argv)
+    profile = asyncio.run(profile_once(args))
+    failures = check(profile, budgets())
+
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text(json.dumps({**profile, "failures": failures}, indent=2) + "\n")
+
+    print(f"{'phase':<8} {'frames':>6} {'p50':>6} {'p95':>6} {'max':>7} {'long':>5} {'commits':>8} {'commit p95':>11}")
+    for name, p in profile["phases"].items():
+        print(f"{name:<8} {p['frames']:>6} {p['frameP50']:>6} {p['frameP95']:>6} {p['frameMax']:>7} "
+              f"{p['longFrames']:>5} {p['commits']:>8} {p['commitP95']:>11}")
+    print(f"rows in DOM: {profile['renderedRows']} / {profile['messages']} messages; report: {REPORT_PATH}")
+
+    if failures:
+        print("\nTranscript profile FAILED:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("\nTranscript profile within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""Web Vitals gate for the login -> dashboard -> chat flow.
+
+Loads each page cold in a fresh Chromium context and records, in the page:
+
+- LCP  (``largest-contentful-paint``)
+- INP  (longest ``event`` timing per interactionId; with fewer than 50
+        interactions INP is the slowest one)
+- TTI  (Lighthouse-style: end of the last long task before a 5 s window with
+        no long tasks, floored at FCP / DOMContentLoaded)
+- FCP and the JS bytes downloaded, to tie regressions to bundle size
+
+Interactions are real key presses and clicks: typing the credentials and
+submitting on /login, typing a message into the chat box on /chat (nothing is
+sent, so no LLM call is made). /dashboard and /chat are hard loads with the
+session from the login step, which is what route-level code splitting changes.
+
+Median of ``--runs`` is checked against absolute budgets and, when
+``web_vitals_baseline.json`` exists, against the baseline (more than
+``--tolerance`` slower, with a 50 ms floor, fails). Exit code 1 on failure.
+
+Measure a production build, not the dev server (Vite serves unbundled
+modules in dev):
+
+    npm run build && npm run preview -- --port 4173
+    WEB_VITALS_BASE_URL=http://localhost:4173 python testsprite_tests/web_vitals.py --runs 5
+    python testsprite_tests/web_vitals.py --cpu-throttle 4     # mid-range phone
+    python testsprite_tests/web_vitals.py --update-baseline
+
+Budget overrides: WEB_VITALS_BUDGET_{LCP,INP,TTI}_MS (defaults 2500/200/3800,
+the "good" thresholds).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Optional
+
+from playwright.async_api import BrowserContext, Page, TimeoutError as PlaywrightTimeoutError, async_playwright
+
+from tc_support import (
+    AUTHENTICATED_MARKER,
+    BASE_URL as TC_BASE_URL,
+    LOGIN_EMAIL,
+    LOGIN_EMAIL_INPUT,
+    LOGIN_PASSWORD,
+    LOGIN_PASSWORD_INPUT,
+    LOGIN_SUBMIT,
+)
+
+HERE = Path(__file__).resolve().parent
+BASE_URL = os.environ.get("WEB_VITALS_BASE_URL", TC_BASE_URL)
+REPORT_PATH = HERE / "tmp" / "web_vitals" / "report.json"
+BASELINE_PATH = HERE / "web_vitals_baseline.json"
+
+PAGES = ("login", "dashboard", "chat")
+METRICS = ("lcp", "inp", "tti")
+DEFAULT_BUDGETS_MS = {"lcp": 2500.0, "inp": 200.0, "tti": 3800.0}
+
+CHAT_INPUT = "textarea[placeholder='Ask me anything']"
+CHAT_TYPING = "How much protein should I eat after a workout?"
+
+QUIET_WINDOW_MS = 5000
+TTI_TIMEOUT_MS = 30000
+REGRESSION_FLOOR_MS = 50.0
+
+_VITALS_SCRIPT = """
+(() => {
+  const v = window.__patVitals = { lcp: null, fcp: null, longTasks: [], interactions: {} };
+  const observe = (type, onEntry, extra = {}) => {
+    try {
+      new PerformanceObserver((list) => list.getEntries().forEach(onEntry))
+        .observe({ type, buffered: true, ...extra });
+    } catch (e) { /* entry type unsupported */ }
+  };
+  observe('largest-contentful-paint', (e) => { v.lcp = e.startTime; });
+  observe('paint', (e) => { if (e.name === 'first-contentful-paint') v.fcp = e.startTime; });
+  observe('longtask', (e) => { v.longTasks.push([e.startTime, e.startTime + e.duration]); });
+  const interaction = (e) => {
+    if (!e.interactionId) return;
+    v.interactions[e.interactionId] = Math.max(v.interactions[e.interactionId] || 0, e.duration);
+  };
+  observe('event', interaction, { durationThreshold: 16 });
+  observe('first-input', interaction);
+})();
+"""
+
+_TTI_PROBE = """
+(quietMs) => {
+  const v = window.__patVitals;
+  const nav = performance.getEntriesByType('navigation')[0];
+  const floor = Math.max(v.fcp || 0, nav ? nav.domContentLoadedEventEnd : 0);
+  const lastLongTask = v.longTasks.reduce((m, t) => Math.max(m, t[1]), 0);
+  const tti = Math.max(floor, lastLongTask);
+  return { quiet: performance.now() - tti >= quietMs, tti };
+}
+"""
+
+_SNAPSHOT = """
+() => {
+  const v = window.__patVitals;
+  const durations = Object.values(v.interactions).sort((a, b) => b - a);
+  const scripts = performance.getEntriesByType('resource')
+    .filter((r) => r.initiatorType === 'script' || /\\.m?js(\\?|$)/.test(r.name));
+  return {
+    lcp: v.lcp,
+    fcp: v.fcp,
+    inp: durations.length ? durations[Math.min(Math.floor(durations.length / 50), durations.length - 1)] : 0,
+    interactions: durations.length,
+    longTasks: v.longTasks.length,
+    jsBytes: scripts.reduce((n, r) => n + (r.encodedBodySize || 0), 0),
+    jsFiles: scripts.length,
+  };
+}
+"""
+
+
+def budgets() -> dict[str, float]:
+    return {
+        name: float(os.environ.get(f"WEB_VITALS_BUDGET_{name.upper()}_MS", default))
+        for name, default in DEFAULT_BUDGETS_MS.items()
+    }
+
+
+async def _settle(page: Page) -> Optional[float]:
+    """Wait for a 5 s long-task-free window after load and return TTI."""
+    try:
+        await page.wait_for_load_state("networkidle", timeout=10000)
+    except PlaywrightTimeoutError:
+        pass
+    deadline = time.monotonic() + TTI_TIMEOUT_MS / 1000
+    while time.monotonic() < deadline:
+        probe = await page.evaluate(_TTI_PROBE, QUIET_WINDOW_MS)
+        if probe["quiet"]:
+            return round(probe["tti"], 1)
+        await asyncio.sleep(0.25)
+    return None
+
+
+async def _measure_load(page: Page, path: str, ready: str) -> dict[str, Any]:
+    await page.goto(f"{BASE_URL.rstrip('/')}{path}", wait_until="domcontentloaded")
+    await page.locator(ready).first.wait_for(state="visible", timeout=30000)
+    tti = await _settle(page)
+    snapshot = await page.evaluate(_SNAPSHOT)
+    return {**snapshot, "tti": tti}
+
+
+async def _throttle(context: BrowserContext, page: Page, rate: float) -> None:
+    if rate > 1:
+        cdp = await context.new_cdp_session(page)
+        await cdp.send("Emulation.setCPUThrottlingRate", {"rate": rate})
+
+
+async def run_flow(context: BrowserContext, cpu_throttle: float) -> dict[str, dict[str, Any]]:
+    """One cold pass through login -> dashboard -> chat."""
+    results: dict[str, dict[str, Any]] = {}
+    await context.add_init_script(_VITALS_SCRIPT)
+    page = await context.new_page()
+    await _throttle(context, page, cpu_throttle)
+
+    # Login: cold load, then type and submit (INP covers these interactions)
+    login = await _measure_load(page, "/login", LOGIN_EMAIL_INPUT)
+    await page.locator(LOGIN_EMAIL_INPUT).first.click()
+    await page.locator(LOGIN_EMAIL_INPUT).first.press_sequentially(LOGIN_EMAIL)
+    await page.locator(LOGIN_PASSWORD_INPUT).first.click()
+    await page.locator(LOGIN_PASSWORD_INPUT).first.press_sequentially(LOGIN_PASSWORD)
+    submitted = time.perf_counter()
+    await page.locator(LOGIN_SUBMIT).first.click()
+    await page.locator(AUTHENTICATED_MARKER).first.wait_for(state="visible", timeout=30000)
+    login_to_dashboard = round((time.perf_counter() - submitted) * 1000, 1)
+    after = await page.evaluate(_SNAPSHOT)
+    results["login"] = {**login, "inp": after["inp"], "interactions": after["interactions"],
+                        "loginToDashboardMs": login_to_dashboard}
+
+    # Dashboard and chat: hard loads with the session in place
+    results["dashboard"] = await _measure_load(page, "/dashboard", AUTHENTICATED_MARKER)
+
+    chat = await _measure_load(page, "/chat", CHAT_INPUT)
+    box = page.locator(CHAT_INPUT).first
+    await box.click()
+    await box.press_sequentially(CHAT_TYPING)
+    await box.fill("")
+    after = await page.evaluate(_SNAPSHOT)
+    results["chat"] = {**chat, "inp": after["inp"], "interactions": after["interactions"]}
+
+    await page.close()
+    return results
+
+
+def _median(values: list[Optional[float]]) -> Optional[float]:
+    present = [v for v in values if v is not None]
+    return round(statistics.median(present), 1) if present else None
+
+
+def summarize(runs: list[dict[str, dict[str, Any]]]) -> dict[str, dict[str, Optional[float]]]:
+    summary: dict[str, dict[str, Optional[float]]] = {}
+    for name in PAGES:
+        per_page = [r[name] for r in runs if name in r]
+        summary[name] = {
+            key: _median([p.get(key) for p in per_page])
+            for key in (*METRICS, "fcp", "jsBytes")
+        }
+    return summary
+
+
+def check(summary: dict[str, dict[str, Optional[float]]], limits: dict[str, float],
+          baseline: Optional[dict[str, Any]], tolerance: float) -> list[str]:
+    failures = []
+    for name, metrics in summary.items():
+        for metric in METRICS:
+            value = metrics.get(metric)
+            if value is None:
+                failures.append(f"{name} {metric.upper()} not measured")
+                continue
+            if value > limits[metric]:
+                failures.append(f"{name} {metric.upper()} {value:.0f} ms > budget {limits[metric]:.0f} ms")
+            base = (baseline or {}).get("pages", {}).get(name, {}).get(metric)
+            if base is not None and value > base * (1 + tolerance) and value - base > REGRESSION_FLOOR_MS:
+                failures.append(
+                    f"{name} {metric.upper()} {value:.0f} ms regressed from baseline {base:.0f} ms "
+                    f"(+{(value / base - 1) * 100 if base else 0:.0f}%)"
+                )
+    return failures
+
+
+async def main_async(args: argparse.Namespace) -> int:
+    async with async_playwright() as pw:
+        browser = await pw.chromium.launch(headless=not args.headed)
+        runs = []
+        for i in range(args.runs):
+            context = await browser.new_context(viewport={"width": 390, "height": 844} if args.mobile else None)
+            try:
+                runs.append(await run_flow(context, args.cpu_throttle))
+                print(f"run {i + 1}/{args.runs}: " + ", ".join(
+                    f"{p} lcp={runs[-1][p]['lcp'] or 0:.0f} inp={runs[-1][p]['inp'] or 0:.0f} "
+                    f"tti={runs[-1][p]['tti'] or 0:.0f}" for p in PAGES))
+            finally:
+                await context.close()
+        await browser.close()
+
+    summary = summarize(runs)
+    baseline = json.loads(BASELINE_PATH.read_text()) if BASELINE_PATH.exists() else None
+    limits = budgets()
+    failures = check(summary, limits, baseline, args.tolerance)
+
+    report = {
+        "baseUrl": BASE_URL,
+        "runs": runs,
+        "summary": summary,
+        "budgetsMs": limits,
+        "cpuThrottle": args.cpu_throttle,
+        "mobile": args.mobile,
+        "failures": failures,
+    }
+    REPORT_PATH.parent.mkdir(parents=True, exist_ok=True)
+    REPORT_PATH.write_text(json.dumps(report, indent=2) + "\n")
+
+    print(f"\n{'page':<10} {'LCP':>7} {'INP':>7} {'TTI':>7} {'JS kB':>8}")
+    for name, m in summary.items():
+        js_kb = (m["jsBytes"] or 0) / 1024
+        print(f"{name:<10} {m['lcp'] or 0:>7.0f} {m['inp'] or 0:>7.0f} {m['tti'] or 0:>7.0f} {js_kb:>8.1f}")
+    print(f"report: {REPORT_PATH}")
+
+    if args.update_baseline:
+        BASELINE_PATH.write_text(json.dumps({
+            "recordedAt": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "cpuThrottle": args.cpu_throttle,
+            "mobile": args.mobile,
+            "pages": summary,
+        }, indent=2) + "\n")
+        print(f"baseline updated: {BASELINE_PATH}")
+        return 0
+
+    if failures:
+        print("\nWeb Vitals check FAILED:")
+        for f in failures:
+            print(f"  - {f}")
+        return 1
+    print("\nWeb Vitals within budget")
+    return 0
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=int(os.environ.get("WEB_VITALS_RUNS", "3")),
+                        help="cold passes through the flow; the median is checked (default 3)")
+    parser.add_argument("--cpu-throttle", type=float, default=float(os.environ.get("WEB_VITALS_CPU_THROTTLE", "1")),
+                        help="CDP CPU slowdown factor, e.g. 4 for a mid-range phone")
+    parser.add_argument("--mobile", action="store_true", help="390x844 viewport")
+    parser.add_argument("--tolerance", type=float, default=float(os.environ.get("WEB_VITALS_TOLERANCE", "0.2")),
+                        help="allowed slowdown vs baseline as a fraction (default 0.2)")
+    parser.add_argument("--update-baseline", action="store_true", help=f"write {BASELINE_PATH.name} and exit 0")
+    parser.add_argument("--headed", action="store_true", help="show the browser")
+    args = parser.parse_args(argv)
+    args.runs = max(1, args.runs)
+    return args
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    return asyncio.run(main_async(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,9 @@ export default defineConfig({
       'src/**/__tests__/**/*.{ts,tsx}',
       'tests/**/*.{test,spec}.{ts,tsx}'
     ],
-    reporters: 'default'
+    reporters: 'default',
+    benchmark: {
+      include: ['tests/bench/**/*.bench.ts']
+    }
   },
 });
\ No newline at end of file